@@ -19,7 +19,7 @@ _LOG = logging.getLogger(__name__)
 
 def _crop_data_frame_in_batches(
     df: pd.DataFrame, chunksize: int
-) -> List[pd.DataFrame]:
+) -> Generator[pd.DataFrame, None, None]:
     """
     Split df into chunks of chunksize.
 
@@ -27,10 +27,112 @@ def _crop_data_frame_in_batches(
     :param chunksize: Number of rows in chunk
     :return: Chunks
     """
-    generator_object = []
-    for _, chunk in df.groupby(np.arange(len(df)) // chunksize):
-        generator_object.append(chunk)
-    return generator_object
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start : start + chunksize]
+
+
+# Statistics accumulated by a bar, in the order of the columns used by
+# `_find_bar_ends()`.
+_CUM_STATISTICS = [
+    "cum_ticks",
+    "cum_dollar_value",
+    "cum_volume",
+    "cum_buy_volume",
+]
+
+
+def _get_tick_columns(
+    data: Union[list, tuple, np.ndarray, pd.DataFrame]
+) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Split raw tick data into date times, prices, and volumes.
+
+    :param data: Contains 3 columns - date_time, price, and volume
+    :return: date times, prices as floats, volumes with their original dtype
+    """
+    if isinstance(data, pd.DataFrame):
+        df = data
+    else:
+        # Infer the types of the columns, e.g., when the rows are stored in an
+        # array of objects.
+        df = pd.DataFrame(list(data)).infer_objects()
+    hdbg.dassert_eq(
+        df.shape[1], 3, "Must have only 3 columns: date_time, price, & volume."
+    )
+    date_times = pd.Index(df.iloc[:, 0])
+    prices = df.iloc[:, 1].to_numpy(dtype=float)
+    volumes = df.iloc[:, 2].to_numpy()
+    return date_times, prices, volumes
+
+
+def _find_bar_ends(
+    statistics: np.ndarray,
+    thresholds: Union[float, int, np.ndarray],
+    metric_idx: int,
+    cum_statistics: np.ndarray,
+    min_window: int = 64,
+) -> Tuple[List[int], np.ndarray, np.ndarray]:
+    """
+    Find the ticks at which the accumulated `metric` reaches the threshold.
+
+    The ticks are scanned in windows whose size adapts to the length of the
+    bars, so that the number of iterations is proportional to the number of
+    bars rather than to the number of ticks. The statistics are accumulated
+    sequentially from the beginning of each bar (and not computed as
+    differences of a global cumulative sum), so that the floating point
+    values are identical to the ones of a tick-by-tick loop.
+
+    :param statistics: per-tick statistics with shape `(num_ticks, 4)` and
+        columns in the order of `_CUM_STATISTICS`
+    :param thresholds: fixed threshold or one threshold per tick
+    :param metric_idx: index of the column of `statistics` compared to the
+        thresholds
+    :param cum_statistics: statistics accumulated by the bar left open by
+        the previous ticks
+    :param min_window: minimum number of ticks to scan in one iteration
+    :return:
+        - indices of the ticks closing a bar
+        - statistics accumulated by each bar with shape `(num_bars, 4)`
+        - statistics accumulated by the bar left open after the last tick
+    """
+    num_ticks = statistics.shape[0]
+    is_fixed_threshold = np.ndim(thresholds) == 0
+    bar_ends: List[int] = []
+    bar_statistics: List[np.ndarray] = []
+    bar_start = 0
+    window_start = 0
+    window = min_window
+    while window_start < num_ticks:
+        window_end = min(window_start + window, num_ticks)
+        cum_values = np.cumsum(
+            np.vstack([cum_statistics, statistics[window_start:window_end]]),
+            axis=0,
+        )[1:]
+        if is_fixed_threshold:
+            window_thresholds = thresholds
+        else:
+            window_thresholds = thresholds[window_start:window_end]
+        is_reached = cum_values[:, metric_idx] >= window_thresholds
+        if is_reached.any():
+            # Close the bar and start a new one from the next tick.
+            idx = int(is_reached.argmax())
+            bar_end = window_start + idx
+            bar_ends.append(bar_end)
+            bar_statistics.append(cum_values[idx])
+            cum_statistics = np.zeros_like(cum_statistics)
+            window = max(min_window, 2 * (bar_end + 1 - bar_start))
+            bar_start = bar_end + 1
+            window_start = bar_end + 1
+        else:
+            # Carry the statistics over and scan a larger window.
+            cum_statistics = cum_values[-1]
+            window_start = window_end
+            window *= 2
+    if bar_statistics:
+        bar_statistics_arr = np.vstack(bar_statistics)
+    else:
+        bar_statistics_arr = np.empty((0, statistics.shape[1]))
+    return bar_ends, bar_statistics_arr, cum_statistics
 
 
 class _StandardBars:
@@ -151,13 +253,9 @@ class _StandardBars:
         in the format[date_time, price, volume]
         :return: Financial data structure
         """
-        if isinstance(data, (list, tuple)):
-            values = data
-        elif isinstance(data, pd.DataFrame):
-            values = data.values
-        else:
+        if not isinstance(data, (list, tuple, pd.DataFrame)):
             raise ValueError("data is neither list nor tuple nor pd.DataFrame")
-        list_bars = self._extract_bars(data=values)
+        list_bars = self._extract_bars(data=data)
         # Set flag to True: notify function to use cache.
         self.flag = True
         return list_bars
@@ -233,54 +331,89 @@ class _StandardBars:
         first_row = pd.read_csv(file_path, nrows=1)
         self._assert_csv(first_row)
 
-    def _extract_bars(self, data: Union[list, tuple, np.ndarray]) -> list:
+    def _extract_bars(
+        self, data: Union[list, tuple, np.ndarray, pd.DataFrame]
+    ) -> list:
         """
-        Compile the various bars: dollar, volume, or tick, in a for loop.
+        Compile the various bars: dollar, volume, or tick, with array
+        operations.
 
-        We did investigate the use of trying to solve this in a vectorised
-        manner but found that a For loop worked well.
+        The bar boundaries are found by `_find_bar_ends()`, while open, high,
+        low, and close prices are computed for all the bars at once. The
+        state of the bar left open by the last tick is stored in the cache,
+        so that the bars can be computed one chunk of ticks at a time.
 
-        :param data: (tuple) Contains 3 columns - date_time, price, and volume.
+        :param data: Contains 3 columns - date_time, price, and volume.
         :return: Extracted bars
         """
-        # Iterate over rows.
-        list_bars: List[list] = []
-        for row in data:
-            # Set variables.
-            date_time = row[0]
-            self.tick_num += 1
-            price = np.float(row[1])
-            volume = row[2]
-            dollar_value = price * volume
-            signed_tick = self._apply_tick_rule(price)
-            if isinstance(self.threshold, (int, float)):
-                # If the threshold is fixed, it's used for every sampling.
-                threshold = self.threshold
-            else:
-                # If the threshold is changing, then the threshold defined just before
-                # sampling time is used
-                threshold = self.threshold.iloc[
-                    self.threshold.index.get_loc(date_time, method="pad")
-                ]
-            if self.open_price is None:
-                self.open_price = price
-            # Update high low prices.
-            self.high_price, self.low_price = self._update_high_low(price)
-            # Calculations.
-            self.cum_statistics["cum_ticks"] += 1
-            self.cum_statistics["cum_dollar_value"] += dollar_value
-            self.cum_statistics["cum_volume"] += volume
-            if signed_tick == 1:
-                self.cum_statistics["cum_buy_volume"] += volume
-            # If threshold reached then take a sample.
-            if self.cum_statistics[self.metric] >= threshold:
-                self._create_bars(
-                    date_time, price, self.high_price, self.low_price, list_bars
-                )
-                # Reset cache.
-                self._reset_cache()
+        date_times, prices, volumes = _get_tick_columns(data)
+        num_ticks = len(prices)
+        if num_ticks == 0:
+            return []
+        signed_ticks = self._apply_tick_rule(prices)
+        statistics = np.column_stack(
+            [
+                np.ones(num_ticks),
+                prices * volumes,
+                volumes,
+                np.where(signed_ticks == 1, volumes, 0),
+            ]
+        ).astype(float)
+        cum_statistics = np.array(
+            [self.cum_statistics[name] for name in _CUM_STATISTICS], dtype=float
+        )
+        bar_ends, bar_statistics, cum_statistics = _find_bar_ends(
+            statistics,
+            self._get_thresholds(date_times),
+            _CUM_STATISTICS.index(self.metric),
+            cum_statistics,
+        )
+        list_bars = self._create_bars(
+            date_times, prices, volumes, bar_ends, bar_statistics
+        )
+        # Update the cache with the bar left open by the last ticks.
+        last_bar_start = bar_ends[-1] + 1 if bar_ends else 0
+        if last_bar_start < num_ticks:
+            open_prices = prices[last_bar_start:]
+            if self.open_price is None or bar_ends:
+                self.open_price = float(open_prices[0])
+            if bar_ends:
+                self.high_price, self.low_price = -np.inf, np.inf
+            self.high_price = max(self.high_price, float(open_prices.max()))
+            self.low_price = min(self.low_price, float(open_prices.min()))
+        else:
+            self._reset_cache()
+        self.cum_statistics = {
+            name: value.item()
+            for name, value in zip(_CUM_STATISTICS, cum_statistics)
+        }
+        self.cum_statistics["cum_ticks"] = int(self.cum_statistics["cum_ticks"])
+        self.tick_num += num_ticks
         return list_bars
 
+    def _get_thresholds(
+        self, date_times: pd.Index
+    ) -> Union[float, int, np.ndarray]:
+        """
+        Get the threshold used for each tick.
+
+        :param date_times: Timestamps of the ticks
+        :return: Fixed threshold or one threshold per tick
+        """
+        if isinstance(self.threshold, (int, float)):
+            # If the threshold is fixed, it's used for every sampling.
+            return self.threshold
+        # If the threshold is changing, then the threshold defined just before
+        # sampling time is used.
+        if isinstance(self.threshold.index, pd.DatetimeIndex):
+            date_times = pd.DatetimeIndex(date_times)
+        idxs = self.threshold.index.get_indexer(date_times, method="pad")
+        hdbg.dassert_lte(
+            0, idxs.min(), "No threshold is defined before the first tick."
+        )
+        thresholds = self.threshold.to_numpy(dtype=float)[idxs]
+        return thresholds
+
     def _reset_cache(self) -> None:
         """
         Describe how cache should be reset when new bar is sampled.
@@ -294,89 +427,91 @@ class _StandardBars:
             "cum_buy_volume": 0,
         }
 
-    def _update_high_low(self, price: float) -> Tuple[float, float]:
-        """
-        Update the high and low prices using the current price.
-
-        :param price: Current price
-        :return: Updated high and low prices
-        """
-        if price > self.high_price:
-            high_price = price
-        else:
-            high_price = self.high_price
-
-        if price < self.low_price:
-            low_price = price
-        else:
-            low_price = self.low_price
-        return high_price, low_price
-
     def _create_bars(
         self,
-        date_time: str,
-        price: float,
-        high_price: float,
-        low_price: float,
-        list_bars: list,
-    ) -> None:
+        date_times: pd.Index,
+        prices: np.ndarray,
+        volumes: np.ndarray,
+        bar_ends: List[int],
+        bar_statistics: np.ndarray,
+    ) -> list:
         """
-        Construct a bar which has the following fields: date_time, open, high,
-        low, close, volume, cum_buy_volume, cum_ticks, cum_dollar_value. These
-        bars are appended to list_bars, which is later used to construct the
-        final bars DataFrame.
-
-        :param date_time: Timestamp of the bar
-        :param price: The current price
-        :param high_price: Highest price in the period
-        :param low_price: Lowest price in the period
-        :param list_bars: List to which we append the bars
+        Construct bars which have the following fields: date_time, open,
+        high, low, close, volume, cum_buy_volume, cum_ticks, cum_dollar_value.
+        These bars are later used to construct the final bars DataFrame.
+
+        :param date_times: Timestamps of the ticks
+        :param prices: Prices of the ticks
+        :param volumes: Volumes of the ticks
+        :param bar_ends: Indices of the ticks closing a bar
+        :param bar_statistics: Statistics accumulated by each bar
+        :return: Bars
         """
-        # Create bars.
-        open_price = self.open_price
-        high_price = max(high_price, open_price)
-        low_price = min(low_price, open_price)
-        close_price = price
-        volume = self.cum_statistics["cum_volume"]
-        cum_buy_volume = self.cum_statistics["cum_buy_volume"]
-        cum_ticks = self.cum_statistics["cum_ticks"]
-        cum_dollar_value = self.cum_statistics["cum_dollar_value"]
-        # Update bars.
-        list_bars.append(
-            [
-                date_time,
-                self.tick_num,
-                open_price,
-                high_price,
-                low_price,
-                close_price,
-                volume,
-                cum_buy_volume,
-                cum_ticks,
-                cum_dollar_value,
-            ]
-        )
+        if not bar_ends:
+            return []
+        bar_ends_arr = np.array(bar_ends)
+        bar_starts = np.concatenate([[0], bar_ends_arr[:-1] + 1])
+        # Compute high and low prices of each bar over its ticks.
+        bar_prices = prices[: bar_ends_arr[-1] + 1]
+        high_prices = np.maximum.reduceat(bar_prices, bar_starts)
+        low_prices = np.minimum.reduceat(bar_prices, bar_starts)
+        open_prices = prices[bar_starts]
+        # The first bar can start in a previous chunk of ticks.
+        if self.open_price is not None:
+            open_prices[0] = self.open_price
+            high_prices[0] = max(high_prices[0], self.high_price)
+            low_prices[0] = min(low_prices[0], self.low_price)
+        high_prices = np.maximum(high_prices, open_prices)
+        low_prices = np.minimum(low_prices, open_prices)
+        close_prices = prices[bar_ends_arr]
+        # Restore the types of the statistics, e.g., integer volumes.
+        statistics = {
+            name: bar_statistics[:, idx]
+            for idx, name in enumerate(_CUM_STATISTICS)
+        }
+        statistics["cum_ticks"] = statistics["cum_ticks"].astype(int)
+        for name in ["cum_volume", "cum_buy_volume"]:
+            statistics[name] = statistics[name].astype(volumes.dtype)
+        tick_nums = self.tick_num + bar_ends_arr + 1
+        columns = [
+            date_times[bar_ends_arr].tolist(),
+            tick_nums.tolist(),
+            open_prices.tolist(),
+            high_prices.tolist(),
+            low_prices.tolist(),
+            close_prices.tolist(),
+            statistics["cum_volume"].tolist(),
+            statistics["cum_buy_volume"].tolist(),
+            statistics["cum_ticks"].tolist(),
+            statistics["cum_dollar_value"].tolist(),
+        ]
+        list_bars = [list(row) for row in zip(*columns)]
+        return list_bars
 
-    def _apply_tick_rule(self, price: float) -> int:
+    def _apply_tick_rule(self, prices: np.ndarray) -> np.ndarray:
         """
         Apply the tick rule as defined on page 29 of Advances in Financial
         Machine Learning.
 
-        :param price: Price at time t
-        :return: The signed tick
+        :param prices: Prices of the ticks
+        :return: The signed ticks
         """
         if self.prev_price is not None:
-            tick_diff = price - self.prev_price
+            prev_prices = np.concatenate([[self.prev_price], prices[:-1]])
         else:
-            tick_diff = 0
-        if tick_diff != 0:
-            signed_tick: int = np.sign(tick_diff)
-            self.prev_tick_rule = signed_tick
-        else:
-            signed_tick = self.prev_tick_rule
-        # Update previous price used for tick rule calculations.
-        self.prev_price = price
-        return signed_tick
+            prev_prices = np.concatenate([prices[:1], prices[:-1]])
+        tick_signs = np.sign(prices - prev_prices)
+        # Propagate the last non-zero sign over the ticks without a price
+        # change.
+        idxs = np.where(tick_signs != 0, np.arange(len(prices)), -1)
+        idxs = np.maximum.accumulate(idxs)
+        signed_ticks = np.where(
+            idxs >= 0, tick_signs[np.maximum(idxs, 0)], self.prev_tick_rule
+        )
+        # Update previous price and tick rule used for tick rule calculations.
+        self.prev_tick_rule = int(signed_ticks[-1])
+        self.prev_price = float(prices[-1])
+        return signed_ticks
 
     def _get_imbalance(
         self, price: float, signed_tick: int, volume: float
@@ -4,11 +4,20 @@ Import as:
 import core.information_bars.test.test_bars as bttbar
 """
 
+import logging
 import os
+from typing import Callable, Union
+
+import numpy as np
+import pandas as pd
+import pytest
 
 import core.information_bars.bars as cinbabar
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
+_LOG = logging.getLogger(__name__)
+
 
 class TestBars(hunitest.TestCase):
     def test_get_tick_bars(self) -> None:
@@ -48,3 +57,162 @@ class TestBars(hunitest.TestCase):
         file_name = os.path.join(self.get_input_dir(), file_name)
         file_name = os.path.abspath(file_name)
         return file_name
+
+
+def _get_ticks(num_ticks: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate random tick data in the format [date_time, price, volume].
+    """
+    np.random.seed(seed)
+    date_times = pd.date_range("2009-09-28 09:30:00", periods=num_ticks, freq="S")
+    # Round the prices so that many ticks don't change the price.
+    prices = np.round(50 + np.random.randn(num_ticks).cumsum() * 0.01, 2)
+    volumes = np.random.randint(1, 10, size=num_ticks) * 100
+    df = pd.DataFrame(
+        {"date_time": date_times, "price": prices, "volume": volumes}
+    )
+    return df
+
+
+def _get_bars_with_loop(
+    df: pd.DataFrame, metric: str, threshold: Union[float, pd.Series]
+) -> pd.DataFrame:
+    """
+    Compute bars with a tick-by-tick loop, used as reference.
+    """
+    bars = []
+    tick_num = 0
+    prev_price = None
+    prev_tick_rule = 0
+    open_price = None
+    high_price, low_price = -np.inf, np.inf
+    cum_statistics = dict.fromkeys(
+        ["cum_ticks", "cum_dollar_value", "cum_volume", "cum_buy_volume"], 0
+    )
+    for date_time, price, volume in df.itertuples(index=False):
+        tick_num += 1
+        tick_diff = 0 if prev_price is None else price - prev_price
+        if tick_diff != 0:
+            prev_tick_rule = np.sign(tick_diff)
+        prev_price = price
+        if isinstance(threshold, pd.Series):
+            threshold_ = threshold.iloc[
+                threshold.index.get_indexer([date_time], method="pad")[0]
+            ]
+        else:
+            threshold_ = threshold
+        if open_price is None:
+            open_price = price
+        high_price, low_price = max(high_price, price), min(low_price, price)
+        cum_statistics["cum_ticks"] += 1
+        cum_statistics["cum_dollar_value"] += price * volume
+        cum_statistics["cum_volume"] += volume
+        if prev_tick_rule == 1:
+            cum_statistics["cum_buy_volume"] += volume
+        if cum_statistics[metric] >= threshold_:
+            bars.append(
+                [
+                    date_time,
+                    tick_num,
+                    open_price,
+                    high_price,
+                    low_price,
+                    price,
+                    cum_statistics["cum_volume"],
+                    cum_statistics["cum_buy_volume"],
+                    cum_statistics["cum_ticks"],
+                    cum_statistics["cum_dollar_value"],
+                ]
+            )
+            open_price = None
+            high_price, low_price = -np.inf, np.inf
+            cum_statistics = dict.fromkeys(cum_statistics, 0)
+    columns = [
+        "date_time",
+        "tick_num",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "cum_buy_volume",
+        "cum_ticks",
+        "cum_dollar_value",
+    ]
+    return pd.DataFrame(bars, columns=columns)
+
+
+class TestBarsKernel(hunitest.TestCase):
+    def test_get_dollar_bars1(self) -> None:
+        """
+        Check that dollar bars match the ones computed with a loop.
+        """
+        df = _get_ticks(5000)
+        self._check(cinbabar.get_dollar_bars, "cum_dollar_value", df, 2e5)
+
+    def test_get_volume_bars1(self) -> None:
+        """
+        Check that volume bars match the ones computed with a loop.
+        """
+        df = _get_ticks(5000)
+        self._check(cinbabar.get_volume_bars, "cum_volume", df, 3000)
+
+    def test_get_tick_bars1(self) -> None:
+        """
+        Check that tick bars match the ones computed with a loop.
+        """
+        df = _get_ticks(5000)
+        self._check(cinbabar.get_tick_bars, "cum_ticks", df, 7)
+
+    def test_get_tick_bars2(self) -> None:
+        """
+        Check tick bars with a threshold changing over time.
+        """
+        df = _get_ticks(5000)
+        threshold = pd.Series(
+            [5, 300, 1, 40], index=df["date_time"].iloc[[0, 1000, 2500, 2600]]
+        )
+        self._check(cinbabar.get_tick_bars, "cum_ticks", df, threshold)
+
+    def _check(
+        self,
+        func: Callable,
+        metric: str,
+        df: pd.DataFrame,
+        threshold: Union[float, pd.Series],
+    ) -> None:
+        expected = _get_bars_with_loop(df, metric, threshold)
+        # Check processing all the ticks at once and in chunks, which carries
+        # the open bars over.
+        for batch_size in [len(df), 777, 10]:
+            actual = func(df, threshold=threshold, batch_size=batch_size)
+            pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+class TestBarsBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_get_dollar_bars1(self) -> None:
+        """
+        Measure the throughput in ticks/sec of the dollar bars.
+        """
+        num_ticks = 2000000
+        df = _get_ticks(num_ticks)
+        threshold = 5e6
+        with htimer.TimedScope(logging.INFO, "Dollar bars") as ts:
+            actual = cinbabar.get_dollar_bars(df, threshold=threshold)
+        elapsed = ts.elapsed_time
+        # The loop is too slow to process all the ticks.
+        num_loop_ticks = 100000
+        with htimer.TimedScope(logging.INFO, "Dollar bars with loop") as ts:
+            expected = _get_bars_with_loop(
+                df.iloc[:num_loop_ticks], "cum_dollar_value", threshold
+            )
+        loop_elapsed = ts.elapsed_time
+        _LOG.info(
+            "kernel=%.0f ticks/s, loop=%.0f ticks/s",
+            num_ticks / elapsed,
+            num_loop_ticks / loop_elapsed,
+        )
+        pd.testing.assert_frame_equal(
+            actual.iloc[: len(expected) - 1], expected.iloc[:-1]
+        )
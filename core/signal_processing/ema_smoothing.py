@@ -4,9 +4,9 @@ Import as:
 import core.signal_processing.ema_smoothing as cspremsm
 """
 
-import functools
+import abc
 import logging
-from typing import Any, Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import numpy as np
 import pandas as pd
@@ -57,14 +57,37 @@ def compute_ema(
     _LOG.debug("width = %0.2f", np.sqrt(depth) * tau)
     _LOG.debug("aspect ratio = %0.2f", np.sqrt(1 + 1.0 / depth))
     _LOG.debug("tau = %0.2f", tau)
+    signal_hat = compute_ema_all_depths(signal, tau, min_periods, depth)[-1]
+    return signal_hat
+
+
+def compute_ema_all_depths(
+    signal: Union[pd.DataFrame, pd.Series],
+    tau: float,
+    min_periods: int,
+    max_depth: int,
+) -> List[Union[pd.DataFrame, pd.Series]]:
+    """
+    Compute the iterated EMAs of all depths from 1 to `max_depth`.
+
+    Each depth is computed from the previous one, so all the depths cost as
+    much as a single call to `compute_ema()` with `depth=max_depth`.
+
+    :return: iterated EMAs, where the i-th element has depth `i + 1`
+    """
+    hdbg.dassert_isinstance(max_depth, int)
+    hdbg.dassert_lte(1, max_depth)
+    hdbg.dassert_lt(0, tau)
     com = csprspfu.calculate_com_from_tau(tau)
     _LOG.debug("com = %0.2f", com)
+    signal_hats = []
     signal_hat = signal.copy()
-    for _ in range(0, depth):
+    for _ in range(0, max_depth):
         signal_hat = signal_hat.ewm(
             com=com, min_periods=min_periods, adjust=True, ignore_na=False, axis=0
         ).mean()
-    return signal_hat
+        signal_hats.append(signal_hat)
+    return signal_hats
 
 
 def compute_smooth_derivative(
@@ -145,11 +168,10 @@ def compute_smooth_moving_average(
     hdbg.dassert_lte(min_depth, max_depth)
     range_ = tau * (min_depth + max_depth) / 2.0
     _LOG.debug("Range = %0.2f", range_)
-    ema_eval = functools.partial(compute_ema, signal, tau, min_periods)
+    # Follow 3.56 of Dacorogna, computing the EMAs of all the depths at once.
+    emas = compute_ema_all_depths(signal, tau, min_periods, max_depth)
     denom = float(max_depth - min_depth + 1)
-    # Not the most efficient implementation, but follows 3.56 of Dacorogna
-    # directly.
-    return sum(map(ema_eval, range(min_depth, max_depth + 1))) / denom
+    return sum(emas[min_depth - 1 :]) / denom
 
 
 def extract_smooth_moving_average_weights(
@@ -681,3 +703,410 @@ def get_trend_residual_decomp(
         raise ValueError(f"Unrecognized nan_mode `{nan_mode}`")
     df["residual"] = detrended
     return df
+
+
+# #############################################################################
+# Streaming EMA and rolling moments
+# #############################################################################
+
+
+def _update_ema(
+    weighted_avg: np.ndarray,
+    old_wt: np.ndarray,
+    nobs: np.ndarray,
+    values: np.ndarray,
+    old_wt_factor: float,
+    min_periods: int,
+) -> np.ndarray:
+    """
+    Update in place the state of an EMA with a new row of values.
+
+    This follows the recursion of `pd.DataFrame.ewm(adjust=True,
+    ignore_na=False).mean()`, one row at a time.
+
+    :param weighted_avg: current EMA (NaN before the first observation)
+    :param old_wt: current total weight of the past observations
+    :param nobs: current number of non-NaN observations
+    :param values: new row of values
+    :param old_wt_factor: decay factor of the weights, i.e., `1 - alpha`
+    :param min_periods: minimum number of observations to output a value
+    :return: EMA after the update, NaN if there are less than `min_periods`
+        observations
+    """
+    is_observation = ~np.isnan(values)
+    nobs += is_observation
+    has_avg = ~np.isnan(weighted_avg)
+    # Decay the weights of the past observations, also for NaNs since
+    # `ignore_na=False`.
+    old_wt[has_avg] *= old_wt_factor
+    mask = has_avg & is_observation
+    mask_update = mask & (weighted_avg != values)
+    weighted_avg[mask_update] = (
+        old_wt[mask_update] * weighted_avg[mask_update] + values[mask_update]
+    ) / (old_wt[mask_update] + 1.0)
+    old_wt[mask] += 1.0
+    # Initialize the average with the first observation.
+    mask_init = ~has_avg & is_observation
+    weighted_avg[mask_init] = values[mask_init]
+    ema = np.where(nobs >= max(min_periods, 1), weighted_avg, np.nan)
+    return ema
+
+
+def _shift(
+    buffer: List[np.ndarray], values: np.ndarray, delay: int
+) -> np.ndarray:
+    """
+    Return the values received `delay` updates ago, like `shift(delay)`.
+
+    :param buffer: last values received, updated in place
+    :param values: new row of values
+    :param delay: number of updates to delay the values by
+    :return: delayed values, NaN during the first `delay` updates
+    """
+    buffer.append(values)
+    if len(buffer) > delay:
+        return buffer.pop(0)
+    return np.full_like(values, np.nan)
+
+
+class _StreamingFilter(abc.ABC):
+    """
+    Compute a filter incrementally, one row at a time.
+
+    The values are updated in O(1) for each row from a small state, which
+    can be serialized with `to_dict()` and restored with `from_dict()`, e.g.,
+    to warm-start a real-time process.
+    """
+
+    def __init__(self, **params: Any) -> None:
+        self._params = params
+
+    def update(self, values: Union[float, np.ndarray, pd.Series]) -> np.ndarray:
+        """
+        Update the filter with a new row of values.
+
+        :param values: one value per column
+        :return: filtered values, one per column
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=float)).copy()
+        hdbg.dassert_eq(values.ndim, 1)
+        return self._update(values)
+
+    def update_df(
+        self, signal: Union[pd.DataFrame, pd.Series]
+    ) -> Union[pd.DataFrame, pd.Series]:
+        """
+        Update the filter with each row of `signal`.
+
+        :return: filtered values, indexed like `signal`
+        """
+        values = [self.update(row) for row in signal.to_numpy(dtype=float)]
+        if isinstance(signal, pd.Series):
+            return pd.Series(
+                np.concatenate(values), index=signal.index, name=signal.name
+            )
+        return pd.DataFrame(values, index=signal.index, columns=signal.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the parameters and the state of the filter.
+        """
+        return {"params": dict(self._params), "state": self._get_state()}
+
+    @classmethod
+    def from_dict(cls, dict_: Dict[str, Any]) -> "_StreamingFilter":
+        """
+        Build a filter from the output of `to_dict()`.
+        """
+        hdbg.dassert_is_subset(["params", "state"], dict_.keys())
+        filter_ = cls(**dict_["params"])
+        filter_._set_state(dict_["state"])
+        return filter_
+
+    @abc.abstractmethod
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        """
+        Update the state with a row of values and return the filtered values.
+        """
+
+    @abc.abstractmethod
+    def _get_state(self) -> Dict[str, Any]:
+        """
+        Return the state of the filter.
+        """
+
+    @abc.abstractmethod
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the state returned by `_get_state()`.
+        """
+
+
+class StreamingSmoothMovingAverage(_StreamingFilter):
+    """
+    Compute `compute_smooth_moving_average()` incrementally.
+
+    The state stores, for each depth and column, the EMA, the total weight of
+    the past observations, and the number of observations. Use `min_depth =
+    max_depth = depth` to compute `compute_ema()`.
+    """
+
+    def __init__(
+        self,
+        tau: float,
+        min_periods: int = 0,
+        min_depth: int = 1,
+        max_depth: int = 1,
+    ) -> None:
+        hdbg.dassert_lt(0, tau)
+        hdbg.dassert_isinstance(min_depth, int)
+        hdbg.dassert_isinstance(max_depth, int)
+        hdbg.dassert_lte(1, min_depth)
+        hdbg.dassert_lte(min_depth, max_depth)
+        super().__init__(
+            tau=tau,
+            min_periods=min_periods,
+            min_depth=min_depth,
+            max_depth=max_depth,
+        )
+        com = csprspfu.calculate_com_from_tau(tau)
+        self._old_wt_factor = 1.0 - 1.0 / (1.0 + com)
+        self._min_periods = min_periods
+        self._min_depth = min_depth
+        self._max_depth = max_depth
+        # Arrays of shape `(max_depth, num_cols)`, initialized on the first
+        # update.
+        self._weighted_avgs: Optional[np.ndarray] = None
+        self._old_wts: Optional[np.ndarray] = None
+        self._nobs: Optional[np.ndarray] = None
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        if self._weighted_avgs is None:
+            shape = (self._max_depth, values.size)
+            self._weighted_avgs = np.full(shape, np.nan)
+            self._old_wts = np.ones(shape)
+            self._nobs = np.zeros(shape, dtype=int)
+        hdbg.dassert_eq(values.size, self._weighted_avgs.shape[1])
+        emas = []
+        ema = values
+        # Each depth smooths the output of the previous one.
+        for depth in range(self._max_depth):
+            ema = _update_ema(
+                self._weighted_avgs[depth],
+                self._old_wts[depth],
+                self._nobs[depth],
+                ema,
+                self._old_wt_factor,
+                self._min_periods,
+            )
+            emas.append(ema)
+        denom = float(self._max_depth - self._min_depth + 1)
+        return sum(emas[self._min_depth - 1 :]) / denom
+
+    def _get_state(self) -> Dict[str, Any]:
+        if self._weighted_avgs is None:
+            return {}
+        state = {
+            "weighted_avgs": self._weighted_avgs.tolist(),
+            "old_wts": self._old_wts.tolist(),
+            "nobs": self._nobs.tolist(),
+        }
+        return state
+
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        if not state:
+            return
+        self._weighted_avgs = np.array(state["weighted_avgs"], dtype=float)
+        self._old_wts = np.array(state["old_wts"], dtype=float)
+        self._nobs = np.array(state["nobs"], dtype=int)
+        hdbg.dassert_eq(self._weighted_avgs.shape[0], self._max_depth)
+
+
+class StreamingRollingMoment(_StreamingFilter):
+    """
+    Compute `compute_rolling_moment()` incrementally.
+    """
+
+    def __init__(
+        self,
+        tau: float,
+        min_periods: int = 0,
+        min_depth: int = 1,
+        max_depth: int = 1,
+        p_moment: float = 2,
+    ) -> None:
+        super().__init__(
+            tau=tau,
+            min_periods=min_periods,
+            min_depth=min_depth,
+            max_depth=max_depth,
+            p_moment=p_moment,
+        )
+        self._p_moment = p_moment
+        self._sma = StreamingSmoothMovingAverage(
+            tau, min_periods, min_depth, max_depth
+        )
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        return self._sma.update(np.abs(values) ** self._p_moment)
+
+    def _get_state(self) -> Dict[str, Any]:
+        return {"sma": self._sma.to_dict()}
+
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        self._sma = StreamingSmoothMovingAverage.from_dict(state["sma"])
+
+
+class StreamingRollingNorm(StreamingRollingMoment):
+    """
+    Compute `compute_rolling_norm()` incrementally.
+    """
+
+    def __init__(
+        self,
+        tau: float,
+        min_periods: int = 0,
+        min_depth: int = 1,
+        max_depth: int = 1,
+        p_moment: float = 2,
+        delay: int = 0,
+    ) -> None:
+        hdbg.dassert_isinstance(delay, int)
+        hdbg.dassert_lte(0, delay, "Requested delay=%i is non-causal.", delay)
+        super().__init__(tau, min_periods, min_depth, max_depth, p_moment)
+        self._params["delay"] = delay
+        self._delay = delay
+        self._buffer: List[np.ndarray] = []
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        values = _shift(self._buffer, values, self._delay)
+        moment = super()._update(values)
+        return moment ** (1.0 / self._p_moment)
+
+    def _get_state(self) -> Dict[str, Any]:
+        state = super()._get_state()
+        state["buffer"] = [values.tolist() for values in self._buffer]
+        return state
+
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        super()._set_state(state)
+        self._buffer = [np.array(values) for values in state["buffer"]]
+
+
+class StreamingRollingVar(_StreamingFilter):
+    """
+    Compute `compute_rolling_var()` incrementally.
+    """
+
+    def __init__(
+        self,
+        tau: float,
+        min_periods: int = 0,
+        min_depth: int = 1,
+        max_depth: int = 1,
+        p_moment: float = 2,
+    ) -> None:
+        super().__init__(
+            tau=tau,
+            min_periods=min_periods,
+            min_depth=min_depth,
+            max_depth=max_depth,
+            p_moment=p_moment,
+        )
+        self._p_moment = p_moment
+        self._sma = StreamingSmoothMovingAverage(
+            tau, min_periods, min_depth, max_depth
+        )
+        self._moment = StreamingRollingMoment(
+            tau, min_periods, min_depth, max_depth, p_moment
+        )
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        signal_ma = self._sma.update(values)
+        return self._moment.update(values - signal_ma)
+
+    def _get_state(self) -> Dict[str, Any]:
+        return {"sma": self._sma.to_dict(), "moment": self._moment.to_dict()}
+
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        self._sma = StreamingSmoothMovingAverage.from_dict(state["sma"])
+        self._moment = StreamingRollingMoment.from_dict(state["moment"])
+
+
+class StreamingRollingStd(StreamingRollingVar):
+    """
+    Compute `compute_rolling_std()` incrementally.
+    """
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        return super()._update(values) ** (1.0 / self._p_moment)
+
+
+class StreamingRollingZscore(_StreamingFilter):
+    """
+    Compute `compute_rolling_zscore()` incrementally.
+    """
+
+    def __init__(
+        self,
+        tau: float,
+        min_periods: int = 0,
+        min_depth: int = 1,
+        max_depth: int = 1,
+        p_moment: float = 2,
+        demean: bool = True,
+        delay: int = 0,
+        atol: float = 0,
+    ) -> None:
+        hdbg.dassert_isinstance(delay, int)
+        hdbg.dassert_lte(0, delay)
+        super().__init__(
+            tau=tau,
+            min_periods=min_periods,
+            min_depth=min_depth,
+            max_depth=max_depth,
+            p_moment=p_moment,
+            demean=demean,
+            delay=delay,
+            atol=atol,
+        )
+        self._demean = demean
+        self._delay = delay
+        self._atol = atol
+        self._sma = StreamingSmoothMovingAverage(
+            tau, min_periods, min_depth, max_depth
+        )
+        self._norm = StreamingRollingNorm(
+            tau, min_periods, min_depth, max_depth, p_moment
+        )
+        # Last values of the moving average and of the norm, used to delay
+        # them.
+        self._ma_buffer: List[np.ndarray] = []
+        self._std_buffer: List[np.ndarray] = []
+
+    def _update(self, values: np.ndarray) -> np.ndarray:
+        if self._demean:
+            signal_ma = self._sma.update(values)
+            signal_std = self._norm.update(values - signal_ma)
+            numerator = values - _shift(self._ma_buffer, signal_ma, self._delay)
+        else:
+            signal_std = self._norm.update(values)
+            numerator = values
+        denominator = _shift(self._std_buffer, signal_std, self._delay)
+        denominator[np.abs(denominator) <= self._atol] = np.nan
+        return numerator / denominator
+
+    def _get_state(self) -> Dict[str, Any]:
+        state = {
+            "sma": self._sma.to_dict(),
+            "norm": self._norm.to_dict(),
+            "ma_buffer": [values.tolist() for values in self._ma_buffer],
+            "std_buffer": [values.tolist() for values in self._std_buffer],
+        }
+        return state
+
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        self._sma = StreamingSmoothMovingAverage.from_dict(state["sma"])
+        self._norm = StreamingRollingNorm.from_dict(state["norm"])
+        self._ma_buffer = [np.array(values) for values in state["ma_buffer"]]
+        self._std_buffer = [np.array(values) for values in state["std_buffer"]]
@@ -5,7 +5,7 @@ import core.signal_processing.incremental_pca as csprinpc
 """
 
 import logging
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -38,14 +38,56 @@ def compute_ipca(
       - list of dfs of unit eigenvectors (0 indexes df eigenvectors
         corresponding to max eigenvalue, etc.).
     """
-    hdbg.dassert_isinstance(
-        num_pc, int, msg="Specify an integral number of principal components."
-    )
     hdbg.dassert_lt(
         num_pc,
         df.shape[0],
         msg="Number of time steps should exceed number of principal components.",
     )
+    # TODO(Paul): Consider requiring that the caller do this instead.
+    # Fill NaNs with zero.
+    df.fillna(0, inplace=True)
+    lambda_df, unit_eigenvecs, _ = compute_ipca_tensor(df, num_pc, tau)
+    # Convert the tensor of unit eigenvectors to a list of dataframes, each
+    # starting from the time step at which the eigenvector is first estimated.
+    unit_eigenvec_dfs = []
+    for i in range(num_pc):
+        first_idx = lambda_df[i].notna().argmax()
+        unit_eigenvec_df = pd.DataFrame(
+            unit_eigenvecs[first_idx:, i, :],
+            index=df.index[first_idx:],
+            columns=df.columns,
+        )
+        unit_eigenvec_dfs.append(unit_eigenvec_df)
+    return lambda_df, unit_eigenvec_dfs
+
+
+def compute_ipca_tensor(
+    df: pd.DataFrame,
+    num_pc: int,
+    tau: float,
+    state: Optional[Dict[str, Any]] = None,
+) -> Tuple[pd.DataFrame, np.ndarray, Dict[str, Any]]:
+    """
+    Incremental PCA storing the unit eigenvectors in a single array.
+
+    Same as `compute_ipca()`, but the recursion runs on numpy arrays and the
+    computation can be resumed from the state returned by a previous call,
+    e.g., to process new rows without recomputing the old ones.
+
+    :param df: centered data. NaNs are treated as zeros
+    :param num_pc: number of principal components to calculate
+    :param tau: as in `compute_ipca()`
+    :param state: state returned by a previous call on the preceding rows,
+        or `None` to start from scratch
+    :return:
+      - df of eigenvalue series (col 0 correspond to max eigenvalue, etc.).
+        Eigenvalues are NaN before their eigenvector is first estimated
+      - unit eigenvectors with shape `(time, component, asset)`
+      - state to pass to the next call to resume the computation
+    """
+    hdbg.dassert_isinstance(
+        num_pc, int, msg="Specify an integral number of principal components."
+    )
     hdbg.dassert_lte(
         num_pc,
         df.shape[1],
@@ -56,50 +98,52 @@ def compute_ipca(
     alpha = 1.0 / (com + 1.0)
     _LOG.debug("com = %0.2f", com)
     _LOG.debug("alpha = %0.2f", alpha)
-    # TODO(Paul): Consider requiring that the caller do this instead.
-    # Fill NaNs with zero.
-    df.fillna(0, inplace=True)
-    lambdas: Dict[int, list] = {k: [] for k in range(num_pc)}
-    # V's are eigenvectors with norm equal to corresponding eigenvalue.
-    vs: Dict[int, list] = {k: [] for k in range(num_pc)}
-    unit_eigenvecs: Dict[int, list] = {k: [] for k in range(num_pc)}
-    step = 0
-    for n in df.index:
-        # Initialize u(n).
-        u = df.loc[n].copy()
-        for i in range(min(num_pc, step + 1)):
-            # Initialize ith eigenvector.
-            if i == step:
-                v = u.copy()
-                if np.linalg.norm(v):
-                    _LOG.debug("Initializing eigenvector %s...", i)
-                    step += 1
-            else:
-                # Main update step for eigenvector i.
-                u, v = _compute_ipca_step(u, vs[i][-1], alpha)
-            # Bookkeeping.
-            v.name = n
-            vs[i].append(v)
-            norm = np.linalg.norm(v)
-            lambdas[i].append(norm)
-            unit_eigenvecs[i].append(v / norm)
-    _LOG.debug("Completed %s steps of incremental PCA.", len(df))
-    # Convert lambda dict of lists to list of series.
-    # Convert unit_eigenvecs dict of lists to list of dataframes.
-    lambdas_srs = []
-    unit_eigenvec_dfs = []
-    for i in range(num_pc):
-        lambdas_srs.append(
-            pd.Series(index=df.index[-len(lambdas[i]) :], data=lambdas[i])
-        )
-        unit_eigenvec_dfs.append(pd.concat(unit_eigenvecs[i], axis=1).transpose())
-    lambda_df = pd.concat(lambdas_srs, axis=1)
-    return lambda_df, unit_eigenvec_dfs
+    # Store the rows contiguously, since the recursion accesses one row at a time.
+    values = np.ascontiguousarray(df.fillna(0).to_numpy(dtype=float))
+    num_rows, dim = values.shape
+    if state is None:
+        state = {
+            "columns": df.columns.to_list(),
+            # V's are eigenvectors with norm equal to corresponding eigenvalue.
+            "vs": np.zeros((num_pc, dim)),
+            "num_initialized": 0,
+        }
+    else:
+        hdbg.dassert_eq(state["columns"], df.columns.to_list())
+        hdbg.dassert_eq(state["vs"].shape, (num_pc, dim))
+    vs = state["vs"].copy()
+    step = state["num_initialized"]
+    lambdas = np.full((num_rows, num_pc), np.nan)
+    unit_eigenvecs = np.full((num_rows, num_pc, dim), np.nan)
+    # Vectors with zero norm are normalized to NaNs.
+    with np.errstate(invalid="ignore"):
+        for n in range(num_rows):
+            # Initialize u(n).
+            u = values[n]
+            for i in range(min(num_pc, step + 1)):
+                # Initialize ith eigenvector.
+                if i == step:
+                    v = u
+                    if np.linalg.norm(v):
+                        _LOG.debug("Initializing eigenvector %s...", i)
+                        step += 1
+                else:
+                    # Main update step for eigenvector i.
+                    u, v = _compute_ipca_step(u, vs[i], alpha)
+                # Bookkeeping.
+                vs[i] = v
+                norm = np.linalg.norm(v)
+                lambdas[n, i] = norm
+                unit_eigenvecs[n, i] = v / norm
+    _LOG.debug("Completed %s steps of incremental PCA.", num_rows)
+    lambda_df = pd.DataFrame(lambdas, index=df.index, columns=range(num_pc))
+    state = {"columns": state["columns"], "vs": vs, "num_initialized": step}
+    return lambda_df, unit_eigenvecs, state
 
 
 def _compute_ipca_step(
-    u: pd.Series, v: pd.Series, alpha: float
-) -> Tuple[pd.Series, pd.Series]:
+    u: Union[pd.Series, np.ndarray], v: Union[pd.Series, np.ndarray], alpha: float
+) -> Tuple[Union[pd.Series, np.ndarray], Union[pd.Series, np.ndarray]]:
     """
     Single step of incremental PCA.
 
@@ -114,12 +158,14 @@ def _compute_ipca_step(
       * u_next is residualized observation for step n, component i + 1
       * v_next is unnormalized eigenvector estimate for step n, component i
     """
-    if np.linalg.norm(v) == 0:
+    v_norm = np.linalg.norm(v)
+    if v_norm == 0:
         v_next = v * 0
         u_next = u.copy()
     else:
-        v_next = (1 - alpha) * v + alpha * u * np.dot(u, v) / np.linalg.norm(v)
-        u_next = u - np.dot(u, v) * v / (np.linalg.norm(v) ** 2)
+        u_dot_v = np.dot(u, v)
+        v_next = (1 - alpha) * v + alpha * u * u_dot_v / v_norm
+        u_next = u - u_dot_v * v / (v_norm**2)
     return u_next, v_next
 
 
@@ -132,11 +178,7 @@ def compute_unit_vector_angular_distance(df: pd.DataFrame) -> pd.Series:
 
     The angular distance lies in [0, 1].
     """
-    vecs = df.values
-    # If all of the vectors are unit vectors, then
-    # np.diag(vecs.dot(vecs.T)) should return an array of all 1.'s.
-    cos_sim = np.diag(vecs[:-1, :].dot(vecs[1:, :].T))
-    ang_dist = np.arccos(cos_sim) / np.pi
+    ang_dist = _compute_angular_distance(df.values)
     srs = pd.Series(index=df.index[1:], data=ang_dist, name="angular change")
     return srs
 
@@ -152,3 +194,43 @@ def compute_eigenvector_diffs(eigenvecs: List[pd.DataFrame]) -> pd.DataFrame:
         ang_chg.append(srs)
     df = pd.concat(ang_chg, axis=1)
     return df
+
+
+def compute_eigenvector_tensor_diffs(
+    unit_eigenvecs: np.ndarray, index: pd.Index
+) -> pd.DataFrame:
+    """
+    Compute the angular distances of the eigenvectors for all the components.
+
+    Same as `compute_eigenvector_diffs()` for the output of
+    `compute_ipca_tensor()`.
+
+    :param unit_eigenvecs: unit eigenvectors with shape
+        `(time, component, asset)`
+    :param index: index of the time axis
+    :return: df of angular distances indexed according to the later time
+        point, with one column per component
+    """
+    hdbg.dassert_eq(unit_eigenvecs.ndim, 3)
+    hdbg.dassert_eq(unit_eigenvecs.shape[0], len(index))
+    ang_dist = _compute_angular_distance(unit_eigenvecs)
+    df = pd.DataFrame(
+        ang_dist, index=index[1:], columns=range(unit_eigenvecs.shape[1])
+    )
+    return df
+
+
+def _compute_angular_distance(vecs: np.ndarray) -> np.ndarray:
+    """
+    Compute the angular distance between consecutive unit vectors.
+
+    :param vecs: unit vectors stored along the last axis, with time along the
+        first axis
+    :return: angular distances with the shape of `vecs` without the last
+        axis and the first time point
+    """
+    # Compute only the dot products of consecutive vectors and not all the
+    # pairwise ones.
+    cos_sim = np.einsum("...i,...i->...", vecs[:-1], vecs[1:])
+    ang_dist = np.arccos(cos_sim) / np.pi
+    return ang_dist
@@ -277,3 +277,30 @@ def compute_weighted_sum(
     if convert_to_dataframe:
         product = product.to_frame()
     return product
+
+
+def shift_time_axis(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Shift `values` along the time axis (i.e., the second to last one).
+
+    This is the same as `pd.DataFrame.shift(periods)` on each 2D slice of
+    `values`, e.g., a negative `periods` shifts the values backward.
+    """
+    hdbg.dassert_lte(2, values.ndim)
+    shifted = np.full_like(values, np.nan)
+    if periods > 0:
+        shifted[..., periods:, :] = values[..., :-periods, :]
+    elif periods < 0:
+        shifted[..., :periods, :] = values[..., -periods:, :]
+    else:
+        shifted[...] = values
+    return shifted
+
+
+def sum_with_min_count(values: np.ndarray) -> np.ndarray:
+    """
+    Sum along the last axis like `pd.DataFrame.sum(axis=1, min_count=1)`.
+    """
+    sums = np.nansum(values, axis=-1)
+    sums[np.isnan(values).all(axis=-1)] = np.nan
+    return sums
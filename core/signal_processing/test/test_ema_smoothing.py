@@ -1,6 +1,7 @@
 import datetime
+import json
 import logging
-from typing import List
+from typing import Any, Callable, Dict, List, Union
 
 import numpy as np
 import pandas as pd
@@ -683,3 +684,145 @@ class Test_compute_rolling_annualized_sharpe_ratio(hunitest.TestCase):
             realization, tau=16, points_per_year=260.875
         )
         self.check_string(hunitest.convert_df_to_string(rolling_sr, index=True))
+
+
+class Test_compute_ema_all_depths(hunitest.TestCase):
+    def test1(self) -> None:
+        """
+        Check that each depth matches `compute_ema()`.
+        """
+        np.random.seed(42)
+        signal = pd.Series(np.random.randn(100))
+        actual = cspremsm.compute_ema_all_depths(
+            signal, tau=10, min_periods=5, max_depth=3
+        )
+        self.assertEqual(len(actual), 3)
+        for depth, srs in enumerate(actual, 1):
+            expected = cspremsm.compute_ema(signal, 10, 5, depth)
+            pd.testing.assert_series_equal(srs, expected)
+
+
+def _get_streaming_df() -> pd.DataFrame:
+    np.random.seed(42)
+    df = pd.DataFrame(np.random.randn(200, 3), columns=["a", "b", "c"])
+    df.iloc[5:9, 0] = np.nan
+    df.iloc[:3, 1] = np.nan
+    df.iloc[50, 2] = 0
+    return df
+
+
+class _StreamingFilterTestCase(hunitest.TestCase):
+    def _check(
+        self,
+        filter_cls: type,
+        func: Callable,
+        signal: Union[pd.DataFrame, pd.Series],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        """
+        Check that the streaming filter matches the batch function.
+
+        The filter is serialized halfway through the data and warm-started
+        from its state.
+        """
+        expected = func(signal, **kwargs)
+        filter_ = filter_cls(**kwargs)
+        actual1 = filter_.update_df(signal.iloc[:100])
+        state = json.loads(json.dumps(filter_.to_dict()))
+        actual2 = filter_cls.from_dict(state).update_df(signal.iloc[100:])
+        actual = pd.concat([actual1, actual2])
+        if isinstance(signal, pd.Series):
+            pd.testing.assert_series_equal(actual, expected, rtol=1e-10)
+        else:
+            pd.testing.assert_frame_equal(actual, expected, rtol=1e-10)
+
+
+class Test_StreamingSmoothMovingAverage(_StreamingFilterTestCase):
+    def test1(self) -> None:
+        """
+        Check a single EMA of a series.
+        """
+        signal = _get_streaming_df()["a"]
+        kwargs = {"tau": 10, "min_periods": 5}
+        self._check(
+            cspremsm.StreamingSmoothMovingAverage,
+            cspremsm.compute_smooth_moving_average,
+            signal,
+            kwargs,
+        )
+
+    def test2(self) -> None:
+        """
+        Check a smooth moving average of a dataframe with NaNs.
+        """
+        signal = _get_streaming_df()
+        kwargs = {"tau": 10, "min_periods": 5, "min_depth": 2, "max_depth": 4}
+        self._check(
+            cspremsm.StreamingSmoothMovingAverage,
+            cspremsm.compute_smooth_moving_average,
+            signal,
+            kwargs,
+        )
+
+    def test3(self) -> None:
+        """
+        Check that a single row gives the last value of `compute_ema()`.
+        """
+        signal = _get_streaming_df()
+        filter_ = cspremsm.StreamingSmoothMovingAverage(
+            10, min_depth=3, max_depth=3
+        )
+        for row in signal.iloc[:-1].itertuples(index=False):
+            filter_.update(row)
+        actual = filter_.update(signal.iloc[-1])
+        expected = cspremsm.compute_ema(signal, 10, 0, 3).iloc[-1].values
+        np.testing.assert_allclose(actual, expected, rtol=1e-10)
+
+
+class Test_StreamingRollingNorm(_StreamingFilterTestCase):
+    def test1(self) -> None:
+        signal = _get_streaming_df()
+        kwargs = {"tau": 10, "min_periods": 3, "max_depth": 2, "delay": 2}
+        self._check(
+            cspremsm.StreamingRollingNorm,
+            cspremsm.compute_rolling_norm,
+            signal,
+            kwargs,
+        )
+
+
+class Test_StreamingRollingStd(_StreamingFilterTestCase):
+    def test1(self) -> None:
+        signal = _get_streaming_df()
+        kwargs = {"tau": 10, "p_moment": 1}
+        self._check(
+            cspremsm.StreamingRollingStd,
+            cspremsm.compute_rolling_std,
+            signal,
+            kwargs,
+        )
+
+
+class Test_StreamingRollingZscore(_StreamingFilterTestCase):
+    def test1(self) -> None:
+        signal = _get_streaming_df()
+        kwargs = {"tau": 10, "delay": 1, "atol": 0.1}
+        self._check(
+            cspremsm.StreamingRollingZscore,
+            cspremsm.compute_rolling_zscore,
+            signal,
+            kwargs,
+        )
+
+    def test2(self) -> None:
+        """
+        Check a z-score without demeaning.
+        """
+        signal = _get_streaming_df()
+        kwargs = {"tau": 10, "demean": False, "delay": 2}
+        self._check(
+            cspremsm.StreamingRollingZscore,
+            cspremsm.compute_rolling_zscore,
+            signal,
+            kwargs,
+        )
@@ -136,6 +136,72 @@ class Test_compute_ipca(hunitest.TestCase):
         return df
 
 
+class Test_compute_ipca_tensor(hunitest.TestCase):
+    def test1(self) -> None:
+        """
+        Check that the output is consistent with `compute_ipca()`.
+        """
+        df = Test_compute_ipca._get_df(seed=1)
+        df.iloc[1:2, :] = np.nan
+        num_pc = 3
+        tau = 16
+        lambda_df, unit_eigenvecs, _ = csprinpc.compute_ipca_tensor(
+            df, num_pc, tau
+        )
+        expected_lambda_df, unit_eigenvec_dfs = csprinpc.compute_ipca(
+            df.copy(), num_pc, tau
+        )
+        pd.testing.assert_frame_equal(lambda_df, expected_lambda_df)
+        for i, unit_eigenvec_df in enumerate(unit_eigenvec_dfs):
+            np.testing.assert_array_equal(
+                unit_eigenvecs[-len(unit_eigenvec_df) :, i, :],
+                unit_eigenvec_df.values,
+            )
+
+    def test2(self) -> None:
+        """
+        Check that resuming from a state is equivalent to a single run.
+        """
+        df = Test_compute_ipca._get_df(seed=1)
+        num_pc = 3
+        tau = 16
+        (
+            expected_lambda_df,
+            expected_unit_eigenvecs,
+            _,
+        ) = csprinpc.compute_ipca_tensor(df, num_pc, tau)
+        lambda_df1, unit_eigenvecs1, state = csprinpc.compute_ipca_tensor(
+            df.iloc[:15], num_pc, tau
+        )
+        lambda_df2, unit_eigenvecs2, _ = csprinpc.compute_ipca_tensor(
+            df.iloc[15:], num_pc, tau, state=state
+        )
+        pd.testing.assert_frame_equal(
+            pd.concat([lambda_df1, lambda_df2]), expected_lambda_df
+        )
+        np.testing.assert_array_equal(
+            np.concatenate([unit_eigenvecs1, unit_eigenvecs2]),
+            expected_unit_eigenvecs,
+        )
+
+
+class Test_compute_eigenvector_tensor_diffs(hunitest.TestCase):
+    def test1(self) -> None:
+        """
+        Check that the output is consistent with `compute_eigenvector_diffs()`.
+        """
+        df = Test_compute_ipca._get_df(seed=1)
+        num_pc = 3
+        tau = 16
+        _, unit_eigenvecs, _ = csprinpc.compute_ipca_tensor(df, num_pc, tau)
+        actual = csprinpc.compute_eigenvector_tensor_diffs(
+            unit_eigenvecs, df.index
+        )
+        _, unit_eigenvec_dfs = csprinpc.compute_ipca(df, num_pc, tau)
+        expected = csprinpc.compute_eigenvector_diffs(unit_eigenvec_dfs)
+        pd.testing.assert_frame_equal(actual, expected, check_freq=False)
+
+
 class Test__compute_ipca_step(hunitest.TestCase):
     def test1(self) -> None:
         """
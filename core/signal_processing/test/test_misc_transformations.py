@@ -70,3 +70,16 @@ class Test_compute_weighted_sum1(hunitest.TestCase):
 1           1.0
 2          -2.0"""
         self.assert_equal(actual_str, expected_str, fuzzy_match=True)
+
+
+class TestShiftTimeAxis1(hunitest.TestCase):
+    def test1(self) -> None:
+        """
+        Check that shifting each slice is the same as `pd.DataFrame.shift()`.
+        """
+        values = np.arange(24, dtype=float).reshape(2, 4, 3)
+        for periods in [-5, -2, 0, 1, 3, 5]:
+            actual = csprmitr.shift_time_axis(values, periods)
+            for i in range(values.shape[0]):
+                expected = pd.DataFrame(values[i]).shift(periods).values
+                np.testing.assert_array_equal(actual[i], expected)
@@ -20,6 +20,7 @@ from dataflow.core.nodes.sources import *  # pylint: disable=unused-import # NOQ
 from dataflow.core.nodes.transformers import *  # pylint: disable=unused-import # NOQA
 from dataflow.core.nodes.unsupervised_sklearn_models import *  # pylint: disable=unused-import # NOQA
 from dataflow.core.nodes.volatility_models import *  # pylint: disable=unused-import # NOQA
+from dataflow.core.panel import *  # pylint: disable=unused-import # NOQA
 from dataflow.core.result_bundle import *  # pylint: disable=unused-import # NOQA
 from dataflow.core.utils import *  # pylint: disable=unused-import # NOQA
 from dataflow.core.visitors import *  # pylint: disable=unused-import # NOQA
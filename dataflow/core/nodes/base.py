@@ -6,11 +6,13 @@ import dataflow.core.nodes.base as dtfconobas
 
 import abc
 import collections
+import concurrent.futures
 import copy
 import functools
 import logging
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
+import numpy as np
 import pandas as pd
 
 import dataflow.core.node as dtfcornode
@@ -933,3 +935,136 @@ class DfStacker:
             hdbg.dassert_eq(cols, value.columns.to_list())
             # TODO(Paul): We may want to relax the identical index requirement.
             hdbg.dassert(idx.equals(value.index))
+
+
+# #############################################################################
+# Per-key execution
+# #############################################################################
+
+
+# Process the data of a single key (e.g., fit or predict the model of one
+# instrument).
+# The function accepts `(key, df, fit_state)` and returns
+# `(df_out, info, fit_state)`, where `fit_state` is the (possibly updated) state
+# of the model for that key.
+KeyFunc = Callable[
+    [dtfcorutil.NodeColumn, pd.DataFrame, Optional[Any]],
+    Tuple[pd.DataFrame, Any, Optional[Any]],
+]
+
+# Represent a dataframe as column arrays, index, and column names. Shipping
+# arrays to a worker process is cheaper than pickling the dataframe block
+# manager.
+_DataFramePayload = Tuple[List[np.ndarray], pd.Index, List[Any]]
+
+
+def _encode_df(df: pd.DataFrame) -> _DataFramePayload:
+    arrays = [df.iloc[:, idx].to_numpy() for idx in range(df.shape[1])]
+    return arrays, df.index, df.columns.to_list()
+
+
+def _decode_df(payload: _DataFramePayload) -> pd.DataFrame:
+    arrays, idx, cols = payload
+    df = pd.DataFrame(dict(enumerate(arrays)), index=idx)
+    df.columns = pd.Index(cols)
+    return df
+
+
+def _process_key_shard(
+    func: KeyFunc,
+    shard: List[Tuple[dtfcorutil.NodeColumn, _DataFramePayload, Optional[Any]]],
+) -> List[Tuple[Optional[_DataFramePayload], Any, Optional[Any]]]:
+    """
+    Apply `func` to each key of `shard` inside a worker process.
+    """
+    results = []
+    for key, payload, fit_state in shard:
+        df_out, info, fit_state = func(key, _decode_df(payload), fit_state)
+        df_payload = None if df_out is None else _encode_df(df_out)
+        results.append((df_payload, info, fit_state))
+    return results
+
+
+def process_keys(
+    func: KeyFunc,
+    dfs: Dict[dtfcorutil.NodeColumn, pd.DataFrame],
+    fit_states: Optional[Dict[dtfcorutil.NodeColumn, Any]] = None,
+    *,
+    num_workers: int = 1,
+) -> Tuple[
+    Dict[dtfcorutil.NodeColumn, pd.DataFrame],
+    Dict[dtfcorutil.NodeColumn, Any],
+    Dict[dtfcorutil.NodeColumn, Optional[Any]],
+]:
+    """
+    Apply `func` to the dataframe of each key, possibly using a process pool.
+
+    The keys are partitioned into `num_workers` contiguous shards and each
+    shard is processed by a worker process. Results are assembled in the order
+    of the keys of `dfs`, so that the output does not depend on the number of
+    workers.
+
+    :param func: function processing a single key (see `KeyFunc`). It must be
+        picklable when `num_workers > 1`, e.g., a module-level function or a
+        `functools.partial` of one
+    :param dfs: dataframes keyed by, e.g., instrument, as returned by
+        `GroupedColDfToDfColProcessor.preprocess()`
+    :param fit_states: state to pass to `func` for each key (e.g., the fitted
+        models in `predict()`); `None` passes `None` for every key
+    :param num_workers: number of worker processes; `1` processes the keys
+        serially in the current process
+    :return: dictionaries with output dataframes, info, and fit states, keyed
+        as `dfs`
+    """
+    hdbg.dassert_isinstance(dfs, dict)
+    hdbg.dassert_lte(1, num_workers)
+    fit_states = fit_states or {}
+    keys = list(dfs.keys())
+    results: List[Tuple[Optional[pd.DataFrame], Any, Optional[Any]]]
+    if num_workers == 1 or len(keys) <= 1:
+        results = [func(key, dfs[key], fit_states.get(key)) for key in keys]
+    else:
+        num_shards = min(num_workers, len(keys))
+        shard_size = int(np.ceil(len(keys) / num_shards))
+        shards = [
+            keys[idx : idx + shard_size]
+            for idx in range(0, len(keys), shard_size)
+        ]
+        _LOG.debug(
+            "Processing %s keys in %s shards with %s workers",
+            len(keys),
+            len(shards),
+            num_workers,
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _process_key_shard,
+                    func,
+                    [
+                        (key, _encode_df(dfs[key]), fit_states.get(key))
+                        for key in shard
+                    ],
+                )
+                for shard in shards
+            ]
+            # Collect the results in submission order to preserve the key
+            # order.
+            results = []
+            for future in futures:
+                for df_payload, info, fit_state in future.result():
+                    df_out = (
+                        None if df_payload is None else _decode_df(df_payload)
+                    )
+                    results.append((df_out, info, fit_state))
+    hdbg.dassert_eq(len(results), len(keys))
+    out_dfs = {}
+    out_infos = {}
+    out_fit_states = {}
+    for key, (df_out, info, fit_state) in zip(keys, results):
+        out_dfs[key] = df_out
+        out_infos[key] = info
+        out_fit_states[key] = fit_state
+    return out_dfs, out_infos, out_fit_states
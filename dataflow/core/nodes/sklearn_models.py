@@ -5,6 +5,7 @@ import dataflow.core.nodes.sklearn_models as dtfcnoskmo
 """
 
 import collections
+import functools
 import logging
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
@@ -360,6 +361,8 @@ class MultiindexSkLearnModel(dtfconobas.FitPredictNode):
         steps_ahead: int,
         model_kwargs: Optional[Any] = None,
         nan_mode: Optional[str] = None,
+        *,
+        num_workers: int = 1,
     ) -> None:
         """
         Params not listed are as in `ContinuousSkLearnModel`.
@@ -370,6 +373,8 @@ class MultiindexSkLearnModel(dtfconobas.FitPredictNode):
             of the dataframe with the `x_vars` and `y_vars`.
         :param out_col_group: column level prefix of length
             `df_in.columns.nlevels - 2`. It may be an empty tuple.
+        :param num_workers: number of processes used to fit / predict the
+            per-key models, as in `dtfconobas.process_keys()`
         """
         super().__init__(nid)
         hdbg.dassert_isinstance(in_col_groups, list)
@@ -382,6 +387,8 @@ class MultiindexSkLearnModel(dtfconobas.FitPredictNode):
         self._steps_ahead = steps_ahead
         self._model_kwargs = model_kwargs
         self._nan_mode = nan_mode
+        hdbg.dassert_lte(1, num_workers)
+        self._num_workers = num_workers
         #
         self._key_fit_state: Dict[str, Any] = {}
 
@@ -409,29 +416,26 @@ class MultiindexSkLearnModel(dtfconobas.FitPredictNode):
         dfs = dtfconobas.GroupedColDfToDfColProcessor.preprocess(
             df_in, self._in_col_groups
         )
-        results = {}
-        info = collections.OrderedDict()
-        for key, df in dfs.items():
-            csklm = ContinuousSkLearnModel(
-                "sklearn",
-                model_func=self._model_func,
-                x_vars=self._x_vars,
-                y_vars=self._y_vars,
-                steps_ahead=self._steps_ahead,
-                model_kwargs=self._model_kwargs,
-                col_mode="replace_all",
-                nan_mode=self._nan_mode,
-            )
-            if fit:
-                df_out = csklm.fit(df)["df_out"]
-                info_out = csklm.get_info("fit")
-                self._key_fit_state[key] = csklm.get_fit_state()
-            else:
-                csklm.set_fit_state(self._key_fit_state[key])
-                df_out = csklm.predict(df)["df_out"]
-                info_out = csklm.get_info("predict")
-            results[key] = df_out
-            info[key] = info_out
+        func = functools.partial(
+            _fit_predict_continuous_sklearn_model,
+            model_func=self._model_func,
+            x_vars=self._x_vars,
+            y_vars=self._y_vars,
+            steps_ahead=self._steps_ahead,
+            model_kwargs=self._model_kwargs,
+            nan_mode=self._nan_mode,
+            fit=fit,
+        )
+        if fit:
+            fit_states = None
+        else:
+            fit_states = {key: self._key_fit_state[key] for key in dfs.keys()}
+        results, key_info, key_fit_states = dtfconobas.process_keys(
+            func, dfs, fit_states, num_workers=self._num_workers
+        )
+        if fit:
+            self._key_fit_state.update(key_fit_states)
+        info = collections.OrderedDict(key_info)
         df_out = dtfconobas.GroupedColDfToDfColProcessor.postprocess(
             results, self._out_col_group
         )
@@ -442,6 +446,46 @@ class MultiindexSkLearnModel(dtfconobas.FitPredictNode):
         return {"df_out": df_out}
 
 
+def _fit_predict_continuous_sklearn_model(
+    key: dtfcorutil.NodeColumn,
+    df: pd.DataFrame,
+    fit_state: Optional[Dict[str, Any]],
+    *,
+    model_func: Callable[..., Any],
+    x_vars: List[dtfcorutil.NodeColumn],
+    y_vars: List[dtfcorutil.NodeColumn],
+    steps_ahead: int,
+    model_kwargs: Optional[Any],
+    nan_mode: Optional[str],
+    fit: bool,
+) -> Tuple[pd.DataFrame, collections.OrderedDict, Dict[str, Any]]:
+    """
+    Fit or predict the `ContinuousSkLearnModel` of a single key.
+
+    This is a `dtfconobas.KeyFunc`, so that it can be run in a worker process.
+    """
+    _ = key
+    csklm = ContinuousSkLearnModel(
+        "sklearn",
+        model_func=model_func,
+        x_vars=x_vars,
+        y_vars=y_vars,
+        steps_ahead=steps_ahead,
+        model_kwargs=model_kwargs,
+        col_mode="replace_all",
+        nan_mode=nan_mode,
+    )
+    if fit:
+        df_out = csklm.fit(df)["df_out"]
+        info_out = csklm.get_info("fit")
+        fit_state = csklm.get_fit_state()
+    else:
+        csklm.set_fit_state(fit_state)
+        df_out = csklm.predict(df)["df_out"]
+        info_out = csklm.get_info("predict")
+    return df_out, info_out, fit_state
+
+
 class SkLearnModel(dtfconobas.FitPredictNode, dtfconobas.ColModeMixin):
     """
     Fit and predict an sklearn model.
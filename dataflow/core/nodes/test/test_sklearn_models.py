@@ -310,6 +310,51 @@ class TestMultiindexSkLearnModel(hunitest.TestCase):
         )
         self.check_string(df_str)
 
+    def test_num_workers1(self) -> None:
+        """
+        Check that fitting with a process pool matches the serial fit.
+        """
+        data = self._get_data()
+        data_fit = data.loc[:"2000-01-31"]  # type: ignore[misc]
+        data_predict = data.loc["2000-01-31":]  # type: ignore[misc]
+        config = cconfig.get_config_from_nested_dict(
+            {
+                "in_col_groups": [
+                    ("ret_0",),
+                ],
+                "out_col_group": (),
+                "x_vars": ["ret_0"],
+                "y_vars": ["ret_0"],
+                "steps_ahead": 1,
+                "model_kwargs": {
+                    "alpha": 0.5,
+                },
+            }
+        )
+        actual = []
+        for num_workers in [1, 2]:
+            node = dtfcnoskmo.MultiindexSkLearnModel(
+                "sklearn",
+                model_func=slmode.Ridge,
+                num_workers=num_workers,
+                **config.to_dict(),
+            )
+            df_fit = node.fit(data_fit)["df_out"]
+            # Predict from a node initialized with the fit state.
+            fit_state = node.get_fit_state()
+            node = dtfcnoskmo.MultiindexSkLearnModel(
+                "sklearn",
+                model_func=slmode.Ridge,
+                num_workers=num_workers,
+                **config.to_dict(),
+            )
+            node.set_fit_state(fit_state)
+            df_predict = node.predict(data_predict)["df_out"]
+            actual.append((df_fit, df_predict, list(fit_state["_key_fit_state"])))
+        self.assertEqual(actual[0][2], actual[1][2])
+        pd.testing.assert_frame_equal(actual[0][0], actual[1][0])
+        pd.testing.assert_frame_equal(actual[0][1], actual[1][1])
+
     def _get_data(self) -> pd.DataFrame:
         """
         Generate multivariate normal returns.
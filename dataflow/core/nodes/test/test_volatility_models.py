@@ -657,6 +657,35 @@ class TestMultiindexVolatilityModel(hunitest.TestCase):
         )
         self.assert_equal(actual, expected)
 
+    def test_num_workers1(self) -> None:
+        """
+        Check that modeling the instruments in parallel matches the serial run.
+        """
+        data = self._get_data()
+        config = cconfig.get_config_from_nested_dict(
+            {
+                "in_col_group": ("ret_0",),
+                "steps_ahead": 2,
+                "nan_mode": "drop",
+            }
+        )
+        fit_data = data.loc[:"2000-01-31"]  # type: ignore[misc]
+        actual = []
+        for num_workers in [1, 2]:
+            node = MultiindexVolatilityModel(
+                "vol_model", num_workers=num_workers, **config.to_dict()
+            )
+            df_fit = node.fit(fit_data)["df_out"]
+            df_predict = node.predict(data)["df_out"]
+            fit_state = node.get_fit_state()
+            actual.append((df_fit, df_predict, fit_state["_col_fit_state"]))
+        pd.testing.assert_frame_equal(actual[0][0], actual[1][0])
+        pd.testing.assert_frame_equal(actual[0][1], actual[1][1])
+        self.assertEqual(
+            str(cconfig.get_config_from_nested_dict(actual[0][2])),
+            str(cconfig.get_config_from_nested_dict(actual[1][2])),
+        )
+
     @staticmethod
     def _package_results1(
         config: cconfig.Config,
@@ -4,6 +4,7 @@ Import as:
 import dataflow.core.nodes.transformers as dtfconotra
 """
 import collections
+import functools
 import inspect
 import logging
 from typing import (
@@ -24,6 +25,7 @@ import pandas as pd
 import core.finance as cofinanc
 import dataflow.core.node as dtfcornode
 import dataflow.core.nodes.base as dtfconobas
+import dataflow.core.panel as dtfcorpane
 import dataflow.core.utils as dtfcorutil
 import helpers.hdbg as hdbg
 
@@ -99,6 +101,8 @@ class ColumnTransformer(dtfconobas.Transformer, dtfconobas.ColModeMixin):
     def _transform(
         self, df: pd.DataFrame
     ) -> Tuple[pd.DataFrame, collections.OrderedDict]:
+        if isinstance(df, dtfcorpane.Panel):
+            return self._transform_panel(df)
         df_in = df.copy()
         df = df.copy()
         if self._fit_cols is None:
@@ -149,6 +153,56 @@ class ColumnTransformer(dtfconobas.Transformer, dtfconobas.ColModeMixin):
         info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(df)
         return df, info
 
+    def _transform_panel(
+        self, panel: dtfcorpane.Panel
+    ) -> Tuple[dtfcorpane.Panel, collections.OrderedDict]:
+        """
+        Apply the transformation to the features of a panel.
+
+        `cols` refers to the features of the panel and `transformer_func` is
+        applied to a dataframe with `(feature, asset)` columns built on the
+        panel values.
+        """
+        if self._fit_cols is None:
+            self._fit_cols = panel.features or self._cols
+        hdbg.dassert_is_subset(self._fit_cols, panel.features)
+        df = panel.to_wide_df(self._fit_cols)
+        idx = df.index
+        if self._nan_mode == "leave_unchanged":
+            pass
+        elif self._nan_mode == "drop":
+            df = df.dropna()
+        else:
+            raise ValueError(f"Unrecognized `nan_mode` {self._nan_mode}")
+        info = collections.OrderedDict()
+        func_sig = inspect.signature(self._transformer_func)
+        if "info" in func_sig.parameters:
+            func_info = collections.OrderedDict()  # type: ignore
+            df = self._transformer_func(
+                df, info=func_info, **self._transformer_kwargs
+            )
+            info["func_info"] = func_info
+        else:
+            df = self._transformer_func(df, **self._transformer_kwargs)
+        df = df.reindex(index=idx)
+        panel_out = dtfcorpane.Panel.from_df(df)
+        hdbg.dassert_eq(panel_out.assets, panel.assets)
+        if self._col_rename_func is not None:
+            panel_out = panel_out.rename_features(self._col_rename_func)
+        self._transformed_col_names = panel_out.features
+        # Select the features to propagate as in `_apply_col_mode()`.
+        col_mode = self._col_mode or "merge_all"
+        if col_mode == "merge_all":
+            panel_out = panel.merge(panel_out)
+        elif col_mode == "replace_selected":
+            panel_out = panel.drop_features(self._fit_cols).merge(panel_out)
+        elif col_mode == "replace_all":
+            pass
+        else:
+            hdbg.dfatal("Unsupported column mode `%s`", col_mode)
+        info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(panel_out)
+        return panel_out, info
+
 
 class SeriesTransformer(dtfconobas.Transformer, dtfconobas.ColModeMixin):
     """
@@ -285,6 +339,7 @@ class GroupedColDfToDfTransformer(dtfconobas.Transformer):
         drop_nans: bool = False,
         reindex_like_input: bool = True,
         join_output_with_input: bool = True,
+        num_workers: int = 1,
     ) -> None:
         """
         For reference, let.
@@ -311,6 +366,10 @@ class GroupedColDfToDfTransformer(dtfconobas.Transformer):
         :param join_output_with_input: whether to join the output with the input. A
             common case where this should typically be set to `False` is in
             resampling.
+        :param num_workers: number of processes used to apply
+            `transformer_func` to the keys, as in `dtfconobas.process_keys()`.
+            If larger than 1, `transformer_func` must be picklable (e.g., not a
+            lambda)
         """
         super().__init__(nid)
         # TODO(Paul): Add more checks here.
@@ -325,12 +384,16 @@ class GroupedColDfToDfTransformer(dtfconobas.Transformer):
         self._reindex_like_input = reindex_like_input
         self._join_output_with_input = join_output_with_input
         self._permitted_exceptions = permitted_exceptions
+        hdbg.dassert_lte(1, num_workers)
+        self._num_workers = num_workers
         # The leaf col names are determined from the dataframe at runtime.
         self._leaf_cols = None
 
     def _transform(
         self, df: pd.DataFrame
     ) -> Tuple[pd.DataFrame, collections.OrderedDict]:
+        if isinstance(df, dtfcorpane.Panel):
+            return self._transform_panel(df)
         #
         if self._join_output_with_input:
             df_in = df.copy()
@@ -341,18 +404,75 @@ class GroupedColDfToDfTransformer(dtfconobas.Transformer):
         self._leaf_cols = list(in_dfs.keys())
         #
         info = collections.OrderedDict()  # type: ignore
+        out_dfs = self._apply_transformer_func(in_dfs, info)
+        df = dtfconobas.GroupedColDfToDfColProcessor.postprocess(
+            out_dfs, self._out_col_group
+        )
+        if self._join_output_with_input:
+            df = dtfcorutil.merge_dataframes(df_in, df)
+        info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(df)
+        return df, info
+
+    def _transform_panel(
+        self, panel: dtfcorpane.Panel
+    ) -> Tuple[dtfcorpane.Panel, collections.OrderedDict]:
+        """
+        Apply the transformation to each asset of a panel.
+
+        The `in_col_groups` select the features of the panel and
+        `out_col_group` must be empty.
+        """
+        hdbg.dassert_eq(
+            self._out_col_group,
+            (),
+            "Panels support only `(feature, asset)` column levels",
+        )
+        for col_group in self._in_col_groups:
+            hdbg.dassert_eq(len(col_group), 1)
+        features = [col_group[-1] for col_group in self._in_col_groups]
+        in_dfs = panel.get_asset_dfs(features)
+        self._leaf_cols = panel.assets
+        #
+        info = collections.OrderedDict()  # type: ignore
+        out_dfs = self._apply_transformer_func(in_dfs, info)
+        if self._join_output_with_input:
+            # Write the output features after the input ones, without
+            # stacking them in an intermediate panel.
+            panel_out = panel.merge_asset_dfs(out_dfs)
+        else:
+            panel_out = dtfcorpane.Panel.from_asset_dfs(out_dfs, panel.assets)
+        info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(panel_out)
+        return panel_out, info
+
+    def _apply_transformer_func(
+        self,
+        in_dfs: Dict[dtfcorutil.NodeColumn, pd.DataFrame],
+        info: collections.OrderedDict,
+    ) -> Dict[dtfcorutil.NodeColumn, pd.DataFrame]:
+        """
+        Apply `transformer_func` to the dataframe of each key.
+
+        :param in_dfs: dataframes keyed by leaf column (e.g., asset)
+        :param info: info to populate with the info from `transformer_func`
+        :return: transformed dataframes keyed as `in_dfs`
+        """
         info["func_info"] = collections.OrderedDict()
         func_info = info["func_info"]
+        func = functools.partial(
+            _apply_func_to_key_data,
+            func=self._transformer_func,
+            func_kwargs=self._transformer_kwargs,
+            drop_nans=self._drop_nans,
+            reindex_like_input=self._reindex_like_input,
+            exceptions=self._permitted_exceptions,
+        )
+        key_dfs, key_infos, _ = dtfconobas.process_keys(
+            func, in_dfs, num_workers=self._num_workers
+        )
         out_dfs = {}
-        for key in self._leaf_cols:
-            df_out, key_info = _apply_func_to_data(
-                in_dfs[key],
-                self._transformer_func,
-                self._transformer_kwargs,
-                self._drop_nans,
-                self._reindex_like_input,
-                self._permitted_exceptions,
-            )
+        for key in in_dfs.keys():
+            df_out = key_dfs[key]
+            key_info = key_infos[key]
             if df_out is None:
                 _LOG.warning(
                     "No output for key=%s, imputing empty dataframe", key
@@ -365,13 +485,7 @@ class GroupedColDfToDfTransformer(dtfconobas.Transformer):
                 df_out = df_out.rename(columns=self._col_mapping)
             out_dfs[key] = df_out
         info["func_info"] = func_info
-        df = dtfconobas.GroupedColDfToDfColProcessor.postprocess(
-            out_dfs, self._out_col_group
-        )
-        if self._join_output_with_input:
-            df = dtfcorutil.merge_dataframes(df_in, df)
-        info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(df)
-        return df, info
+        return out_dfs
 
 
 class CrossSectionalDfToDfTransformer(dtfconobas.Transformer):
@@ -720,6 +834,26 @@ def _apply_func_to_data(
     return result, info
 
 
+def _apply_func_to_key_data(
+    key: dtfcorutil.NodeColumn,
+    data: pd.DataFrame,
+    fit_state: None,
+    **kwargs: Any,
+) -> Tuple[
+    Optional[Union[pd.Series, pd.DataFrame]],
+    Optional[collections.OrderedDict],
+    None,
+]:
+    """
+    Apply `_apply_func_to_data()` to the data of a single key.
+
+    This is a stateless `dtfconobas.KeyFunc`.
+    """
+    _ = key, fit_state
+    result, info = _apply_func_to_data(data, **kwargs)
+    return result, info, None
+
+
 # TODO(Paul): Consider deprecating.
 def _apply_func_to_series(
     srs: pd.Series,
@@ -806,6 +940,43 @@ class FunctionWrapper(dtfconobas.Transformer):
         return df_out, info
 
 
+# #############################################################################
+# Panel conversion
+# #############################################################################
+
+
+class PanelConverter(dtfconobas.Transformer):
+    """
+    Convert between multiindex-column dataframes and `dtfcorpane.Panel`.
+
+    The node is meant to be placed at the boundaries of a DAG section whose
+    nodes support panels natively.
+    """
+
+    def __init__(self, nid: dtfcornode.NodeId, mode: str) -> None:
+        """
+        :param mode: `to_panel` to convert a dataframe with `(feature, asset)`
+            columns into a panel, `to_df` to convert a panel back
+        """
+        super().__init__(nid)
+        hdbg.dassert_in(mode, ["to_panel", "to_df"])
+        self._mode = mode
+
+    def _transform(
+        self, df: Union[pd.DataFrame, dtfcorpane.Panel]
+    ) -> Tuple[Union[pd.DataFrame, dtfcorpane.Panel], collections.OrderedDict]:
+        if self._mode == "to_panel":
+            df_out = dtfcorpane.Panel.from_df(df)
+        elif self._mode == "to_df":
+            hdbg.dassert_isinstance(df, dtfcorpane.Panel)
+            df_out = df.to_df()
+        else:
+            raise ValueError(f"Unsupported mode `{self._mode}`")
+        info: collections.OrderedDict[str, Any] = collections.OrderedDict()
+        info["df_transformed_info"] = dtfcorutil.get_df_info_as_string(df_out)
+        return df_out, info
+
+
 # #############################################################################
 # Resamplers (deprecated)
 # #############################################################################
@@ -5,6 +5,7 @@ import dataflow.core.nodes.volatility_models as dtfcnovomo
 """
 
 import collections
+import functools
 import logging
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
@@ -21,6 +22,7 @@ import dataflow.core.node as dtfcornode
 import dataflow.core.nodes.base as dtfconobas
 import dataflow.core.nodes.sources as dtfconosou
 import dataflow.core.nodes.transformers as dtfconotra
+import dataflow.core.panel as dtfcorpane
 import dataflow.core.utils as dtfcorutil
 import dataflow.core.visitors as dtfcorvisi
 import helpers.hdbg as hdbg
@@ -406,34 +408,70 @@ class SingleColumnVolatilityModel(dtfconobas.FitPredictNode):
         return dag
 
 
+def _fit_predict_single_column_volatility_model(
+    col: dtfcorutil.NodeColumn,
+    df: pd.DataFrame,
+    fit_state: Optional[Dict[str, Any]],
+    *,
+    steps_ahead: int,
+    p_moment: float,
+    progress_bar: bool,
+    tau: Optional[float],
+    nan_mode: Optional[str],
+    out_col_prefix: Optional[str],
+    fit: bool,
+) -> Tuple[pd.DataFrame, collections.OrderedDict, Dict[str, Any]]:
+    """
+    Fit or predict the `SingleColumnVolatilityModel` of the column `col`.
+
+    This is a `dtfconobas.KeyFunc`, so that it can be run in a worker process.
+    """
+    scvm = SingleColumnVolatilityModel(
+        "volatility",
+        steps_ahead=steps_ahead,
+        col=col,
+        p_moment=p_moment,
+        progress_bar=progress_bar,
+        tau=tau,
+        nan_mode=nan_mode,
+        out_col_prefix=out_col_prefix or col,
+    )
+    if fit:
+        df_out = scvm.fit(df)["df_out"]
+        info_out = scvm.get_info("fit")
+        fit_state = scvm.get_fit_state()
+    else:
+        scvm.set_fit_state(fit_state)
+        df_out = scvm.predict(df)["df_out"]
+        info_out = scvm.get_info("predict")
+    return df_out, info_out, fit_state
+
+
 class _MultiColVolatilityModelMixin:
     def _fit_predict_volatility_model(
         self, df: pd.DataFrame, fit: bool, out_col_prefix: Optional[str] = None
     ) -> Tuple[Dict[str, pd.DataFrame], collections.OrderedDict]:
-        dfs = {}
-        info = collections.OrderedDict()
-        for col in df.columns:
-            local_out_col_prefix = out_col_prefix or col
-            scvm = SingleColumnVolatilityModel(
-                "volatility",
-                steps_ahead=self._steps_ahead,
-                col=col,
-                p_moment=self._p_moment,
-                progress_bar=self._progress_bar,
-                tau=self._tau,
-                nan_mode=self._nan_mode,
-                out_col_prefix=local_out_col_prefix,
-            )
-            if fit:
-                df_out = scvm.fit(df[[col]])["df_out"]
-                info_out = scvm.get_info("fit")
-                self._col_fit_state[col] = scvm.get_fit_state()
-            else:
-                scvm.set_fit_state(self._col_fit_state[col])
-                df_out = scvm.predict(df[[col]])["df_out"]
-                info_out = scvm.get_info("predict")
-            dfs[col] = df_out
-            info[col] = info_out
+        func = functools.partial(
+            _fit_predict_single_column_volatility_model,
+            steps_ahead=self._steps_ahead,
+            p_moment=self._p_moment,
+            progress_bar=self._progress_bar,
+            tau=self._tau,
+            nan_mode=self._nan_mode,
+            out_col_prefix=out_col_prefix,
+            fit=fit,
+        )
+        col_dfs = {col: df[[col]] for col in df.columns}
+        if fit:
+            fit_states = None
+        else:
+            fit_states = {col: self._col_fit_state[col] for col in df.columns}
+        dfs, col_info, col_fit_states = dtfconobas.process_keys(
+            func, col_dfs, fit_states, num_workers=self._num_workers
+        )
+        if fit:
+            self._col_fit_state.update(col_fit_states)
+        info = collections.OrderedDict(col_info)
         return dfs, info
 
 
@@ -460,6 +498,8 @@ class VolatilityModel(
         col_rename_func: Callable[[Any], Any] = lambda x: f"{x}_zscored",
         col_mode: Optional[str] = None,
         nan_mode: Optional[str] = None,
+        *,
+        num_workers: int = 1,
     ) -> None:
         """
         Specify the data and smooth moving average (SMA) modeling parameters.
@@ -478,6 +518,8 @@ class VolatilityModel(
               and transformed selected columns
             - If "replace_all", leave only transformed selected columns
         :param nan_mode: as in ContinuousSkLearnModel
+        :param num_workers: number of processes used to model the columns, as
+            in `dtfconobas.process_keys()`
         """
         super().__init__(nid)
         self._cols = cols
@@ -493,6 +535,8 @@ class VolatilityModel(
         self._col_rename_func = col_rename_func
         self._col_mode = col_mode or "merge_all"
         self._nan_mode = nan_mode
+        hdbg.dassert_lte(1, num_workers)
+        self._num_workers = num_workers
         # State of the model to serialize/deserialize.
         self._fit_cols: List[dtfcorutil.NodeColumn] = []
         self._col_fit_state = {}
@@ -555,6 +599,8 @@ class MultiindexVolatilityModel(
         progress_bar: bool = False,
         tau: Optional[float] = None,
         nan_mode: Optional[str] = None,
+        *,
+        num_workers: int = 1,
     ) -> None:
         """
         Specify the data and sma modeling parameters.
@@ -565,6 +611,8 @@ class MultiindexVolatilityModel(
         :param tau: as in `csigproc.compute_smooth_moving_average`. If `None`,
             learn this parameter
         :param nan_mode: as in ContinuousSkLearnModel
+        :param num_workers: number of processes used to model the instruments,
+            as in `dtfconobas.process_keys()`
         """
         super().__init__(nid)
         hdbg.dassert_isinstance(in_col_group, tuple)
@@ -580,6 +628,8 @@ class MultiindexVolatilityModel(
         #
         self._tau = tau
         self._nan_mode = nan_mode
+        hdbg.dassert_lte(1, num_workers)
+        self._num_workers = num_workers
         #
         self._col_fit_state = {}
 
@@ -601,6 +651,8 @@ class MultiindexVolatilityModel(
         self._info["fit"] = fit_state["_info['fit']"]
 
     def _fit_predict_helper(self, df_in: pd.DataFrame, fit: bool):
+        if isinstance(df_in, dtfcorpane.Panel):
+            return self._fit_predict_panel_helper(df_in, fit)
         dtfcorutil.validate_df_indices(df_in)
         df = dtfconobas.SeriesToDfColProcessor.preprocess(
             df_in, self._in_col_group
@@ -616,6 +668,26 @@ class MultiindexVolatilityModel(
         self._set_info(method, info)
         return {"df_out": df_out}
 
+    def _fit_predict_panel_helper(
+        self, panel: dtfcorpane.Panel, fit: bool
+    ) -> Dict[str, dtfcorpane.Panel]:
+        """
+        Model the volatility of each asset of a panel.
+        """
+        hdbg.dassert_eq(
+            len(self._in_col_group),
+            1,
+            "Panels support only `(feature, asset)` column levels",
+        )
+        df = panel.get_feature_df(self._in_col_group[0])
+        dfs, info = self._fit_predict_volatility_model(
+            df, fit=fit, out_col_prefix=self._out_col_prefix
+        )
+        panel_out = panel.merge_asset_dfs(dfs)
+        method = "fit" if fit else "predict"
+        self._set_info(method, info)
+        return {"df_out": panel_out}
+
 
 class VolatilityModulator(dtfconobas.FitPredictNode, dtfconobas.ColModeMixin):
     """
@@ -0,0 +1,453 @@
+"""
+Dense (time x feature x asset) representation of multiindex-column data.
+
+Import as:
+
+import dataflow.core.panel as dtfcorpane
+"""
+
+import logging
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import dataflow.core.utils as dtfcorutil
+import helpers.hdbg as hdbg
+
+_LOG = logging.getLogger(__name__)
+
+
+# #############################################################################
+# _PanelStorage
+# #############################################################################
+
+
+class _PanelStorage:
+    """
+    Store the values of panels that append features to the same array.
+
+    The panels sharing the storage are views on the first features of
+    `values`, so that a panel can append features after its own ones without
+    copying them, as long as no other panel already appended features to the
+    storage.
+    """
+
+    def __init__(self, values: np.ndarray, num_features: int) -> None:
+        """
+        Constructor.
+
+        :param values: array of shape `(time, capacity, asset)`
+        :param num_features: number of features of `values` already used by a
+            panel
+        """
+        hdbg.dassert_lte(num_features, values.shape[1])
+        self.values = values
+        self.num_features = num_features
+
+    def append(
+        self, values: np.ndarray, num_features: int, num_new_features: int
+    ) -> "_PanelStorage":
+        """
+        Reserve `num_new_features` after the first `num_features` features.
+
+        :param values: values of the panel appending the features, i.e., the
+            first `num_features` features of this storage
+        :return: storage with the reserved features, which is this storage or
+            a new one, if the features are already used or if there is not
+            enough capacity
+        """
+        num_features_out = num_features + num_new_features
+        if (
+            self.num_features == num_features
+            and num_features_out <= self.values.shape[1]
+        ):
+            storage = self
+        else:
+            # Grow the capacity geometrically, so that appending features one
+            # node at a time copies each value a constant number of times on
+            # average.
+            num_rows, _, num_assets = values.shape
+            capacity = max(2 * num_features, num_features_out)
+            storage_values = np.empty((num_rows, capacity, num_assets))
+            storage_values[:, :num_features, :] = values
+            storage = _PanelStorage(storage_values, num_features)
+        storage.num_features = num_features_out
+        return storage
+
+
+# #############################################################################
+# Panel
+# #############################################################################
+
+
+class Panel:
+    """
+    Store data with two column levels `(feature, asset)` as a 3D array.
+
+    A multi-asset dataframe like
+    ```
+    close           ret_0
+    MN0 MN1 MN2 MN3 MN0 MN1 MN2 MN3
+    ```
+    is represented by a float array of shape `(time, feature, asset)` with
+    labels for each axis, i.e., `index`, `features` (e.g., `close`, `ret_0`),
+    and `assets` (e.g., `MN0`, ..., `MN3`).
+
+    Nodes supporting panels access features and assets through array views,
+    without sorting, copying, splitting, and concatenating dataframes as in
+    `preprocess_multiindex_cols()` and `_postprocess_dataframe_dict()`.
+    Conversion from / to dataframes (e.g., with `PanelConverter`) is meant to
+    happen only at the boundaries of a DAG.
+
+    The order of the features is the order of insertion, while `to_df()`
+    returns the columns sorted as the dataframe-based nodes do.
+
+    Panels are not modified in place: the nodes append features with
+    `merge()` and `merge_asset_dfs()`, which return a new panel and copy the
+    values of this panel only when needed (see `_PanelStorage`).
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        index: pd.Index,
+        features: List[dtfcorutil.NodeColumn],
+        assets: List[dtfcorutil.NodeColumn],
+    ) -> None:
+        """
+        Constructor.
+
+        :param values: array of shape `(len(index), len(features), len(assets))`
+        :param index: index of the time axis
+        :param features: labels of the feature axis
+        :param assets: labels of the asset axis
+        """
+        hdbg.dassert_isinstance(values, np.ndarray)
+        hdbg.dassert_eq(values.ndim, 3)
+        hdbg.dassert_isinstance(index, pd.Index)
+        features = list(features)
+        assets = list(assets)
+        hdbg.dassert_no_duplicates(features)
+        hdbg.dassert_no_duplicates(assets)
+        hdbg.dassert_eq(values.shape, (len(index), len(features), len(assets)))
+        self._values = values
+        self._index = index
+        self._features = features
+        self._assets = assets
+        self._feature_to_idx = {
+            feature: idx for idx, feature in enumerate(features)
+        }
+        self._storage = _PanelStorage(values, len(features))
+
+    def __repr__(self) -> str:
+        txt = (
+            f"<{self.__class__.__name__} shape={self._values.shape} "
+            f"features={self._features} assets={self._assets}>"
+        )
+        return txt
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "Panel":
+        """
+        Build a panel from a dataframe with `(feature, asset)` columns.
+
+        Every feature must be defined for every asset. Features and assets
+        are sorted as in `preprocess_multiindex_cols()`.
+        """
+        hdbg.dassert_isinstance(df, pd.DataFrame)
+        hdbg.dassert_eq(
+            df.columns.nlevels,
+            2,
+            "Panels support only `(feature, asset)` column levels",
+        )
+        hdbg.dassert_no_duplicates(df.columns.to_list())
+        if not df.columns.is_monotonic_increasing:
+            df = df.sort_index(axis=1)
+        features = df.columns.get_level_values(0).unique().to_list()
+        assets = df.columns.get_level_values(1).unique().to_list()
+        expected_columns = pd.MultiIndex.from_product([features, assets])
+        hdbg.dassert(
+            df.columns.equals(expected_columns),
+            "Every feature must be defined for every asset: columns=%s",
+            df.columns,
+        )
+        values = df.to_numpy(dtype=float).reshape(
+            len(df.index), len(features), len(assets)
+        )
+        return cls(values, df.index, features, assets)
+
+    @classmethod
+    def from_asset_dfs(
+        cls,
+        dfs: Dict[dtfcorutil.NodeColumn, Optional[pd.DataFrame]],
+        assets: List[dtfcorutil.NodeColumn],
+    ) -> "Panel":
+        """
+        Stack one `(time, feature)` dataframe per asset into a panel.
+
+        This is the panel counterpart of `_postprocess_dataframe_dict()`.
+
+        :param dfs: dataframes keyed by asset. Missing, `None`, or empty
+            dataframes are imputed with NaNs
+        :param assets: assets (and their order) of the output panel
+        """
+        hdbg.dassert_isinstance(dfs, dict)
+        non_empty_dfs = [
+            dfs[asset]
+            for asset in assets
+            if dfs.get(asset) is not None and not dfs[asset].empty
+        ]
+        hdbg.dassert(non_empty_dfs, "All the dataframes are empty")
+        # Use the first non-empty dataframe as reference for index and
+        # features, aligning the indices only if they differ.
+        index = non_empty_dfs[0].index
+        features = non_empty_dfs[0].columns.to_list()
+        for df in non_empty_dfs[1:]:
+            hdbg.dassert_eq(features, df.columns.to_list())
+            if not df.index.equals(index):
+                index = index.union(df.index)
+        values = np.full((len(index), len(features), len(assets)), np.nan)
+        for asset_idx, asset in enumerate(assets):
+            df = dfs.get(asset)
+            if df is None or df.empty:
+                _LOG.warning("Imputing NaNs for asset=`%s`", asset)
+                continue
+            if not df.index.equals(index):
+                df = df.reindex(index)
+            values[:, :, asset_idx] = df.to_numpy(dtype=float)
+        return cls(values, index, features, assets)
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Convert the panel into a dataframe with `(feature, asset)` columns.
+        """
+        num_rows, num_features, num_assets = self._values.shape
+        columns = pd.MultiIndex.from_product([self._features, self._assets])
+        df = pd.DataFrame(
+            self._values.reshape(num_rows, num_features * num_assets),
+            index=self._index,
+            columns=columns,
+        )
+        df = df.sort_index(axis=1)
+        return df
+
+    # /////////////////////////////////////////////////////////////////////////
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values
+
+    @property
+    def index(self) -> pd.Index:
+        return self._index
+
+    @property
+    def features(self) -> List[dtfcorutil.NodeColumn]:
+        return self._features
+
+    @property
+    def assets(self) -> List[dtfcorutil.NodeColumn]:
+        return self._assets
+
+    @property
+    def shape(self) -> tuple:
+        return self._values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self._values.size == 0
+
+    @property
+    def columns(self) -> pd.MultiIndex:
+        """
+        Return the `(feature, asset)` columns, like for a dataframe.
+        """
+        return pd.MultiIndex.from_product([self._features, self._assets])
+
+    def info(self, buf: Optional[IO[str]] = None) -> None:
+        """
+        Print a summary of the panel, like `pd.DataFrame.info()`.
+        """
+        lines = [
+            str(type(self)),
+            f"Index: {len(self._index)} entries",
+            f"Features: {self._features}",
+            f"Assets: {self._assets}",
+            f"dtype: {self._values.dtype}",
+            f"memory usage: {self._values.nbytes} bytes",
+        ]
+        txt = "\n".join(lines) + "\n"
+        if buf is None:
+            print(txt, end="")
+        else:
+            buf.write(txt)
+
+    # /////////////////////////////////////////////////////////////////////////
+
+    def get_feature_idxs(
+        self, features: List[dtfcorutil.NodeColumn]
+    ) -> List[int]:
+        hdbg.dassert_is_subset(features, self._features)
+        return [self._feature_to_idx[feature] for feature in features]
+
+    def get_feature_df(self, feature: dtfcorutil.NodeColumn) -> pd.DataFrame:
+        """
+        Return a `(time, asset)` dataframe with the values of `feature`.
+
+        The dataframe is built on a view of the panel values.
+        """
+        hdbg.dassert_in(feature, self._feature_to_idx)
+        df = pd.DataFrame(
+            self._values[:, self._feature_to_idx[feature], :],
+            index=self._index,
+            columns=self._assets,
+        )
+        return df
+
+    def get_asset_dfs(
+        self, features: List[dtfcorutil.NodeColumn]
+    ) -> Dict[dtfcorutil.NodeColumn, pd.DataFrame]:
+        """
+        Return one `(time, feature)` dataframe per asset.
+
+        This is the panel counterpart of
+        `GroupedColDfToDfColProcessor.preprocess()`.
+        """
+        feature_idxs = self.get_feature_idxs(features)
+        # Copy the values of each asset in one `(feature, time)` block, which
+        # is the layout of the values of a dataframe, so that each dataframe
+        # is a view on its block.
+        values = np.ascontiguousarray(
+            self._values[:, feature_idxs, :].transpose(2, 1, 0)
+        )
+        columns = pd.Index(features)
+        dfs = {
+            asset: pd.DataFrame(
+                values[asset_idx].T, index=self._index, columns=columns
+            )
+            for asset_idx, asset in enumerate(self._assets)
+        }
+        return dfs
+
+    def to_wide_df(
+        self, features: Optional[List[dtfcorutil.NodeColumn]] = None
+    ) -> pd.DataFrame:
+        """
+        Return a `(time, (feature, asset))` dataframe for `features`.
+
+        Unlike `to_df()`, the columns are not sorted.
+        """
+        if features is None:
+            values = self._values
+            features = self._features
+        else:
+            values = self._values[:, self.get_feature_idxs(features), :]
+        num_rows, num_features, num_assets = values.shape
+        df = pd.DataFrame(
+            values.reshape(num_rows, num_features * num_assets),
+            index=self._index,
+            columns=pd.MultiIndex.from_product([features, self._assets]),
+        )
+        return df
+
+    # /////////////////////////////////////////////////////////////////////////
+
+    def select_features(self, features: List[dtfcorutil.NodeColumn]) -> "Panel":
+        values = self._values[:, self.get_feature_idxs(features), :]
+        return Panel(values, self._index, features, self._assets)
+
+    def drop_features(self, features: List[dtfcorutil.NodeColumn]) -> "Panel":
+        hdbg.dassert_is_subset(features, self._features)
+        features_to_keep = [
+            feature for feature in self._features if feature not in features
+        ]
+        return self.select_features(features_to_keep)
+
+    def rename_features(self, func: Callable[[Any], Any]) -> "Panel":
+        features = [func(feature) for feature in self._features]
+        panel = Panel(self._values, self._index, features, self._assets)
+        panel._storage = self._storage
+        return panel
+
+    def merge(self, other: "Panel") -> "Panel":
+        """
+        Append the features of `other` to the ones of this panel.
+
+        This is the panel counterpart of `dtfcorutil.merge_dataframes()`.
+        """
+        hdbg.dassert_isinstance(other, Panel)
+        hdbg.dassert(
+            other.index.equals(self._index),
+            "Panel indices differ but are expected to be the same!",
+        )
+        hdbg.dassert_eq(other.assets, self._assets)
+        panel, values = self._append_features(other.features)
+        values[:] = other.values
+        return panel
+
+    def merge_asset_dfs(
+        self, dfs: Dict[dtfcorutil.NodeColumn, Optional[pd.DataFrame]]
+    ) -> "Panel":
+        """
+        Append the features of one `(time, feature)` dataframe per asset.
+
+        This is the same as `self.merge(Panel.from_asset_dfs(dfs,
+        self.assets))`, but the values of the dataframes are written directly
+        in the output panel.
+
+        :param dfs: dataframes keyed by asset, with an index contained in the
+            one of this panel. Missing, `None`, or empty dataframes are imputed
+            with NaNs
+        """
+        hdbg.dassert_isinstance(dfs, dict)
+        non_empty_dfs = [
+            dfs[asset]
+            for asset in self._assets
+            if dfs.get(asset) is not None and not dfs[asset].empty
+        ]
+        hdbg.dassert(non_empty_dfs, "All the dataframes are empty")
+        features = non_empty_dfs[0].columns.to_list()
+        panel, values = self._append_features(features)
+        values[:] = np.nan
+        for asset_idx, asset in enumerate(self._assets):
+            df = dfs.get(asset)
+            if df is None or df.empty:
+                _LOG.warning("Imputing NaNs for asset=`%s`", asset)
+                continue
+            hdbg.dassert_eq(features, df.columns.to_list())
+            if not df.index.equals(self._index):
+                hdbg.dassert(
+                    df.index.difference(self._index).empty,
+                    "Panel indices differ but are expected to be the same!",
+                )
+                df = df.reindex(self._index)
+            values[:, :, asset_idx] = df.to_numpy(dtype=float)
+        return panel
+
+    def _append_features(
+        self, features: List[dtfcorutil.NodeColumn]
+    ) -> Tuple["Panel", np.ndarray]:
+        """
+        Build a panel with `features` appended to the ones of this panel.
+
+        :return: output panel and view on the values of the appended features
+            to fill in
+        """
+        hdbg.dassert_not_intersection(
+            features, self._features, "Feature names overlap."
+        )
+        num_features = len(self._features)
+        storage = self._storage.append(
+            self._values, num_features, len(features)
+        )
+        num_features_out = storage.num_features
+        panel = Panel(
+            storage.values[:, :num_features_out, :],
+            self._index,
+            self._features + list(features),
+            self._assets,
+        )
+        panel._storage = storage
+        values = storage.values[:, num_features:num_features_out, :]
+        return panel, values
@@ -0,0 +1,371 @@
+import logging
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataflow.core.dag as dtfcordag
+import dataflow.core.node as dtfcornode
+import dataflow.core.nodes.sources as dtfconosou
+import dataflow.core.nodes.transformers as dtfconotra
+import dataflow.core.nodes.volatility_models as dtfcnovomo
+import dataflow.core.panel as dtfcorpane
+import helpers.htimer as htimer
+import helpers.hunit_test as hunitest
+
+_LOG = logging.getLogger(__name__)
+
+
+def _get_data(num_rows: int, num_assets: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a dataframe with `(feature, asset)` columns.
+    """
+    np.random.seed(seed)
+    idx = pd.date_range("2000-01-01", periods=num_rows, freq="B")
+    assets = [f"MN{i}" for i in range(num_assets)]
+    close = pd.DataFrame(
+        100 + np.random.randn(num_rows, num_assets).cumsum(axis=0),
+        index=idx,
+        columns=assets,
+    )
+    volume = pd.DataFrame(
+        np.random.randint(1, 100, size=(num_rows, num_assets)),
+        index=idx,
+        columns=assets,
+    ).astype(float)
+    df = pd.concat([close, volume], axis=1, keys=["close", "volume"])
+    return df
+
+
+def _compute_ret_0(df: pd.DataFrame) -> pd.DataFrame:
+    return df[["close"]].pct_change().rename(columns={"close": "ret_0"})
+
+
+def _compute_log(df: pd.DataFrame) -> pd.DataFrame:
+    return np.log(df)
+
+
+def _compute_dollar_volume(df: pd.DataFrame) -> pd.DataFrame:
+    return (df["close"] * df["volume"]).to_frame("dollar_volume")
+
+
+def _compute_rolling_mean(
+    df: pd.DataFrame, col: str, window: int
+) -> pd.DataFrame:
+    srs = df[col].rolling(window).mean()
+    return srs.to_frame(f"{col}_mean_{window}")
+
+
+def _get_nodes(
+    use_panel: bool, *, use_volatility_model: bool = True
+) -> List[dtfcornode.Node]:
+    """
+    Build the nodes of a 10-node pipeline on `(feature, asset)` data.
+
+    :param use_volatility_model: whether to model the volatility of `ret_0`,
+        or to compute more rolling means instead
+    """
+    nodes = []
+    if use_panel:
+        nodes.append(dtfconotra.PanelConverter("to_panel", mode="to_panel"))
+    nodes.append(
+        dtfconotra.GroupedColDfToDfTransformer(
+            "ret_0",
+            in_col_groups=[("close",)],
+            out_col_group=(),
+            transformer_func=_compute_ret_0,
+        )
+    )
+    nodes.append(
+        dtfconotra.GroupedColDfToDfTransformer(
+            "dollar_volume",
+            in_col_groups=[("close",), ("volume",)],
+            out_col_group=(),
+            transformer_func=_compute_dollar_volume,
+        )
+    )
+    col_windows = [("ret_0", 5), ("ret_0", 10), ("dollar_volume", 5)]
+    if use_volatility_model:
+        nodes.extend(_get_rolling_mean_nodes(col_windows))
+        nodes.append(
+            dtfcnovomo.MultiindexVolatilityModel(
+                "vol_model",
+                in_col_group=("ret_0",),
+                steps_ahead=2,
+                tau=10,
+                nan_mode="leave_unchanged",
+            )
+        )
+        col_windows = [("ret_0_vol", 5), ("ret_0_vol_adj", 5)]
+    else:
+        col_windows += [("ret_0", 20), ("close", 5), ("volume", 5)]
+    nodes.extend(_get_rolling_mean_nodes(col_windows))
+    if use_panel:
+        nodes.append(dtfconotra.PanelConverter("to_df", mode="to_df"))
+    return nodes
+
+
+def _get_rolling_mean_nodes(
+    col_windows: List[Tuple[str, int]]
+) -> List[dtfcornode.Node]:
+    nodes = [
+        dtfconotra.GroupedColDfToDfTransformer(
+            f"{col}_mean_{window}",
+            in_col_groups=[(col,)],
+            out_col_group=(),
+            transformer_func=_compute_rolling_mean,
+            transformer_kwargs={"col": col, "window": window},
+        )
+        for col, window in col_windows
+    ]
+    return nodes
+
+
+def _run_pipeline(
+    df: pd.DataFrame, use_panel: bool, *, use_volatility_model: bool = True
+) -> pd.DataFrame:
+    dag = dtfcordag.DAG(mode="strict")
+    tail_nid = None
+    nodes = _get_nodes(use_panel, use_volatility_model=use_volatility_model)
+    for node in [dtfconosou.DfDataSource("source", df)] + nodes:
+        dag.add_node(node)
+        if tail_nid is not None:
+            dag.connect(tail_nid, node.nid)
+        tail_nid = node.nid
+    df_out = dag.run_leq_node(tail_nid, "fit")["df_out"]
+    return df_out
+
+
+def _assert_equal(
+    df: pd.DataFrame, panel_or_df: Union[pd.DataFrame, dtfcorpane.Panel]
+) -> None:
+    if isinstance(panel_or_df, dtfcorpane.Panel):
+        panel_or_df = panel_or_df.to_df()
+    pd.testing.assert_frame_equal(
+        df.sort_index(axis=1), panel_or_df, check_freq=False
+    )
+
+
+# #############################################################################
+
+
+class TestPanel(hunitest.TestCase):
+    def test_from_df_to_df1(self) -> None:
+        """
+        Check that a dataframe survives the round trip through a panel.
+        """
+        df = _get_data(10, 3)
+        panel = dtfcorpane.Panel.from_df(df)
+        self.assertEqual(panel.shape, (10, 2, 3))
+        self.assertEqual(panel.features, ["close", "volume"])
+        self.assertEqual(panel.assets, ["MN0", "MN1", "MN2"])
+        pd.testing.assert_frame_equal(panel.to_df(), df)
+
+    def test_from_df_unsorted1(self) -> None:
+        """
+        Check that features and assets are sorted.
+        """
+        df = _get_data(10, 3)
+        df_unsorted = df[df.columns[::-1]]
+        panel = dtfcorpane.Panel.from_df(df_unsorted)
+        self.assertEqual(panel.features, ["close", "volume"])
+        self.assertEqual(panel.assets, ["MN0", "MN1", "MN2"])
+        pd.testing.assert_frame_equal(panel.to_df(), df)
+
+    def test_from_df_non_rectangular1(self) -> None:
+        """
+        Check that a feature missing for an asset is rejected.
+        """
+        df = _get_data(10, 3)
+        df = df.drop(columns=[("volume", "MN1")])
+        with self.assertRaises(AssertionError):
+            dtfcorpane.Panel.from_df(df)
+
+    def test_get_feature_df1(self) -> None:
+        df = _get_data(10, 3)
+        panel = dtfcorpane.Panel.from_df(df)
+        pd.testing.assert_frame_equal(
+            panel.get_feature_df("volume"), df["volume"]
+        )
+
+    def test_from_asset_dfs1(self) -> None:
+        """
+        Check that empty dataframes are imputed with NaNs.
+        """
+        df = _get_data(10, 2)
+        panel = dtfcorpane.Panel.from_df(df)
+        dfs = panel.get_asset_dfs(["close"])
+        dfs["MN1"] = pd.DataFrame()
+        panel_out = dtfcorpane.Panel.from_asset_dfs(dfs, panel.assets)
+        np.testing.assert_array_equal(
+            panel_out.values[:, 0, 0], df[("close", "MN0")].values
+        )
+        self.assertTrue(np.isnan(panel_out.values[:, 0, 1]).all())
+
+    def test_merge1(self) -> None:
+        df = _get_data(10, 3)
+        panel = dtfcorpane.Panel.from_df(df)
+        panel_out = panel.select_features(["close"]).merge(
+            panel.select_features(["volume"]).rename_features(lambda x: "vol")
+        )
+        self.assertEqual(panel_out.features, ["close", "vol"])
+        with self.assertRaises(AssertionError):
+            panel.merge(panel.select_features(["close"]))
+
+    def test_merge2(self) -> None:
+        """
+        Check that merging features one at a time does not copy the previous
+        ones, unless features were already appended to the same panel.
+        """
+        df = _get_data(10, 3)
+        panel = dtfcorpane.Panel.from_df(df)
+        close = panel.select_features(["close"])
+        panel1 = panel.merge(close.rename_features(lambda x: "close1"))
+        panel2 = panel1.merge(close.rename_features(lambda x: "close2"))
+        self.assertTrue(np.shares_memory(panel1.values, panel2.values))
+        # Append different features to `panel1` again.
+        volume = panel.select_features(["volume"])
+        panel3 = panel1.merge(volume.rename_features(lambda x: "volume3"))
+        self.assertFalse(np.shares_memory(panel2.values, panel3.values))
+        pd.testing.assert_frame_equal(
+            panel2.get_feature_df("close2"), df["close"]
+        )
+        pd.testing.assert_frame_equal(
+            panel3.get_feature_df("volume3"), df["volume"]
+        )
+        self.assertEqual(panel1.features, ["close", "volume", "close1"])
+
+    def test_merge_asset_dfs1(self) -> None:
+        """
+        Check that missing timestamps and assets are imputed with NaNs.
+        """
+        df = _get_data(10, 3)
+        panel = dtfcorpane.Panel.from_df(df)
+        dfs = {
+            asset: asset_df.rename(columns={"close": "close1"}).iloc[2:]
+            for asset, asset_df in panel.get_asset_dfs(["close"]).items()
+        }
+        dfs["MN1"] = pd.DataFrame()
+        actual = panel.merge_asset_dfs(dfs)
+        self.assertEqual(actual.features, ["close", "volume", "close1"])
+        expected = df["close"].copy()
+        expected.iloc[:2] = np.nan
+        expected["MN1"] = np.nan
+        pd.testing.assert_frame_equal(actual.get_feature_df("close1"), expected)
+
+
+class TestPanelNodes(hunitest.TestCase):
+    def test_grouped_col_df_to_df_transformer1(self) -> None:
+        df = _get_data(20, 3)
+        node = dtfconotra.GroupedColDfToDfTransformer(
+            "dollar_volume",
+            in_col_groups=[("close",), ("volume",)],
+            out_col_group=(),
+            transformer_func=_compute_dollar_volume,
+        )
+        expected = node.fit(df)["df_out"]
+        actual = node.fit(dtfcorpane.Panel.from_df(df))["df_out"]
+        self.assertIsInstance(actual, dtfcorpane.Panel)
+        _assert_equal(expected, actual)
+
+    def test_column_transformer1(self) -> None:
+        df = _get_data(20, 3)
+        node = dtfconotra.ColumnTransformer(
+            "log",
+            transformer_func=_compute_log,
+            col_mode="replace_all",
+        )
+        expected = node.fit(df)["df_out"]
+        node = dtfconotra.ColumnTransformer(
+            "log",
+            transformer_func=_compute_log,
+            col_mode="replace_all",
+        )
+        actual = node.fit(dtfcorpane.Panel.from_df(df))["df_out"]
+        _assert_equal(expected, actual)
+
+    def test_column_transformer2(self) -> None:
+        """
+        Check `cols`, `col_rename_func` and `col_mode` on a panel.
+        """
+        df = _get_data(20, 3)
+        node = dtfconotra.ColumnTransformer(
+            "log",
+            transformer_func=_compute_log,
+            cols=["close"],
+            col_rename_func=lambda x: f"log_{x}",
+            col_mode="replace_selected",
+        )
+        actual = node.fit(dtfcorpane.Panel.from_df(df))["df_out"]
+        self.assertEqual(actual.features, ["volume", "log_close"])
+        pd.testing.assert_frame_equal(
+            actual.get_feature_df("log_close"), np.log(df["close"])
+        )
+
+    def test_multiindex_volatility_model1(self) -> None:
+        df = _get_data(40, 3)
+        df = dtfconotra.GroupedColDfToDfTransformer(
+            "ret_0",
+            in_col_groups=[("close",)],
+            out_col_group=(),
+            transformer_func=_compute_ret_0,
+        ).fit(df)["df_out"]
+        kwargs = {
+            "in_col_group": ("ret_0",),
+            "steps_ahead": 2,
+            "nan_mode": "drop",
+        }
+        node = dtfcnovomo.MultiindexVolatilityModel("vol_model", **kwargs)
+        expected = node.fit(df)["df_out"]
+        node = dtfcnovomo.MultiindexVolatilityModel("vol_model", **kwargs)
+        actual = node.fit(dtfcorpane.Panel.from_df(df))["df_out"]
+        _assert_equal(expected, actual)
+
+    def test_pipeline1(self) -> None:
+        """
+        Check that a pipeline on panels matches the pipeline on dataframes.
+        """
+        df = _get_data(40, 3)
+        expected = _run_pipeline(df, use_panel=False)
+        actual = _run_pipeline(df, use_panel=True)
+        _assert_equal(expected, actual)
+
+    def test_pipeline2(self) -> None:
+        """
+        Check the pipeline of the benchmark.
+        """
+        df = _get_data(40, 3)
+        expected = _run_pipeline(df, use_panel=False, use_volatility_model=False)
+        actual = _run_pipeline(df, use_panel=True, use_volatility_model=False)
+        _assert_equal(expected, actual)
+
+
+class TestPanelBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_pipeline1(self) -> None:
+        """
+        Compare the run time of a 10-node pipeline on dataframes and panels.
+
+        The volatility model is replaced by rolling means, since fitting it
+        takes the same time on dataframes and panels and hides the per-node
+        overhead.
+        """
+        df = _get_data(2000, 100)
+        with htimer.TimedScope(logging.INFO, "Dataframe pipeline") as ts:
+            expected = _run_pipeline(
+                df, use_panel=False, use_volatility_model=False
+            )
+        df_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Panel pipeline") as ts:
+            actual = _run_pipeline(df, use_panel=True, use_volatility_model=False)
+        panel_elapsed = ts.elapsed_time
+        speedup = df_elapsed / panel_elapsed
+        _LOG.info(
+            "dataframe=%.3f s, panel=%.3f s, speedup=%.2fx",
+            df_elapsed,
+            panel_elapsed,
+            speedup,
+        )
+        _assert_equal(expected, actual)
+        self.assertGreater(speedup, 1.5)
@@ -14,7 +14,17 @@ import json
 import logging
 import os
 import re
-from typing import Any, Dict, Iterable, List, Match, Optional, Tuple, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Match,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import pandas as pd
 from tqdm.autonotebook import tqdm
@@ -221,6 +231,24 @@ def get_configs_from_command_line(
 # /////////////////////////////////////////////////////////////////////////////////
 
 
+# Data cached by the process running the experiments.
+_DATA_CACHE: Dict[str, Any] = {}
+
+
+def get_cached_data(key: str, load_func: Callable[[], Any]) -> Any:
+    """
+    Return the data cached under `key`, loading it with `load_func` on a miss.
+
+    When `run_experiment.py --worker_pool` is used, each worker process runs
+    many experiments and the cache is shared by all of them, e.g., to load the
+    market data only once. The cached data must be treated as read-only.
+    """
+    if key not in _DATA_CACHE:
+        _LOG.info("Loading data for key='%s'", key)
+        _DATA_CACHE[key] = load_func()
+    return _DATA_CACHE[key]
+
+
 def mark_config_as_success(experiment_result_dir: str) -> None:
     """
     Publish an empty file to indicate a successful finish.
@@ -373,7 +401,7 @@ def _get_experiment_subdirs(
     return src_dir, experiment_subdirs
 
 
-def _load_experiment_artifact(
+def load_experiment_artifact(
     file_name: str,
     load_rb_kwargs: Optional[Dict[str, Any]] = None,
 ) -> Any:
@@ -435,21 +463,42 @@ def yield_experiment_artifacts(
     Same inputs as `load_experiment_artifacts()`.
     """
     _LOG.info("# Load artifacts '%s' from '%s'", file_name, src_dir)
+    file_names = get_experiment_artifact_file_names(
+        src_dir, file_name, selected_idxs=selected_idxs, aws_profile=aws_profile
+    )
+    for key, file_name_tmp in tqdm(file_names, desc="Loading artifacts"):
+        _LOG.debug("Loading '%s'", file_name_tmp)
+        obj = load_experiment_artifact(file_name_tmp, load_rb_kwargs)
+        yield key, obj
+
+
+def get_experiment_artifact_file_names(
+    src_dir: str,
+    file_name: str,
+    selected_idxs: Optional[Iterable[int]] = None,
+    aws_profile: Optional[str] = None,
+) -> List[Tuple[int, str]]:
+    """
+    Return the key of each experiment and the path of its artifact.
+
+    Experiments without the artifact `file_name` are skipped.
+
+    Same inputs as `load_experiment_artifacts()`.
+    """
     # Get the experiment subdirs.
     src_dir, experiment_subdirs = _get_experiment_subdirs(
         src_dir, selected_idxs, aws_profile=aws_profile
     )
-    # Iterate over experiment directories.
-    for key, subdir in tqdm(experiment_subdirs.items(), desc="Loading artifacts"):
+    file_names = []
+    for key, subdir in experiment_subdirs.items():
         # Build the name of the file.
         hdbg.dassert_dir_exists(subdir)
         file_name_tmp = os.path.join(subdir, file_name)
-        _LOG.debug("Loading '%s'", file_name_tmp)
         if not os.path.exists(file_name_tmp):
             _LOG.warning("Can't find '%s': skipping", file_name_tmp)
             continue
-        obj = _load_experiment_artifact(file_name_tmp, load_rb_kwargs)
-        yield key, obj
+        file_names.append((key, file_name_tmp))
+    return file_names
 
 
 def _yield_rolling_experiment_out_of_sample_df(
@@ -491,7 +540,7 @@ def _yield_rolling_experiment_out_of_sample_df(
                 _LOG.warning("Can't find '%s': skipping", file_name_tmp)
                 continue
             hdbg.dassert(os.path.basename(file_name_tmp))
-            rb = _load_experiment_artifact(file_name_tmp, load_rb_kwargs)
+            rb = load_experiment_artifact(file_name_tmp, load_rb_kwargs)
             dfs.append(rb["result_df"])
         if dfs:
             df = pd.concat(dfs, axis=0)
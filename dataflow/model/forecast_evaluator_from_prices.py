@@ -19,6 +19,16 @@ import helpers.hpandas as hpandas
 
 _LOG = logging.getLogger(__name__)
 
+# Settings of `compute_portfolio()` supported by `compute_portfolio_grid()`,
+# with their default values.
+_GRID_SETTINGS = {
+    "bulk_frac_to_remove": 0.0,
+    "bulk_fill_method": "zero",
+    "target_gmv": 1e6,
+    "quantization": "no_quantization",
+    "burn_in_bars": 3,
+}
+
 
 class ForecastEvaluatorFromPrices:
     """
@@ -302,6 +312,139 @@ class ForecastEvaluatorFromPrices:
             stats = stats.reindex(idx)
         return holdings, positions, flows, pnl, stats
 
+    def compute_portfolio_grid(
+        self,
+        df: pd.DataFrame,
+        settings: pd.DataFrame,
+    ) -> pd.DataFrame:
+        """
+        Compute the portfolio stats for a grid of `compute_portfolio()` settings.
+
+        The pieces that do not depend on the settings (e.g., trimming, split
+        factors, beginning-of-day bars) are computed once, the forecast
+        ranking is computed once per distinct ranking setting, and the GMV
+        scaling, holdings, flows, and PnL are computed with array operations
+        over the settings.
+
+        E.g., `settings` for a GMV / quantization sweep can be built with
+        ```
+        settings = pd.MultiIndex.from_product(
+            [[1e5, 1e6], ["no_quantization", "nearest_share"]],
+            names=["target_gmv", "quantization"],
+        ).to_frame(index=False)
+        ```
+
+        :param df: as in `compute_portfolio()`
+        :param settings: one row per setting with columns among
+            `bulk_frac_to_remove`, `bulk_fill_method`, `target_gmv`,
+            `quantization`, `burn_in_bars`, with the same meaning as in
+            `compute_portfolio()`. Missing columns take the default value of
+            `compute_portfolio()`
+        :return: tidy dataframe of stats indexed by setting (i.e., the index of
+            `settings`) and timestamp, with the same values as the stats
+            returned by `compute_portfolio()` for each setting
+        """
+        self._validate_df(df)
+        hdbg.dassert_isinstance(settings, pd.DataFrame)
+        hdbg.dassert_lt(0, settings.shape[0])
+        hdbg.dassert_is_subset(settings.columns, _GRID_SETTINGS.keys())
+        hdbg.dassert(not settings.index.has_duplicates)
+        settings = settings.copy()
+        for key, value in _GRID_SETTINGS.items():
+            if key not in settings.columns:
+                settings[key] = value
+        df = self._apply_trimming(df)
+        prediction_df = ForecastEvaluatorFromPrices._get_df(
+            df, self._prediction_col
+        )
+        volatility_df = ForecastEvaluatorFromPrices._get_df(
+            df, self._volatility_col
+        )
+        price_df = ForecastEvaluatorFromPrices._get_df(df, self._price_col)
+        # Compute the target positions before GMV scaling and their L1 norm
+        # once per ranking setting.
+        rank_settings = ["bulk_frac_to_remove", "bulk_fill_method"]
+        rank_keys = list(settings[rank_settings].itertuples(index=False))
+        unique_rank_keys = list(dict.fromkeys(rank_keys))
+        unscaled_position_dfs = []
+        for bulk_frac_to_remove, bulk_fill_method in unique_rank_keys:
+            target_positions = ForecastEvaluatorFromPrices._compute_target_positions_from_forecasts(
+                volatility_df,
+                prediction_df,
+                bulk_frac_to_remove,
+                bulk_fill_method,
+                None,
+            )
+            unscaled_position_dfs.append(target_positions)
+        rank_idxs = [unique_rank_keys.index(key) for key in rank_keys]
+        # Array with shape `(setting, time, asset)`.
+        target_positions = np.stack(
+            [
+                target_positions.to_numpy(dtype=float)
+                for target_positions in unscaled_position_dfs
+            ]
+        )[rank_idxs]
+        # Array with shape `(setting, time)`, with NaNs for no GMV scaling.
+        target_gmvs = np.stack(
+            [
+                ForecastEvaluatorFromPrices._get_target_gmv_by_bar(
+                    unscaled_position_dfs[rank_idx], target_gmv
+                )
+                for rank_idx, target_gmv in zip(rank_idxs, settings["target_gmv"])
+            ]
+        )
+        price = price_df.to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            l1_norm = sigproc.sum_with_min_count(np.abs(target_positions))
+            # Scale like `_apply_gmv_scaling()` for each bar.
+            target_gmvs = target_gmvs[:, :, np.newaxis]
+            scale_factor = l1_norm[:, :, np.newaxis] / target_gmvs
+            scaled_positions = np.where(
+                target_gmvs > 0,
+                target_positions / scale_factor,
+                target_positions * 0,
+            )
+            target_positions = np.where(
+                np.isnan(target_gmvs), target_positions, scaled_positions
+            )
+            # Compute holdings and flows for each setting.
+            target_holdings = target_positions / price
+            for quantization, idxs in settings.groupby(
+                "quantization", sort=False
+            ).indices.items():
+                target_holdings[
+                    idxs
+                ] = ForecastEvaluatorFromPrices._apply_quantization(
+                    target_holdings[idxs], quantization
+                )
+            holdings, flows = self._compute_holdings_and_flows_from_arrays(
+                price_df, target_holdings
+            )
+            positions = holdings * price
+            pnl = _add_with_fill_value(
+                positions - sigproc.shift_time_axis(positions, 1), flows
+            )
+        stats = ForecastEvaluatorFromPrices._compute_statistics_from_arrays(
+            positions, flows, pnl
+        )
+        # Build a tidy dataframe, removing the initial bars.
+        stats_dfs = []
+        for idx, burn_in_bars in enumerate(settings["burn_in_bars"]):
+            stats_df = pd.DataFrame(
+                stats[idx],
+                index=price_df.index,
+                columns=["pnl", "gross_volume", "net_volume", "gmv", "nmv"],
+            )
+            if burn_in_bars > 0:
+                stats_df = stats_df.iloc[burn_in_bars:]
+            stats_dfs.append(stats_df)
+        stats_df = pd.concat(
+            stats_dfs,
+            keys=settings.index,
+            names=[settings.index.name or "setting", price_df.index.name],
+        )
+        return stats_df
+
     def annotate_forecasts(
         self,
         df: pd.DataFrame,
@@ -496,6 +639,38 @@ class ForecastEvaluatorFromPrices:
             )
         return target_positions
 
+    @staticmethod
+    def _get_target_gmv_by_bar(
+        target_positions: pd.DataFrame,
+        target_gmv: Optional[Union[float, pd.Series]],
+    ) -> np.ndarray:
+        """
+        Return the target GMV of each bar as used by `_apply_gmv_scaling()`.
+
+        :return: array of target GMVs, with NaN for bars without GMV scaling
+        """
+        num_bars = target_positions.shape[0]
+        if target_gmv is None:
+            target_gmvs = np.full(num_bars, np.nan)
+        elif isinstance(target_gmv, float):
+            target_gmvs = np.full(num_bars, target_gmv)
+        elif isinstance(target_gmv, pd.Series):
+            hdbg.dassert_lte(0, target_gmv.min())
+            active_times = cofinanc.infer_active_times(target_positions)
+            hdbg.dassert(
+                active_times.difference(target_gmv.index).empty,
+                "No `target_gmv` available at times=%s",
+                active_times.difference(target_gmv.index),
+            )
+            target_gmvs = target_gmv.reindex(
+                target_positions.index.time
+            ).to_numpy(dtype=float)
+        else:
+            raise ValueError(
+                "`target_gmv` type=%s not supported", type(target_gmv)
+            )
+        return target_gmvs
+
     @staticmethod
     def _apply_quantization(
         holdings: pd.DataFrame,
@@ -540,6 +715,28 @@ class ForecastEvaluatorFromPrices:
         )
         return stats
 
+    @staticmethod
+    def _compute_statistics_from_arrays(
+        positions: np.ndarray,
+        flows: np.ndarray,
+        pnl: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Compute the stats of `_compute_statistics()` on `(..., time, asset)`.
+
+        :return: array of shape `(..., time, 5)` with the columns of
+            `_compute_statistics()`
+        """
+        gmv = sigproc.sum_with_min_count(np.abs(positions))
+        nmv = sigproc.sum_with_min_count(positions)
+        gross_volume = sigproc.sum_with_min_count(np.abs(flows))
+        net_volume = sigproc.sum_with_min_count(-1 * flows)
+        portfolio_pnl = sigproc.sum_with_min_count(pnl)
+        stats = np.stack(
+            [portfolio_pnl, gross_volume, net_volume, gmv, nmv], axis=-1
+        )
+        return stats
+
     @staticmethod
     def _get_df(df: pd.DataFrame, col: str) -> pd.DataFrame:
         hdbg.dassert_in(col, df.columns)
@@ -604,3 +801,71 @@ class ForecastEvaluatorFromPrices:
         # Set the overnight flow to zero (since we do not trade and since
         # the share count may change due to corporate actions).
         return holdings, flows
+
+    def _compute_holdings_and_flows_from_arrays(
+        self,
+        price: pd.DataFrame,
+        target_holdings: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute `_compute_holdings_and_flows()` for a batch of target holdings.
+
+        :param price: price dataframe shared by the batch
+        :param target_holdings: quantized target holdings with shape
+            `(..., time, asset)`
+        :return: holdings and flows with the same shape as `target_holdings`
+        """
+        # Assume target shares are obtained.
+        holdings = sigproc.shift_time_axis(target_holdings, 1)
+        # Carry the holdings overnight, adjusting them for the splits.
+        split_factors = cofinanc.infer_splits(price)
+        timestamps = pd.DataFrame(
+            price.index.to_list(), price.index, ["timestamp"]
+        )
+        bod_timestamps = timestamps.groupby(lambda x: x.date()).min()
+        holdings[..., price.index.isin(bod_timestamps["timestamp"]), :] = np.nan
+        holdings = _ffill(holdings)
+        splits = (
+            split_factors.merge(bod_timestamps, left_index=True, right_index=True)
+            .set_index("timestamp")
+            .reindex(index=price.index, columns=price.columns)
+            .to_numpy(dtype=float)
+        )
+        holdings = _multiply_with_fill_value(holdings, splits)
+        # Change in shares priced at end of bar. Only valid intraday.
+        prev_holdings = sigproc.shift_time_axis(holdings, 1)
+        flows = (
+            -1
+            * _add_with_fill_value(holdings, -1 * prev_holdings)
+            * price.to_numpy(dtype=float)
+        )
+        return holdings, flows
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """
+    Forward fill NaNs along the time axis (i.e., the second to last one).
+    """
+    num_bars = values.shape[-2]
+    idxs = np.arange(num_bars).reshape(num_bars, 1)
+    idxs = np.where(np.isnan(values), 0, idxs)
+    np.maximum.accumulate(idxs, axis=-2, out=idxs)
+    return np.take_along_axis(values, idxs, axis=-2)
+
+
+def _add_with_fill_value(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """
+    Add like `pd.DataFrame.add(..., fill_value=0)`.
+    """
+    result = np.where(np.isnan(lhs), 0, lhs) + np.where(np.isnan(rhs), 0, rhs)
+    result[np.isnan(lhs) & np.isnan(rhs)] = np.nan
+    return result
+
+
+def _multiply_with_fill_value(lhs: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """
+    Multiply like `pd.DataFrame.multiply(..., fill_value=1)`.
+    """
+    result = np.where(np.isnan(lhs), 1, lhs) * np.where(np.isnan(rhs), 1, rhs)
+    result[np.isnan(lhs) & np.isnan(rhs)] = np.nan
+    return result
@@ -7,12 +7,13 @@ import dataflow.model.forecast_evaluator_from_returns as dtfmfefrre
 import datetime
 import logging
 import os
-from typing import Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 import core.finance as cofinanc
+import core.signal_processing as csigproc
 import helpers.hdbg as hdbg
 import helpers.hio as hio
 import helpers.hpandas as hpandas
@@ -265,6 +266,104 @@ class ForecastEvaluatorFromReturns:
             stats = stats.reindex(idx)
         return positions, pnl, stats
 
+    def compute_portfolio_stats_batch(
+        self,
+        df: pd.DataFrame,
+        predictions: np.ndarray,
+        keys: List[Any],
+        *,
+        target_gmv: Optional[float] = None,
+        dollar_neutrality: str = "no_constraint",
+        reindex_like_input: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Compute the portfolio stats for a batch of predictions.
+
+        The predictions share the returns and volatility of `df`, which are
+        filtered and aligned once, while positions, PnL, and stats are computed
+        with array operations over the batch dimension. The result is the same
+        as calling `compute_portfolio()` once per prediction.
+
+        :param df: multiindexed dataframe with returns and volatility (the
+            prediction column is not used)
+        :param predictions: array of shape `(len(keys), len(df), num_assets)`
+            with the predictions aligned to the index of `df` and to the asset
+            columns of `df[returns_col]`
+        :param keys: labels of the predictions in the batch
+        :param target_gmv: as in `compute_portfolio()`
+        :param dollar_neutrality: as in `compute_portfolio()`
+        :param reindex_like_input: as in `compute_portfolio()`
+        :return: stats multiindexed by `keys` at the outer column level, like
+            the concatenation of the stats of `compute_portfolio()`
+        """
+        hpandas.dassert_time_indexed_df(
+            df, allow_empty=True, strictly_increasing=True
+        )
+        hdbg.dassert_eq(df.columns.nlevels, 2)
+        returns = ForecastEvaluatorFromReturns._get_df(df, self._returns_col)
+        volatility = ForecastEvaluatorFromReturns._get_df(
+            df, self._volatility_col
+        )
+        # Align the shared inputs like `divide()` and `multiply()` would do.
+        asset_ids = returns.columns
+        if not volatility.columns.equals(asset_ids):
+            asset_ids = asset_ids.union(volatility.columns)
+        hdbg.dassert_isinstance(predictions, np.ndarray)
+        hdbg.dassert_eq(
+            predictions.shape, (len(keys), df.shape[0], len(returns.columns))
+        )
+        hdbg.dassert_no_duplicates(keys)
+        if not asset_ids.equals(returns.columns):
+            # Reindex the predictions to the union of the assets.
+            col_idxs = returns.columns.get_indexer(asset_ids)
+            predictions = np.where(
+                col_idxs >= 0, predictions[:, :, col_idxs], np.nan
+            )
+        # Find the rows kept by `compute_portfolio()` without copying `df`.
+        rows = pd.Series(np.arange(df.shape[0]), index=df.index)
+        if self._remove_weekends:
+            rows = cofinanc.remove_weekends(rows.to_frame())[0]
+        rows = rows.between_time(self._start_time, self._end_time)
+        row_idxs = rows.to_numpy()
+        returns = returns.reindex(columns=asset_ids).to_numpy(dtype=float)[
+            row_idxs
+        ]
+        volatility = volatility.reindex(columns=asset_ids).to_numpy(dtype=float)[
+            row_idxs
+        ]
+        predictions = predictions[:, row_idxs, :]
+        # Compute positions and PnL with shape `(batch, time, asset)`.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            target_positions = predictions / volatility
+            target_positions = (
+                ForecastEvaluatorFromReturns._apply_dollar_neutrality_to_array(
+                    target_positions, dollar_neutrality
+                )
+            )
+            target_positions = (
+                ForecastEvaluatorFromReturns._apply_gmv_scaling_to_array(
+                    target_positions, target_gmv
+                )
+            )
+            pnl = csigproc.shift_time_axis(target_positions, 2) * returns
+            stats = ForecastEvaluatorFromReturns._compute_statistics_from_arrays(
+                target_positions, pnl
+            )
+        # Build the output dataframe with shape `(time, batch x stat)`.
+        stat_names = ["pnl", "gross_volume", "net_volume", "gmv", "nmv"]
+        num_keys, num_rows, num_stats = stats.shape
+        columns = pd.MultiIndex.from_product([keys, stat_names])
+        values = stats.transpose(1, 0, 2).reshape(num_rows, num_keys * num_stats)
+        if reindex_like_input:
+            index = df.index
+            values_tmp = np.full((df.shape[0], values.shape[1]), np.nan)
+            values_tmp[row_idxs] = values
+            values = values_tmp
+        else:
+            index = rows.index
+        stats_df = pd.DataFrame(values, index=index, columns=columns)
+        return stats_df
+
     def annotate_forecasts(
         self,
         df: pd.DataFrame,
@@ -306,7 +405,11 @@ class ForecastEvaluatorFromReturns:
         dollar_neutrality: str = "no_constraint",
     ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        
+        Compute the PnL of holding the end-of-day positions overnight.
+
+        :param overnight_returns: returns from the end of a day to the start
+            of the next one, with one timestamp per date
+        :return: per-asset overnight PnL and portfolio stats
         """
         positions, _, _ = self.compute_portfolio(
             df, target_gmv=target_gmv, dollar_neutrality=dollar_neutrality
@@ -508,6 +611,96 @@ class ForecastEvaluatorFromReturns:
         )
         return stats
 
+    @staticmethod
+    def _apply_dollar_neutrality_to_array(
+        target_positions: np.ndarray,
+        dollar_neutrality: str,
+    ) -> np.ndarray:
+        """
+        Apply `_apply_dollar_neutrality()` along the last axis of an array.
+        """
+        hdbg.dassert_isinstance(dollar_neutrality, str)
+        if dollar_neutrality == "no_constraint":
+            pass
+        elif dollar_neutrality == "demean":
+            hdbg.dassert_lt(
+                1,
+                target_positions.shape[-1],
+                "Unable to enforce dollar neutrality with a single asset.",
+            )
+            count = (~np.isnan(target_positions)).sum(axis=-1, keepdims=True)
+            net_asset_value = (
+                np.nansum(target_positions, axis=-1, keepdims=True) / count
+            )
+            target_positions = target_positions - net_asset_value
+        elif dollar_neutrality == "side_preserving":
+            hdbg.dassert_lt(
+                1,
+                target_positions.shape[-1],
+                "Unable to enforce dollar neutrality with a single asset.",
+            )
+            positive_positions = np.clip(target_positions, 0, None)
+            negative_positions = np.clip(target_positions, None, 0)
+            positive_asset_value = np.nansum(
+                positive_positions, axis=-1, keepdims=True
+            )
+            negative_asset_value = -1 * np.nansum(
+                negative_positions, axis=-1, keepdims=True
+            )
+            min_sided_asset_value = np.minimum(
+                positive_asset_value, negative_asset_value
+            )
+            positive_positions = positive_positions * (
+                min_sided_asset_value / positive_asset_value
+            )
+            negative_positions = negative_positions * (
+                min_sided_asset_value / negative_asset_value
+            )
+            target_positions = positive_positions + negative_positions
+        else:
+            raise ValueError(
+                "Unrecognized option `dollar_neutrality`=%s" % dollar_neutrality
+            )
+        return target_positions
+
+    @staticmethod
+    def _apply_gmv_scaling_to_array(
+        target_positions: np.ndarray,
+        target_gmv: Optional[float],
+    ) -> np.ndarray:
+        """
+        Apply `_apply_gmv_scaling()` along the last axis of an array.
+        """
+        if target_gmv is not None:
+            hdbg.dassert_lt(0, target_gmv)
+            l1_norm = csigproc.sum_with_min_count(np.abs(target_positions))
+            scale_factor = l1_norm / target_gmv
+            target_positions = target_positions / scale_factor[..., np.newaxis]
+        return target_positions
+
+    @staticmethod
+    def _compute_statistics_from_arrays(
+        target_positions: np.ndarray,
+        pnl: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Compute the stats of `_compute_statistics()` on `(..., time, asset)`.
+
+        :return: array of shape `(..., time, 5)` with the columns of
+            `_compute_statistics()`
+        """
+        positions = csigproc.shift_time_axis(target_positions, 1)
+        gmv = csigproc.sum_with_min_count(np.abs(positions))
+        nmv = csigproc.sum_with_min_count(positions)
+        traded_volume = positions - csigproc.shift_time_axis(positions, 1)
+        gross_volume = csigproc.sum_with_min_count(np.abs(traded_volume))
+        net_volume = csigproc.sum_with_min_count(traded_volume)
+        portfolio_pnl = csigproc.sum_with_min_count(pnl)
+        stats = np.stack(
+            [portfolio_pnl, gross_volume, net_volume, gmv, nmv], axis=-1
+        )
+        return stats
+
     @staticmethod
     def _get_df(df: pd.DataFrame, col: str) -> pd.DataFrame:
         hdbg.dassert_in(col, df.columns)
@@ -4,11 +4,11 @@ Import as:
 import dataflow.model.forecast_mixer as dtfmofomix
 """
 
-import collections
 import functools
 import logging
 from typing import List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 import dataflow.model.forecast_evaluator_from_returns as dtfmfefrre
@@ -47,6 +47,7 @@ class ForecastMixer:
         *,
         target_gmv: Optional[float] = None,
         dollar_neutrality: str = "no_constraint",
+        batch_size: int = 128,
     ) -> pd.DataFrame:
         """
         Generate portfolio bar metrics given prediction weights.
@@ -58,6 +59,7 @@ class ForecastMixer:
             column of `weights` represents a different collection of weights.
         :param target_gmv: forward to `compute_portfolio()`
         :param dollar_neutrality: forward to `compute_portfolio()`
+        :param batch_size: max number of weight vectors evaluated at once
         :return: a multiindexed dataframe of portfolio bar metrics
         """
         # Ensure `df` is a dataframe with two levels of columns
@@ -72,36 +74,54 @@ class ForecastMixer:
         hdbg.dassert_eq(weights.columns.nlevels, 1)
         hdbg.dassert(not weights.columns.has_duplicates)
         hdbg.dassert_set_eq(weights.index.to_list(), self._predictions_cols)
-        # TODO(Paul): Check uniqueness of weights columns.
-        # Create one bar metric df per column in `weights`.
-        bar_metrics_dfs = collections.OrderedDict()
-        for col in weights.columns:
-            weight_srs = weights[col]
-            _LOG.debug("weights=\n%s", weight_srs)
-            # Sum weighted predictions
-            dfs = []
-            for prediction_col in self._predictions_cols:
-                dfs.append(weight_srs[prediction_col] * df[prediction_col])
-            sum_df = functools.reduce(lambda x, y: x.add(y), dfs)
-            # Build forecast dataframe.
-            forecast_dfs = {
-                "prediction": sum_df,
-                "volatility": df[self._volatility_col],
-                "returns": df[self._returns_col],
-            }
-            forecast_df = pd.concat(
-                forecast_dfs.values(), axis=1, keys=forecast_dfs.keys()
+        hdbg.dassert_lt(0, batch_size)
+        # Align the predictions on the same assets, as `add()` would do.
+        prediction_dfs = [df[col] for col in self._predictions_cols]
+        asset_ids = functools.reduce(
+            lambda x, y: x.union(y), [pred.columns for pred in prediction_dfs]
+        )
+        returns = df[self._returns_col]
+        hdbg.dassert_set_eq(
+            asset_ids.to_list(),
+            returns.columns.to_list(),
+            "Predictions and returns must refer to the same assets",
+        )
+        # Stack the predictions into an array `(prediction, time, asset)`.
+        predictions = np.stack(
+            [
+                pred.reindex(columns=returns.columns).to_numpy(dtype=float)
+                for pred in prediction_dfs
+            ]
+        )
+        forecast_df = pd.concat(
+            [df[self._volatility_col], returns],
+            axis=1,
+            keys=["volatility", "returns"],
+        )
+        # Process the weight vectors in batches to bound the memory footprint
+        # to `batch_size` times the size of a prediction dataframe.
+        weight_values = weights.loc[self._predictions_cols].to_numpy(dtype=float)
+        bar_metrics_dfs = []
+        for start in range(0, weights.shape[1], batch_size):
+            end = start + batch_size
+            _LOG.debug("weights=\n%s", weights.iloc[:, start:end])
+            # Sum the weighted predictions for all the weight vectors with a
+            # single contraction on the prediction axis, obtaining an array
+            # `(weight, time, asset)`.
+            weighted_predictions = np.einsum(
+                "pta,pw->wta", predictions, weight_values[:, start:end]
             )
-            # Compute the bar metrics for `forecast_df`.
-            _, _, bar_stats = self._forecast_evaluator.compute_portfolio(
-                forecast_df,
-                target_gmv=target_gmv,
-                dollar_neutrality=dollar_neutrality,
-                reindex_like_input=True,
+            # Compute the bar metrics for all the weight vectors at once.
+            bar_metrics_df = (
+                self._forecast_evaluator.compute_portfolio_stats_batch(
+                    forecast_df,
+                    weighted_predictions,
+                    weights.columns[start:end].to_list(),
+                    target_gmv=target_gmv,
+                    dollar_neutrality=dollar_neutrality,
+                    reindex_like_input=True,
+                )
             )
-            bar_metrics_dfs[col] = bar_stats
-        # Build a multiindexed dataframe.
-        bar_metrics_df = pd.concat(
-            bar_metrics_dfs.values(), axis=1, keys=bar_metrics_dfs.keys()
-        )
+            bar_metrics_dfs.append(bar_metrics_df)
+        bar_metrics_df = pd.concat(bar_metrics_dfs, axis=1)
         return bar_metrics_df
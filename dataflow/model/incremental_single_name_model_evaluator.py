@@ -6,11 +6,16 @@ import dataflow.model.incremental_single_name_model_evaluator as dtfmisnmoev
 
 from __future__ import annotations
 
+import abc
 import collections
+import concurrent.futures
+import hashlib
 import logging
+import os
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import pandas as pd
+from tqdm.autonotebook import tqdm
 
 import core.finance as cofinanc
 import core.signal_processing as csigproc
@@ -19,11 +24,425 @@ import dataflow.model.experiment_utils as dtfmoexuti
 import dataflow.model.stats_computer as dtfmostcom
 import helpers.hdatetime as hdateti
 import helpers.hdbg as hdbg
+import helpers.hio as hio
 import helpers.hlogging as hloggin
+import helpers.hpickle as hpickle
 
 _LOG = logging.getLogger(__name__)
 
 
+# #############################################################################
+# Single-pass evaluation
+# #############################################################################
+
+
+class ArtifactReducer(abc.ABC):
+    """
+    Accumulate a result over the artifacts of single-name experiments.
+
+    The evaluation of an artifact is split into:
+    - `map()`: compute a partial result from one artifact; this is run in the
+      worker processes and its output must be picklable
+    - `merge()`: fold the partial result into the state, in the order of the
+      experiment keys
+    - `finalize()`: convert the state into the result
+    """
+
+    @abc.abstractmethod
+    def get_columns(self) -> Optional[List[str]]:
+        """
+        Return the columns of `result_df` needed by the reducer.
+
+        `None` means all the columns.
+        """
+        ...
+
+    @abc.abstractmethod
+    def map(self, key: int, artifact: Any) -> Any:
+        ...
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Return the params determining the partial results of the reducer.
+        """
+        return vars(self)
+
+    def init_state(self) -> Any:
+        return collections.OrderedDict()
+
+    def merge(self, state: Any, key: int, partial_result: Any) -> Any:
+        state[key] = partial_result
+        return state
+
+    def finalize(self, state: Any) -> Any:
+        return state
+
+
+class StatsReducer(ArtifactReducer):
+    """
+    Compute the single-name stats as in `compute_stats_for_single_name_artifacts()`.
+    """
+
+    def __init__(
+        self,
+        prediction_col: str,
+        target_col: str,
+        start: Optional[hdateti.Datetime],
+        end: Optional[hdateti.Datetime],
+    ) -> None:
+        self._prediction_col = prediction_col
+        self._target_col = target_col
+        self._start = start
+        self._end = end
+
+    def get_columns(self) -> Optional[List[str]]:
+        return [self._prediction_col, self._target_col]
+
+    def map(self, key: int, artifact: Any) -> pd.Series:
+        _ = key
+        # Extract df and restrict to [start, end].
+        df_for_key = artifact.result_df[self.get_columns()]
+        df_for_key = df_for_key.loc[self._start : self._end].copy()
+        # Compute (intraday) PnL.
+        pnl = df_for_key[self._prediction_col] * df_for_key[self._target_col]
+        df_for_key["pnl"] = pnl
+        # Compute (intraday) stats.
+        stats_computer = dtfmostcom.StatsComputer()
+        stats = stats_computer.compute_finance_stats(
+            df_for_key,
+            returns_col=self._target_col,
+            position_col=self._prediction_col,
+            pnl_col="pnl",
+        )
+        return stats
+
+    def finalize(self, state: Any) -> pd.DataFrame:
+        # Generate dataframe from dictionary of stats.
+        stats_df = pd.DataFrame(state)
+        # Perform multiple tests adjustment.
+        adj_pvals = costatis.multipletests(
+            stats_df.loc["ratios"].loc["sr.pval"], nan_mode="drop"
+        ).rename("sr.adj_pval")
+        # Add multiple test info to stats dataframe.
+        adj_pvals = pd.concat([adj_pvals.to_frame().transpose()], keys=["ratios"])
+        stats_df = pd.concat([stats_df, adj_pvals], axis=0)
+        return stats_df
+
+
+class AggregationReducer(ArtifactReducer):
+    """
+    Aggregate single-name models as in `aggregate_single_name_models()`.
+    """
+
+    def __init__(
+        self,
+        position_intent_1_col: str,
+        ret_0_col: str,
+        spread_0_col: str,
+        prediction_col: str,
+        target_col: str,
+        start: Optional[hdateti.Datetime],
+        end: Optional[hdateti.Datetime],
+    ) -> None:
+        self._position_intent_1_col = position_intent_1_col
+        self._ret_0_col = ret_0_col
+        self._spread_0_col = spread_0_col
+        self._prediction_col = prediction_col
+        self._target_col = target_col
+        self._start = start
+        self._end = end
+
+    def get_columns(self) -> Optional[List[str]]:
+        return [
+            self._position_intent_1_col,
+            self._ret_0_col,
+            self._spread_0_col,
+            self._prediction_col,
+            self._target_col,
+        ]
+
+    def map(self, key: int, artifact: Any) -> pd.DataFrame:
+        _ = key
+        # Extract df and restrict to [start, end].
+        df_for_key = artifact.result_df.loc[self._start : self._end].copy()
+        df_for_key = _process_single_name_result_df(
+            df_for_key,
+            position_intent_1_col=self._position_intent_1_col,
+            ret_0_col=self._ret_0_col,
+            spread_0_col=self._spread_0_col,
+            prediction_col=self._prediction_col,
+            target_col=self._target_col,
+            start=self._start,
+            end=self._end,
+        )
+        return df_for_key
+
+    def init_state(self) -> Any:
+        return pd.DataFrame(), collections.OrderedDict()
+
+    def merge(self, state: Any, key: int, partial_result: Any) -> Any:
+        portfolio, dfs = state
+        # Add to portfolio.
+        portfolio = partial_result.add(portfolio, fill_value=0)
+        # Resample.
+        dfs[key] = partial_result.resample("B").sum(min_count=1)
+        return portfolio, dfs
+
+
+class ResultDfReducer(ArtifactReducer):
+    """
+    Collect the result dataframes as in `load_result_dfs()`.
+    """
+
+    def __init__(
+        self,
+        columns: Optional[List[str]],
+        start: Optional[hdateti.Datetime],
+        end: Optional[hdateti.Datetime],
+    ) -> None:
+        self._columns = columns
+        self._start = start
+        self._end = end
+
+    def get_columns(self) -> Optional[List[str]]:
+        return self._columns
+
+    def map(self, key: int, artifact: Any) -> pd.DataFrame:
+        _ = key
+        df = artifact.result_df
+        if self._columns is not None:
+            df = df[self._columns]
+        # Extract df and restrict to [start, end].
+        df = df.loc[self._start : self._end].copy()
+        return df
+
+
+class InfoReducer(ArtifactReducer):
+    """
+    Collect a subset of `info` as in `load_info()`.
+    """
+
+    def __init__(self, info_path: List[str]) -> None:
+        hdbg.dassert_isinstance(info_path, list)
+        self._info_path = info_path
+
+    def get_columns(self) -> Optional[List[str]]:
+        return []
+
+    def map(self, key: int, artifact: Any) -> Any:
+        _ = key
+        info = artifact.info
+        for k in self._info_path:
+            info = info[k]
+        return info
+
+
+def evaluate_single_name_artifacts(
+    src_dir: str,
+    file_name: str,
+    reducers: Dict[str, ArtifactReducer],
+    *,
+    selected_idxs: Optional[Iterable[int]] = None,
+    aws_profile: Optional[str] = None,
+    load_rb_kwargs: Optional[Dict[str, Any]] = None,
+    num_workers: int = 1,
+    checkpoint_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate single-name artifacts reading each artifact only once.
+
+    Each artifact is loaded (with the union of the columns needed by the
+    reducers) and passed to `map()` of all the reducers, possibly in a pool of
+    `num_workers` processes. The partial results are merged in the order of
+    the experiment keys as soon as they are available, so that at most a few
+    artifacts per worker are in memory at a time.
+
+    :param reducers: reducers keyed by name
+    :param load_rb_kwargs: parameters passed to `ResultBundle.from_pickle`,
+        except `columns` which is the union of the columns of the reducers
+    :param num_workers: number of processes used to load and map the artifacts
+    :param checkpoint_dir: if not `None`, store the partial results of each
+        artifact in this dir and reuse them on the next run with the same
+        reducers and params, so that an interrupted evaluation can be resumed
+    :return: result of each reducer keyed by name
+    """
+    hdbg.dassert_isinstance(reducers, dict)
+    hdbg.dassert_lte(1, len(reducers))
+    hdbg.dassert_lte(1, num_workers)
+    load_rb_kwargs = load_rb_kwargs or {}
+    hdbg.dassert_not_in("columns", load_rb_kwargs)
+    load_rb_kwargs = {
+        **load_rb_kwargs,
+        "columns": _get_columns(list(reducers.values())),
+    }
+    file_names = dtfmoexuti.get_experiment_artifact_file_names(
+        src_dir, file_name, selected_idxs=selected_idxs, aws_profile=aws_profile
+    )
+    checkpoint_id = _get_checkpoint_id(reducers, load_rb_kwargs)
+    if checkpoint_dir is not None:
+        hio.create_dir(checkpoint_dir, incremental=True)
+    # Find the artifacts that have not been processed yet. The checkpoints
+    # are read only when merging, so that they are not all in memory.
+    checkpointed_keys = set()
+    file_names_to_process = []
+    for key, file_name_tmp in file_names:
+        if _has_checkpoint(checkpoint_dir, checkpoint_id, key):
+            checkpointed_keys.add(key)
+        else:
+            file_names_to_process.append((key, file_name_tmp))
+    _LOG.info(
+        "Found %d artifacts: %d to process, %d from checkpoint",
+        len(file_names),
+        len(file_names_to_process),
+        len(checkpointed_keys),
+    )
+    # Map the artifacts and merge the partial results in order.
+    states = {name: reducer.init_state() for name, reducer in reducers.items()}
+    iterator = _map_artifacts(
+        reducers, file_names_to_process, load_rb_kwargs, num_workers
+    )
+    for key, _ in tqdm(file_names, desc="Evaluating artifacts"):
+        if key in checkpointed_keys:
+            partial_result = _read_checkpoint(checkpoint_dir, checkpoint_id, key)
+        else:
+            key_tmp, partial_result = next(iterator)
+            hdbg.dassert_eq(key_tmp, key)
+            _write_checkpoint(
+                checkpoint_dir, checkpoint_id, key, partial_result
+            )
+        for name, reducer in reducers.items():
+            states[name] = reducer.merge(states[name], key, partial_result[name])
+        _LOG.debug("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
+    results = {
+        name: reducer.finalize(states[name]) for name, reducer in reducers.items()
+    }
+    _LOG.info("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
+    return results
+
+
+def _get_columns(reducers: List[ArtifactReducer]) -> Optional[List[str]]:
+    """
+    Return the union of the columns needed by `reducers`.
+    """
+    columns: List[str] = []
+    for reducer in reducers:
+        reducer_columns = reducer.get_columns()
+        if reducer_columns is None:
+            return None
+        columns.extend(col for col in reducer_columns if col not in columns)
+    return columns
+
+
+def _map_artifact(
+    reducers: Dict[str, ArtifactReducer],
+    key: int,
+    file_name: str,
+    load_rb_kwargs: Dict[str, Any],
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Load an artifact and compute the partial result of each reducer.
+    """
+    artifact = dtfmoexuti.load_experiment_artifact(file_name, load_rb_kwargs)
+    partial_result = {
+        name: reducer.map(key, artifact) for name, reducer in reducers.items()
+    }
+    return key, partial_result
+
+
+def _map_artifacts(
+    reducers: Dict[str, ArtifactReducer],
+    file_names: List[Tuple[int, str]],
+    load_rb_kwargs: Dict[str, Any],
+    num_workers: int,
+) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield the partial results of the artifacts in the order of `file_names`.
+    """
+    if num_workers == 1:
+        for key, file_name in file_names:
+            yield _map_artifact(reducers, key, file_name, load_rb_kwargs)
+        return
+    # Keep a bounded number of artifacts in flight to bound the memory.
+    max_num_futures = 2 * num_workers
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers
+    ) as executor:
+        futures: collections.deque = collections.deque()
+        for key, file_name in file_names:
+            if len(futures) == max_num_futures:
+                yield futures.popleft().result()
+            futures.append(
+                executor.submit(
+                    _map_artifact, reducers, key, file_name, load_rb_kwargs
+                )
+            )
+        while futures:
+            yield futures.popleft().result()
+
+
+def _get_checkpoint_id(
+    reducers: Dict[str, ArtifactReducer], load_rb_kwargs: Dict[str, Any]
+) -> str:
+    """
+    Return a hash of the reducers and params determining the partial results.
+    """
+    # Sort by key only, since the values can't always be compared.
+    params = [
+        (name, type(reducer).__name__, sorted(reducer.get_params().items()))
+        for name, reducer in sorted(reducers.items(), key=lambda x: x[0])
+    ]
+    params.append(("load_rb_kwargs", "", sorted(load_rb_kwargs.items())))
+    checkpoint_id = hashlib.md5(repr(params).encode()).hexdigest()[:16]
+    return checkpoint_id
+
+
+def _get_checkpoint_file_name(
+    checkpoint_dir: str, checkpoint_id: str, key: int
+) -> str:
+    return os.path.join(checkpoint_dir, f"result_{key}.{checkpoint_id}.pkl")
+
+
+def _has_checkpoint(
+    checkpoint_dir: Optional[str], checkpoint_id: str, key: int
+) -> bool:
+    if checkpoint_dir is None:
+        return False
+    file_name = _get_checkpoint_file_name(checkpoint_dir, checkpoint_id, key)
+    return os.path.exists(file_name)
+
+
+def _read_checkpoint(
+    checkpoint_dir: str, checkpoint_id: str, key: int
+) -> Dict[str, Any]:
+    """
+    Return the checkpointed partial results of `key`.
+    """
+    file_name = _get_checkpoint_file_name(checkpoint_dir, checkpoint_id, key)
+    partial_result: Dict[str, Any] = hpickle.from_pickle(file_name)
+    return partial_result
+
+
+def _write_checkpoint(
+    checkpoint_dir: Optional[str],
+    checkpoint_id: str,
+    key: int,
+    partial_result: Dict[str, Any],
+) -> None:
+    if checkpoint_dir is None:
+        return
+    file_name = _get_checkpoint_file_name(checkpoint_dir, checkpoint_id, key)
+    # Write to a temporary file and rename it, so that an interrupted write
+    # doesn't leave a corrupted checkpoint.
+    tmp_file_name = hio.change_filename_extension(file_name, "pkl", "tmp.pkl")
+    hpickle.to_pickle(partial_result, tmp_file_name)
+    os.replace(tmp_file_name, file_name)
+
+
+# #############################################################################
+# Single-name evaluation functions
+# #############################################################################
+
+
 def compute_stats_for_single_name_artifacts(
     src_dir: str,
     file_name: str,
@@ -43,46 +462,15 @@ def compute_stats_for_single_name_artifacts(
     :return: dataframe of stats, with keys as column names and a row
         multiindex for grouped stats
     """
-    stats = collections.OrderedDict()
-    load_rb_kwargs = {"columns": list([prediction_col, target_col])}
-    iterator = dtfmoexuti.yield_experiment_artifacts(
+    reducer = StatsReducer(prediction_col, target_col, start, end)
+    results = evaluate_single_name_artifacts(
         src_dir,
         file_name,
-        load_rb_kwargs=load_rb_kwargs,
+        {"stats": reducer},
         selected_idxs=selected_idxs,
         aws_profile=aws_profile,
     )
-    for key, artifact in iterator:
-        _LOG.debug(
-            "load_experiment_artifacts: memory_usage=%s",
-            hloggin.get_memory_usage_as_str(None),
-        )
-        # Extract df and restrict to [start, end].
-        df_for_key = artifact.result_df.loc[start:end].copy()
-        # Compute (intraday) PnL.
-        pnl = df_for_key[prediction_col] * df_for_key[target_col]
-        df_for_key["pnl"] = pnl
-        # Compute (intraday) stats.
-        stats_computer = dtfmostcom.StatsComputer()
-        stats[key] = stats_computer.compute_finance_stats(
-            df_for_key,
-            returns_col=target_col,
-            positions_col=prediction_col,
-            pnl_col="pnl",
-        )
-    # Generate dataframe from dictionary of stats.
-    stats_df = pd.DataFrame(stats)
-    # Perform multiple tests adjustment.
-    adj_pvals = costatis.multipletests(
-        stats_df.loc["signal_quality"].loc["sr.pval"], nan_mode="drop"
-    ).rename("sr.adj_pval")
-    # Add multiple test info to stats dataframe.
-    adj_pvals = pd.concat(
-        [adj_pvals.to_frame().transpose()], keys=["signal_quality"]
-    )
-    stats_df = pd.concat([stats_df, adj_pvals], axis=0)
-    _LOG.info("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
-    return stats_df
+    return results["stats"]
 
 
 def aggregate_single_name_models(
@@ -98,45 +486,23 @@ def aggregate_single_name_models(
     selected_idxs: Optional[Iterable[int]] = None,
     aws_profile: Optional[str] = None,
 ) -> Tuple[pd.DataFrame, Dict[Union[str, int], pd.DataFrame]]:
-    expected_columns = [
+    reducer = AggregationReducer(
         position_intent_1_col,
         ret_0_col,
         spread_0_col,
         prediction_col,
         target_col,
-    ]
-    load_rb_kwargs = {"columns": expected_columns}
-    iterator = dtfmoexuti.yield_experiment_artifacts(
+        start,
+        end,
+    )
+    results = evaluate_single_name_artifacts(
         src_dir,
         file_name,
-        load_rb_kwargs=load_rb_kwargs,
+        {"aggregation": reducer},
         selected_idxs=selected_idxs,
         aws_profile=aws_profile,
     )
-    portfolio = pd.DataFrame()
-    dfs = collections.OrderedDict()
-    for key, artifact in iterator:
-        _LOG.info(
-            "load_experiment_artifacts: memory_usage=%s",
-            hloggin.get_memory_usage_as_str(None),
-        )
-        # Extract df and restrict to [start, end].
-        df_for_key = artifact.result_df.loc[start:end].copy()
-        df_for_key = _process_single_name_result_df(
-            df_for_key,
-            position_intent_1_col=position_intent_1_col,
-            ret_0_col=ret_0_col,
-            spread_0_col=spread_0_col,
-            prediction_col=prediction_col,
-            target_col=target_col,
-            start=start,
-            end=end,
-        )
-        # Add to portfolio.
-        portfolio = df_for_key.add(portfolio, fill_value=0)
-        # Resample.
-        dfs[key] = df_for_key.resample("B").sum(min_count=1)
-    _LOG.info("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
+    portfolio, dfs = results["aggregation"]
     return portfolio, dfs
 
 
@@ -157,24 +523,43 @@ def load_result_dfs(
     This function should be used judiciously on large runs due to the memory
     requirements.
     """
-    iterator = dtfmoexuti.yield_experiment_artifacts(
+    load_rb_kwargs = load_rb_kwargs.copy()
+    columns = load_rb_kwargs.pop("columns", None)
+    reducer = ResultDfReducer(columns, start, end)
+    results = evaluate_single_name_artifacts(
         src_dir,
         file_name,
+        {"result_dfs": reducer},
+        selected_idxs=selected_idxs,
+        aws_profile=aws_profile,
         load_rb_kwargs=load_rb_kwargs,
+    )
+    return results["result_dfs"]
+
+
+def load_info(
+    src_dir: str,
+    file_name: str,
+    info_path: List[str],
+    selected_idxs: Optional[Iterable[int]] = None,
+    aws_profile: Optional[str] = None,
+) -> Dict[int, Any]:
+    """
+    Return a subset of `info` from result bundles.
+
+    :param info_path: a list of keys to traverse for subsetting `info`. An
+        empty list means no restriction.
+    :return: dict keyed by experiment, with value equal to `info`
+        restricted to `info_path`
+    """
+    results = evaluate_single_name_artifacts(
+        src_dir,
+        file_name,
+        {"info": InfoReducer(info_path)},
         selected_idxs=selected_idxs,
         aws_profile=aws_profile,
     )
-    dfs = collections.OrderedDict()
-    for key, artifact in iterator:
-        _LOG.info(
-            "load_experiment_artifacts: memory_usage=%s",
-            hloggin.get_memory_usage_as_str(None),
-        )
-        # Extract df and restrict to [start, end].
-        df = artifact.result_df.loc[start:end].copy()
-        dfs[key] = df
-    _LOG.info("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
-    return dfs
+    return results["info"]
 
 
 def _process_single_name_result_df(
@@ -252,35 +637,3 @@ def _process_single_name_result_df(
     )
     df["half_spread_cost"] = half_spread_cost
     return df
-
-
-def load_info(
-    src_dir: str,
-    file_name: str,
-    info_path: List[str],
-    selected_idxs: Optional[Iterable[int]] = None,
-    aws_profile: Optional[str] = None,
-) -> Dict[int, Any]:
-    """
-    Return a subset of `info` from result bundles.
-
-    :param info_path: a list of keys to traverse for subsetting `info`. An
-        empty list means no restriction.
-    :return: dict keyed by experiment, with value equal to `info`
-        restricted to `info_path`
-    """
-    iterator = dtfmoexuti.yield_experiment_artifacts(
-        src_dir,
-        file_name,
-        load_rb_kwargs={"columns": []},
-        selected_idxs=selected_idxs,
-        aws_profile=aws_profile,
-    )
-    info_dict = collections.OrderedDict()
-    for key, artifact in iterator:
-        info = artifact.info
-        for k in info_path:
-            info = info[k]
-        info_dict[key] = info
-    _LOG.info("memory_usage=%s", hloggin.get_memory_usage_as_str(None))
-    return info_dict
@@ -94,7 +94,7 @@ stats = dtfmisnmoev.compute_stats_for_single_name_artifacts(
 # %%
 # TODO(gp): Move this chunk of code into a function.
 col_mask = (
-    stats.loc["signal_quality"].loc["sr.adj_pval"]
+    stats.loc["ratios"].loc["sr.adj_pval"]
     < eval_config["bh_adj_threshold"]
 )
 selected = stats.loc[:, col_mask].columns.to_list()
@@ -6,19 +6,40 @@ import dataflow.model.regression_analyzer as dtfmoreana
 
 from __future__ import annotations
 
+import concurrent.futures
 import datetime
 import logging
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import scipy as sp
 import seaborn as sns
 from tqdm.autonotebook import tqdm
 
+import core.signal_processing as csigproc
 import core.statistics as costatis
 import helpers.hdbg as hdbg
 
 _LOG = logging.getLogger(__name__)
 
+# Columns of `costatis.compute_regression_coefficients()`.
+_REGRESSION_STATS = [
+    "count",
+    "eff_count",
+    "sgn_rho",
+    "var",
+    "covar",
+    "rho",
+    "beta",
+    "SE(beta)",
+    "beta_z_scored",
+    "p_val_2s",
+    "autocovar",
+    "autocorr",
+    "turn",
+]
+
 
 class RegressionAnalyzer:
     """
@@ -71,33 +92,67 @@ class RegressionAnalyzer:
         end_datetime: Optional[pd.Timestamp] = None,
         start_time: datetime.time = datetime.time(9, 30),
         end_time: datetime.time = datetime.time(16, 00),
+        chunk_size: int = 256,
+        num_workers: int = 1,
     ) -> pd.DataFrame:
         """
         Compute regression coefficients.
+
+        The result is the same as calling
+        `costatis.compute_regression_coefficients()` on each asset, but the
+        regressions of all the assets are computed together from the sums of
+        `x * x`, `x * y`, etc. accumulated over a `(feature, time, asset)`
+        array.
+
+        :param chunk_size: number of assets processed together, to bound the
+            memory footprint
+        :param num_workers: number of processes used to process the chunks of
+            assets
         """
+        hdbg.dassert_lt(0, chunk_size)
+        hdbg.dassert_lte(1, num_workers)
         self._validate_data_df(df)
         df = df[self._df_cols]
         df = df.loc[start_datetime:end_datetime]
         df = df.between_time(start_time, end_time)
-        coeffs = {}
-        asset_ids = df.columns.levels[1].to_list()
+        features, target, asset_ids = self._get_arrays(df)
         _LOG.debug("Num asset_ids=%d", len(asset_ids))
-        for asset_id in tqdm(asset_ids, desc="Processing assets"):
-            asset_df = df.T.xs(asset_id, level=1).T
-            if asset_df.empty:
-                _LOG.debug("Empty dataframe for asset_id=%d", asset_id)
-                continue
-            if self._feature_lag != 0:
-                features = asset_df[self._feature_cols].shift(self._feature_lag)
-                target = asset_df[[self._target_col]]
-                asset_df = features.merge(
-                    target, left_index=True, right_index=True
-                )
-            coeff = costatis.compute_regression_coefficients(
-                asset_df, self._feature_cols, self._target_col
+        if self._feature_lag != 0:
+            features = csigproc.shift_time_axis(features, self._feature_lag)
+        # Compute the stats by chunks of assets.
+        chunks = [
+            (
+                features[:, :, start : start + chunk_size],
+                target[:, start : start + chunk_size],
             )
-            coeffs[asset_id] = coeff
-        out_df = pd.concat(coeffs)
+            for start in range(0, len(asset_ids), chunk_size)
+        ]
+        if num_workers == 1:
+            stats = [
+                _compute_regression_stats(*chunk)
+                for chunk in tqdm(chunks, desc="Processing assets")
+            ]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=num_workers
+            ) as executor:
+                stats = list(
+                    tqdm(
+                        executor.map(_compute_regression_stats, *zip(*chunks)),
+                        total=len(chunks),
+                        desc="Processing assets",
+                    )
+                )
+        # Array with shape `(asset, feature, stat)`.
+        stats = np.concatenate(stats)
+        # Infer the type of the features as in the per-asset dataframes.
+        feature_idx = pd.Index(self._df_cols)[:-1]
+        out_df = pd.DataFrame(
+            stats.reshape(-1, len(_REGRESSION_STATS)),
+            index=pd.MultiIndex.from_product([asset_ids, feature_idx]),
+            columns=_REGRESSION_STATS,
+        )
+        out_df["count"] = out_df["count"].astype(int)
         return out_df
 
     def combine_features(
@@ -112,18 +167,11 @@ class RegressionAnalyzer:
         df = df[self._df_cols]
         weight_srs = pd.Series(weights, self._feature_cols, name="weight")
         _LOG.debug("weights=\n%s", weight_srs)
-        predictions = {}
-        # TODO(Paul): Consider performing the calculation as in
-        #  `ForecastMixer.generate_portfolio_bar_metrics_df()`.
-        asset_ids = df.columns.levels[1].to_list()
-        for asset_id in tqdm(asset_ids, desc="Processing assets"):
-            asset_df = df.T.xs(asset_id, level=1).T
-            if asset_df.empty:
-                _LOG.debug("Empty dataframe for asset_id=%d", asset_id)
-                continue
-            prediction = (asset_df * weight_srs).sum(axis=1, min_count=1)
-            predictions[asset_id] = prediction
-        out_df = pd.concat(predictions).unstack(level=0)
+        features, _, asset_ids = self._get_arrays(df)
+        weighted_features = features * weight_srs.to_numpy()[:, None, None]
+        predictions = np.nansum(weighted_features, axis=0)
+        predictions[np.isnan(weighted_features).all(axis=0)] = np.nan
+        out_df = pd.DataFrame(predictions, index=df.index, columns=asset_ids)
         return out_df
 
     def show_pairplot(
@@ -163,8 +211,117 @@ class RegressionAnalyzer:
         paired_df = pd.concat([srs1, srs2], join="inner", axis=1)
         sns.pairplot(paired_df)
 
+    def _get_arrays(
+        self, df: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray, List[Union[int, str]]]:
+        """
+        Convert `df` into arrays with the features and the target.
+
+        :return: features with shape `(feature, time, asset)`, target with
+            shape `(time, asset)`, asset ids
+        """
+        asset_ids = df.columns.remove_unused_levels().levels[1].to_list()
+        features = np.stack(
+            [
+                df[col].reindex(columns=asset_ids).to_numpy(dtype=float)
+                for col in self._feature_cols
+            ]
+        )
+        target = (
+            df[self._target_col].reindex(columns=asset_ids).to_numpy(dtype=float)
+        )
+        return features, target, asset_ids
+
     def _validate_data_df(self, df):
         hdbg.dassert_isinstance(df, pd.DataFrame)
         hdbg.dassert_eq(df.columns.nlevels, 2)
         for col in self._df_cols:
             hdbg.dassert_in(col, df.columns)
+
+
+def _compute_eff_count(count: np.ndarray) -> np.ndarray:
+    """
+    Compute Kish's effective sample size for equal weights.
+
+    The result is equal to `count` up to rounding. It is computed as in
+    `costatis.compute_cardinality()` for each distinct count, so that it
+    matches exactly the result of `costatis.compute_regression_coefficients()`.
+    """
+    eff_count = np.full(count.shape, np.nan)
+    for value in np.unique(count):
+        normalized_weights = np.full(value, 1.0) / value
+        eff_count[count == value] = (normalized_weights**2).sum() ** (
+            1 / (1 - 2)
+        )
+    return eff_count
+
+
+def _compute_regression_stats(
+    features: np.ndarray, target: np.ndarray
+) -> np.ndarray:
+    """
+    Regress the target on each feature independently for each asset.
+
+    This is equivalent to `costatis.compute_regression_coefficients()` with
+    equal sample weights.
+
+    :param features: array with shape `(feature, time, asset)`
+    :param target: array with shape `(time, asset)`
+    :return: array with shape `(asset, feature, stat)` with the stats in
+        `_REGRESSION_STATS`
+    """
+    num_bars = target.shape[0]
+    # Drop bars with no target value.
+    has_target = ~np.isnan(target)
+    features = np.where(has_target, features, np.nan)
+    # Find the previous bar with a target value for each bar, to compute the
+    # autocovariance on the bars with a target value.
+    bar_idxs = np.where(has_target, np.arange(num_bars)[:, np.newaxis], -1)
+    bar_idxs = np.maximum.accumulate(bar_idxs, axis=0)
+    prev_bar_idxs = np.full_like(bar_idxs, -1)
+    prev_bar_idxs[1:] = bar_idxs[:-1]
+    prev_features = np.take_along_axis(
+        features, np.maximum(prev_bar_idxs, 0)[np.newaxis], axis=1
+    )
+    prev_features = np.where(prev_bar_idxs >= 0, prev_features, np.nan)
+    # Accumulate the sufficient statistics with shape `(feature, asset)`.
+    count = (~np.isnan(features)).sum(axis=1)
+    xy = features * target
+    sum_sgn_xy = np.nansum(np.sign(xy), axis=1)
+    sum_xx = np.nansum(features**2, axis=1)
+    sum_xy = np.nansum(xy, axis=1)
+    sum_xx_lag = np.nansum(features * prev_features, axis=1)
+    y_variance = np.nansum(target**2, axis=0) / has_target.sum(axis=0)
+    # Compute the stats.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eff_count = _compute_eff_count(count)
+        sgn_rho = sum_sgn_xy / count
+        x_variance = sum_xx / count
+        covariance = sum_xy / count
+        rho = covariance / (np.sqrt(x_variance) * np.sqrt(y_variance))
+        beta = covariance / x_variance
+        beta_se = np.sqrt(y_variance / (x_variance * eff_count))
+        z_scores = beta / beta_se
+        p_val = 2 * sp.stats.norm.sf(np.abs(z_scores))
+        autocovariance = sum_xx_lag / count
+        autocorrelation = autocovariance / x_variance
+        turn = np.sqrt(2 * (1 - autocorrelation))
+    stats = np.stack(
+        [
+            count,
+            eff_count,
+            sgn_rho,
+            x_variance,
+            covariance,
+            rho,
+            beta,
+            beta_se,
+            z_scores,
+            p_val,
+            autocovariance,
+            autocorrelation,
+            turn,
+        ],
+        axis=-1,
+    )
+    return stats.transpose(1, 0, 2)
@@ -11,6 +11,15 @@ Run a list of experiments consisting of multiple model runs based on the passed:
     --dst_dir experiment1 \
     --num_threads 2
 
+# Same as above but running the experiments in 2 long-lived worker processes,
+# instead of one `run_experiment_stub.py` process per config:
+> run_experiment.py \
+    --experiment_builder "dataflow_model.master_experiment.run_experiment" \
+    --config_builder "dataflow_lm.RH1E.config.build_15min_model_configs()" \
+    --dst_dir experiment1 \
+    --num_threads 2 \
+    --worker_pool
+
 Import as:
 
 import dataflow.model.run_experiment as dtfmoruexp
@@ -19,15 +28,21 @@ import dataflow.model.run_experiment as dtfmoruexp
 # TODO(gp): -> run_configs.py?
 
 import argparse
+import concurrent.futures
+import contextlib
+import functools
 import logging
+import multiprocessing
 import os
-from typing import cast
+import traceback
+from typing import Callable, Optional, Tuple, cast
 
 import core.config as cconfig
 import dataflow.model.experiment_utils as dtfmoexuti
 import helpers.hdatetime as hdateti
 import helpers.hdbg as hdbg
 import helpers.hgit as hgit
+import helpers.hintrospection as hintros
 import helpers.hjoblib as hjoblib
 import helpers.hparser as hparser
 import helpers.hprint as hprint
@@ -40,6 +55,25 @@ _LOG = logging.getLogger(__name__)
 # #############################################################################
 
 
+def _prepare_experiment(config: cconfig.Config) -> Tuple[int, str, str]:
+    """
+    Set up the experiment dir and the log file for `config`.
+
+    :return: index of the config, experiment result dir, and log file
+    """
+    dtfmoexuti.setup_experiment_dir(config)
+    # TODO(gp): Rename id -> idx everywhere with `jackpy "meta" | grep id | grep config`
+    idx = config[("meta", "id")]
+    _LOG.info("\n%s", hprint.frame(f"Executing experiment for config {idx}"))
+    _LOG.info("config=\n%s", config)
+    # Prepare the log file.
+    # TODO(gp): -> experiment_dst_dir
+    experiment_result_dir = config[("meta", "experiment_result_dir")]
+    log_file = os.path.join(experiment_result_dir, "run_experiment.%s.log" % idx)
+    log_file = os.path.abspath(os.path.abspath(log_file))
+    return idx, experiment_result_dir, log_file
+
+
 # TODO(gp): _run_configs_stub
 def _run_experiment_stub(
     config: cconfig.Config,
@@ -58,22 +92,12 @@ def _run_experiment_stub(
     hdbg.dassert_eq(1, num_attempts, "Multiple attempts not supported yet")
     _ = incremental
     #
-    dtfmoexuti.setup_experiment_dir(config)
+    idx, experiment_result_dir, log_file = _prepare_experiment(config)
     # Prepare command line to execute the experiment.
     file_name = "run_experiment_stub.py"
     exec_name = hgit.find_file_in_git_tree(file_name, super_module=True)
     #
-    # TODO(gp): Rename id -> idx everywhere with `jackpy "meta" | grep id | grep config`
-    idx = config[("meta", "id")]
-    _LOG.info("\n%s", hprint.frame(f"Executing experiment for config {idx}"))
-    _LOG.info("config=\n%s", config)
-    #
     dst_dir = config[("meta", "dst_dir")]
-    # Prepare the log file.
-    # TODO(gp): -> experiment_dst_dir
-    experiment_result_dir = config[("meta", "experiment_result_dir")]
-    log_file = os.path.join(experiment_result_dir, "run_experiment.%s.log" % idx)
-    log_file = os.path.abspath(os.path.abspath(log_file))
     experiment_builder = config[("meta", "experiment_builder")]
     config_builder = config[("meta", "config_builder")]
     cmd = [
@@ -105,10 +129,162 @@ def _run_experiment_stub(
     return rc
 
 
-def _get_joblib_workload(args: argparse.Namespace) -> hjoblib.Workload:
+# #############################################################################
+# Worker pool
+# #############################################################################
+
+
+# Function running the experiments in the current worker process, resolved
+# once from the `experiment_builder` by `_init_worker()`.
+_WORKER_EXPERIMENT_FUNC: Optional[Callable] = None
+
+
+def _init_worker(experiment_builder: str) -> None:
+    """
+    Initialize a worker process importing the `experiment_builder` once.
+    """
+    global _WORKER_EXPERIMENT_FUNC
+    hdbg.dassert(
+        not experiment_builder.endswith("()"),
+        "Invalid experiment_builder='%s'",
+        experiment_builder,
+    )
+    _WORKER_EXPERIMENT_FUNC = hintros.get_function_from_string(experiment_builder)
+    # Log at the same level as `run_experiment_stub.py -v INFO`.
+    logging.getLogger().setLevel(logging.INFO)
+
+
+def _run_experiment_in_worker(
+    config: cconfig.Config, log_file: str
+) -> Optional[str]:
+    """
+    Run the experiment for `config` in the current worker process.
+
+    The logging and the output of the experiment are redirected to `log_file`,
+    like for `run_experiment_stub.py`.
+
+    :return: `None` if the experiment succeeded, the traceback otherwise
+    """
+    hdbg.dassert_is_not(
+        _WORKER_EXPERIMENT_FUNC, None, "The worker is not initialized"
+    )
+    root_logger = logging.getLogger()
+    with open(log_file, "w") as fd:
+        file_handler = logging.StreamHandler(fd)
+        file_handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)-5s %(module)s:%(lineno)d %(message)s"
+            )
+        )
+        root_logger.addHandler(file_handler)
+        try:
+            with contextlib.redirect_stdout(fd), contextlib.redirect_stderr(fd):
+                _WORKER_EXPERIMENT_FUNC(config)  # type: ignore[misc]
+            error = None
+        except Exception:  # pylint: disable=broad-except
+            # Isolate the failure to this config, reporting it to the caller.
+            error = traceback.format_exc()
+            _LOG.error("Experiment failed:\n%s", error)
+        finally:
+            root_logger.removeHandler(file_handler)
+    return error
+
+
+def _get_worker_pool(
+    experiment_builder: str, num_workers: int
+) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Create a pool of worker processes running the `experiment_builder`.
+    """
+    hdbg.dassert_lte(1, num_workers)
+    # Start the workers from a fresh interpreter, since they are created on
+    # demand by the threads submitting the experiments and forking a
+    # multi-threaded process can deadlock.
+    mp_context = multiprocessing.get_context("spawn")
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(experiment_builder,),
+    )
+    return pool
+
+
+class _WorkerPool:
+    """
+    Pool of long-lived processes running many experiments each.
+
+    Each worker imports and resolves the `experiment_builder` once, and keeps
+    the data cached through `dtfmoexuti.get_cached_data()` across the
+    experiments it runs. If a worker process dies, the pool is restarted
+    and only the experiments running in the pool at that time fail.
+    """
+
+    def __init__(self, experiment_builder: str, num_workers: int) -> None:
+        self._experiment_builder = experiment_builder
+        self._num_workers = num_workers
+        self._pool = _get_worker_pool(experiment_builder, num_workers)
+
+    def run(self, config: cconfig.Config, log_file: str) -> Optional[str]:
+        """
+        Same as `_run_experiment_in_worker()` but in a worker process.
+        """
+        pool = self._pool
+        try:
+            error = pool.submit(
+                _run_experiment_in_worker, config, log_file
+            ).result()
+        except concurrent.futures.process.BrokenProcessPool as e:
+            error = f"Worker process died: {str(e)}"
+            _LOG.error(error)
+            # Replace the broken pool, unless another experiment already did.
+            if self._pool is pool:
+                self._pool = _get_worker_pool(
+                    self._experiment_builder, self._num_workers
+                )
+        return error
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+
+def _run_experiment_in_worker_pool(
+    config: cconfig.Config,
+    #
+    incremental: bool,
+    num_attempts: int,
+    *,
+    worker_pool: _WorkerPool,
+) -> int:
+    """
+    Run a pipeline for a specific `Config` in a worker of `worker_pool`.
+
+    Same interface and bookkeeping as `_run_experiment_stub()`.
+    """
+    hdbg.dassert_eq(1, num_attempts, "Multiple attempts not supported yet")
+    _ = incremental
+    #
+    idx, experiment_result_dir, log_file = _prepare_experiment(config)
+    error = worker_pool.run(config, log_file)
+    if error is not None:
+        # The experiment wasn't successful.
+        msg = f"Execution failed for experiment {idx}"
+        _LOG.error(msg)
+        raise RuntimeError(msg)
+    # Mark as success.
+    dtfmoexuti.mark_config_as_success(experiment_result_dir)
+    return 0
+
+
+def _get_joblib_workload(
+    args: argparse.Namespace, worker_pool: Optional[_WorkerPool] = None
+) -> hjoblib.Workload:
     """
     Prepare the joblib workload by building all the Configs using the
     parameters from command line.
+
+    :param worker_pool: pool running the experiments. If `None`, each
+        experiment runs in a separate `run_experiment_stub.py` process
     """
     # Get the configs to run.
     configs = dtfmoexuti.get_configs_from_command_line(args)
@@ -123,8 +299,17 @@ def _get_joblib_workload(args: argparse.Namespace) -> hjoblib.Workload:
         )
         tasks.append(task)
     #
-    func_name = "_run_experiment_stub"
-    workload = (_run_experiment_stub, func_name, tasks)
+    if worker_pool is None:
+        func_name = "_run_experiment_stub"
+        workload_func = _run_experiment_stub
+    else:
+        func_name = "_run_experiment_in_worker_pool"
+        workload_func = functools.partial(
+            _run_experiment_in_worker_pool, worker_pool=worker_pool
+        )
+        # `parallel_execute()` reports the name of the workload function.
+        functools.update_wrapper(workload_func, _run_experiment_in_worker_pool)
+    workload = (workload_func, func_name, tasks)
     hjoblib.validate_workload(workload)
     return workload
 
@@ -147,6 +332,12 @@ def _parse() -> argparse.ArgumentParser:
         required=True,
         help="File storing the pipeline to iterate over",
     )
+    parser.add_argument(
+        "--worker_pool",
+        action="store_true",
+        help="Run the experiments in long-lived worker processes (one per "
+        "thread) instead of one `run_experiment_stub.py` process per config",
+    )
     parser.add_argument(
         "--archive_on_S3",
         action="store_true",
@@ -170,11 +361,15 @@ def _main(parser: argparse.ArgumentParser) -> None:
     # Create the dst dir.
     dst_dir, clean_dst_dir = hparser.parse_dst_dir_arg(args)
     _ = clean_dst_dir
-    # Prepare the workload.
-    workload = _get_joblib_workload(args)
     # Parse command-line options.
     dry_run = args.dry_run
     num_threads = args.num_threads
+    worker_pool = None
+    if args.worker_pool and not dry_run:
+        num_workers = hjoblib.get_num_executing_threads(num_threads)
+        worker_pool = _WorkerPool(args.experiment_builder, num_workers)
+    # Prepare the workload.
+    workload = _get_joblib_workload(args, worker_pool)
     incremental = not args.no_incremental
     abort_on_error = not args.skip_on_error
     num_attempts = args.num_attempts
@@ -187,16 +382,20 @@ def _main(parser: argparse.ArgumentParser) -> None:
     # TODO(gp): Is this the correct backend? It might not matter since we spawn
     # a process with system.
     backend = "asyncio_threading"
-    hjoblib.parallel_execute(
-        workload,
-        dry_run,
-        num_threads,
-        incremental,
-        abort_on_error,
-        num_attempts,
-        log_file,
-        backend=backend,
-    )
+    try:
+        hjoblib.parallel_execute(
+            workload,
+            dry_run,
+            num_threads,
+            incremental,
+            abort_on_error,
+            num_attempts,
+            log_file,
+            backend=backend,
+        )
+    finally:
+        if worker_pool is not None:
+            worker_pool.shutdown()
     #
     _LOG.info("dst_dir='%s'", dst_dir)
     _LOG.info("log_file='%s'", log_file)
@@ -5,16 +5,21 @@ import dataflow.model.stats_computer as dtfmostcom
 """
 
 import collections
+import concurrent.futures
 import functools
 import logging
-from typing import Callable, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
+import scipy as sp
 
 import core.finance as cofinanc
 import core.statistics as costatis
 import dataflow.core as dtfcore
+import helpers.hdataframe as hdatafr
 import helpers.hdbg as hdbg
+import helpers.hpandas as hpandas
 import helpers.htimer as htimer
 
 _LOG = logging.getLogger(__name__)
@@ -59,15 +64,52 @@ class StatsComputer:
         result.name = srs.name
         return result
 
-    def compute_sampling_stats(self, srs: pd.Series) -> pd.Series:
+    def compute_time_series_stats_batch(
+        self, df: pd.DataFrame, *, num_workers: int = 1
+    ) -> pd.DataFrame:
+        """
+        Compute `compute_time_series_stats()` for each column of `df`.
+
+        The stats are computed for all the columns at once, instead of one
+        series at a time:
+        - the moments of each column (mean, std, skew, kurtosis) are computed
+          once and shared by the ratios, summary and normality stats
+        - the cheap stats (e.g., Sharpe ratio, K-ratio, quantiles,
+          forecastability) are vectorized across columns
+        - the stationarity tests are run on `num_workers` processes
+
+        Columns with infs, with less than `_MIN_NUM_VALUES_BATCH` values or
+        with constant values are processed by `compute_time_series_stats()`.
+        The results are the same as `compute_time_series_stats()` up to
+        rounding errors.
+
+        :param df: dataframe with a `DatetimeIndex` with a `freq` and one
+            series per column
+        :param num_workers: number of processes running the stationarity
+            tests
+        :return: dataframe with the stats of each column of `df`
+        """
+        _dassert_batch_df(df)
+        hdbg.dassert_lte(1, num_workers)
+        compute_batch = functools.partial(
+            self._compute_time_series_stats_batch, num_workers=num_workers
+        )
+        result = _apply_batch(df, compute_batch, self.compute_time_series_stats)
+        return result
+
+    def compute_sampling_stats(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "sampling"
         functions = [
             costatis.summarize_time_index_info,
             costatis.compute_special_value_stats,
         ]
-        return self._compute_stat_functions(srs, name, functions)
+        return self._compute_stat_functions(data, name, functions)
 
-    def compute_summary_stats(self, srs: pd.Series) -> pd.Series:
+    def compute_summary_stats(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "summary"
         # TODO(*): Add
         #   - var and std assuming zero mean
@@ -80,9 +122,11 @@ class StatsComputer:
             costatis.compute_jensen_ratio,
             lambda x: x.describe(),
         ]
-        return self._compute_stat_functions(srs, name, functions)
+        return self._compute_stat_functions(data, name, functions)
 
-    def compute_stationarity_stats(self, srs: pd.Series) -> pd.Series:
+    def compute_stationarity_stats(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "stationarity"
         # Restrict the number of lags because
         #   1. On long time series, auto-selection is time-consuming
@@ -96,9 +140,11 @@ class StatsComputer:
                 costatis.apply_kpss_test, nlags=lags, prefix="kpss."
             ),
         ]
-        return self._compute_stat_functions(srs, name, functions)
+        return self._compute_stat_functions(data, name, functions)
 
-    def compute_normality_stats(self, srs: pd.Series) -> pd.Series:
+    def compute_normality_stats(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "normality"
         functions = [
             functools.partial(
@@ -110,24 +156,31 @@ class StatsComputer:
             ),
         ]
         # TODO(*): costatis.compute_centered_gaussian_log_likelihood
-        return self._compute_stat_functions(srs, name, functions)
+        return self._compute_stat_functions(data, name, functions)
 
-    def compute_spectral_stats(self, srs: pd.Series) -> pd.Series:
+    def compute_spectral_stats(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "spectral"
         functions = [
             costatis.compute_forecastability,
         ]
-        return self._compute_stat_functions(srs, name, functions)
+        return self._compute_stat_functions(data, name, functions)
 
-    def compute_ratios(self, srs: pd.Series) -> pd.Series:
+    def compute_ratios(
+        self, data: Union[pd.Series, pd.DataFrame]
+    ) -> Union[pd.Series, pd.DataFrame]:
         name = "ratios"
         functions = [
             costatis.summarize_sharpe_ratio,
             functools.partial(costatis.ttest_1samp, prefix="sr."),
         ]
-        result = self._compute_stat_functions(srs, name, functions)
-        kratio = pd.Series(costatis.compute_kratio(srs), index=["kratio"])
-        kratio.name = name
+        result = self._compute_stat_functions(data, name, functions)
+        if isinstance(data, pd.DataFrame):
+            kratio = data.apply(costatis.compute_kratio).to_frame("kratio").T
+        else:
+            kratio = pd.Series(costatis.compute_kratio(data), index=["kratio"])
+            kratio.name = name
         return pd.concat([result, kratio])
 
     def compute_portfolio_stats(
@@ -180,6 +233,92 @@ class StatsComputer:
         )
         return stats_df, resampled_df
 
+    def compute_portfolio_stats_batch(
+        self,
+        df: pd.DataFrame,
+        freq: str,
+        *,
+        pnl_col: str = "pnl",
+        gross_volume_col: str = "gross_volume",
+        net_volume_col: str = "net_volume",
+        gmv_col: str = "gmv",
+        nmv_col: str = "nmv",
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Compute `compute_portfolio_stats()` for each portfolio of `df`.
+
+        The stats are computed for all the portfolios at once, on one
+        dataframe per metric with one portfolio per column. The results are
+        the same as `compute_portfolio_stats()` up to rounding errors.
+
+        :param df: dataframe with the portfolio names as the outermost column
+            level
+        """
+        hdbg.dassert_isinstance(df, pd.DataFrame)
+        hdbg.dassert_eq(df.columns.nlevels, 2)
+        hdbg.dassert_is_subset(
+            [pnl_col, gross_volume_col, net_volume_col, gmv_col, nmv_col],
+            df.columns.levels[1].to_list(),
+        )
+        resampled_df = cofinanc.resample_portfolio_bar_metrics(
+            df,
+            freq,
+            pnl_col=pnl_col,
+            gross_volume_col=gross_volume_col,
+            net_volume_col=net_volume_col,
+            gmv_col=gmv_col,
+            nmv_col=nmv_col,
+        )
+        # Get a dataframe with one portfolio per column for each metric.
+        pnl = resampled_df.xs("pnl", axis=1, level=1)
+        gross_volume = resampled_df.xs("gross_volume", axis=1, level=1)
+        gmv = resampled_df.xs("gmv", axis=1, level=1)
+        nmv = resampled_df.xs("nmv", axis=1, level=1)
+        results = []
+        # Add Sharpe ratio, K-ratio.
+        ratios = self._compute_ratios_batch(pnl)
+        ratios = ratios.round(2)
+        results.append(pd.concat([ratios], keys=["ratios"]))
+        # Add GMV stats.
+        gmv_stats = pd.DataFrame(
+            {
+                "gmv_mean": gmv.mean(),
+                "gmv_stdev": gmv.std(),
+            },
+        ).T
+        results.append(pd.concat([gmv_stats], keys=["dollar"]))
+        # Add dollar return, volatility, drawdown.
+        stats = pd.concat(
+            [
+                _compute_annualized_return_and_volatility_batch(pnl),
+                _compute_max_drawdown_batch(pnl),
+            ]
+        )
+        results.append(pd.concat([stats], keys=["dollar"]))
+        # Add dollar turnover, bias.
+        dollar_turnover_and_bias = _compute_turnover_and_bias_batch(
+            gross_volume, nmv
+        )
+        results.append(pd.concat([dollar_turnover_and_bias], keys=["dollar"]))
+        # Add percentage return, volatility, drawdown.
+        pnl = pnl / gmv
+        stats = 100 * pd.concat(
+            [
+                _compute_annualized_return_and_volatility_batch(pnl),
+                _compute_max_drawdown_batch(pnl),
+            ]
+        )
+        results.append(pd.concat([stats], keys=["percentage"]))
+        # Add percentage turnover, bias.
+        percentage_turnover_and_bias = 100 * _compute_turnover_and_bias_batch(
+            gross_volume / gmv, nmv / gmv
+        )
+        results.append(
+            pd.concat([percentage_turnover_and_bias], keys=["percentage"])
+        )
+        stats_df = pd.concat(results, axis=0).astype("float").round(2)
+        return stats_df, resampled_df
+
     def compute_per_asset_stats(
         self,
         df: pd.DataFrame,
@@ -195,15 +334,8 @@ class StatsComputer:
 
         :param df: multiindexed dataframe
         """
-        dfs = dtfcore.GroupedColDfToDfColProcessor.preprocess(
-            df,
-            [
-                (returns_col,),
-                (volatility_col,),
-                (prediction_col,),
-                (position_col,),
-                (pnl_col,),
-            ],
+        dfs = self._get_asset_dfs(
+            df, [returns_col, volatility_col, prediction_col, position_col, pnl_col]
         )
         stats = []
         for key, value in dfs.items():
@@ -219,6 +351,53 @@ class StatsComputer:
             stats.append(stat)
         return pd.concat(stats, axis=1)
 
+    def compute_per_asset_stats_batch(
+        self,
+        df: pd.DataFrame,
+        *,
+        returns_col: Optional[str] = None,
+        volatility_col: Optional[str] = None,
+        prediction_col: Optional[str] = None,
+        position_col: Optional[str] = None,
+        pnl_col: Optional[str] = None,
+        num_workers: int = 1,
+    ) -> pd.DataFrame:
+        """
+        Compute `compute_per_asset_stats()` batching the assets.
+
+        The PnL stats of all the assets are computed at once, as in
+        `compute_time_series_stats_batch()`.
+
+        :param df: multiindexed dataframe
+        :param num_workers: number of processes running the stationarity
+            tests
+        """
+        dfs = self._get_asset_dfs(
+            df, [returns_col, volatility_col, prediction_col, position_col, pnl_col]
+        )
+        pnl_stats = None
+        if pnl_col is not None:
+            pnl = pd.concat(
+                [cofinanc.maybe_resample(value[pnl_col]) for value in dfs.values()],
+                axis=1,
+                keys=dfs.keys(),
+            )
+            pnl_stats = self._compute_pnl_stats_batch(pnl, num_workers)
+        stats = []
+        for key, value in dfs.items():
+            stat = self._compute_finance_stats(
+                value,
+                returns_col=returns_col,
+                volatility_col=volatility_col,
+                prediction_col=prediction_col,
+                position_col=position_col,
+                pnl_col=pnl_col,
+                pnl_stats=None if pnl_stats is None else pnl_stats[key],
+            )
+            stat.name = key
+            stats.append(stat)
+        return pd.concat(stats, axis=1)
+
     # TODO(Paul): rename `compute_stats()`.
     def compute_finance_stats(
         self,
@@ -244,83 +423,15 @@ class StatsComputer:
             realized at the next timestamp
         :param pnl_col: PnL realized at indexed timestamp
         """
-        hdbg.dassert(not isinstance(df.columns, pd.MultiIndex))
-        results = []
-        # Compute stats related to positions.
-        if position_col is not None:
-            position_stats = self._compute_position_stats(df[position_col])
-            results.append(position_stats)
-        # Compute stats related to PnL.
-        if pnl_col is not None:
-            pnl_stats = self._compute_pnl_stats(df[pnl_col])
-            results.append(pnl_stats)
-        # Currently we do not calculate individual prediction/returns stats.
-        if (
-            returns_col is not None
-            and volatility_col is not None
-            and prediction_col is not None
-        ):
-            name = "pnl"
-            returns = df[returns_col]
-            predictions = df[prediction_col].divide(df[volatility_col]).shift(2)
-            #
-            prediction_corr = predictions.corr(returns)
-            corr = pd.Series(
-                prediction_corr, index=["prediction_corr"], name=name
-            )
-            results.append(pd.concat([corr], keys=["correlation"]))
-            #
-            srs = pd.Series(
-                costatis.compute_implied_sharpe_ratio(
-                    predictions, prediction_corr
-                ),
-                index=["sr_implied_by_prediction_corr"],
-                name=name,
-            )
-            results.append(pd.concat([srs], keys=["ratios"]))
-            #
-            j_ratio = costatis.compute_jensen_ratio(returns)["jensen_ratio"]
-            hit_rate = pd.Series(
-                costatis.compute_hit_rate_implied_by_correlation(
-                    prediction_corr, j_ratio
-                ),
-                index=["hit_rate_implied_by_prediction_corr"],
-                name=name,
-            )
-            results.append(pd.concat([hit_rate], keys=["finance"]))
-            #
-            hit_rate = costatis.calculate_hit_rate(returns * predictions)
-            hit_rate = hit_rate["hit_rate_point_est_(%)"] / 100
-            corr2 = pd.Series(
-                costatis.compute_correlation_implied_by_hit_rate(
-                    hit_rate, j_ratio
-                ),
-                index=["prediction_corr_implied_by_hit_rate"],
-                name=name,
-            )
-            results.append(pd.concat([corr2], keys=["correlation"]))
-        if returns_col is not None and position_col is not None:
-            returns = df[returns_col]
-            positions = df[position_col].shift(1)
-            #
-            name = "pnl"
-            bets = costatis.compute_bet_stats(positions, returns)
-            bets.name = name
-            results.append(pd.concat([bets], keys=["bets"]))
-        if returns_col is not None and pnl_col is not None:
-            returns = df[returns_col]
-            pnl = df[pnl_col]
-            #
-            corr = pd.Series(
-                pnl.corr(returns), index=["pnl_corr_to_underlying"], name=name
-            )
-            results.append(pd.concat([corr], keys=["correlation"]))
-        # No predictions and positions calculations yet.
-        # No predictions and PnL calculations yet.
-        # No positions and PnL calculations yet.
-        result = pd.concat(results, axis=0)
-        hdbg.dassert_isinstance(result, pd.Series)
-        return result
+        return self._compute_finance_stats(
+            df,
+            returns_col=returns_col,
+            volatility_col=volatility_col,
+            prediction_col=prediction_col,
+            position_col=position_col,
+            pnl_col=pnl_col,
+            pnl_stats=None,
+        )
 
     # TODO(Paul): Make this a decorator.
     @staticmethod
@@ -341,13 +452,20 @@ class StatsComputer:
 
     @staticmethod
     def _compute_stat_functions(
-        srs: pd.Series,
+        srs: Union[pd.Series, pd.DataFrame],
         name: str,
         functions: List[Callable],
-    ) -> pd.Series:
+    ) -> Union[pd.Series, pd.DataFrame]:
         """
-        Apply a list of functions to a series.
+        Apply a list of functions to a series or to each column of a
+        dataframe.
         """
+        if isinstance(srs, pd.DataFrame):
+            # Apply each function to all the columns and concat the results
+            # once.
+            stats = [srs.apply(function) for function in functions]
+            df_out = pd.concat(stats)
+            return df_out
         hdbg.dassert_isinstance(srs, pd.Series)
         # Apply the functions.
         stats = [function(srs).rename(name) for function in functions]
@@ -436,6 +554,217 @@ class StatsComputer:
         hdbg.dassert_isinstance(result, pd.Series)
         return result, df
 
+    def _compute_finance_stats(
+        self,
+        df: pd.DataFrame,
+        *,
+        returns_col: Optional[str],
+        volatility_col: Optional[str],
+        prediction_col: Optional[str],
+        position_col: Optional[str],
+        pnl_col: Optional[str],
+        pnl_stats: Optional[pd.Series],
+    ) -> pd.Series:
+        """
+        Compute `compute_finance_stats()`.
+
+        :param pnl_stats: `_compute_pnl_stats()` of the PnL, if already
+            computed
+        """
+        hdbg.dassert(not isinstance(df.columns, pd.MultiIndex))
+        results = []
+        # Compute stats related to positions.
+        if position_col is not None:
+            position_stats = self._compute_position_stats(df[position_col])
+            results.append(position_stats)
+        # Compute stats related to PnL.
+        if pnl_col is not None:
+            if pnl_stats is None:
+                pnl_stats = self._compute_pnl_stats(df[pnl_col])
+            results.append(pnl_stats)
+        # Currently we do not calculate individual prediction/returns stats.
+        if (
+            returns_col is not None
+            and volatility_col is not None
+            and prediction_col is not None
+        ):
+            name = "pnl"
+            returns = df[returns_col]
+            predictions = df[prediction_col].divide(df[volatility_col]).shift(2)
+            #
+            prediction_corr = predictions.corr(returns)
+            corr = pd.Series(
+                prediction_corr, index=["prediction_corr"], name=name
+            )
+            results.append(pd.concat([corr], keys=["correlation"]))
+            #
+            srs = pd.Series(
+                costatis.compute_implied_sharpe_ratio(
+                    predictions, prediction_corr
+                ),
+                index=["sr_implied_by_prediction_corr"],
+                name=name,
+            )
+            results.append(pd.concat([srs], keys=["ratios"]))
+            #
+            j_ratio = costatis.compute_jensen_ratio(returns)["jensen_ratio"]
+            hit_rate = pd.Series(
+                costatis.compute_hit_rate_implied_by_correlation(
+                    prediction_corr, j_ratio
+                ),
+                index=["hit_rate_implied_by_prediction_corr"],
+                name=name,
+            )
+            results.append(pd.concat([hit_rate], keys=["finance"]))
+            #
+            hit_rate = costatis.calculate_hit_rate(returns * predictions)
+            hit_rate = hit_rate["hit_rate_point_est_(%)"] / 100
+            corr2 = pd.Series(
+                costatis.compute_correlation_implied_by_hit_rate(
+                    hit_rate, j_ratio
+                ),
+                index=["prediction_corr_implied_by_hit_rate"],
+                name=name,
+            )
+            results.append(pd.concat([corr2], keys=["correlation"]))
+        if returns_col is not None and position_col is not None:
+            returns = df[returns_col]
+            positions = df[position_col].shift(1)
+            #
+            name = "pnl"
+            bets = costatis.compute_bet_stats(positions, returns)
+            bets.name = name
+            results.append(pd.concat([bets], keys=["bets"]))
+        if returns_col is not None and pnl_col is not None:
+            returns = df[returns_col]
+            pnl = df[pnl_col]
+            #
+            corr = pd.Series(
+                pnl.corr(returns), index=["pnl_corr_to_underlying"], name=name
+            )
+            results.append(pd.concat([corr], keys=["correlation"]))
+        # No predictions and positions calculations yet.
+        # No predictions and PnL calculations yet.
+        # No positions and PnL calculations yet.
+        result = pd.concat(results, axis=0)
+        hdbg.dassert_isinstance(result, pd.Series)
+        return result
+
+    @staticmethod
+    def _get_asset_dfs(
+        df: pd.DataFrame, cols: List[Optional[str]]
+    ) -> Dict[Any, pd.DataFrame]:
+        """
+        Split a multiindexed dataframe into one dataframe per asset.
+        """
+        dfs = dtfcore.GroupedColDfToDfColProcessor.preprocess(
+            df, [(col,) for col in cols]
+        )
+        return dfs
+
+    def _compute_stationarity_stats_batch(
+        self, df: pd.DataFrame, num_workers: int
+    ) -> pd.DataFrame:
+        """
+        Compute `compute_stationarity_stats()` for each column of `df` on
+        `num_workers` processes.
+        """
+        if num_workers == 1:
+            return self.compute_stationarity_stats(df)
+        srs_list = [df[column] for column in df.columns]
+        chunksize = max(1, len(srs_list) // (4 * num_workers))
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+            stats = list(
+                executor.map(
+                    self.compute_stationarity_stats, srs_list, chunksize=chunksize
+                )
+            )
+        return pd.concat(stats, axis=1, keys=df.columns)
+
+    def _compute_time_series_stats_batch(
+        self, df: pd.DataFrame, *, num_workers: int
+    ) -> pd.DataFrame:
+        """
+        Compute `compute_time_series_stats()` for columns that can be
+        processed in batch.
+        """
+        values = _to_values(df)
+        points_per_year = hdatafr.infer_sampling_points_per_year(df)
+        moments = _compute_moments(values)
+        # List of pd.DataFrame each with various metrics.
+        stats = []
+        with htimer.TimedScope(logging.DEBUG, "Computing ratios"):
+            ratios = _compute_ratios(values, moments, points_per_year)
+            stats.append(_to_df(ratios, df.columns))
+        with htimer.TimedScope(logging.DEBUG, "Computing samplings stats"):
+            stats.append(self.compute_sampling_stats(df))
+        with htimer.TimedScope(logging.DEBUG, "Computing summary stats"):
+            summary = _compute_summary_stats(values, moments)
+            stats.append(_to_df(summary, df.columns))
+        with htimer.TimedScope(logging.DEBUG, "Computing stationarity stats"):
+            stats.append(self._compute_stationarity_stats_batch(df, num_workers))
+        with htimer.TimedScope(logging.DEBUG, "Computing normality stats"):
+            normality = _compute_normality_stats(moments)
+            stats.append(_to_df(normality, df.columns))
+        with htimer.TimedScope(logging.DEBUG, "Computing spectral stats"):
+            spectral = _compute_spectral_stats(values)
+            stats.append(_to_df(spectral, df.columns))
+        names = [
+            "ratios",
+            "sampling",
+            "summary",
+            "stationarity",
+            "normality",
+            "spectral",
+        ]
+        result = pd.concat(stats, axis=0, keys=names)
+        return result
+
+    def _compute_ratios_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute `compute_ratios()` for each column of `df`.
+        """
+        _dassert_batch_df(df)
+
+        def _compute_batch(df: pd.DataFrame) -> pd.DataFrame:
+            values = _to_values(df)
+            points_per_year = hdatafr.infer_sampling_points_per_year(df)
+            moments = _compute_moments(values)
+            ratios = _compute_ratios(values, moments, points_per_year)
+            return _to_df(ratios, df.columns)
+
+        result = _apply_batch(df, _compute_batch, self.compute_ratios)
+        return result
+
+    def _compute_pnl_stats_batch(
+        self, df: pd.DataFrame, num_workers: int
+    ) -> pd.DataFrame:
+        """
+        Compute `_compute_pnl_stats()` for each column of `df`.
+
+        :param df: dataframe with one resampled PnL stream per column
+        :param num_workers: number of processes running the stationarity
+            tests
+        """
+        results = []
+        results.append(
+            self.compute_time_series_stats_batch(df, num_workers=num_workers)
+        )
+        #
+        stats = pd.concat(
+            [
+                _compute_annualized_return_and_volatility_batch(df),
+                _compute_max_drawdown_batch(df),
+                df.apply(costatis.calculate_hit_rate),
+            ]
+        )
+        results.append(pd.concat([stats], keys=["portfolio"]))
+        #
+        corr = df.apply(costatis.compute_implied_correlation)
+        corr = corr.to_frame("prediction_corr_implied_by_pnl").T
+        results.append(pd.concat([corr], keys=["correlation"]))
+        return pd.concat(results, axis=0)
+
     def _compute_pnl_stats(self, srs: pd.Series) -> pd.Series:
         """
         Compute stats for a PnL stream.
@@ -475,3 +804,333 @@ class StatsComputer:
         _LOG.info("stats=\n%s", stats)
         results.append(pd.concat([stats], keys=["portfolio"]))
         return pd.concat(results, axis=0)
+
+
+# #############################################################################
+# Batch stats
+# #############################################################################
+
+
+# Min number of non-NaN values of the columns processed in batch, so that all
+# the tests are well-defined.
+_MIN_NUM_VALUES_BATCH = 20
+
+
+def _dassert_batch_df(df: pd.DataFrame) -> None:
+    hdbg.dassert_isinstance(df, pd.DataFrame)
+    hdbg.dassert_isinstance(df.index, pd.DatetimeIndex)
+    hpandas.dassert_strictly_increasing_index(df.index)
+    # The annualized stats require a `freq`.
+    hdbg.dassert(df.index.freq, "`df` must have an index with a `freq`")
+    hdbg.dassert_no_duplicates(df.columns.to_list())
+
+
+def _is_batch_column(values: np.ndarray) -> np.ndarray:
+    """
+    Return whether each column of `values` can be processed in batch.
+    """
+    with np.errstate(invalid="ignore"):
+        has_infs = np.isinf(values).any(axis=0)
+        num_values = (~np.isnan(values)).sum(axis=0)
+        is_batch = ~has_infs & (num_values >= _MIN_NUM_VALUES_BATCH)
+        if values.shape[0] > 0:
+            # Exclude constant columns.
+            is_batch &= ~(
+                np.nanmax(values, axis=0, initial=-np.inf)
+                == np.nanmin(values, axis=0, initial=np.inf)
+            )
+    return is_batch
+
+
+def _apply_batch(
+    df: pd.DataFrame,
+    compute_batch: Callable[[pd.DataFrame], pd.DataFrame],
+    compute_series: Callable[[pd.Series], pd.Series],
+) -> pd.DataFrame:
+    """
+    Compute stats with `compute_batch()` for the columns of `df` that can be
+    processed in batch and with `compute_series()` for the other ones.
+    """
+    is_batch = _is_batch_column(df.to_numpy(dtype=float))
+    _LOG.debug(
+        "Computing stats of %s / %s columns in batch",
+        is_batch.sum(),
+        len(df.columns),
+    )
+    results = []
+    if is_batch.any():
+        results.append(compute_batch(df.loc[:, is_batch]))
+    for column in df.columns[~is_batch]:
+        results.append(compute_series(df[column]).to_frame())
+    result = pd.concat(results, axis=1)
+    result = result[df.columns]
+    return result
+
+
+def _to_values(df: pd.DataFrame) -> np.ndarray:
+    """
+    Return the values of `df` as a Fortran-ordered array.
+
+    Each column is contiguous, so that the reductions sum the values of each
+    column in the same order as for a single series.
+    """
+    return np.asfortranarray(df.to_numpy(dtype=float))
+
+
+def _fill_nans_with_zero(values: np.ndarray) -> np.ndarray:
+    """
+    Apply `nan_mode="fill_with_zero"` to each column of `values`.
+    """
+    filled_values = values.copy(order="F")
+    filled_values[np.isnan(filled_values)] = 0.0
+    return filled_values
+
+
+def _to_df(stats: Dict[str, np.ndarray], columns: pd.Index) -> pd.DataFrame:
+    """
+    Convert stats indexed by name to a dataframe with a column per series.
+    """
+    df = pd.DataFrame(stats, index=columns).T
+    return df
+
+
+def _compute_moments(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute the moments of the non-NaN values of each column of `values`.
+
+    The moments are shared by the ratios, summary and normality stats.
+
+    :return: stats indexed by name:
+        - count of non-NaN values
+        - mean, sample std, skew and excess kurtosis, as in
+          `costatis.compute_moments()`
+        - t-value and p-value of the null mean, as in `costatis.ttest_1samp()`
+        - L1 norm and sum of squares
+    """
+    is_nan = np.isnan(values)
+    count = (~is_nan).sum(axis=0)
+    filled_values = _fill_nans_with_zero(values)
+    mean = filled_values.sum(axis=0) / count
+    demeaned = _fill_nans_with_zero(values - mean)
+    squared_demeaned = np.square(demeaned)
+    m2 = squared_demeaned.sum(axis=0) / count
+    m3 = (squared_demeaned * demeaned).sum(axis=0) / count
+    m4 = np.square(squared_demeaned).sum(axis=0) / count
+    std = np.sqrt(m2 * count / (count - 1))
+    tval = mean / std * np.sqrt(count)
+    moments = {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "skew": m3 / m2**1.5,
+        "kurtosis": m4 / m2**2 - 3,
+        "tval": tval,
+        "pval": 2 * sp.stats.t.sf(np.abs(tval), count - 1),
+        "l1_norm": np.abs(filled_values).sum(axis=0),
+        "sum_of_squares": np.square(filled_values).sum(axis=0),
+    }
+    return moments
+
+
+def _compute_ratios(
+    values: np.ndarray, moments: Dict[str, np.ndarray], points_per_year: float
+) -> Dict[str, np.ndarray]:
+    """
+    Compute `StatsComputer.compute_ratios()` for each column of `values`.
+    """
+    num_rows = values.shape[0]
+    # The Sharpe ratio and the K-ratio fill the NaNs with zeros.
+    filled_values = _fill_nans_with_zero(values)
+    sr = filled_values.mean(axis=0) / filled_values.std(axis=0, ddof=1)
+    ratios = {
+        "sharpe_ratio": sr * np.sqrt(points_per_year),
+        "sharpe_ratio_standard_error": np.sqrt(points_per_year)
+        * np.sqrt((1 + sr**2 / 2) / (num_rows - 1)),
+        "sr.tval": moments["tval"],
+        "sr.pval": moments["pval"],
+        "kratio": _compute_kratio(filled_values, points_per_year),
+    }
+    return ratios
+
+
+def _compute_kratio(values: np.ndarray, points_per_year: float) -> np.ndarray:
+    """
+    Compute `costatis.compute_kratio()` for each column of NaN-filled `values`.
+
+    The slope of the cumulative PnL and its standard error are computed in
+    closed form, instead of with an OLS regression for each column.
+    """
+    num_rows = values.shape[0]
+    cum_values = values.cumsum(axis=0)
+    x = np.arange(num_rows, dtype=float)
+    x_demeaned = x - x.mean()
+    y_demeaned = cum_values - cum_values.mean(axis=0)
+    s_xx = np.square(x_demeaned).sum()
+    slope = x_demeaned @ y_demeaned / s_xx
+    residuals = y_demeaned - np.outer(x_demeaned, slope)
+    slope_se = np.sqrt(np.square(residuals).sum(axis=0) / (num_rows - 2) / s_xx)
+    kratio = slope / slope_se * np.sqrt(points_per_year) / num_rows
+    return kratio
+
+
+def _compute_summary_stats(
+    values: np.ndarray, moments: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Compute `StatsComputer.compute_summary_stats()` for each column of
+    `values`.
+    """
+    count = moments["count"]
+    # Sort each column, moving the NaNs to the end, to compute the quantiles
+    # of the non-NaN values, as in `pd.Series.describe()`.
+    sorted_values = np.sort(values, axis=0)
+    columns = np.arange(values.shape[1])
+    quantiles = {}
+    for quantile in [0.25, 0.5, 0.75]:
+        # Interpolate linearly between the closest values.
+        position = quantile * (count - 1)
+        lower = sorted_values[np.floor(position).astype(int), columns]
+        upper = sorted_values[np.ceil(position).astype(int), columns]
+        quantiles[quantile] = lower + (upper - lower) * (position % 1)
+    summary = {
+        "scipy.mean": moments["mean"],
+        "scipy.std": moments["std"],
+        "scipy.skew": moments["skew"],
+        "scipy.kurtosis": moments["kurtosis"],
+        "null_mean_zero.tval": moments["tval"],
+        "null_mean_zero.pval": moments["pval"],
+        "jensen_ratio": moments["l1_norm"]
+        / (np.sqrt(count) * np.sqrt(moments["sum_of_squares"])),
+        "count": count.astype(float),
+        "mean": moments["mean"],
+        "std": moments["std"],
+        "min": sorted_values[0],
+        "25%": quantiles[0.25],
+        "50%": quantiles[0.5],
+        "75%": quantiles[0.75],
+        "max": sorted_values[count - 1, columns],
+    }
+    return summary
+
+
+def _compute_normality_stats(
+    moments: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Compute `StatsComputer.compute_normality_stats()` from the output of
+    `_compute_moments()`.
+
+    The omnibus test of normality is computed from the skew and kurtosis, as
+    in `sp.stats.normaltest()`.
+    """
+    n = moments["count"].astype(float)
+    # Compute the z-score of the skew, as in `sp.stats.skewtest()`.
+    y = moments["skew"] * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+    beta2 = (
+        3.0
+        * (n**2 + 27 * n - 70)
+        * (n + 1)
+        * (n + 3)
+        / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+    )
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = np.where(y == 0, 1, y)
+    skew_z = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+    # Compute the z-score of the kurtosis, as in `sp.stats.kurtosistest()`.
+    b2 = moments["kurtosis"] + 3
+    e = 3.0 * (n - 1) / (n + 1)
+    varb2 = (
+        24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    )
+    x = (b2 - e) / np.sqrt(varb2)
+    sqrtbeta1 = (
+        6.0
+        * (n * n - 5 * n + 2)
+        / ((n + 7) * (n + 9))
+        * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+    )
+    a = 6.0 + 8.0 / sqrtbeta1 * (
+        2.0 / sqrtbeta1 + np.sqrt(1 + 4.0 / (sqrtbeta1**2))
+    )
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        term2 = np.sign(denom) * np.where(
+            denom == 0.0, np.nan, np.power((1 - 2.0 / a) / np.abs(denom), 1 / 3.0)
+        )
+    kurtosis_z = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+    stat = skew_z**2 + kurtosis_z**2
+    # Compute the log likelihood of a centered Gaussian, as in
+    # `costatis.compute_centered_gaussian_total_log_likelihood()`.
+    sum_of_squares = moments["sum_of_squares"]
+    centered_var = sum_of_squares / n
+    log_likelihood = -0.5 * np.log(2 * np.pi) * n - 0.5 * (
+        n * np.log(centered_var) + sum_of_squares / centered_var
+    )
+    normality = {
+        "omnibus_null_normal.stat": stat,
+        "omnibus_null_normal.pval": sp.stats.chi2.sf(stat, 2),
+        "centered_gaussian.log_likelihood": log_likelihood,
+        "centered_gaussian.centered_var": centered_var,
+    }
+    return normality
+
+
+def _compute_spectral_stats(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute `StatsComputer.compute_spectral_stats()` for each column of
+    `values`.
+    """
+    filled_values = _fill_nans_with_zero(values)
+    _, psd = sp.signal.welch(filled_values, axis=0)
+    forecastability = 1 - sp.stats.entropy(psd, base=psd.shape[0], axis=0)
+    spectral = {"forecastability": forecastability}
+    return spectral
+
+
+def _compute_annualized_return_and_volatility_batch(
+    df: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Compute `costatis.compute_annualized_return_and_volatility()` for each
+    column of `df`.
+    """
+    points_per_year = hdatafr.infer_sampling_points_per_year(df)
+    values = _fill_nans_with_zero(_to_values(df))
+    stats = {
+        "annualized_mean_return": points_per_year * values.mean(axis=0),
+        "annualized_volatility": np.sqrt(points_per_year)
+        * values.std(axis=0, ddof=1),
+    }
+    return _to_df(stats, df.columns)
+
+
+def _compute_max_drawdown_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute `costatis.compute_max_drawdown()` for each column of `df`.
+    """
+    values = _fill_nans_with_zero(_to_values(df))
+    cum_values = values.cumsum(axis=0)
+    drawdown = np.maximum.accumulate(cum_values, axis=0) - cum_values
+    stats = {"max_drawdown": drawdown.max(axis=0)}
+    return _to_df(stats, df.columns)
+
+
+def _compute_turnover_and_bias_batch(
+    volume: pd.DataFrame, bias: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Compute `costatis.compute_turnover_and_bias()` for each column of the
+    inputs.
+    """
+    hdbg.dassert_lte(0, volume.min().min())
+    hdbg.dassert(volume.index.equals(bias.index))
+    stats = {
+        "turnover_mean": volume.mean(),
+        "turnover_stdev": volume.std(),
+        "market_bias_mean": bias.mean(),
+        "market_bias_stdev": bias.std(),
+    }
+    return pd.DataFrame(stats).T
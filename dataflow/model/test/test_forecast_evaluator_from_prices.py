@@ -4,10 +4,12 @@ from typing import List
 
 import numpy as np
 import pandas as pd
+import pytest
 
 import core.finance_data_example as cfidaexa
 import dataflow.model.forecast_evaluator_from_prices as dtfmfefrpr
 import helpers.hpandas as hpandas
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
 _LOG = logging.getLogger(__name__)
@@ -280,3 +282,139 @@ class TestForecastEvaluatorFromPrices1(hunitest.TestCase):
 2022-01-03 09:55:00-05:00    -278.06      9.64e+05  -200690.59  1.00e+06 -236802.17
 2022-01-03 10:00:00-05:00    1385.12      1.21e+05  -120770.11  9.98e+05 -356187.17"""
         self.assert_equal(stats_df_str, expected_stats_df_str, fuzzy_match=True)
+
+
+class TestForecastEvaluatorFromPrices2(hunitest.TestCase):
+    """
+    Check that `compute_portfolio_grid()` matches `compute_portfolio()`.
+    """
+
+    @staticmethod
+    def get_data(
+        end_datetime: pd.Timestamp, asset_ids: List[int]
+    ) -> pd.DataFrame:
+        start_datetime = pd.Timestamp(
+            "2022-01-03 09:30:00", tz="America/New_York"
+        )
+        df = cfidaexa.get_forecast_price_based_dataframe(
+            start_datetime, end_datetime, asset_ids, bar_duration="5T"
+        )
+        # Keep only the trading hours.
+        df = df.between_time(datetime.time(9, 30), datetime.time(16, 0))
+        return df
+
+    @staticmethod
+    def get_settings() -> pd.DataFrame:
+        target_gmv = pd.Series(
+            1e5,
+            pd.date_range("2022-01-03 09:30", "2022-01-03 16:00", freq="5T").time,
+        )
+        target_gmv.iloc[:3] = 0.0
+        settings = pd.DataFrame(
+            [
+                [1e6, "no_quantization", 3, 0.0],
+                [1e5, "nearest_share", 0, 0.0],
+                [1e5, "nearest_lot", 5, 0.1],
+                [target_gmv, "nearest_share", 3, 0.0],
+                [0.0, "no_quantization", 3, 0.1],
+                [None, "no_quantization", 0, 0.0],
+            ],
+            columns=[
+                "target_gmv",
+                "quantization",
+                "burn_in_bars",
+                "bulk_frac_to_remove",
+            ],
+        )
+        return settings
+
+    @staticmethod
+    def compute_portfolio_with_loop(
+        forecast_evaluator: dtfmfefrpr.ForecastEvaluatorFromPrices,
+        df: pd.DataFrame,
+        settings: pd.DataFrame,
+    ) -> pd.DataFrame:
+        stats_dfs = []
+        for _, row in settings.iterrows():
+            *_, stats = forecast_evaluator.compute_portfolio(df, **row.to_dict())
+            stats_dfs.append(stats)
+        stats_df = pd.concat(
+            stats_dfs, keys=settings.index, names=["setting", None]
+        )
+        return stats_df
+
+    def test_compute_portfolio_grid1(self) -> None:
+        end_datetime = pd.Timestamp("2022-01-05 16:00:00", tz="America/New_York")
+        data = self.get_data(end_datetime, asset_ids=[101, 201, 301, 401])
+        forecast_evaluator = dtfmfefrpr.ForecastEvaluatorFromPrices(
+            price_col="price",
+            volatility_col="volatility",
+            prediction_col="prediction",
+        )
+        settings = self.get_settings()
+        actual = forecast_evaluator.compute_portfolio_grid(data, settings)
+        expected = self.compute_portfolio_with_loop(
+            forecast_evaluator, data, settings
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
+
+    def test_compute_portfolio_grid2(self) -> None:
+        """
+        Check the default settings and a single asset.
+        """
+        end_datetime = pd.Timestamp("2022-01-03 12:00:00", tz="America/New_York")
+        data = self.get_data(end_datetime, asset_ids=[101])
+        forecast_evaluator = dtfmfefrpr.ForecastEvaluatorFromPrices(
+            price_col="price",
+            volatility_col="volatility",
+            prediction_col="prediction",
+        )
+        settings = pd.DataFrame({"target_gmv": [1e4, 1e6]}, index=["a", "b"])
+        actual = forecast_evaluator.compute_portfolio_grid(data, settings)
+        expected = self.compute_portfolio_with_loop(
+            forecast_evaluator, data, settings
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
+
+
+class TestForecastEvaluatorFromPricesBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_compute_portfolio_grid1(self) -> None:
+        """
+        Compare a grid of settings with one `compute_portfolio()` per setting.
+        """
+        end_datetime = pd.Timestamp("2022-01-07 16:00:00", tz="America/New_York")
+        data = TestForecastEvaluatorFromPrices2.get_data(
+            end_datetime, asset_ids=list(range(100, 120))
+        )
+        forecast_evaluator = dtfmfefrpr.ForecastEvaluatorFromPrices(
+            price_col="price",
+            volatility_col="volatility",
+            prediction_col="prediction",
+        )
+        settings = pd.MultiIndex.from_product(
+            [
+                np.linspace(1e5, 1e6, 5),
+                ["no_quantization", "nearest_share"],
+                [0, 3, 10],
+            ],
+            names=["target_gmv", "quantization", "burn_in_bars"],
+        ).to_frame(index=False)
+        with htimer.TimedScope(logging.INFO, "Grid") as ts:
+            actual = forecast_evaluator.compute_portfolio_grid(data, settings)
+        grid_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Loop") as ts:
+            expected = (
+                TestForecastEvaluatorFromPrices2.compute_portfolio_with_loop(
+                    forecast_evaluator, data, settings
+                )
+            )
+        loop_elapsed = ts.elapsed_time
+        _LOG.info(
+            "num_settings=%s grid=%.3f s, loop=%.3f s, speedup=%.2fx",
+            settings.shape[0],
+            grid_elapsed,
+            loop_elapsed,
+            loop_elapsed / grid_elapsed,
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
@@ -427,3 +427,4 @@ class TestForecastEvaluator1(hunitest.TestCase):
                              pnl  gross_volume  net_volume       gmv       nmv
 2022-01-04 09:30:00-05:00 -100.0             0           0  100000.0  100000.0"""
         self.assert_equal(actual, expected, fuzzy_match=True)
+
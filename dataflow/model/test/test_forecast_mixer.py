@@ -1,10 +1,14 @@
 import logging
 
+import numpy as np
 import pandas as pd
+import pytest
 
 import core.finance_data_example as cfidaexa
+import dataflow.model.forecast_evaluator_from_returns as dtfmfefrre
 import dataflow.model.forecast_mixer as dtfmofomix
 import helpers.hpandas as hpandas
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
 _LOG = logging.getLogger(__name__)
@@ -55,3 +59,131 @@ class TestForecastMixer1(hunitest.TestCase):
 2021-01-03 10:25:00-05:00   500.49     1.47e+06   9.94e+05  1000000.0  1000000.00  -531.87     2.00e+06  -8.41e+05  1000000.0  -722795.55
 2021-01-03 10:30:00-05:00  -774.93     7.83e+05  -7.83e+05  1000000.0   216610.31   609.69     2.24e+05  -2.24e+05  1000000.0  -947292.77"""
         self.assert_equal(actual, expected, fuzzy_match=True)
+
+
+def _get_prediction_df(
+    end_datetime: pd.Timestamp, num_assets: int, num_features: int
+) -> pd.DataFrame:
+    start_datetime = pd.Timestamp("2021-01-01 09:30", tz="America/New_York")
+    asset_ids = list(range(100, 100 + num_assets))
+    prediction_df = cfidaexa.get_forecast_dataframe(
+        start_datetime, end_datetime, asset_ids, num_features=num_features
+    )
+    return prediction_df
+
+
+def _get_weights(num_features: int, num_weights: int) -> pd.DataFrame:
+    np.random.seed(0)
+    weights = pd.DataFrame(
+        np.random.randn(num_features, num_weights),
+        range(1, num_features + 1),
+        [f"w{i}" for i in range(num_weights)],
+    )
+    return weights
+
+
+def _generate_bar_metrics_with_loop(
+    df: pd.DataFrame, weights: pd.DataFrame, **kwargs
+) -> pd.DataFrame:
+    """
+    Compute the bar metrics running `compute_portfolio()` once per weight.
+    """
+    forecast_evaluator = dtfmfefrre.ForecastEvaluatorFromReturns(
+        returns_col="returns",
+        volatility_col="volatility",
+        prediction_col="prediction",
+    )
+    bar_metrics_dfs = {}
+    for col in weights.columns:
+        sum_df = sum(
+            weights.loc[prediction_col, col] * df[prediction_col]
+            for prediction_col in weights.index
+        )
+        forecast_df = pd.concat(
+            [sum_df, df["volatility"], df["returns"]],
+            axis=1,
+            keys=["prediction", "volatility", "returns"],
+        )
+        _, _, bar_stats = forecast_evaluator.compute_portfolio(
+            forecast_df, reindex_like_input=True, **kwargs
+        )
+        bar_metrics_dfs[col] = bar_stats
+    bar_metrics_df = pd.concat(
+        bar_metrics_dfs.values(), axis=1, keys=bar_metrics_dfs.keys()
+    )
+    return bar_metrics_df
+
+
+class TestForecastMixer2(hunitest.TestCase):
+    """
+    Check that the batched computation matches the per-weight computation.
+    """
+
+    def helper(self, dollar_neutrality: str, target_gmv: float) -> None:
+        end_datetime = pd.Timestamp("2021-01-04 16:30", tz="America/New_York")
+        num_features = 3
+        prediction_df = _get_prediction_df(end_datetime, 4, num_features)
+        # Inject some NaNs.
+        prediction_df.iloc[5:8, 0] = np.nan
+        prediction_df.iloc[20, :] = np.nan
+        weights = _get_weights(num_features, 7)
+        forecast_mixer = dtfmofomix.ForecastMixer(
+            returns_col="returns",
+            volatility_col="volatility",
+            prediction_cols=[1, 2, 3],
+        )
+        kwargs = {
+            "target_gmv": target_gmv,
+            "dollar_neutrality": dollar_neutrality,
+        }
+        actual = forecast_mixer.generate_portfolio_bar_metrics_df(
+            prediction_df, weights, batch_size=3, **kwargs
+        )
+        expected = _generate_bar_metrics_with_loop(
+            prediction_df, weights, **kwargs
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
+
+    def test_no_constraint1(self) -> None:
+        self.helper("no_constraint", None)
+
+    def test_demean1(self) -> None:
+        self.helper("demean", 1e6)
+
+    def test_side_preserving1(self) -> None:
+        self.helper("side_preserving", 1e6)
+
+
+class TestForecastMixerBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_generate_portfolio_bar_metrics_df1(self) -> None:
+        """
+        Measure the number of weight vectors evaluated per second.
+        """
+        end_datetime = pd.Timestamp("2021-01-08 16:00", tz="America/New_York")
+        num_features = 5
+        prediction_df = _get_prediction_df(end_datetime, 20, num_features)
+        num_weights = 200
+        weights = _get_weights(num_features, num_weights)
+        forecast_mixer = dtfmofomix.ForecastMixer(
+            returns_col="returns",
+            volatility_col="volatility",
+            prediction_cols=list(range(1, num_features + 1)),
+        )
+        kwargs = {"target_gmv": 1e6, "dollar_neutrality": "demean"}
+        with htimer.TimedScope(logging.INFO, "Batched mixing") as ts:
+            actual = forecast_mixer.generate_portfolio_bar_metrics_df(
+                prediction_df, weights, **kwargs
+            )
+        batch_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Per-weight mixing") as ts:
+            expected = _generate_bar_metrics_with_loop(
+                prediction_df, weights, **kwargs
+            )
+        loop_elapsed = ts.elapsed_time
+        _LOG.info(
+            "batched=%.1f weights/s, per-weight=%.1f weights/s",
+            num_weights / batch_elapsed,
+            num_weights / loop_elapsed,
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
@@ -0,0 +1,188 @@
+import collections
+import logging
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import core.config as cconfig
+import dataflow.core as dtfcore
+import dataflow.model.experiment_utils as dtfmoexuti
+import dataflow.model.incremental_single_name_model_evaluator as dtfmisnmoev
+import helpers.hio as hio
+import helpers.hpickle as hpickle
+import helpers.hunit_test as hunitest
+
+_LOG = logging.getLogger(__name__)
+
+_COLUMNS = ["prediction", "target"]
+
+
+def _write_result_bundles(dir_name: str, keys: List[int]) -> None:
+    """
+    Write one `ResultBundle` with random data per key.
+    """
+    idx = pd.date_range("2020-01-01", periods=300, freq="B")
+    for key in keys:
+        np.random.seed(key)
+        result_df = pd.DataFrame(
+            np.random.randn(len(idx), len(_COLUMNS)), idx, _COLUMNS
+        )
+        info = collections.OrderedDict({"fit": {"key": key}})
+        rb = dtfcore.PredictionResultBundle(
+            config=cconfig.Config(),
+            result_nid="nid",
+            method="fit",
+            result_df=result_df,
+            info=info,
+        )
+        # Save in the format of `ResultBundle.to_pickle(..., use_pq=True)`.
+        file_name = os.path.join(dir_name, f"result_{key}", "result_bundle")
+        hio.create_enclosing_dir(file_name, incremental=True)
+        rb.result_df = None
+        hpickle.to_pickle(rb, file_name + ".v2_0.pkl")
+        result_df.to_parquet(file_name + ".v2_0.pq")
+        hpickle.to_pickle(
+            {"index.freq": result_df.index.freq},
+            file_name + ".v2_0.metadata_df.pkl",
+        )
+
+
+def _get_reducers() -> Dict[str, dtfmisnmoev.ArtifactReducer]:
+    start = pd.Timestamp("2020-02-01")
+    end = None
+    reducers = {
+        "stats": dtfmisnmoev.StatsReducer("prediction", "target", start, end),
+        "result_dfs": dtfmisnmoev.ResultDfReducer(["target"], start, end),
+        "info": dtfmisnmoev.InfoReducer(["fit"]),
+    }
+    return reducers
+
+
+class _CountingInfoReducer(dtfmisnmoev.InfoReducer):
+    """
+    Count the artifacts passed to `map()` and fail on a given key.
+    """
+
+    num_calls = 0
+
+    def __init__(self, info_path: List[str], failing_key: int = -1) -> None:
+        super().__init__(info_path)
+        self._failing_key = failing_key
+
+    def get_params(self) -> Dict[str, Any]:
+        # Failing doesn't change the partial results.
+        params = super().get_params().copy()
+        del params["_failing_key"]
+        return params
+
+    def map(self, key: int, artifact: Any) -> Any:
+        _CountingInfoReducer.num_calls += 1
+        if key == self._failing_key:
+            raise ValueError(f"Failing on key={key}")
+        return super().map(key, artifact)
+
+
+class TestEvaluateSingleNameArtifacts(hunitest.TestCase):
+    def test_single_pass1(self) -> None:
+        """
+        Check the reducers against loops over the artifacts.
+        """
+        src_dir = self.get_scratch_space()
+        _write_result_bundles(src_dir, [0, 1, 3])
+        results = dtfmisnmoev.evaluate_single_name_artifacts(
+            src_dir, "result_bundle.v2_0.pkl", _get_reducers()
+        )
+        # Check the result dataframes against a loop over the artifacts.
+        iterator = dtfmoexuti.yield_experiment_artifacts(
+            src_dir, "result_bundle.v2_0.pkl", {"columns": ["target"]}
+        )
+        result_dfs = results["result_dfs"]
+        self.assertEqual(list(result_dfs.keys()), [0, 1, 3])
+        for key, artifact in iterator:
+            expected = artifact.result_df.loc["2020-02-01":]
+            pd.testing.assert_frame_equal(result_dfs[key], expected)
+        # Check the stats.
+        stats_df = results["stats"]
+        self.assertEqual(stats_df.columns.to_list(), [0, 1, 3])
+        self.assertIn(("ratios", "sr.adj_pval"), stats_df.index)
+        # Check the info.
+        self.assertEqual(
+            results["info"], {0: {"key": 0}, 1: {"key": 1}, 3: {"key": 3}}
+        )
+
+    def test_num_workers1(self) -> None:
+        """
+        Check that a process pool gives the same results as a single process.
+        """
+        src_dir = self.get_scratch_space()
+        _write_result_bundles(src_dir, list(range(5)))
+        expected = dtfmisnmoev.evaluate_single_name_artifacts(
+            src_dir, "result_bundle.v2_0.pkl", _get_reducers()
+        )
+        actual = dtfmisnmoev.evaluate_single_name_artifacts(
+            src_dir, "result_bundle.v2_0.pkl", _get_reducers(), num_workers=2
+        )
+        pd.testing.assert_frame_equal(actual["stats"], expected["stats"])
+        for key, df in expected["result_dfs"].items():
+            pd.testing.assert_frame_equal(actual["result_dfs"][key], df)
+        self.assertEqual(actual["info"], expected["info"])
+
+    def test_checkpoint1(self) -> None:
+        """
+        Check that an interrupted evaluation is resumed from the checkpoint.
+        """
+        scratch_dir = self.get_scratch_space()
+        src_dir = os.path.join(scratch_dir, "experiment")
+        checkpoint_dir = os.path.join(scratch_dir, "checkpoint")
+        _write_result_bundles(src_dir, list(range(4)))
+        # Interrupt the evaluation on the third artifact.
+        reducers = {"info": _CountingInfoReducer(["fit"], failing_key=2)}
+        with self.assertRaises(ValueError):
+            dtfmisnmoev.evaluate_single_name_artifacts(
+                src_dir,
+                "result_bundle.v2_0.pkl",
+                reducers,
+                checkpoint_dir=checkpoint_dir,
+            )
+        file_names = sorted(os.listdir(checkpoint_dir))
+        self.assertEqual(len(file_names), 2)
+        self.assertTrue(file_names[0].startswith("result_0."))
+        self.assertTrue(file_names[1].startswith("result_1."))
+        # Resume the evaluation.
+        _CountingInfoReducer.num_calls = 0
+        reducers = {"info": _CountingInfoReducer(["fit"])}
+        results = dtfmisnmoev.evaluate_single_name_artifacts(
+            src_dir,
+            "result_bundle.v2_0.pkl",
+            reducers,
+            checkpoint_dir=checkpoint_dir,
+        )
+        self.assertEqual(_CountingInfoReducer.num_calls, 2)
+        expected = {key: {"key": key} for key in range(4)}
+        self.assertEqual(results["info"], expected)
+
+    def test_checkpoint2(self) -> None:
+        """
+        Check that the checkpoints are not reused when the params change.
+        """
+        scratch_dir = self.get_scratch_space()
+        src_dir = os.path.join(scratch_dir, "experiment")
+        checkpoint_dir = os.path.join(scratch_dir, "checkpoint")
+        _write_result_bundles(src_dir, list(range(2)))
+        results = {}
+        for start in ["2020-02-03", "2020-03-02"]:
+            reducer = dtfmisnmoev.ResultDfReducer(
+                ["target"], pd.Timestamp(start), None
+            )
+            results[start] = dtfmisnmoev.evaluate_single_name_artifacts(
+                src_dir,
+                "result_bundle.v2_0.pkl",
+                {"result_dfs": reducer},
+                checkpoint_dir=checkpoint_dir,
+            )["result_dfs"]
+        self.assertEqual(len(os.listdir(checkpoint_dir)), 4)
+        for start, result_dfs in results.items():
+            for df in result_dfs.values():
+                self.assertEqual(df.index[0], pd.Timestamp(start))
@@ -1,10 +1,15 @@
 import logging
+from typing import List
 
+import numpy as np
 import pandas as pd
+import pytest
 
 import core.finance_data_example as cfidaexa
+import core.statistics as costatis
 import dataflow.model.regression_analyzer as dtfmoreana
 import helpers.hpandas as hpandas
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
 _LOG = logging.getLogger(__name__)
@@ -35,3 +40,122 @@ class TestRegressionAnalyzer1(hunitest.TestCase):
 1        -0.289  0.155 -0.0     -2.0    0.774  0.118  0.0     -2.0
 2        -0.163  0.806  0.0     -2.0    0.574  0.156 -0.0     -2.0"""
         self.assert_equal(actual, expected, fuzzy_match=True)
+
+
+def _get_feature_df(
+    end_datetime: pd.Timestamp, asset_ids: List[int], num_features: int
+) -> pd.DataFrame:
+    start_datetime = pd.Timestamp("2021-01-03 09:30", tz="America/New_York")
+    feature_df = cfidaexa.get_forecast_dataframe(
+        start_datetime, end_datetime, asset_ids, num_features=num_features
+    )
+    return feature_df
+
+
+def _compute_regression_coefficients_with_loop(
+    df: pd.DataFrame, feature_cols: List[int], feature_lag: int
+) -> pd.DataFrame:
+    """
+    Compute the regression coefficients one asset at a time.
+    """
+    df = df.between_time("09:30", "16:00")
+    coeffs = {}
+    for asset_id in df.columns.levels[1]:
+        asset_df = df.T.xs(asset_id, level=1).T
+        features = asset_df[feature_cols].shift(feature_lag)
+        asset_df = features.merge(
+            asset_df[["returns"]], left_index=True, right_index=True
+        )
+        coeffs[asset_id] = costatis.compute_regression_coefficients(
+            asset_df, feature_cols, "returns"
+        )
+    return pd.concat(coeffs)
+
+
+class TestRegressionAnalyzer2(hunitest.TestCase):
+    """
+    Check that the batched regressions match the per-asset regressions.
+    """
+
+    def helper(self, feature_lag: int, chunk_size: int, num_workers: int) -> None:
+        end_datetime = pd.Timestamp("2021-01-08 16:00", tz="America/New_York")
+        feature_df = _get_feature_df(end_datetime, [100, 200, 300], 3)
+        # Inject some NaNs in the features and in the target.
+        feature_df.iloc[10:30, 0] = np.nan
+        feature_df.iloc[40:45, 4] = np.nan
+        feature_df.loc[feature_df.index[50:60], ("returns", 200)] = np.nan
+        regression_analyzer = dtfmoreana.RegressionAnalyzer(
+            target_col="returns",
+            feature_cols=[1, 2, 3],
+            feature_lag=feature_lag,
+        )
+        actual = regression_analyzer.compute_regression_coefficients(
+            feature_df, chunk_size=chunk_size, num_workers=num_workers
+        )
+        expected = _compute_regression_coefficients_with_loop(
+            feature_df, [1, 2, 3], feature_lag
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
+
+    def test_compute_regression_coefficients1(self) -> None:
+        self.helper(feature_lag=0, chunk_size=256, num_workers=1)
+
+    def test_compute_regression_coefficients2(self) -> None:
+        self.helper(feature_lag=2, chunk_size=2, num_workers=1)
+
+    def test_compute_regression_coefficients3(self) -> None:
+        self.helper(feature_lag=1, chunk_size=1, num_workers=2)
+
+    def test_combine_features1(self) -> None:
+        end_datetime = pd.Timestamp("2021-01-04 16:00", tz="America/New_York")
+        feature_df = _get_feature_df(end_datetime, [100, 200], 2)
+        feature_df.iloc[10:30, 0] = np.nan
+        feature_df.iloc[20:25, 2] = np.nan
+        regression_analyzer = dtfmoreana.RegressionAnalyzer(
+            target_col="returns",
+            feature_cols=[1, 2],
+        )
+        actual = regression_analyzer.combine_features(feature_df, [0.5, -1.0])
+        expected = pd.DataFrame(
+            {
+                asset_id: (0.5 * feature_df[(1, asset_id)]).add(
+                    -1.0 * feature_df[(2, asset_id)], fill_value=0
+                )
+                for asset_id in [100, 200]
+            }
+        )
+        pd.testing.assert_frame_equal(actual, expected, check_names=False)
+
+
+class TestRegressionAnalyzerBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_compute_regression_coefficients1(self) -> None:
+        """
+        Compare batched and per-asset regressions on 200 assets.
+        """
+        end_datetime = pd.Timestamp("2021-01-08 16:00", tz="America/New_York")
+        asset_ids = list(range(100, 300))
+        feature_df = _get_feature_df(end_datetime, asset_ids, 5)
+        feature_cols = [1, 2, 3, 4, 5]
+        regression_analyzer = dtfmoreana.RegressionAnalyzer(
+            target_col="returns",
+            feature_cols=feature_cols,
+            feature_lag=1,
+        )
+        with htimer.TimedScope(logging.INFO, "Batched") as ts:
+            actual = regression_analyzer.compute_regression_coefficients(
+                feature_df
+            )
+        batch_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Per asset") as ts:
+            expected = _compute_regression_coefficients_with_loop(
+                feature_df, feature_cols, 1
+            )
+        loop_elapsed = ts.elapsed_time
+        _LOG.info(
+            "batched=%.3f s, per-asset=%.3f s, speedup=%.2fx",
+            batch_elapsed,
+            loop_elapsed,
+            loop_elapsed / batch_elapsed,
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
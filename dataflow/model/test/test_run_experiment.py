@@ -5,12 +5,14 @@ from typing import Any, List
 
 import pytest
 
+import core.config as cconfig
 import dev_scripts.test.test_run_notebook as trnot
 import helpers.hdbg as hdbg
 import helpers.hgit as hgit
 import helpers.hparser as hparser
 import helpers.hs3 as hs3
 import helpers.hsystem as hsystem
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
 _LOG = logging.getLogger(__name__)
@@ -197,6 +199,107 @@ class TestRunExperimentFail2(hunitest.TestCase):
         _run_experiment_helper(self, cmd_opts, exp_pass, self.EXPECTED_OUTCOME)
 
 
+# #############################################################################
+# TestRunExperimentWorkerPool1
+# #############################################################################
+
+
+class TestRunExperimentWorkerPool1(hunitest.TestCase):
+    """
+    Run experiments in a worker pool.
+
+    Same as `TestRunExperimentFail2` but using `--worker_pool`.
+    """
+
+    @pytest.mark.slow
+    def test_serial1(self) -> None:
+        """
+        Execute:
+        - 3 experiments with one failing
+        - serially
+        - aborting on error
+        """
+        cmd_opts = [
+            "--config_builder 'dev_scripts.test.test_run_notebook.build_configs2()'",
+            "--num_threads serial",
+            "--worker_pool",
+        ]
+        #
+        exp_pass = False
+        _LOG.warning("This command is supposed to fail")
+        _run_experiment_helper(
+            self, cmd_opts, exp_pass, TestRunExperimentFail2.EXPECTED_OUTCOME
+        )
+
+    @pytest.mark.slow
+    def test_parallel1(self) -> None:
+        """
+        Execute:
+        - 3 experiments with one failing
+        - with 2 threads
+        - skipping on error
+        """
+        cmd_opts = [
+            "--config_builder 'dev_scripts.test.test_run_notebook.build_configs2()'",
+            "--skip_on_error",
+            "--num_threads 2",
+            "--worker_pool",
+        ]
+        #
+        exp_pass = True
+        _run_experiment_helper(
+            self, cmd_opts, exp_pass, TestRunExperimentFail2.EXPECTED_OUTCOME
+        )
+
+
+def build_configs_for_benchmark(num_configs: int) -> List[cconfig.Config]:
+    """
+    Build `num_configs` configs that won't make the experiment fail.
+    """
+    values = [False] * num_configs
+    configs = trnot._build_config(values)
+    return configs
+
+
+class TestRunExperimentWorkerPoolBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test1(self) -> None:
+        """
+        Compare configs/hour running one process per config and a worker pool.
+        """
+        num_configs = 40
+        config_builder = (
+            "dataflow.model.test.test_run_experiment."
+            f"build_configs_for_benchmark({num_configs})"
+        )
+        configs_per_hour = {}
+        for worker_pool in [False, True]:
+            cmd = [
+                os.path.join(
+                    hgit.get_amp_abs_path(), "dataflow/model/run_experiment.py"
+                ),
+                "--experiment_builder dataflow.model.test.simple_experiment.run_experiment",
+                f"--config_builder '{config_builder}'",
+                f"--dst_dir {self.get_scratch_space()}",
+                "--clean_dst_dir",
+                "--no_confirm",
+                "--num_threads 2",
+            ]
+            if worker_pool:
+                cmd.append("--worker_pool")
+            cmd = " ".join(cmd)
+            with htimer.TimedScope(
+                logging.INFO, f"worker_pool={worker_pool}"
+            ) as ts:
+                hsystem.system(cmd, suppress_output=False)
+            configs_per_hour[worker_pool] = num_configs / ts.elapsed_time * 3600
+        _LOG.info(
+            "configs/hour: subprocess=%.0f, worker_pool=%.0f",
+            configs_per_hour[False],
+            configs_per_hour[True],
+        )
+
+
 # #############################################################################
 # TestRunExperimentArchiveOnS3
 # #############################################################################
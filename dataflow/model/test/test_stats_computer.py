@@ -1,14 +1,21 @@
 import logging
 
+import numpy as np
 import pandas as pd
+import pytest
 
 import core.finance_data_example as cfidaexa
 import dataflow.model.stats_computer as dtfmostcom
 import helpers.hpandas as hpandas
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 
 _LOG = logging.getLogger(__name__)
 
+# The batch stats sum the values in a different order or use closed-form
+# expressions, so they match the per-series ones only up to rounding errors.
+_RTOL = 1e-10
+
 
 class TestStatsComputer1(hunitest.TestCase):
     def test_compute_portfolio_stats1(self) -> None:
@@ -40,6 +47,25 @@ percentage  annualized_mean_return              22.94
             market_bias_stdev                    0.01"""
         self.assert_equal(actual, expected, fuzzy_match=True)
 
+    def test_compute_portfolio_stats_batch1(self) -> None:
+        """
+        Check that the batch stats are the same as the per-portfolio ones.
+        """
+        sc = dtfmostcom.StatsComputer()
+        portfolio_df = pd.concat(
+            [self._get_portfolio(seed=1347), self._get_portfolio(seed=1348)],
+            axis=1,
+            keys=["portfolio1", "portfolio2"],
+        )
+        expected_stats, expected_df = sc.compute_portfolio_stats(
+            portfolio_df, "1T"
+        )
+        actual_stats, actual_df = sc.compute_portfolio_stats_batch(
+            portfolio_df, "1T"
+        )
+        pd.testing.assert_frame_equal(actual_stats, expected_stats, rtol=_RTOL)
+        pd.testing.assert_frame_equal(actual_df, expected_df)
+
     @staticmethod
     def _get_portfolio(seed=1347) -> pd.DataFrame:
         start_timestamp = pd.Timestamp(
@@ -56,3 +82,107 @@ percentage  annualized_mean_return              22.94
             seed=seed,
         )
         return df
+
+
+def _get_series_df(num_rows: int, num_cols: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a dataframe of random series with different NaN patterns.
+    """
+    np.random.seed(seed)
+    idx = pd.date_range("2010-01-01", periods=num_rows, freq="B")
+    df = pd.DataFrame(
+        np.random.randn(num_rows, num_cols),
+        index=idx,
+        columns=[f"MN{i}" for i in range(num_cols)],
+    )
+    # Add leading NaNs and scattered NaNs.
+    df.iloc[: num_rows // 5, 1::4] = np.nan
+    df.iloc[::7, 2::4] = np.nan
+    # Add zeros.
+    df.iloc[10:20, 3::4] = 0.0
+    return df
+
+
+class TestStatsComputer2(hunitest.TestCase):
+    def test_compute_time_series_stats_batch1(self) -> None:
+        """
+        Check that the batch stats are the same as the per-series ones.
+        """
+        df = _get_series_df(300, 8)
+        self._check_compute_time_series_stats_batch(df)
+
+    def test_compute_time_series_stats_batch2(self) -> None:
+        """
+        Check degenerate columns, i.e., with infs, constant, or with few
+        values.
+        """
+        df = _get_series_df(300, 4)
+        df.iloc[5, 0] = np.inf
+        df["MN1"] = 1.0
+        df.iloc[:290, 2] = np.nan
+        self._check_compute_time_series_stats_batch(df)
+
+    def test_compute_time_series_stats_batch3(self) -> None:
+        """
+        Check running the stationarity tests in multiple processes.
+        """
+        df = _get_series_df(300, 4)
+        self._check_compute_time_series_stats_batch(df, num_workers=2)
+
+    def test_compute_per_asset_stats_batch1(self) -> None:
+        """
+        Check that the batch stats are the same as the per-asset ones.
+        """
+        cols = ["returns", "volatility", "prediction", "position", "pnl"]
+        df = pd.concat(
+            [_get_series_df(300, 4, seed=seed) for seed in range(len(cols))],
+            axis=1,
+            keys=cols,
+        )
+        df["volatility"] = df["volatility"].abs()
+        sc = dtfmostcom.StatsComputer()
+        kwargs = {f"{col}_col": col for col in cols}
+        expected = sc.compute_per_asset_stats(df, **kwargs)
+        actual = sc.compute_per_asset_stats_batch(df, num_workers=2, **kwargs)
+        pd.testing.assert_frame_equal(actual, expected, rtol=_RTOL)
+
+    @staticmethod
+    def _check_compute_time_series_stats_batch(
+        df: pd.DataFrame, num_workers: int = 1
+    ) -> None:
+        sc = dtfmostcom.StatsComputer()
+        expected = pd.concat(
+            [sc.compute_time_series_stats(df[col]) for col in df.columns],
+            axis=1,
+        )
+        actual = sc.compute_time_series_stats_batch(df, num_workers=num_workers)
+        pd.testing.assert_frame_equal(actual, expected, rtol=_RTOL)
+
+
+class TestStatsComputerBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_compute_time_series_stats_batch1(self) -> None:
+        """
+        Compare the run time of the per-series and batch stats, without a
+        process pool.
+        """
+        df = _get_series_df(2000, 200)
+        sc = dtfmostcom.StatsComputer()
+        with htimer.TimedScope(logging.INFO, "Per-series stats") as ts:
+            expected = pd.concat(
+                [sc.compute_time_series_stats(df[col]) for col in df.columns],
+                axis=1,
+            )
+        series_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Batch stats") as ts:
+            actual = sc.compute_time_series_stats_batch(df, num_workers=1)
+        batch_elapsed = ts.elapsed_time
+        speedup = series_elapsed / batch_elapsed
+        _LOG.info(
+            "per-series=%.3f s, batch=%.3f s, speedup=%.2fx",
+            series_elapsed,
+            batch_elapsed,
+            speedup,
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=_RTOL)
+        self.assertGreater(speedup, 1.5)
@@ -320,7 +320,10 @@ def _wait_until(
         )
         time_in_secs = 0
     else:
-        time_in_secs = (wait_until_timestamp - curr_timestamp).seconds
+        # Use `total_seconds()` since `seconds` doesn't include the days.
+        time_in_secs = int(
+            (wait_until_timestamp - curr_timestamp).total_seconds()
+        )
         _LOG.debug(
             "%s: wall_clock_time=%s: sleep for %s secs",
             tag,
@@ -362,6 +365,12 @@ async def async_wait_until(
     time_in_secs = _wait_until(wait_until_timestamp, get_wall_clock_time, tag=tag)
     # Async wait.
     hdbg.dassert_lte(0, time_in_secs)
+    # Sleep in chunks since `async_solipsism` can't sleep for more than a day
+    # (e.g., when replaying data over a weekend).
+    max_time_in_secs = 12 * 60 * 60
+    while time_in_secs > max_time_in_secs:
+        await asyncio.sleep(max_time_in_secs)
+        time_in_secs -= max_time_in_secs
     await asyncio.sleep(time_in_secs)
     #
     hprint.log_frame(
@@ -5,13 +5,29 @@ import helpers.hparquet as hparque
 """
 
 import collections
+import concurrent.futures
 import datetime
+import json
 import logging
 import os
-from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+import queue
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
+import fsspec
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pads
 import pyarrow.fs as pafs
 import pyarrow.parquet as pq
 from tqdm.autonotebook import tqdm
@@ -43,6 +59,27 @@ def get_pyarrow_s3fs(*args: Any, **kwargs: Any) -> pafs.S3FileSystem:
     return s3fs_
 
 
+def _get_pyarrow_file_name_and_filesystem(
+    file_name: str, aws_profile: Optional[str]
+) -> Tuple[str, Optional[pafs.S3FileSystem]]:
+    """
+    Check that `file_name` exists and return the path and filesystem to use
+    with Pyarrow.
+    """
+    hdbg.dassert_isinstance(file_name, str)
+    hs3.dassert_is_valid_aws_profile(file_name, aws_profile)
+    if hs3.is_s3_path(file_name):
+        filesystem = get_pyarrow_s3fs(aws_profile)
+        # Pyarrow S3FileSystem does not have `exists` method.
+        s3_filesystem = hs3.get_s3fs(aws_profile)
+        hs3.dassert_path_exists(file_name, s3_filesystem)
+        file_name = file_name.lstrip("s3://")
+    else:
+        filesystem = None
+        hdbg.dassert_path_exists(file_name)
+    return file_name, filesystem
+
+
 def from_parquet(
     file_name: str,
     *,
@@ -59,32 +96,19 @@ def from_parquet(
     Dataset.
     """
     _LOG.debug(hprint.to_str("file_name columns filters"))
-    hdbg.dassert_isinstance(file_name, str)
-    hs3.dassert_is_valid_aws_profile(file_name, aws_profile)
-    if hs3.is_s3_path(file_name):
-        filesystem = get_pyarrow_s3fs(aws_profile)
-        # Pyarrow S3FileSystem does not have `exists` method.
-        s3_filesystem = hs3.get_s3fs(aws_profile)
-        hs3.dassert_path_exists(file_name, s3_filesystem)
-        file_name = file_name.lstrip("s3://")
-    else:
-        filesystem = None
-        hdbg.dassert_path_exists(file_name)
+    file_name, filesystem = _get_pyarrow_file_name_and_filesystem(
+        file_name, aws_profile
+    )
     # Load data.
     with htimer.TimedScope(
         logging.DEBUG, f"# Reading Parquet file '{file_name}'"
     ) as ts:
-        dataset = pq.ParquetDataset(
-            # Replace URI with path.
-            file_name,
-            filesystem=filesystem,
-            filters=filters,
-            use_legacy_dataset=False,
-        )
-        # To read also the index we need to use `read_pandas()`, instead of
-        # `read_table()`.
+        dataset = _get_dataset(file_name, filesystem)
+        # To read also the index we need to read the index columns and the
+        # pandas metadata, like `pq.ParquetDataset.read_pandas()`.
         # See https://arrow.apache.org/docs/python/parquet.html#reading-and-writing-single-files.
-        table = dataset.read_pandas(columns=columns)
+        columns_to_read, pandas_metadata = _get_columns_to_read(dataset, columns)
+        table = _read_table(dataset, columns_to_read, pandas_metadata, filters)
         df = table.to_pandas()
     # Report stats about the df.
     _LOG.debug("df.shape=%s", str(df.shape))
@@ -103,6 +127,188 @@ def from_parquet(
     return df
 
 
+# Manifest of a folder whose files are being replaced by a merged file, see
+# `list_and_merge_pq_files()`.
+_MERGE_MANIFEST_FILE_NAME = "_merge_manifest.json"
+
+
+def _get_dataset(
+    file_name: str, filesystem: Optional[pafs.FileSystem]
+) -> pads.Dataset:
+    """
+    Discover the Parquet dataset in `file_name`, like `pq.ParquetDataset`.
+
+    The files of a folder being merged by `list_and_merge_pq_files()` are
+    replaced by the merged file, as listed by the manifest of the merge.
+    """
+    pa_filesystem = filesystem or pafs.LocalFileSystem()
+    file_info = pa_filesystem.get_file_info(file_name)
+    if file_info.type != pafs.FileType.Directory:
+        # A single file is read without partitioning, even if it is inside a
+        # partition folder.
+        dataset = pads.dataset(file_name, filesystem=filesystem, format="parquet")
+        return dataset
+    file_names = _list_dataset_files(file_name, pa_filesystem)
+    dataset = pads.dataset(
+        file_names,
+        filesystem=filesystem,
+        format="parquet",
+        partitioning=pads.HivePartitioning.discover(infer_dictionary=True),
+        partition_base_dir=file_name,
+    )
+    return dataset
+
+
+def _list_dataset_files(dir_name: str, filesystem: pafs.FileSystem) -> List[str]:
+    """
+    List the files of the Parquet dataset in `dir_name`.
+
+    The hidden files, i.e., starting with "." or "_", are ignored, like in
+    the Pyarrow dataset discovery. If a folder has a merge manifest, its
+    superseded files are replaced by the merged file, so that a reader sees
+    either the original files or the merged one, but never both.
+    """
+    dir_name = dir_name.rstrip("/")
+    selector = pafs.FileSelector(dir_name, recursive=True)
+    paths = [
+        file_info.path
+        for file_info in filesystem.get_file_info(selector)
+        if file_info.type == pafs.FileType.File
+    ]
+    all_paths = set(paths)
+    files = []
+    manifest_paths = []
+    for path in paths:
+        parts = path[len(dir_name) + 1 :].split("/")
+        if parts[-1] == _MERGE_MANIFEST_FILE_NAME:
+            manifest_paths.append(path)
+        elif not any(part.startswith((".", "_")) for part in parts):
+            files.append(path)
+    for manifest_path in manifest_paths:
+        folder = manifest_path.rsplit("/", 1)[0]
+        with filesystem.open_input_stream(manifest_path) as f:
+            manifest = json.loads(f.read())
+        # The merged file is hidden until it is renamed.
+        merged_path = f"{folder}/{manifest['tmp_file_name']}"
+        if merged_path not in all_paths:
+            merged_path = f"{folder}/{manifest['file_name']}"
+        superseded_paths = {
+            f"{folder}/{name}" for name in manifest["superseded_file_names"]
+        }
+        files = [
+            path
+            for path in files
+            if path not in superseded_paths and path != merged_path
+        ]
+        files.append(merged_path)
+    # Sort like the Pyarrow dataset discovery.
+    files = sorted(files)
+    return files
+
+
+def _get_columns_to_read(
+    dataset: pads.Dataset, columns: Optional[List[str]]
+) -> Tuple[Optional[List[str]], Optional[bytes]]:
+    """
+    Return the columns to read to restore the index and the pandas metadata.
+
+    :return: `columns` with the index columns and the pandas metadata
+    """
+    # To restore the index, the index columns need to be read together with
+    # `columns` and the pandas metadata attached to each table, as in
+    # `pq.ParquetDataset.read_pandas()`.
+    metadata = dataset.schema.metadata or {}
+    pandas_metadata = metadata.get(b"pandas")
+    if columns is not None and pandas_metadata is not None:
+        # A `RangeIndex` is stored as a dict, instead of as a column.
+        index_columns = [
+            col
+            for col in json.loads(pandas_metadata)["index_columns"]
+            if not isinstance(col, dict)
+        ]
+        columns = list(columns) + [
+            col for col in index_columns if col not in columns
+        ]
+    return columns, pandas_metadata
+
+
+def _filters_to_expression(filters: List[Any]) -> pads.Expression:
+    """
+    Convert filters in the `from_parquet()` format into a dataset expression.
+
+    E.g., `[[("year", "==", 2020), ("asset_id", "in", [101, 202])]]` becomes
+    `(year == 2020) & isin(asset_id, [101, 202])`.
+
+    :param filters: an AND filter, i.e., a list of tuples, or an OR-AND
+        filter, i.e., a list of lists of tuples
+    """
+    hdbg.dassert_isinstance(filters, list)
+    hdbg.dassert_lt(0, len(filters))
+    if isinstance(filters[0], tuple):
+        # Convert an AND filter into an OR-AND filter.
+        filters = [filters]
+    or_expression = None
+    for and_filter in filters:
+        hdbg.dassert_isinstance(and_filter, list)
+        hdbg.dassert_lt(0, len(and_filter))
+        and_expression = None
+        for col, op, val in and_filter:
+            field = pads.field(col)
+            if op in ("=", "=="):
+                expression = field == val
+            elif op == "!=":
+                expression = field != val
+            elif op == "<":
+                expression = field < val
+            elif op == ">":
+                expression = field > val
+            elif op == "<=":
+                expression = field <= val
+            elif op == ">=":
+                expression = field >= val
+            elif op == "in":
+                expression = field.isin(val)
+            elif op == "not in":
+                expression = ~field.isin(val)
+            else:
+                raise ValueError(f"Invalid op='{op}' in filter {and_filter}")
+            and_expression = (
+                expression
+                if and_expression is None
+                else and_expression & expression
+            )
+        or_expression = (
+            and_expression
+            if or_expression is None
+            else or_expression | and_expression
+        )
+    return or_expression
+
+
+def _read_table(
+    dataset: pads.Dataset,
+    columns: Optional[List[str]],
+    pandas_metadata: Optional[bytes],
+    filters: Optional[List[Any]],
+) -> pa.Table:
+    """
+    Read `columns` of the data selected by `filters` from `dataset`.
+
+    :param columns, pandas_metadata: as returned by `_get_columns_to_read()`
+    :param filters: as in `from_parquet()`
+    """
+    expression = None
+    if filters:
+        expression = _filters_to_expression(filters)
+    table = dataset.to_table(columns=columns, filter=expression)
+    if pandas_metadata is not None:
+        # Restore the pandas metadata, which is lost when selecting `columns`.
+        metadata = table.schema.metadata or {}
+        metadata[b"pandas"] = pandas_metadata
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
 # Copied from `hio.create_enclosing_dir()` to avoid circular dependencies.
 def _create_enclosing_dir(file_name: str) -> Optional[str]:
     dir_name = os.path.dirname(file_name)
@@ -182,6 +388,189 @@ def to_parquet(
         )
 
 
+# #############################################################################
+# ParquetTileIterator
+# #############################################################################
+
+
+class ParquetTileIterator:
+    """
+    Iterate over tiles of a Parquet dataset, reading the next tiles in the
+    background.
+
+    Calling `from_parquet()` once per tile builds a new dataset for each
+    tile, listing again all the files and partitions. Instead, this class
+    discovers the dataset once and evaluates only the filter of each tile.
+
+    The tiles are read by a thread and stored in a queue holding at most
+    `prefetch` tiles, so that reading the next tiles overlaps with the
+    processing of the current one, while bounding the memory used.
+
+    E.g.,
+    ```
+    tiles = hparque.ParquetTileIterator(
+        file_name,
+        [[("year", "==", 2020)], [("year", "==", 2021)]],
+        columns=["asset_id", "close"],
+    )
+    for tile in tiles:
+        ...
+    _LOG.info("%s", tiles.get_stats())
+    ```
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        filters: List[Optional[List[Any]]],
+        *,
+        columns: Optional[List[str]] = None,
+        prefetch: int = 1,
+        log_level: int = logging.DEBUG,
+        aws_profile: Optional[str] = None,
+    ) -> None:
+        """
+        Constructor.
+
+        :param file_name: as in `from_parquet()`
+        :param filters: one filter per tile, in the format accepted by
+            `from_parquet()`. `None` or an empty filter selects all the data
+        :param columns: as in `from_parquet()`
+        :param prefetch: max number of tiles read ahead in the background;
+            0 reads each tile only when requested, without a thread
+        :param log_level: level to log the stats at the end of an iteration
+        """
+        hdbg.dassert_isinstance(filters, list)
+        hdbg.dassert_lte(0, prefetch)
+        self._filters = filters
+        self._prefetch = prefetch
+        self._log_level = log_level
+        file_name, filesystem = _get_pyarrow_file_name_and_filesystem(
+            file_name, aws_profile
+        )
+        with htimer.TimedScope(
+            logging.DEBUG, f"# Discovering Parquet dataset '{file_name}'"
+        ):
+            # Use the same dataset as `from_parquet()` so that the tiles are
+            # the same as the ones returned by `from_parquet()`.
+            self._dataset = _get_dataset(file_name, filesystem)
+        self._columns, self._pandas_metadata = _get_columns_to_read(
+            self._dataset, columns
+        )
+        self._stats: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        # Time spent waiting for a tile to be read.
+        io_wait_timer = htimer.Timer(start_on_creation=False)
+        # Time spent by the caller processing a tile.
+        compute_timer = htimer.Timer(start_on_creation=False)
+        self._stats = {"num_tiles": 0, "read_time": 0.0}
+        if self._prefetch == 0:
+            tiles = self._read_tiles()
+        else:
+            tiles = self._read_tiles_in_background()
+        try:
+            while True:
+                io_wait_timer.resume()
+                tile = next(tiles, None)
+                io_wait_timer.stop()
+                if tile is None:
+                    break
+                self._stats["num_tiles"] += 1
+                compute_timer.resume()
+                yield tile
+                compute_timer.stop()
+        finally:
+            # Stop reading also when the caller doesn't consume all the tiles.
+            tiles.close()
+        self._stats["io_wait_time"] = io_wait_timer.get_total_elapsed()
+        self._stats["compute_time"] = compute_timer.get_total_elapsed()
+        _LOG.log(
+            self._log_level,
+            "Read %s tiles: read_time=%.3fs io_wait_time=%.3fs "
+            "compute_time=%.3fs",
+            self._stats["num_tiles"],
+            self._stats["read_time"],
+            self._stats["io_wait_time"],
+            self._stats["compute_time"],
+        )
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Return the stats of the last complete iteration.
+
+        - `read_time`: time spent reading the tiles
+        - `io_wait_time`: time the caller waited for a tile to be read
+        - `compute_time`: time the caller spent processing the tiles
+
+        With prefetching, `io_wait_time` is smaller than `read_time` by the
+        amount of reading overlapped with `compute_time`.
+        """
+        return self._stats.copy()
+
+    # /////////////////////////////////////////////////////////////////////////
+
+    def _read_tile(self, filter_: Optional[List[Any]]) -> pd.DataFrame:
+        with htimer.TimedScope(logging.DEBUG, "# Reading tile") as ts:
+            table = _read_table(
+                self._dataset, self._columns, self._pandas_metadata, filter_
+            )
+            df = table.to_pandas()
+        self._stats["read_time"] += ts.elapsed_time
+        _LOG.debug("df.shape=%s", str(df.shape))
+        return df
+
+    def _read_tiles(self) -> Iterator[pd.DataFrame]:
+        for filter_ in self._filters:
+            yield self._read_tile(filter_)
+
+    def _read_tiles_in_background(self) -> Iterator[pd.DataFrame]:
+        """
+        Read the tiles in a thread, yielding them as they become available.
+        """
+        # The thread puts the tiles in the queue, followed by `None` when done
+        # or by the exception raised while reading.
+        queue_: queue.Queue = queue.Queue(maxsize=self._prefetch)
+        stop_event = threading.Event()
+
+        def _put(item: Any) -> None:
+            # Wait for room in the queue, unless the caller stopped iterating.
+            while not stop_event.is_set():
+                try:
+                    queue_.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def _read() -> None:
+            try:
+                for tile in self._read_tiles():
+                    if stop_event.is_set():
+                        return
+                    _put(tile)
+            except Exception as e:  # pylint: disable=broad-except
+                _put(e)
+                return
+            _put(None)
+
+        thread = threading.Thread(target=_read, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = queue_.get()
+                if isinstance(item, Exception):
+                    raise item
+                if item is None:
+                    break
+                yield item
+        finally:
+            stop_event.set()
+            thread.join()
+
+
 # #############################################################################
 
 
@@ -193,6 +582,7 @@ def yield_parquet_tiles_by_year(
     *,
     asset_ids: Optional[List[int]] = None,
     asset_id_col: str = "asset_id",
+    prefetch: int = 1,
 ) -> Iterator[pd.DataFrame]:
     """
     Yield Parquet data in tiles up to one year in length.
@@ -201,6 +591,7 @@ def yield_parquet_tiles_by_year(
     :param start_date: first date to load; day is ignored
     :param end_date: last date to load; day is ignored
     :param cols: if an `int` is supplied, it is cast to a string before reading
+    :param prefetch: as in `ParquetTileIterator`
     :return: a generator of `from_parquet()` dataframes
     """
     time_filters = build_year_month_filter(start_date, end_date)
@@ -213,6 +604,7 @@ def yield_parquet_tiles_by_year(
     if asset_ids is None:
         asset_ids = []
     asset_id_filter = build_asset_id_filter(asset_ids, asset_id_col)
+    filters = []
     for time_filter in time_filters:
         if asset_id_filter:
             combined_filter = [
@@ -220,21 +612,29 @@ def yield_parquet_tiles_by_year(
             ]
         else:
             combined_filter = time_filter
-        tile = from_parquet(
-            file_name,
-            columns=columns,
-            filters=combined_filter,
-        )
-        yield tile
+        filters.append(combined_filter)
+    tiles = ParquetTileIterator(
+        file_name, filters, columns=columns, prefetch=prefetch
+    )
+    yield from tiles
 
 
 def build_asset_id_filter(
     asset_ids: List[int],
     asset_id_col: str,
-) -> List[List[Tuple[str, str, int]]]:
-    filters = []
-    for asset_id in asset_ids:
-        filters.append([(asset_id_col, "==", asset_id)])
+) -> List[List[Tuple[str, str, List[int]]]]:
+    """
+    Build a Parquet filter selecting `asset_ids`.
+
+    E.g., `[[("asset_id", "in", [101, 202])]]`, where the asset ids are
+    selected with a single `isin` test instead of ORing one filter per asset.
+
+    :return: a list with one AND filter, or an empty list if there are no
+        asset ids
+    """
+    if not asset_ids:
+        return []
+    filters = [[(asset_id_col, "in", list(asset_ids))]]
     return filters
 
 
@@ -245,12 +645,15 @@ def yield_parquet_tiles_by_assets(
     asset_id_col: str,
     asset_batch_size: int,
     cols: Optional[List[Union[int, str]]],
+    *,
+    prefetch: int = 1,
 ) -> Iterator[pd.DataFrame]:
     """
     Yield Parquet data in tiles batched by asset ids.
 
     :param file_name: as in `from_parquet()`
     :param cols: if an `int` is supplied, it is cast to a string before reading
+    :param prefetch: as in `ParquetTileIterator`
     :return: a generator of `from_parquet()` dataframes
     """
     hdbg.dassert_isinstance(asset_id_col, str)
@@ -262,15 +665,11 @@ def yield_parquet_tiles_by_assets(
     columns: Optional[List[str]] = None
     if cols:
         columns = [str(col) for col in cols]
-    for batch in tqdm(batches):
-        _LOG.debug("assets=%s", batch)
-        filter_ = build_asset_id_filter(batch, asset_id_col)
-        tile = from_parquet(
-            file_name,
-            columns=columns,
-            filters=filter_,
-        )
-        yield tile
+    filters = [build_asset_id_filter(batch, asset_id_col) for batch in batches]
+    tiles = ParquetTileIterator(
+        file_name, filters, columns=columns, prefetch=prefetch
+    )
+    yield from tqdm(tiles)
 
 
 def build_year_month_filter(
@@ -566,6 +965,110 @@ def get_parquet_filters_from_timestamp_interval(
     return or_and_filter
 
 
+def _get_filter_col_names(filters: Optional[List[Any]]) -> List[str]:
+    """
+    Return the names of the columns used in filters in the `from_parquet()`
+    format.
+    """
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        # Convert an AND filter into an OR-AND filter.
+        filters = [filters]
+    col_names = sorted(
+        {col for and_filter in filters for col, _, _ in and_filter}
+    )
+    return col_names
+
+
+def get_last_timestamp(
+    file_name: str,
+    filters: Optional[List[Any]],
+    start_ts: Optional[pd.Timestamp],
+    end_ts: Optional[pd.Timestamp],
+    *,
+    ts_col_name: Optional[str] = None,
+    aws_profile: Optional[str] = None,
+) -> Optional[pd.Timestamp]:
+    """
+    Return the last timestamp in `[start_ts, end_ts]` of the data selected by
+    `filters`, using the Parquet statistics.
+
+    The max timestamp of a row group is read from its statistics, so that
+    only the row groups straddling `end_ts` are actually read. When `filters`
+    involve columns that are not partition columns, the statistics can't
+    tell which rows are selected and the timestamp column is read.
+
+    :param filters: as in `from_parquet()`
+    :param start_ts, end_ts: boundaries of the interval. `None` means no bound
+    :param ts_col_name: name of the timestamp column. `None` means the index
+        of the saved dataframe
+    :return: the last timestamp or `None` if there is no data
+    """
+    file_name, filesystem = _get_pyarrow_file_name_and_filesystem(
+        file_name, aws_profile
+    )
+    dataset = _get_dataset(file_name, filesystem)
+    if ts_col_name is None:
+        index_columns = dataset.schema.pandas_metadata["index_columns"]
+        hdbg.dassert_eq(len(index_columns), 1)
+        ts_col_name = index_columns[0]
+        hdbg.dassert_isinstance(ts_col_name, str)
+    hdbg.dassert_in(ts_col_name, dataset.schema.names)
+    # Build the filter on the timestamps.
+    ts_type = dataset.schema.field(ts_col_name).type
+    hdbg.dassert(pa.types.is_timestamp(ts_type), "Invalid type=%s", ts_type)
+    ts_filter = None
+    if start_ts is not None:
+        ts_filter = pads.field(ts_col_name) >= pa.scalar(start_ts, type=ts_type)
+    if end_ts is not None:
+        end_ts_filter = pads.field(ts_col_name) <= pa.scalar(end_ts, type=ts_type)
+        ts_filter = (
+            end_ts_filter if ts_filter is None else ts_filter & end_ts_filter
+        )
+    if end_ts is not None and ts_type.tz is None and end_ts.tz is not None:
+        # Compare naive statistics with `end_ts` as naive UTC timestamp, like
+        # `pa.scalar()` does.
+        end_ts = end_ts.tz_convert("UTC").tz_localize(None)
+    filter_ = ts_filter
+    if filters:
+        filter_ = _filters_to_expression(filters)
+        if ts_filter is not None:
+            filter_ = filter_ & ts_filter
+    #
+    partition_col_names = dataset.partitioning.schema.names
+    if not set(_get_filter_col_names(filters)).issubset(partition_col_names):
+        # The rows are selected by data columns, so read the timestamps.
+        table = dataset.to_table(columns=[ts_col_name], filter=filter_)
+        last_timestamp = pc.max(table[ts_col_name]).as_py()
+        if last_timestamp is not None:
+            last_timestamp = pd.Timestamp(last_timestamp)
+        return last_timestamp
+    # The partitions select the rows, so use the statistics of the row groups.
+    last_timestamp = None
+    for fragment in dataset.get_fragments(filter=filter_):
+        # Skip the row groups outside `[start_ts, end_ts]` using their
+        # statistics.
+        row_group_fragments = fragment.split_by_row_group(filter=ts_filter)
+        for row_group_fragment in row_group_fragments:
+            statistics = row_group_fragment.row_groups[0].statistics
+            stats = statistics.get(ts_col_name)
+            if stats is not None and (end_ts is None or stats["max"] <= end_ts):
+                # All the rows are before `end_ts`, so the max is the last one.
+                max_ts = pd.Timestamp(stats["max"])
+            else:
+                table = row_group_fragment.to_table(
+                    columns=[ts_col_name], filter=ts_filter
+                )
+                max_ts = pc.max(table[ts_col_name]).as_py()
+                if max_ts is None:
+                    continue
+                max_ts = pd.Timestamp(max_ts)
+            if last_timestamp is None or last_timestamp < max_ts:
+                last_timestamp = max_ts
+    return last_timestamp
+
+
 def add_date_partition_columns(
     df: pd.DataFrame, partition_mode: str
 ) -> Tuple[pd.DataFrame, List[str]]:
@@ -617,6 +1120,7 @@ def to_partitioned_parquet(
     *,
     partition_filename: Union[Callable, None] = lambda x: "data.parquet",
     aws_profile: hs3.AwsProfile = None,
+    row_group_size: Optional[int] = None,
 ) -> None:
     """
     Save the given dataframe as Parquet file partitioned along the given
@@ -627,6 +1131,8 @@ def to_partitioned_parquet(
     :param dst_dir: location of partitioned dataset
     :param partition_filename: a callable to override standard partition names. None for `uuid`.
     :param aws_profile: the name of an AWS profile or a s3fs filesystem
+    :param row_group_size: max number of rows of each row group. `None` for
+        the Pyarrow default
 
     E.g., in case of partition using `date`, the file layout looks like:
     ```
@@ -671,22 +1177,175 @@ def to_partitioned_parquet(
         # TODO(gp): add this logic to hparquet.to_parquet as a possible option.
         _LOG.debug(hprint.to_str("partition_columns dst_dir"))
         hdbg.dassert_is_subset(partition_columns, df.columns)
+        kwargs = {}
+        if row_group_size is not None:
+            kwargs["row_group_size"] = row_group_size
         pq.write_to_dataset(
             table,
             dst_dir,
             partition_cols=partition_columns,
             partition_filename_cb=partition_filename,
             filesystem=filesystem,
+            **kwargs,
+        )
+
+
+class _MemoryBudget:
+    """
+    Limit the memory used by tasks running concurrently.
+    """
+
+    def __init__(self, max_memory_in_bytes: Optional[int]) -> None:
+        """
+        Constructor.
+
+        :param max_memory_in_bytes: max memory used by the tasks running at
+            the same time; `None` for no limit
+        """
+        self._max_memory_in_bytes = max_memory_in_bytes
+        self._memory_in_bytes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, memory_in_bytes: int) -> None:
+        """
+        Wait until `memory_in_bytes` are available.
+
+        A task requiring more than the max memory runs only when no other
+        task is running.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._max_memory_in_bytes is None
+                or self._memory_in_bytes == 0
+                or self._memory_in_bytes + memory_in_bytes
+                <= self._max_memory_in_bytes
+            )
+            self._memory_in_bytes += memory_in_bytes
+
+    def release(self, memory_in_bytes: int) -> None:
+        with self._condition:
+            self._memory_in_bytes -= memory_in_bytes
+            self._condition.notify_all()
+
+
+def _write_row_groups(
+    writer: pq.ParquetWriter, tables: Iterator[pa.Table], row_group_size: int
+) -> None:
+    """
+    Write `tables` in row groups with `row_group_size` rows, except the last.
+    """
+    buffer: List[pa.Table] = []
+    num_rows = 0
+    for table in tables:
+        # Tables from different files can differ in the metadata.
+        buffer.append(table.replace_schema_metadata(writer.schema.metadata))
+        num_rows += table.num_rows
+        if num_rows >= row_group_size:
+            table = pa.concat_tables(buffer)
+            num_rows_to_write = (num_rows // row_group_size) * row_group_size
+            writer.write_table(
+                table.slice(0, num_rows_to_write), row_group_size=row_group_size
+            )
+            buffer = [table.slice(num_rows_to_write)]
+            num_rows -= num_rows_to_write
+    if num_rows > 0:
+        writer.write_table(
+            pa.concat_tables(buffer), row_group_size=row_group_size
         )
 
 
-# TODO(Nikola): Currently indirectly tested in
-#  `im_v2/ccxt/data/extract/test/test_download_historical_data.py`.
+def _merge_pq_folder(
+    folder: str,
+    folder_files: List[str],
+    filesystem: Any,
+    file_name: str,
+    sort_col: Optional[str],
+    row_group_size: int,
+) -> None:
+    """
+    Merge the Parquet files in `folder` into a single file `file_name`.
+
+    See `list_and_merge_pq_files()` for the params.
+    """
+    _LOG.debug("Merging %s files in '%s'", len(folder_files), folder)
+    # Read each file separately, since reading the folder as a dataset would
+    # add the partition columns to the data.
+    with filesystem.open(folder_files[0], "rb") as f:
+        schema = pq.read_schema(f)
+
+    def _read_tables() -> Iterator[pa.Table]:
+        for folder_file in folder_files:
+            with filesystem.open(folder_file, "rb") as f:
+                pq_file = pq.ParquetFile(f)
+                for batch in pq_file.iter_batches(batch_size=row_group_size):
+                    yield pa.Table.from_batches([batch])
+
+    tables = _read_tables()
+    if sort_col is not None:
+        hdbg.dassert_in(sort_col, schema.names)
+        # Sorting requires loading all the data of the folder.
+        table = pa.concat_tables(
+            table.replace_schema_metadata(schema.metadata) for table in tables
+        )
+        tables = iter([table.sort_by(sort_col)])
+    # Write the merged data to a file that readers ignore, given the leading
+    # ".", until it is complete.
+    tmp_file_name = f".{file_name}.tmp"
+    with pq.ParquetWriter(
+        f"{folder}/{tmp_file_name}", schema, filesystem=filesystem
+    ) as writer:
+        _write_row_groups(writer, tables, row_group_size)
+    # Record the files to replace, so that an interrupted merge can be
+    # completed by the next call.
+    manifest = {
+        "file_name": file_name,
+        "tmp_file_name": tmp_file_name,
+        "superseded_file_names": [
+            os.path.basename(folder_file) for folder_file in folder_files
+        ],
+    }
+    manifest_path = f"{folder}/{_MERGE_MANIFEST_FILE_NAME}"
+    filesystem.pipe(f"{manifest_path}.tmp", json.dumps(manifest).encode())
+    filesystem.mv(f"{manifest_path}.tmp", manifest_path)
+    _complete_pq_folder_merge(folder, filesystem)
+
+
+def _complete_pq_folder_merge(folder: str, filesystem: Any) -> None:
+    """
+    Replace the files of `folder` superseded by the merged file, as listed by
+    the manifest of the folder.
+
+    This is also used to complete a merge that was interrupted after writing
+    the manifest.
+    """
+    manifest_path = f"{folder}/{_MERGE_MANIFEST_FILE_NAME}"
+    manifest = json.loads(filesystem.cat(manifest_path))
+    file_name = manifest["file_name"]
+    tmp_path = f"{folder}/{manifest['tmp_file_name']}"
+    if filesystem.exists(tmp_path):
+        filesystem.mv(tmp_path, f"{folder}/{file_name}")
+    superseded_paths = [
+        f"{folder}/{name}"
+        for name in manifest["superseded_file_names"]
+        if name != file_name
+    ]
+    superseded_paths = [
+        path for path in superseded_paths if filesystem.exists(path)
+    ]
+    if superseded_paths:
+        filesystem.rm(superseded_paths)
+    filesystem.rm(manifest_path)
+
+
 def list_and_merge_pq_files(
     root_dir: str,
     *,
     file_name: str = "data.parquet",
     aws_profile: hs3.AwsProfile = None,
+    sort_col: Optional[str] = None,
+    row_group_size: int = 100000,
+    num_threads: int = 1,
+    max_memory_in_bytes: Optional[int] = None,
 ) -> None:
     """
     Merge all files of the Parquet dataset.
@@ -714,33 +1373,94 @@ def list_and_merge_pq_files(
                     data.parquet
     ```
 
+    The files of each folder are streamed into a hidden file. Once it is
+    complete, a manifest listing the files it supersedes is written in the
+    folder and then the merged file is renamed and the superseded files are
+    removed. A merge interrupted after writing the manifest is completed by
+    the next call.
+    Writing the manifest is the atomic step of the merge, also on S3: from
+    then on, `from_parquet()` and `ParquetTileIterator` read the merged file
+    instead of the superseded ones, so that they never see duplicated rows.
+    The folders are merged in parallel using `num_threads` threads.
+
     :param root_dir: root directory of Parquet dataset
     :param file_name: name of the single resulting file
     :param aws_profile: the name of an AWS profile or a s3fs filesystem
+    :param sort_col: column to sort the merged data by (e.g., the `timestamp`
+        index); `None` to keep the order of the files. Sorting loads all the
+        data of a folder in memory, instead of streaming it by row groups
+    :param row_group_size: number of rows of each row group of the merged
+        files
+    :param num_threads: number of folders merged at the same time
+    :param max_memory_in_bytes: cap on the total size of the files of the
+        folders merged at the same time, used as proxy of the memory needed;
+        `None` for no cap
     """
+    hdbg.dassert_lte(1, row_group_size)
+    hdbg.dassert_lte(1, num_threads)
     if aws_profile is not None:
         filesystem = hs3.get_s3fs(aws_profile)
     else:
-        raise NotImplementedError("Local filesystem is not implemented!")
+        filesystem = fsspec.filesystem("file")
+    # Complete the merges that were interrupted.
+    manifest_paths = filesystem.glob(f"{root_dir}/**/{_MERGE_MANIFEST_FILE_NAME}")
+    for manifest_path in manifest_paths:
+        _LOG.warning("Completing the interrupted merge of '%s'", manifest_path)
+        _complete_pq_folder_merge(manifest_path.rsplit("/", 1)[0], filesystem)
     # Get full paths to each Parquet file inside root dir.
-    parquet_files = filesystem.glob(f"{root_dir}/**.parquet")
+    parquet_files = filesystem.glob(f"{root_dir}/**/*.parquet")
     _LOG.debug("Parquet files: '%s'", parquet_files)
     # Get paths only to the lowest level of dataset folders.
-    dataset_folders = set(f.rsplit("/", 1)[0] for f in parquet_files)
+    dataset_folders = sorted(set(f.rsplit("/", 1)[0] for f in parquet_files))
+    # Find the folders to merge.
+    folder_to_files = {}
+    folder_to_size = {}
     for folder in dataset_folders:
         # Get files per folder and merge if there are multiple ones.
-        folder_files = filesystem.ls(folder)
+        folder_files = [
+            file_info
+            for file_info in filesystem.ls(folder, detail=True)
+            if not os.path.basename(file_info["name"]).startswith((".", "_"))
+        ]
         hdbg.dassert_ne(
             len(folder_files), 0, msg=f"Empty folder `{folder}` detected!"
         )
-        if len(folder_files) == 1 and folder_files[0].endswith("/data.parquet"):
-            # If there is already single `data.parquet` file, no action is required.
+        if len(folder_files) == 1 and folder_files[0]["name"].endswith(
+            "/" + file_name
+        ):
+            # If there is already a single `data.parquet` file, no action is
+            # required.
             continue
-        # Read all files in target folder.
-        data = pq.ParquetDataset(folder_files, filesystem=filesystem).read()
-        # Remove all old files and write new, merged one.
-        filesystem.rm(folder, recursive=True)
-        pq.write_table(data, folder + "/" + file_name, filesystem=filesystem)
+        folder_to_files[folder] = [
+            file_info["name"] for file_info in folder_files
+        ]
+        folder_to_size[folder] = sum(
+            file_info["size"] for file_info in folder_files
+        )
+    _LOG.debug("Merging %s folders", len(folder_to_files))
+    memory_budget = _MemoryBudget(max_memory_in_bytes)
+
+    def _merge(folder: str) -> None:
+        memory_budget.acquire(folder_to_size[folder])
+        try:
+            _merge_pq_folder(
+                folder,
+                folder_to_files[folder],
+                filesystem,
+                file_name,
+                sort_col,
+                row_group_size,
+            )
+        finally:
+            memory_budget.release(folder_to_size[folder])
+
+    if num_threads == 1:
+        for folder in folder_to_files:
+            _merge(folder)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+            # Consume the results to raise the exceptions, if any.
+            list(executor.map(_merge, folder_to_files))
 
 
 def maybe_cast_to_int(string: str) -> Union[str, int]:
@@ -517,9 +517,14 @@ def execute_query_to_df(
     use_timer: bool = False,
     profile: bool = False,
     verbose: bool = False,
+    *,
+    params: Optional[Dict[str, Any]] = None,
 ) -> pd.DataFrame:
     """
     Execute a query.
+
+    :param params: values to bind to the `%(name)s` placeholders of the
+        query, e.g., to pass a list as a Postgres array with `= ANY(%(name)s)`
     """
     if False:
         # Ask the user before executing a query.
@@ -540,11 +545,11 @@ def execute_query_to_df(
         idx = htimer.dtimer_start(0, "Sql time")
     cursor = connection.cursor()
     try:
-        df = pd.read_sql_query(query, connection)
+        df = pd.read_sql_query(query, connection, params=params)
     except psycop.OperationalError:
         # Catch error and execute query directly to print error.
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
         except psycop.Error as e:
             print(e.pgerror)
             raise e
@@ -2,6 +2,8 @@ import datetime
 import logging
 import os
 import random
+import threading
+import unittest.mock as umock
 from typing import Any, List, Optional, Tuple
 
 import pandas as pd
@@ -208,7 +210,6 @@ class TestParquet1(hunitest.TestCase):
 
 
 class TestPartitionedParquet1(hunitest.TestCase):
-
     # From https://arrow.apache.org/docs/python/dataset.html#reading-partitioned-data
     # A dataset can exploit a nested structure, where the sub-dir names hold
     # information about which subset of the data is stored in that dir
@@ -689,6 +690,90 @@ class TestGetParquetFiltersFromTimestampInterval1(hunitest.TestCase):
 # #############################################################################
 
 
+class TestGetLastTimestamp1(hunitest.TestCase):
+    def write_data(self) -> Tuple[pd.DataFrame, str]:
+        """
+        Save minute data for 2 assets in [2021-12-30, 2022-01-02) partitioned
+        by asset and year / month.
+        """
+        idx = pd.date_range(
+            "2021-12-30", "2022-01-02", freq="T", closed="left", tz="UTC"
+        )
+        idx.name = "timestamp"
+        dfs = []
+        for asset_id, num_rows in [(101, len(idx)), (202, len(idx) - 100)]:
+            df = pd.DataFrame(
+                {"asset_id": asset_id, "val1": range(num_rows)},
+                index=idx[:num_rows],
+            )
+            dfs.append(df)
+        df = pd.concat(dfs)
+        df, partition_columns = hparque.add_date_partition_columns(
+            df, "by_year_month"
+        )
+        dir_name = os.path.join(self.get_scratch_space(), "data")
+        hparque.to_partitioned_parquet(
+            df, ["asset_id"] + partition_columns, dir_name
+        )
+        return df, dir_name
+
+    def test_partition_filters1(self) -> None:
+        """
+        Check the last timestamp for filters on the partition columns.
+        """
+        df, dir_name = self.write_data()
+        intervals = [
+            (None, None),
+            (None, pd.Timestamp("2021-12-31 10:03:30+00:00")),
+            (pd.Timestamp("2022-01-01 19:00:00-05:00"), None),
+            (
+                pd.Timestamp("2021-12-31 12:00:00+00:00"),
+                pd.Timestamp("2022-01-01 12:00:00+00:00"),
+            ),
+            (pd.Timestamp("2022-02-01 00:00:00+00:00"), None),
+        ]
+        for start_ts, end_ts in intervals:
+            for asset_id in [101, 202]:
+                filters = hparque.get_parquet_filters_from_timestamp_interval(
+                    "by_year_month",
+                    start_ts,
+                    end_ts,
+                    additional_filters=[("asset_id", "in", [asset_id])],
+                )
+                actual = hparque.get_last_timestamp(
+                    dir_name, filters, start_ts, end_ts
+                )
+                expected = self._get_last_timestamp(
+                    df[df["asset_id"] == asset_id], start_ts, end_ts
+                )
+                self.assertEqual(actual, expected)
+
+    def test_data_filters1(self) -> None:
+        """
+        Check the last timestamp for filters on data columns.
+        """
+        df, dir_name = self.write_data()
+        filters = [("val1", "<", 1000)]
+        actual = hparque.get_last_timestamp(dir_name, filters, None, None)
+        expected = self._get_last_timestamp(df[df["val1"] < 1000], None, None)
+        self.assertEqual(actual, expected)
+
+    @staticmethod
+    def _get_last_timestamp(
+        df: pd.DataFrame,
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> Optional[pd.Timestamp]:
+        if start_ts is not None:
+            df = df[df.index >= start_ts]
+        if end_ts is not None:
+            df = df[df.index <= end_ts]
+        return None if df.empty else df.index.max()
+
+
+# #############################################################################
+
+
 class TestAddDatePartitionColumns(hunitest.TestCase):
     def add_date_partition_columns_helper(
         self, partition_mode: str, expected: str
@@ -827,3 +912,331 @@ class TestToPartitionedDataset(hunitest.TestCase):
         val1 - val2=['void_column']
         """
         self.assert_equal(act, exp, fuzzy_match=True)
+
+
+# #############################################################################
+
+
+class TestParquetTileIterator1(hunitest.TestCase):
+    def write_tiles(self) -> str:
+        """
+        Save daily data for 3 assets in 2020-2021 partitioned by asset and
+        year / month.
+        """
+        idx = pd.date_range(
+            "2020-01-01",
+            "2021-12-31",
+            freq="D",
+            tz="America/New_York",
+            name="end_time",
+        )
+        dfs = []
+        for asset_id in [101, 202, 303]:
+            df = pd.DataFrame(
+                {"asset_id": asset_id, "val1": range(len(idx)), "val2": 1.0},
+                index=idx,
+            )
+            dfs.append(df)
+        df = pd.concat(dfs)
+        df, partition_columns = hparque.add_date_partition_columns(
+            df, "by_year_month"
+        )
+        dir_name = os.path.join(self.get_scratch_space(), "data")
+        hparque.to_partitioned_parquet(
+            df, ["asset_id"] + partition_columns, dir_name
+        )
+        return dir_name
+
+    def test_yield_parquet_tiles_by_year1(self) -> None:
+        """
+        Check that the tiles are the same as the ones from `from_parquet()`.
+        """
+        dir_name = self.write_tiles()
+        start_date = datetime.date(2020, 3, 1)
+        end_date = datetime.date(2021, 2, 1)
+        columns = ["asset_id", "val1"]
+        tiles = hparque.yield_parquet_tiles_by_year(
+            dir_name, start_date, end_date, columns, asset_ids=[101, 303]
+        )
+        time_filters = hparque.build_year_month_filter(start_date, end_date)
+        for tile, time_filter in zip(tiles, time_filters):
+            expected = hparque.from_parquet(
+                dir_name,
+                columns=columns,
+                filters=[
+                    [("asset_id", "==", 101)] + time_filter,
+                    [("asset_id", "==", 303)] + time_filter,
+                ],
+            )
+            pd.testing.assert_frame_equal(tile, expected)
+            self.assertEqual(tile.index.name, "end_time")
+            self.assertEqual(sorted(tile["asset_id"].unique()), [101, 303])
+
+    def test_filters1(self) -> None:
+        """
+        Check that the tiles are the same as `from_parquet()` with filters on
+        partition and data columns.
+        """
+        dir_name = self.write_tiles()
+        filters = [
+            [("asset_id", "in", [101, 303]), ("val1", "<", 10)],
+            [
+                [("year", "==", 2021), ("val1", ">=", 700)],
+                [("asset_id", "not in", [101, 303]), ("month", "=", 2)],
+            ],
+            [("val1", "!=", 0), ("val1", "<=", 2)],
+        ]
+        tiles = hparque.ParquetTileIterator(dir_name, filters, prefetch=0)
+        for tile, filter_ in zip(tiles, filters):
+            expected = hparque.from_parquet(dir_name, filters=filter_)
+            self.assertGreater(len(tile), 0)
+            pd.testing.assert_frame_equal(tile, expected)
+
+    def test_prefetch1(self) -> None:
+        """
+        Check that reading in the background returns the same tiles.
+        """
+        dir_name = self.write_tiles()
+        filters = [[("year", "==", 2020)], None, [("asset_id", "in", [202])]]
+        tiles = hparque.ParquetTileIterator(dir_name, filters, prefetch=2)
+        actual = list(tiles)
+        expected = list(
+            hparque.ParquetTileIterator(dir_name, filters, prefetch=0)
+        )
+        self.assertEqual(len(actual), 3)
+        for actual_tile, expected_tile in zip(actual, expected):
+            pd.testing.assert_frame_equal(actual_tile, expected_tile)
+        stats = tiles.get_stats()
+        self.assertEqual(stats["num_tiles"], 3)
+        self.assertEqual(
+            sorted(stats.keys()),
+            ["compute_time", "io_wait_time", "num_tiles", "read_time"],
+        )
+
+    def test_prefetch2(self) -> None:
+        """
+        Check that the background thread stops when the caller stops
+        iterating.
+        """
+        dir_name = self.write_tiles()
+        tiles = hparque.ParquetTileIterator(dir_name, [None] * 5, prefetch=1)
+        num_threads = threading.active_count()
+        for _ in tiles:
+            break
+        self.assertEqual(threading.active_count(), num_threads)
+
+    def test_error1(self) -> None:
+        """
+        Check that an error reading a tile is raised to the caller.
+        """
+        dir_name = self.write_tiles()
+        tiles = hparque.ParquetTileIterator(
+            dir_name, [None, [("void_column", "==", 1)]]
+        )
+        with self.assertRaises(pyarrow.ArrowInvalid):
+            list(tiles)
+
+
+# #############################################################################
+
+
+class TestListAndMergePqFiles1(hunitest.TestCase):
+    def write_fragmented_dataset(self) -> Tuple[str, pd.DataFrame]:
+        """
+        Save minute data for 2 currency pairs in Jan-Feb 2022 in shuffled
+        chunks, so that each leaf folder contains multiple files.
+        """
+        idx = pd.date_range(
+            "2022-01-31", "2022-02-01 23:59", freq="T", tz="UTC", name="timestamp"
+        )
+        dfs = []
+        for currency_pair in ["ADA_USDT", "BTC_USDT"]:
+            df = pd.DataFrame(
+                {"close": range(len(idx)), "currency_pair": currency_pair},
+                index=idx,
+            )
+            dfs.append(df)
+        df = pd.concat(dfs)
+        df, partition_columns = hparque.add_date_partition_columns(
+            df, "by_year_month"
+        )
+        dir_name = os.path.join(self.get_scratch_space(), "data")
+        df_shuffled = df.sample(frac=1, random_state=0)
+        num_chunks = 5
+        chunk_size = len(df) // num_chunks + 1
+        for i in range(num_chunks):
+            hparque.to_partitioned_parquet(
+                df_shuffled.iloc[i * chunk_size : (i + 1) * chunk_size],
+                ["currency_pair"] + partition_columns,
+                dir_name,
+                partition_filename=None,
+            )
+        return dir_name, df
+
+    def check_merged_dataset(self, dir_name: str) -> None:
+        """
+        Check that each leaf folder contains only `data.parquet`.
+        """
+        dir_signature = hunitest.get_dir_signature(
+            dir_name, include_file_content=False, remove_dir_name=True
+        )
+        exp = r"""
+        # Dir structure
+        .
+        currency_pair=ADA_USDT
+        currency_pair=ADA_USDT/year=2022
+        currency_pair=ADA_USDT/year=2022/month=1
+        currency_pair=ADA_USDT/year=2022/month=1/data.parquet
+        currency_pair=ADA_USDT/year=2022/month=2
+        currency_pair=ADA_USDT/year=2022/month=2/data.parquet
+        currency_pair=BTC_USDT
+        currency_pair=BTC_USDT/year=2022
+        currency_pair=BTC_USDT/year=2022/month=1
+        currency_pair=BTC_USDT/year=2022/month=1/data.parquet
+        currency_pair=BTC_USDT/year=2022/month=2
+        currency_pair=BTC_USDT/year=2022/month=2/data.parquet"""
+        self.assert_equal(dir_signature, exp, fuzzy_match=True)
+
+    def test_merge1(self) -> None:
+        """
+        Check that the merged files are sorted and have the requested row
+        groups.
+        """
+        dir_name, df = self.write_fragmented_dataset()
+        hparque.list_and_merge_pq_files(
+            dir_name,
+            sort_col="timestamp",
+            row_group_size=500,
+            num_threads=2,
+            max_memory_in_bytes=10000,
+        )
+        self.check_merged_dataset(dir_name)
+        file_name = os.path.join(
+            dir_name, "currency_pair=ADA_USDT/year=2022/month=2/data.parquet"
+        )
+        metadata = parquet.ParquetFile(file_name).metadata
+        row_group_sizes = [
+            metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+        ]
+        self.assertEqual(row_group_sizes, [500, 500, 440])
+        # The partition columns are not stored in the files.
+        self.assertEqual(
+            parquet.read_schema(file_name).names, ["close", "timestamp"]
+        )
+        # Check that the data of each currency pair is sorted.
+        actual = hparque.from_parquet(dir_name)
+        for currency_pair in ["ADA_USDT", "BTC_USDT"]:
+            actual_tmp = actual[actual["currency_pair"] == currency_pair]
+            expected_tmp = df[df["currency_pair"] == currency_pair]
+            pd.testing.assert_frame_equal(
+                actual_tmp,
+                expected_tmp,
+                check_dtype=False,
+                check_categorical=False,
+            )
+
+    def test_merge2(self) -> None:
+        """
+        Check merging without sorting, including an existing `data.parquet`.
+        """
+        dir_name, df = self.write_fragmented_dataset()
+        hparque.list_and_merge_pq_files(dir_name)
+        # Add new files to a merged folder and merge again.
+        df_new = df.iloc[:10].copy()
+        df_new["close"] = -1
+        hparque.to_partitioned_parquet(
+            df_new,
+            ["currency_pair", "year", "month"],
+            dir_name,
+            partition_filename=None,
+        )
+        hparque.list_and_merge_pq_files(dir_name)
+        self.check_merged_dataset(dir_name)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), len(df) + len(df_new))
+        self.assertEqual((actual["close"] == -1).sum(), len(df_new))
+
+    def test_merge3(self) -> None:
+        """
+        Check that a merge interrupted after writing its manifest is
+        completed by the next merge.
+        """
+        dir_name, df = self.write_fragmented_dataset()
+        hparque.list_and_merge_pq_files(dir_name)
+        # Add new files to the merged folders.
+        df_new = df.copy()
+        df_new["close"] = -1
+        hparque.to_partitioned_parquet(
+            df_new,
+            ["currency_pair", "year", "month"],
+            dir_name,
+            partition_filename=None,
+        )
+        # Interrupt the merge of the first folder after writing its manifest.
+        with umock.patch.object(
+            hparque,
+            "_complete_pq_folder_merge",
+            side_effect=RuntimeError("Interrupted"),
+        ):
+            with self.assertRaises(RuntimeError):
+                hparque.list_and_merge_pq_files(dir_name)
+        folder = os.path.join(
+            dir_name, "currency_pair=ADA_USDT/year=2022/month=1"
+        )
+        file_names = os.listdir(folder)
+        self.assertIn(".data.parquet.tmp", file_names)
+        self.assertIn("_merge_manifest.json", file_names)
+        self.assertGreater(len(file_names), 3)
+        # The merged file is hidden until it is renamed.
+        expected_num_rows = len(df) + len(df_new)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), expected_num_rows)
+        # Complete the merge.
+        hparque.list_and_merge_pq_files(dir_name)
+        self.check_merged_dataset(dir_name)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), expected_num_rows)
+        self.assertEqual((actual["close"] == -1).sum(), len(df_new))
+
+    def test_merge4(self) -> None:
+        """
+        Check that reading a folder between the steps of a merge returns each
+        row once.
+        """
+        dir_name, df = self.write_fragmented_dataset()
+        hparque.list_and_merge_pq_files(dir_name)
+        # Add new files to the merged folders.
+        df_new = df.copy()
+        df_new["close"] = -1
+        hparque.to_partitioned_parquet(
+            df_new,
+            ["currency_pair", "year", "month"],
+            dir_name,
+            partition_filename=None,
+        )
+        expected_num_rows = len(df) + len(df_new)
+        # Stop the merge of each folder after writing its manifest.
+        with umock.patch.object(hparque, "_complete_pq_folder_merge"):
+            hparque.list_and_merge_pq_files(dir_name)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), expected_num_rows)
+        # Rename the merged file, without removing the superseded files, i.e.,
+        # the old `data.parquet` and the new files.
+        folder = os.path.join(
+            dir_name, "currency_pair=ADA_USDT/year=2022/month=1"
+        )
+        os.rename(
+            os.path.join(folder, ".data.parquet.tmp"),
+            os.path.join(folder, "data.parquet"),
+        )
+        self.assertGreater(len(os.listdir(folder)), 2)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), expected_num_rows)
+        tiles = hparque.ParquetTileIterator(dir_name, [None])
+        self.assertEqual(len(next(iter(tiles))), expected_num_rows)
+        # Complete the merges.
+        hparque.list_and_merge_pq_files(dir_name)
+        self.check_merged_dataset(dir_name)
+        actual = hparque.from_parquet(dir_name)
+        self.assertEqual(len(actual), expected_num_rows)
+        self.assertEqual((actual["close"] == -1).sum(), len(df_new))
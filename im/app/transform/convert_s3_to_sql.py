@@ -309,7 +309,7 @@ def _main(parser: argparse.ArgumentParser) -> None:
     imcdatrtr.convert_s3_to_sql_bulk(serial=args.serial, params_list=params_list)
     _LOG.info("Closing database connection")
     sql_writer_backend.close()
-    sql_data_loader.conn.close()
+    sql_data_loader.close()
 
 
 if __name__ == "__main__":
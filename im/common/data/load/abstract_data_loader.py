@@ -5,16 +5,23 @@ import im.common.data.load.abstract_data_loader as imcdladalo
 """
 
 import abc
-import functools
-from typing import Optional
+import collections
+import contextlib
+import logging
+import threading
+import weakref
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import psycopg2
 import psycopg2.extensions as pexten
+import psycopg2.pool as ppool
 
 import helpers.hdbg as hdbg
 import im.common.data.types as imcodatyp
 
+_LOG = logging.getLogger(__name__)
+
 
 class AbstractDataLoader(abc.ABC):
     """
@@ -117,21 +124,193 @@ class AbstractS3DataLoader(AbstractDataLoader):
         """
 
 
+# Statements looking up the ids, prepared on each connection of the pool.
+_PREPARED_STATEMENTS = {
+    "get_symbol_id": "PREPARE get_symbol_id (text) AS "
+    "SELECT id FROM Symbol WHERE code = $1",
+    "get_exchange_id": "PREPARE get_exchange_id (text) AS "
+    "SELECT id FROM Exchange WHERE name = $1",
+    "get_trade_symbol_id": "PREPARE get_trade_symbol_id (integer, integer) AS "
+    "SELECT id FROM TradeSymbol WHERE symbol_id = $1 AND exchange_id = $2",
+}
+
+# Queries loading all the ids, keyed by the corresponding prepared statement.
+_ID_QUERIES = {
+    "get_symbol_id": "SELECT code, id FROM Symbol",
+    "get_exchange_id": "SELECT name, id FROM Exchange",
+    "get_trade_symbol_id": "SELECT symbol_id, exchange_id, id FROM TradeSymbol",
+}
+
+# Bounds of the date range of the data cached when a bound is not specified.
+_MIN_TS = pd.Timestamp.min.tz_localize("UTC")
+_MAX_TS = pd.Timestamp.max.tz_localize("UTC")
+
+_CacheKey = Tuple[str, str, imcodatyp.Frequency]
+_CacheEntry = Tuple[pd.Timestamp, pd.Timestamp, pd.DataFrame]
+
+
+class _DateRangeCache:
+    """
+    Cache dataframes by key and date range, bounded by their memory size.
+
+    The date ranges cached for a key are disjoint: data for a range
+    overlapping cached ranges is merged with them, so that rows are not
+    cached twice. The least recently used dataframes are evicted first.
+    """
+
+    def __init__(self, max_num_bytes: int) -> None:
+        hdbg.dassert_lte(0, max_num_bytes)
+        self._max_num_bytes = max_num_bytes
+        self._num_bytes = 0
+        # Map (key, start_ts, end_ts) to (dataframe, number of bytes), from the
+        # least to the most recently used.
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def num_bytes(self) -> int:
+        return self._num_bytes
+
+    def get(
+        self, key: _CacheKey, start_ts: pd.Timestamp, end_ts: pd.Timestamp
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get the cached data for a range including [start_ts, end_ts], if any.
+        """
+        with self._lock:
+            for entry_key in self._entries:
+                entry_cache_key, entry_start_ts, entry_end_ts = entry_key
+                if (
+                    entry_cache_key == key
+                    and entry_start_ts <= start_ts
+                    and end_ts <= entry_end_ts
+                ):
+                    self._entries.move_to_end(entry_key)
+                    df: pd.DataFrame = self._entries[entry_key][0]
+                    return df
+        return None
+
+    def get_overlapping(
+        self, key: _CacheKey, start_ts: pd.Timestamp, end_ts: pd.Timestamp
+    ) -> List[_CacheEntry]:
+        """
+        Get the cached data for the ranges overlapping [start_ts, end_ts].
+
+        :return: (start_ts, end_ts, dataframe) for each range, sorted by time
+        """
+        with self._lock:
+            entries = [
+                (entry_start_ts, entry_end_ts, df)
+                for (
+                    entry_cache_key,
+                    entry_start_ts,
+                    entry_end_ts,
+                ), (df, _) in self._entries.items()
+                if entry_cache_key == key
+                and entry_start_ts <= end_ts
+                and start_ts <= entry_end_ts
+            ]
+        entries = sorted(entries, key=lambda entry: entry[0])
+        return entries
+
+    def put(
+        self,
+        key: _CacheKey,
+        start_ts: pd.Timestamp,
+        end_ts: pd.Timestamp,
+        df: pd.DataFrame,
+    ) -> None:
+        """
+        Cache the data for [start_ts, end_ts].
+
+        The ranges overlapping [start_ts, end_ts] are replaced, so `df` must
+        contain their data.
+        """
+        hdbg.dassert_lte(start_ts, end_ts)
+        num_bytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            # Remove the ranges merged into the new one.
+            for entry_key in list(self._entries):
+                entry_cache_key, entry_start_ts, entry_end_ts = entry_key
+                if (
+                    entry_cache_key == key
+                    and entry_start_ts <= end_ts
+                    and start_ts <= entry_end_ts
+                ):
+                    self._remove(entry_key)
+            if num_bytes > self._max_num_bytes:
+                _LOG.debug(
+                    "Not caching %s bytes for key=%s since the cache is too small",
+                    num_bytes,
+                    key,
+                )
+                return
+            # Evict the least recently used data.
+            while self._num_bytes + num_bytes > self._max_num_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[(key, start_ts, end_ts)] = (df, num_bytes)
+            self._num_bytes += num_bytes
+
+    def _remove(
+        self, entry_key: Tuple[_CacheKey, pd.Timestamp, pd.Timestamp]
+    ) -> None:
+        _, num_bytes = self._entries.pop(entry_key)
+        self._num_bytes -= num_bytes
+
+
+# #############################################################################
+
+
 class AbstractSqlDataLoader(AbstractDataLoader):
     """
     Interface class loading provider data from an SQL backend.
+
+    The DB is accessed through a pool of connections that can be shared by
+    multiple threads. The ids of the symbols, exchanges and trade symbols are
+    loaded in memory once and the data read is cached by date range.
     """
 
     def __init__(
-        self, dbname: str, user: str, password: str, host: str, port: int
+        self,
+        dbname: str,
+        user: str,
+        password: str,
+        host: str,
+        port: int,
+        *,
+        max_connections: int = 4,
+        max_cache_bytes: int = 2**30,
     ):
-        self.conn: psycopg2.extensions.connection = psycopg2.connect(
+        """
+        Constructor.
+
+        :param max_connections: max number of connections to the DB
+        :param max_cache_bytes: max memory used to cache the data read
+        """
+        hdbg.dassert_lte(1, max_connections)
+        # Use UTC as time zone in the DB session, so that the dates are
+        # compared to timestamps in the same way as in `_trim_data()`.
+        # The pool closes the connections returned in excess of `minconn`, so
+        # all the connections are kept open to reuse the prepared statements.
+        self._pool = ppool.ThreadedConnectionPool(
+            max_connections,
+            max_connections,
             dbname=dbname,
             user=user,
             password=password,
             host=host,
             port=port,
+            options="-c timezone=UTC",
         )
+        # The pool raises when no connection is available, so we wait for a
+        # connection to be returned.
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+        # Connections with the prepared statements.
+        self._prepared_conns: weakref.WeakSet = weakref.WeakSet()
+        # Map prepared statement name to the ids looked up by the statement.
+        self._ids: Optional[Dict[str, Dict[Tuple, int]]] = None
+        self._ids_lock = threading.Lock()
+        self._cache = _DateRangeCache(max_cache_bytes)
 
     # TODO(*): Factor out common code.
     def get_symbol_id(
@@ -144,13 +323,7 @@ class AbstractSqlDataLoader(AbstractDataLoader):
         :param symbol: symbol code, e.g. GOOGL
         :return: primary key (id)
         """
-        symbol_id = -1
-        with self.conn:
-            with self.conn.cursor() as curs:
-                curs.execute("SELECT id FROM Symbol WHERE code = %s", [symbol])
-                if curs.rowcount:
-                    (_symbol_id,) = curs.fetchone()
-                    symbol_id = _symbol_id
+        symbol_id = self._get_id("get_symbol_id", symbol)
         if symbol_id == -1:
             hdbg.dfatal(f"Could not find Symbol ${symbol}")
         return symbol_id
@@ -165,15 +338,7 @@ class AbstractSqlDataLoader(AbstractDataLoader):
         :param exchange: name of the Exchange entry as defined in DB
         :return: primary key (id)
         """
-        exchange_id = -1
-        with self.conn:
-            with self.conn.cursor() as curs:
-                curs.execute(
-                    "SELECT id FROM Exchange WHERE name = %s", [exchange]
-                )
-                if curs.rowcount:
-                    (_exchange_id,) = curs.fetchone()
-                    exchange_id = _exchange_id
+        exchange_id = self._get_id("get_exchange_id", exchange)
         if exchange_id == -1:
             hdbg.dfatal(f"Could not find Exchange ${exchange}")
         return exchange_id
@@ -191,17 +356,9 @@ class AbstractSqlDataLoader(AbstractDataLoader):
         :param exchange_id: id of Exchange
         :return: primary key (id)
         """
-        trade_symbol_id = -1
-        with self.conn:
-            with self.conn.cursor() as curs:
-                curs.execute(
-                    "SELECT id FROM TradeSymbol "
-                    "WHERE symbol_id = %s AND exchange_id = %s",
-                    [symbol_id, exchange_id],
-                )
-                if curs.rowcount:
-                    (_trade_symbol_id,) = curs.fetchone()
-                    trade_symbol_id = _trade_symbol_id
+        trade_symbol_id = self._get_id(
+            "get_trade_symbol_id", symbol_id, exchange_id
+        )
         if trade_symbol_id == -1:
             hdbg.dfatal(
                 f"Could not find Trade Symbol with "
@@ -209,10 +366,6 @@ class AbstractSqlDataLoader(AbstractDataLoader):
             )
         return trade_symbol_id
 
-    # TODO(plyq): Uncomment once #1047 will be resolved.
-    # @hcache.cache()
-    # Use lru_cache for now.
-    @functools.lru_cache(maxsize=64)
     def read_data(
         self,
         exchange: str,
@@ -229,16 +382,40 @@ class AbstractSqlDataLoader(AbstractDataLoader):
     ) -> pd.DataFrame:
         """
         Read data.
+
+        The data in [start_ts, end_ts] is read from the cache if it was read
+        before. Otherwise only the data not cached is read from the DB and it
+        is merged with the cached data overlapping [start_ts, end_ts].
+        Timestamps without a time zone are in UTC.
         """
-        return self._read_data(
-            exchange=exchange,
-            symbol=symbol,
-            frequency=frequency,
-            nrows=nrows,
-        )
+        start_ts = self._to_utc(start_ts)
+        end_ts = self._to_utc(end_ts)
+        key = (exchange, symbol, frequency)
+        cache_start_ts = _MIN_TS if start_ts is None else start_ts
+        cache_end_ts = _MAX_TS if end_ts is None else end_ts
+        hdbg.dassert_lte(cache_start_ts, cache_end_ts)
+        df = self._cache.get(key, cache_start_ts, cache_end_ts)
+        if df is None:
+            if nrows:
+                # Reading the first rows of a range is not cached.
+                return self._read_data(
+                    exchange,
+                    symbol,
+                    frequency,
+                    nrows=nrows,
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                )
+            df = self._read_missing_data(key, cache_start_ts, cache_end_ts)
+        # Return a copy of the cached data, so that it can't be modified.
+        df = self._trim_data(df, frequency, start_ts, end_ts)
+        if nrows:
+            hdbg.dassert_lte(1, nrows)
+            df = df.head(nrows)
+        return df
 
     def close(self) -> None:
-        self.conn.close()
+        self._pool.closeall()
 
     @staticmethod
     @abc.abstractmethod
@@ -250,26 +427,221 @@ class AbstractSqlDataLoader(AbstractDataLoader):
         :return: table name in DB
         """
 
+    @staticmethod
+    def _get_datetime_field_name_by_frequency(
+        frequency: imcodatyp.Frequency,
+    ) -> str:
+        """
+        Get the name of the datetime field of the table for a frequency.
+        """
+        if frequency == imcodatyp.Frequency.Daily:
+            datetime_field_name = "date"
+        else:
+            datetime_field_name = "datetime"
+        return datetime_field_name
+
+    @staticmethod
+    def _to_utc(timestamp: Optional[pd.Timestamp]) -> Optional[pd.Timestamp]:
+        if timestamp is None:
+            return None
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tz is None:
+            timestamp = timestamp.tz_localize("UTC")
+        else:
+            timestamp = timestamp.tz_convert("UTC")
+        return timestamp
+
+    @contextlib.contextmanager
+    def _get_connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """
+        Get a connection from the pool and run a transaction with it.
+
+        The lookup statements are prepared the first time a connection is
+        used.
+        """
+        with self._semaphore:
+            conn = self._pool.getconn()
+            try:
+                if conn not in self._prepared_conns:
+                    with conn:
+                        with conn.cursor() as curs:
+                            for statement in _PREPARED_STATEMENTS.values():
+                                curs.execute(statement)
+                    self._prepared_conns.add(conn)
+                with conn:
+                    yield conn
+            finally:
+                if conn.closed:
+                    self._prepared_conns.discard(conn)
+                self._pool.putconn(conn, close=bool(conn.closed))
+
+    def _load_ids(self) -> Dict[str, Dict[Tuple, int]]:
+        """
+        Load all the ids from the DB once.
+        """
+        with self._ids_lock:
+            if self._ids is None:
+                ids = {}
+                with self._get_connection() as conn:
+                    with conn.cursor() as curs:
+                        for statement_name, query in _ID_QUERIES.items():
+                            curs.execute(query)
+                            ids[statement_name] = {
+                                tuple(row[:-1]): row[-1]
+                                for row in curs.fetchall()
+                            }
+                _LOG.debug(
+                    "Loaded ids: %s",
+                    {name: len(ids_) for name, ids_ in ids.items()},
+                )
+                self._ids = ids
+        return self._ids
+
+    def _get_id(self, statement_name: str, *values: Any) -> int:
+        """
+        Get an id from memory or, if it is missing, from the DB.
+
+        The entries added to the DB after loading the ids (e.g., by the SQL
+        writer) are looked up with a prepared statement and kept in memory.
+
+        :return: the id or -1 if the entry doesn't exist
+        """
+        ids = self._load_ids()[statement_name]
+        id_ = ids.get(values, -1)
+        if id_ == -1:
+            with self._get_connection() as conn:
+                with conn.cursor() as curs:
+                    placeholders = ", ".join(["%s"] * len(values))
+                    curs.execute(
+                        f"EXECUTE {statement_name} ({placeholders})", values
+                    )
+                    if curs.rowcount:
+                        (id_,) = curs.fetchone()
+                        ids[values] = id_
+        return id_
+
+    def _read_missing_data(
+        self, key: _CacheKey, start_ts: pd.Timestamp, end_ts: pd.Timestamp
+    ) -> pd.DataFrame:
+        """
+        Read the data in [start_ts, end_ts] not cached and cache it together
+        with the cached data overlapping [start_ts, end_ts].
+
+        :return: the data of the range including [start_ts, end_ts] and the
+            overlapping ranges
+        """
+        exchange, symbol, frequency = key
+        entries = self._cache.get_overlapping(key, start_ts, end_ts)
+        start_ts = min([start_ts] + [entry[0] for entry in entries])
+        end_ts = max([end_ts] + [entry[1] for entry in entries])
+        # Read the data in the gaps between the cached ranges. The ranges are
+        # disjoint and sorted, so the data is sorted.
+        dfs = []
+        gap_start_ts, left_close = start_ts, True
+        for entry_start_ts, entry_end_ts, entry_df in entries:
+            if gap_start_ts < entry_start_ts:
+                df = self._read_data(
+                    exchange,
+                    symbol,
+                    frequency,
+                    start_ts=gap_start_ts,
+                    end_ts=entry_start_ts,
+                    left_close=left_close,
+                    right_close=False,
+                )
+                dfs.append(df)
+            dfs.append(entry_df)
+            gap_start_ts, left_close = entry_end_ts, False
+        if gap_start_ts < end_ts or (left_close and gap_start_ts == end_ts):
+            df = self._read_data(
+                exchange,
+                symbol,
+                frequency,
+                start_ts=gap_start_ts,
+                end_ts=end_ts,
+                left_close=left_close,
+            )
+            dfs.append(df)
+        df = pd.concat(dfs, ignore_index=True)
+        _LOG.debug(
+            "Read %s ranges from the DB and %s from the cache for key=%s",
+            len(dfs) - len(entries),
+            len(entries),
+            key,
+        )
+        self._cache.put(key, start_ts, end_ts, df)
+        return df
+
+    def _trim_data(
+        self,
+        df: pd.DataFrame,
+        frequency: imcodatyp.Frequency,
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
+        """
+        Get a copy of the data in [start_ts, end_ts].
+        """
+        if start_ts is None and end_ts is None:
+            return df.copy()
+        datetime_field_name = self._get_datetime_field_name_by_frequency(
+            frequency
+        )
+        datetimes = pd.to_datetime(df[datetime_field_name], utc=True)
+        mask = pd.Series(True, index=df.index)
+        if start_ts is not None:
+            mask &= start_ts <= datetimes
+        if end_ts is not None:
+            mask &= datetimes <= end_ts
+        df = df[mask].reset_index(drop=True)
+        return df
+
     def _read_data(
         self,
         exchange: str,
         symbol: str,
         frequency: imcodatyp.Frequency,
         nrows: Optional[int] = None,
+        start_ts: Optional[pd.Timestamp] = None,
+        end_ts: Optional[pd.Timestamp] = None,
+        *,
+        left_close: bool = True,
+        right_close: bool = True,
     ) -> pd.DataFrame:
+        """
+        Read the data in the interval between `start_ts` and `end_ts` from the
+        DB.
+
+        :param left_close: whether to include `start_ts` in the interval
+        :param right_close: whether to include `end_ts` in the interval
+        """
         exchange_id = self.get_exchange_id(exchange)
         symbol_id = self.get_symbol_id(symbol)
         trade_symbol_id = self.get_trade_symbol_id(symbol_id, exchange_id)
         table_name = self._get_table_name_by_frequency(frequency)
+        datetime_field_name = self._get_datetime_field_name_by_frequency(
+            frequency
+        )
+        conditions = ["trade_symbol_id = %s"]
+        params: List[Any] = [trade_symbol_id]
+        if start_ts is not None and start_ts != _MIN_TS:
+            operator = ">=" if left_close else ">"
+            conditions.append(f"{datetime_field_name} {operator} %s")
+            params.append(start_ts)
+        if end_ts is not None and end_ts != _MAX_TS:
+            operator = "<=" if right_close else "<"
+            conditions.append(f"{datetime_field_name} {operator} %s")
+            params.append(end_ts)
         limit = pexten.AsIs("ALL")
         # TODO(*): Add LIMIT in SQL query only if nrows is specified.
         if nrows:
             hdbg.dassert_lte(1, nrows)
             limit = nrows
-        query = "SELECT * FROM %s WHERE trade_symbol_id = %s LIMIT %s"
-        df = pd.read_sql_query(
-            query,
-            self.conn,
-            params=[pexten.AsIs(table_name), trade_symbol_id, limit],
+        params.append(limit)
+        query = (
+            f"SELECT * FROM {table_name} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {datetime_field_name} LIMIT %s"
         )
+        with self._get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
         return df
@@ -0,0 +1,233 @@
+import concurrent.futures
+import threading
+import types
+import unittest.mock as umock
+from typing import Any, List, Optional, Set
+
+import pandas as pd
+import psycopg2.extensions as pexten
+
+import helpers.hunit_test as hunitest
+import im.common.data.load.abstract_data_loader as imcdladalo
+import im.common.data.types as imcodatyp
+
+_KEY = ("CME", "ES", imcodatyp.Frequency.Minutely)
+
+
+def _get_data(start_ts: str, end_ts: str) -> pd.DataFrame:
+    datetimes = pd.date_range(start_ts, end_ts, freq="T", tz="UTC")
+    df = pd.DataFrame({"datetime": datetimes, "close": 1.0})
+    return df
+
+
+def _get_ts(timestamp: str) -> pd.Timestamp:
+    return pd.Timestamp(timestamp, tz="UTC")
+
+
+class _FakeCursor:
+    """
+    Cursor of `_FakeConnection`, failing on non-prepared statements.
+    """
+
+    def __init__(self, conn: "_FakeConnection") -> None:
+        self._conn = conn
+        self._rows: List[Any] = []
+        self.rowcount = 0
+
+    def __enter__(self) -> "_FakeCursor":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def execute(self, query: str, params: Optional[Any] = None) -> None:
+        self._rows = []
+        if query.startswith("PREPARE"):
+            statement_name = query.split()[1]
+            assert statement_name not in self._conn.prepared, statement_name
+            self._conn.prepared.add(statement_name)
+        elif query.startswith("EXECUTE"):
+            statement_name = query.split()[1]
+            if statement_name not in self._conn.prepared:
+                raise RuntimeError(
+                    f"prepared statement {statement_name} does not exist"
+                )
+            # Wait for the other threads to use their connections.
+            self._conn.barrier.wait(timeout=10)
+            # The id of a symbol is the length of its code.
+            self._rows = [(len(params[0]),)]
+        self.rowcount = len(self._rows)
+
+    def fetchall(self) -> List[Any]:
+        return self._rows
+
+    def fetchone(self) -> Any:
+        return self._rows[0]
+
+
+class _FakeConnection:
+    """
+    Connection keeping track of the statements prepared in its session.
+    """
+
+    def __init__(self, barrier: threading.Barrier) -> None:
+        self.barrier = barrier
+        self.closed = 0
+        self.prepared: Set[str] = set()
+        self.info = types.SimpleNamespace(
+            transaction_status=pexten.TRANSACTION_STATUS_IDLE
+        )
+
+    def __enter__(self) -> "_FakeConnection":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self)
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+class _SqlDataLoader(imcdladalo.AbstractSqlDataLoader):
+    @staticmethod
+    def _get_table_name_by_frequency(frequency: imcodatyp.Frequency) -> str:
+        return "MinuteData"
+
+
+class TestAbstractSqlDataLoader1(hunitest.TestCase):
+    def test_get_symbol_id1(self) -> None:
+        """
+        Check that threads looking up ids concurrently reuse the pooled
+        connections with the prepared statements.
+        """
+        max_connections = 3
+        # Make all the connections be in use at the same time.
+        barrier = threading.Barrier(max_connections)
+        conns: List[_FakeConnection] = []
+        lock = threading.Lock()
+
+        def _connect(*args: Any, **kwargs: Any) -> _FakeConnection:
+            conn = _FakeConnection(barrier)
+            with lock:
+                conns.append(conn)
+            return conn
+
+        with umock.patch("psycopg2.pool.psycopg2.connect", _connect):
+            loader = _SqlDataLoader(
+                "dbname",
+                "user",
+                "password",
+                "host",
+                5432,
+                max_connections=max_connections,
+            )
+            symbols = [f"S{i}" for i in range(30 * max_connections)]
+            with concurrent.futures.ThreadPoolExecutor(
+                max_connections
+            ) as executor:
+                actual = list(executor.map(loader.get_symbol_id, symbols))
+            loader.close()
+        expected = [len(symbol) for symbol in symbols]
+        self.assertListEqual(actual, expected)
+        # The connections are opened and prepared only once.
+        self.assertEqual(len(conns), max_connections)
+        self.assertTrue(all(conn.closed for conn in conns))
+        for conn in conns:
+            self.assertEqual(conn.prepared, set(imcdladalo._PREPARED_STATEMENTS))
+
+
+class TestDateRangeCache1(hunitest.TestCase):
+    def test_get1(self) -> None:
+        """
+        Check that a range is found only if a cached range includes it.
+        """
+        cache = imcdladalo._DateRangeCache(2**20)
+        df = _get_data("2021-01-01 09:00", "2021-01-01 10:00")
+        cache.put(
+            _KEY, _get_ts("2021-01-01 09:00"), _get_ts("2021-01-01 10:00"), df
+        )
+        actual = cache.get(
+            _KEY, _get_ts("2021-01-01 09:30"), _get_ts("2021-01-01 10:00")
+        )
+        self.assertIs(actual, df)
+        actual = cache.get(
+            _KEY, _get_ts("2021-01-01 09:30"), _get_ts("2021-01-01 10:01")
+        )
+        self.assertIsNone(actual)
+        key = ("CME", "NQ", imcodatyp.Frequency.Minutely)
+        actual = cache.get(
+            key, _get_ts("2021-01-01 09:30"), _get_ts("2021-01-01 10:00")
+        )
+        self.assertIsNone(actual)
+
+    def test_put1(self) -> None:
+        """
+        Check that a range replaces the ranges it overlaps.
+        """
+        cache = imcdladalo._DateRangeCache(2**20)
+        for start_ts, end_ts in [
+            ("2021-01-01 09:00", "2021-01-01 10:00"),
+            ("2021-01-01 11:00", "2021-01-01 12:00"),
+            ("2021-01-01 13:00", "2021-01-01 14:00"),
+        ]:
+            df = _get_data(start_ts, end_ts)
+            cache.put(_KEY, _get_ts(start_ts), _get_ts(end_ts), df)
+        entries = cache.get_overlapping(
+            _KEY, _get_ts("2021-01-01 09:30"), _get_ts("2021-01-01 11:30")
+        )
+        actual = [(str(start_ts), str(end_ts)) for start_ts, end_ts, _ in entries]
+        expected = [
+            ("2021-01-01 09:00:00+00:00", "2021-01-01 10:00:00+00:00"),
+            ("2021-01-01 11:00:00+00:00", "2021-01-01 12:00:00+00:00"),
+        ]
+        self.assertListEqual(actual, expected)
+        # Merge the overlapping ranges.
+        df = _get_data("2021-01-01 09:00", "2021-01-01 12:00")
+        cache.put(
+            _KEY, _get_ts("2021-01-01 09:00"), _get_ts("2021-01-01 12:00"), df
+        )
+        entries = cache.get_overlapping(
+            _KEY, imcdladalo._MIN_TS, imcdladalo._MAX_TS
+        )
+        self.assertEqual(len(entries), 2)
+        expected_num_bytes = sum(
+            entry_df.memory_usage(deep=True).sum() for _, _, entry_df in entries
+        )
+        self.assertEqual(cache.num_bytes, expected_num_bytes)
+
+    def test_put2(self) -> None:
+        """
+        Check that the least recently used data is evicted to stay within the
+        memory bound.
+        """
+        df = _get_data("2021-01-01 09:00", "2021-01-01 10:00")
+        num_bytes = df.memory_usage(deep=True).sum()
+        cache = imcdladalo._DateRangeCache(int(2.5 * num_bytes))
+        for day in ["2021-01-01", "2021-01-02", "2021-01-03"]:
+            cache.put(_KEY, _get_ts(f"{day} 09:00"), _get_ts(f"{day} 10:00"), df)
+            if day == "2021-01-02":
+                # Use the first day, so that the second one is evicted.
+                cache.get(
+                    _KEY, _get_ts("2021-01-01 09:00"), _get_ts("2021-01-01 10:00")
+                )
+        self.assertLessEqual(cache.num_bytes, 2.5 * num_bytes)
+        entries = cache.get_overlapping(
+            _KEY, imcdladalo._MIN_TS, imcdladalo._MAX_TS
+        )
+        actual = [str(start_ts.date()) for start_ts, _, _ in entries]
+        self.assertListEqual(actual, ["2021-01-01", "2021-01-03"])
+        # Data larger than the cache is not cached.
+        df = _get_data("2021-01-05 09:00", "2021-01-05 12:00")
+        cache.put(
+            _KEY, _get_ts("2021-01-05 09:00"), _get_ts("2021-01-05 12:00"), df
+        )
+        actual = cache.get(
+            _KEY, _get_ts("2021-01-05 09:00"), _get_ts("2021-01-05 12:00")
+        )
+        self.assertIsNone(actual)
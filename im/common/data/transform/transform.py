@@ -17,7 +17,6 @@ import pandas as pd
 import tqdm
 
 import helpers.hdbg as hdbg
-import helpers.hprint as hprint
 import im.common.data.load.abstract_data_loader as imcdladalo
 import im.common.data.transform.s3_to_sql_transformer as imcdtststr
 import im.common.data.types as imcodatyp
@@ -86,44 +85,17 @@ def convert_s3_to_sql(
         df, trade_symbol_id=trade_symbol_id, frequency=frequency
     )
     _LOG.debug("Saving '%s' data to database", symbol)
-    if incremental:
-        df = sql_writer_backend.get_remaining_data_to_load(
-            df, trade_symbol_id=trade_symbol_id, frequency=frequency
-        )
-    else:
+    hdbg.dassert_in(frequency, sql_writer_backend.FREQ_COLUMNS)
+    if not incremental:
         sql_writer_backend.delete_data_by_trade_symbol_id(
             trade_symbol_id, frequency
         )
-    if frequency == imcodatyp.Frequency.Minutely:
-        sql_writer_backend.insert_bulk_minute_data(df)
-    elif frequency == imcodatyp.Frequency.Daily:
-        sql_writer_backend.insert_bulk_daily_data(df)
-    elif frequency == imcodatyp.Frequency.Tick:
-        for _, row in df.iterrows():
-            sql_writer_backend.insert_tick_data(
-                trade_symbol_id=row["trade_symbol_id"],
-                date_time=row["datetime"],
-                price_val=row["price"],
-                size_val=row["size"],
-            )
-    else:
-        hdbg.dfatal("Unknown frequency '%s'", frequency)
-    _LOG.info("Done converting '%s' symbol", symbol)
-    # Return info about loaded data.
-    loaded_data = sql_data_loader.read_data(
-        exchange=exchange,
-        symbol=symbol,
-        asset_class=asset_class,
-        frequency=frequency,
-        contract_type=contract_type,
-        unadjusted=unadjusted,
-        nrows=None,
-        normalize=True,
-    )
-    _LOG.info("Total %s records loaded for symbol '%s'", len(loaded_data), symbol)
-    _LOG.debug(
-        "Tail of loaded data:\n%s", hprint.frame(loaded_data.tail().to_string())
+    # In incremental mode the data already loaded is skipped by the DB.
+    num_rows = sql_writer_backend.copy_bulk_data(
+        df, frequency, incremental=incremental
     )
+    _LOG.info("Done converting '%s' symbol", symbol)
+    _LOG.info("Inserted %s records for symbol '%s'", num_rows, symbol)
     return True
 
 
@@ -5,14 +5,43 @@ import im.common.sql_writer as imcosqwri
 """
 
 import abc
-from typing import Dict, Optional
+import io
+import logging
+import threading
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 import psycopg2
 import psycopg2.extensions as pexten
 
+import helpers.hdbg as hdbg
 import im.common.data.types as imcodatyp
 
+_LOG = logging.getLogger(__name__)
+
+# Columns stored as integers in the data tables.
+_INT_COLUMNS = ["trade_symbol_id", "volume", "size", "barCount"]
+
+
+def _to_iso_format(srs: pd.Series) -> pd.Series:
+    """
+    Format datetimes as ISO strings that the DB parses with `COPY`.
+
+    Formatting the datetimes with numpy is much faster than letting
+    `to_csv()` format the timestamps one by one.
+    """
+    if srs.dt.tz is not None:
+        srs = srs.dt.tz_convert("UTC").dt.tz_localize(None)
+        suffix = "+00:00"
+    else:
+        suffix = ""
+    values = np.datetime_as_string(srs.values, unit="us")
+    values = np.char.add(values, suffix)
+    # Empty fields are loaded as NULL.
+    values[srs.isna().values] = ""
+    return pd.Series(values, index=srs.index)
+
 
 class AbstractSqlWriter(abc.ABC):
     """
@@ -28,6 +57,9 @@ class AbstractSqlWriter(abc.ABC):
     #     }
     # }
     FREQ_ATTR_MAPPING: Dict[imcodatyp.Frequency, Dict[str, str]]
+    # Provider-specific constant. Map frequency to the columns of the table
+    # written by `copy_bulk_data()`.
+    FREQ_COLUMNS: Dict[imcodatyp.Frequency, List[str]]
 
     def __init__(
         self, dbname: str, user: str, password: str, host: str, port: int
@@ -39,6 +71,9 @@ class AbstractSqlWriter(abc.ABC):
             host=host,
             port=port,
         )
+        # The connection is shared by the threads converting the symbols, so
+        # the transactions are serialized to avoid interleaving them.
+        self._lock = threading.Lock()
 
     def ensure_symbol_exists(
         self,
@@ -48,7 +83,7 @@ class AbstractSqlWriter(abc.ABC):
         """
         Insert new symbol entry, if it does not exist.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO Symbol (code, asset_class) "
@@ -63,7 +98,7 @@ class AbstractSqlWriter(abc.ABC):
         """
         Insert new exchange entry, if it does not exist.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO Exchange (name) "
@@ -81,7 +116,7 @@ class AbstractSqlWriter(abc.ABC):
         """
         Insert new (`symbol_id`, `exchange_id`) entry, if it does not exist.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO TradeSymbol (symbol_id, exchange_id) "
@@ -160,6 +195,104 @@ class AbstractSqlWriter(abc.ABC):
     def close(self) -> None:
         self.conn.close()
 
+    def copy_bulk_data(
+        self,
+        df: pd.DataFrame,
+        frequency: imcodatyp.Frequency,
+        *,
+        incremental: bool = False,
+        chunk_size: int = 100000,
+    ) -> int:
+        """
+        Insert data in bulk streaming it to the DB with `COPY FROM STDIN`.
+
+        The rows are sent in CSV format, `chunk_size` rows at a time.
+        In non-incremental mode the rows are copied directly into the table,
+        so the data of the trade symbols must have been deleted before.
+        In incremental mode the rows are copied into a temporary staging table
+        and only the rows after the last datetime already loaded for each
+        trade symbol are merged into the table, like
+        `get_remaining_data_to_load()` does.
+
+        :param df: a dataframe with the data to insert (e.g., from S3)
+        :param frequency: frequency of the data
+        :param incremental: merge the data with the data already loaded
+        :param chunk_size: number of rows sent to the DB at a time
+        :return: number of inserted rows
+        """
+        hdbg.dassert_lte(1, chunk_size)
+        table_name = self.FREQ_ATTR_MAPPING[frequency]["table_name"]
+        datetime_field_name = self.FREQ_ATTR_MAPPING[frequency][
+            "datetime_field_name"
+        ]
+        columns = self.FREQ_COLUMNS[frequency]
+        hdbg.dassert_is_subset(columns, df.columns)
+        df = df[columns]
+        if not incremental and frequency != imcodatyp.Frequency.Tick:
+            # The bar tables are unique by trade symbol and datetime and, unlike
+            # `INSERT ... ON CONFLICT DO NOTHING`, `COPY` fails on duplicates.
+            df = df.drop_duplicates(
+                subset=["trade_symbol_id", datetime_field_name]
+            )
+        # Integer columns become float when they contain NaNs, which the DB
+        # doesn't accept as integers.
+        int_columns = [column for column in columns if column in _INT_COLUMNS]
+        df = df.astype({column: "Int64" for column in int_columns})
+        df[datetime_field_name] = _to_iso_format(
+            pd.to_datetime(df[datetime_field_name])
+        )
+        columns_str = ", ".join(columns)
+        with self._lock, self.conn:
+            with self.conn.cursor() as curs:
+                if incremental:
+                    # Copy the data into a staging table, dropped at the end of
+                    # the transaction.
+                    copy_table_name = f"{table_name}Staging"
+                    curs.execute(
+                        f"CREATE TEMP TABLE {copy_table_name} "
+                        f"(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                else:
+                    copy_table_name = table_name
+                num_rows = 0
+                for i in range(0, df.shape[0], chunk_size):
+                    stream = io.StringIO()
+                    df.iloc[i : i + chunk_size].to_csv(
+                        stream, header=False, index=False
+                    )
+                    stream.seek(0)
+                    curs.copy_expert(
+                        f"COPY {copy_table_name} ({columns_str}) "
+                        "FROM STDIN WITH (FORMAT csv)",
+                        stream,
+                    )
+                    num_rows += curs.rowcount
+                if incremental:
+                    # Merge the rows after the last loaded datetime.
+                    staging_columns_str = ", ".join(
+                        f"staging.{column}" for column in columns
+                    )
+                    curs.execute(
+                        "WITH loaded AS ("
+                        f"SELECT trade_symbol_id, MAX({datetime_field_name}) "
+                        "AS max_datetime "
+                        f"FROM {table_name} WHERE trade_symbol_id IN "
+                        f"(SELECT DISTINCT trade_symbol_id FROM {copy_table_name}) "
+                        "GROUP BY trade_symbol_id) "
+                        f"INSERT INTO {table_name} ({columns_str}) "
+                        f"SELECT {staging_columns_str} "
+                        f"FROM {copy_table_name} AS staging "
+                        "LEFT JOIN loaded USING (trade_symbol_id) "
+                        "WHERE loaded.max_datetime IS NULL "
+                        f"OR staging.{datetime_field_name} > loaded.max_datetime "
+                        "ON CONFLICT DO NOTHING"
+                    )
+                    _LOG.debug(
+                        "Merged %s rows out of %s", curs.rowcount, num_rows
+                    )
+                    num_rows = curs.rowcount
+        return num_rows
+
     def get_remaining_data_to_load(
         self,
         df: pd.DataFrame,
@@ -184,7 +317,7 @@ class AbstractSqlWriter(abc.ABC):
         ]
         table_name = self.FREQ_ATTR_MAPPING[frequency]["table_name"]
         # Find the maximum datetime already loaded.
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as cur:
                 cur.execute(
                     f"SELECT MAX({datetime_field_name}) "
@@ -205,7 +338,7 @@ class AbstractSqlWriter(abc.ABC):
         `frequency`.
         """
         table_name = self.FREQ_ATTR_MAPPING[frequency]["table_name"]
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as cur:
                 cur.execute(
                     f"DELETE FROM {table_name} "
@@ -131,6 +131,7 @@ def _main(parser: argparse.ArgumentParser) -> None:
                 contract_type=symbol.contract_type,
                 exchange=symbol.exchange,
                 currency=symbol.currency,
+                return_data=False,
             )
         # On local machine make sure that path exists.
         if not part_files_dir.startswith("s3://"):
@@ -6,10 +6,15 @@ Import as:
 
 import im.ib.data.extract.gateway.download_data_ib_loop as imidegddil
 """
+import collections
+import concurrent.futures
 import datetime
+import gzip
+import itertools
+import json
 import logging
 import os
-from typing import Any, Iterator, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 try:
     import ib_insync
@@ -24,6 +29,7 @@ from tqdm import tqdm
 import helpers.hdbg as hdbg
 import helpers.hio as hio
 import helpers.hpandas as hpandas
+import helpers.hparquet as hparque
 import helpers.hs3 as hs3
 import im.ib.data.extract.gateway.utils as imidegaut
 
@@ -126,6 +132,83 @@ def ib_loop_generator(
         i += 1
 
 
+# #############################################################################
+# Part files.
+# #############################################################################
+
+
+# Suffix of the file describing a part file, saved next to it.
+_PART_FILE_ENTRY_EXT = ".json"
+
+
+def _get_aws_profile(path: str) -> Optional[str]:
+    aws_profile = "am" if hs3.is_s3_path(path) else None
+    return aws_profile
+
+
+def _get_part_file_idx(part_file_name: str) -> int:
+    """
+    Return the index of a part file, e.g., 3 for `ES....False.000003.parquet`.
+    """
+    idx = int(part_file_name.rsplit(".", 2)[-2])
+    return idx
+
+
+def load_part_files_manifest(part_files_dir: str) -> List[Dict[str, Any]]:
+    """
+    Load the manifest of the part files saved in `part_files_dir`.
+
+    Each Parquet part file is described by an entry saved in a JSON file next
+    to it, e.g., `ES....False.000003.parquet.json` contains
+    ```
+    {
+        "file_name": "ES.20210217-000000.20210218-000000.1_D.1_min.TRADES.False.000003.parquet",
+        "interval_file_name": "ES.20210217-000000.20210218-000000.1_D.1_min.TRADES.False.csv",
+        "start_ts": "2021-02-17 00:00:00-05:00",
+        "end_ts": "2021-02-17 23:59:00-05:00",
+        "num_rows": 1440
+    }
+    ```
+    where `interval_file_name` is the name returned by
+    `historical_data_to_filename()` for the interval the data belongs to.
+
+    :return: the manifest entries in the order the part files were saved, or
+        an empty list if there are no part files
+    """
+    if not imidegaut.check_file_exists(part_files_dir):
+        return []
+    aws_profile = _get_aws_profile(part_files_dir)
+    entry_file_names = hs3.listdir(
+        part_files_dir,
+        f"*.parquet{_PART_FILE_ENTRY_EXT}",
+        only_files=True,
+        use_relative_paths=True,
+        aws_profile=aws_profile,
+    )
+    manifest = []
+    for entry_file_name in entry_file_names:
+        txt = hs3.from_file(
+            os.path.join(part_files_dir, entry_file_name),
+            aws_profile=aws_profile,
+        )
+        manifest.append(json.loads(txt))
+    manifest = sorted(
+        manifest, key=lambda entry: _get_part_file_idx(entry["file_name"])
+    )
+    return manifest
+
+
+def _save_part_file_entry(part_files_dir: str, entry: Dict[str, Any]) -> None:
+    """
+    Save the manifest entry of a part file, without rewriting the other ones.
+    """
+    file_name = os.path.join(
+        part_files_dir, entry["file_name"] + _PART_FILE_ENTRY_EXT
+    )
+    txt = json.dumps(entry, indent=4)
+    hs3.to_file(txt, file_name, aws_profile=_get_aws_profile(file_name))
+
+
 def save_historical_data_by_intervals_IB_loop(
     ib: int,
     contract: ib_insync.Contract,
@@ -140,13 +223,26 @@ def save_historical_data_by_intervals_IB_loop(
     incremental: bool,
     use_progress_bar: bool = True,
     num_retry: Optional[Any] = None,
+    manifest: Optional[List[Dict[str, Any]]] = None,
 ) -> Set[Tuple[pd.Timestamp, pd.Timestamp]]:
     """
     Save historical data into multiple files into `contract.symbol` directory
     near the `file_name`.
 
-    :param incremental: if the `file_name` already exists, resume downloading
-        from the last date
+    Each chunk of data returned by IB is split by static intervals and each
+    split is saved into a new Parquet part file, listed in the manifest of
+    `part_files_dir` (see `load_part_files_manifest()`). The part files are
+    never rewritten and they can overlap, e.g., when the same interval is
+    downloaded again: the data is deduplicated only when the part files are
+    merged by `union_part_files()`.
+
+    :param incremental: if the data for an interval was already saved,
+        download it again instead of asserting
+    :param manifest: the manifest of `part_files_dir` returned by
+        `load_part_files_manifest()`, updated in place with the entries of the
+        new part files, so that it can be passed to the next calls without
+        reading it again
+    :return: the intervals the data was saved for
     """
     start_ts, end_ts = imidegaut.process_start_end_ts(start_ts, end_ts)
     #
@@ -164,6 +260,13 @@ def save_historical_data_by_intervals_IB_loop(
         use_progress_bar=use_progress_bar,
         num_retry=num_retry,
     )
+    aws_profile = _get_aws_profile(part_files_dir)
+    if manifest is None:
+        manifest = load_part_files_manifest(part_files_dir)
+    # Intervals saved by previous runs.
+    existing_interval_file_names = {
+        entry["interval_file_name"] for entry in manifest
+    }
     saved_intervals = set()
     for _, df_tmp, _ in generator:
         # Split data by static intervals.
@@ -181,34 +284,223 @@ def save_historical_data_by_intervals_IB_loop(
                 use_rth=use_rth,
                 dst_dir=part_files_dir,
             )
-            # There can be already data from previous loop iteration.
-            if imidegaut.check_file_exists(file_name_for_part):
-                df_to_write = pd.concat(
-                    [df_tmp_part, load_historical_data(file_name_for_part)]
+            interval_file_name = os.path.basename(file_name_for_part)
+            if not incremental:
+                hdbg.dassert_not_in(
+                    interval_file_name,
+                    existing_interval_file_names,
+                    "Most likely the data for selected interval already exists, try incremental mode.",
                 )
-            else:
-                # First iteration ever.
-                df_to_write = df_tmp_part
+            saved_intervals.add(interval)
+            if df_tmp_part.empty:
+                continue
             # Force to have index `pd.Timestamp` format.
-            df_to_write.index = df_to_write.index.map(imidegaut.to_ET)
-            if incremental:
-                # It is possible that same data was already loaded.
-                df_to_write = df_to_write[
-                    ~df_to_write.index.duplicated(keep="last")
-                ]
-                df_to_write.sort_index(inplace=True)
-            hpandas.dassert_monotonic_index(
-                df_to_write,
-                "Most likely the data for selected interval already exists, try incremental mode.",
+            df_tmp_part = df_tmp_part.copy()
+            df_tmp_part.index = df_tmp_part.index.map(imidegaut.to_ET)
+            # Save the data into a new part file.
+            part_file_name = "%s.%06d.parquet" % (
+                os.path.splitext(interval_file_name)[0],
+                len(manifest),
             )
-            # We appended data at step before, so re-write the file.
-            df_to_write.to_csv(file_name_for_part, mode="w", header=True)
-            _LOG.info("Saved partial data in '%s'", file_name_for_part)
-            saved_intervals.add(interval)
+            hparque.to_parquet(
+                df_tmp_part,
+                os.path.join(part_files_dir, part_file_name),
+                aws_profile=aws_profile,
+            )
+            entry = {
+                "file_name": part_file_name,
+                "interval_file_name": interval_file_name,
+                "start_ts": str(df_tmp_part.index.min()),
+                "end_ts": str(df_tmp_part.index.max()),
+                "num_rows": df_tmp_part.shape[0],
+            }
+            manifest.append(entry)
+            _save_part_file_entry(part_files_dir, entry)
+            _LOG.info("Saved partial data in '%s'", part_file_name)
     imidegaut.deallocate_ib(ib, deallocate_ib)
     return saved_intervals
 
 
+def _get_part_file_clusters(
+    part_files_dir: str,
+    dst_file_name: str,
+    manifest: Optional[List[Dict[str, Any]]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group the part files into clusters of files with overlapping time ranges.
+
+    The legacy part files in CSV format are not listed in the manifest, so they
+    are read to find their time range and their data is kept in the entry
+    under the `data` key, to avoid reading them again.
+
+    :param manifest: the manifest of `part_files_dir`, if already loaded
+    :return: clusters sorted by time, each one with the files sorted in the
+        order they were saved, i.e., by decreasing precedence when the same
+        timestamp is in multiple files
+    """
+    if manifest is None:
+        manifest = load_part_files_manifest(part_files_dir)
+    # Add the legacy CSV part files, which were saved before the Parquet ones.
+    csv_file_names = hs3.listdir(
+        part_files_dir,
+        "*.csv",
+        only_files=True,
+        use_relative_paths=True,
+        aws_profile=_get_aws_profile(part_files_dir),
+    )
+    csv_file_names = sorted(
+        file_name
+        for file_name in csv_file_names
+        if file_name != os.path.basename(dst_file_name)
+    )
+    entries = []
+    for file_name in csv_file_names:
+        df = _load_part_file(part_files_dir, file_name)
+        if df.empty:
+            continue
+        entry = {
+            "file_name": file_name,
+            "start_ts": str(df.index.min()),
+            "end_ts": str(df.index.max()),
+            "data": df,
+        }
+        entries.append(entry)
+    entries.extend(manifest)
+    # Sort by start time and merge overlapping time ranges.
+    entries_with_idx = sorted(
+        enumerate(entries), key=lambda x: pd.Timestamp(x[1]["start_ts"])
+    )
+    clusters: List[List[Tuple[int, Dict[str, Any]]]] = []
+    cluster_end_ts = None
+    for idx, entry in entries_with_idx:
+        start_ts = pd.Timestamp(entry["start_ts"])
+        end_ts = pd.Timestamp(entry["end_ts"])
+        if clusters and start_ts <= cluster_end_ts:
+            clusters[-1].append((idx, entry))
+            cluster_end_ts = max(cluster_end_ts, end_ts)
+        else:
+            clusters.append([(idx, entry)])
+            cluster_end_ts = end_ts
+    clusters = [
+        [entry for _, entry in sorted(cluster, key=lambda x: x[0])]
+        for cluster in clusters
+    ]
+    return clusters
+
+
+def _load_part_file(part_files_dir: str, file_name: str) -> pd.DataFrame:
+    file_name = os.path.join(part_files_dir, file_name)
+    if file_name.endswith(".csv"):
+        df = load_historical_data(file_name)
+        # The timestamps can have different UTC offsets because of DST.
+        df.index = pd.to_datetime(df.index, utc=True).tz_convert(
+            "America/New_York"
+        )
+    else:
+        df = hparque.from_parquet(
+            file_name, aws_profile=_get_aws_profile(file_name)
+        )
+    return df
+
+
+def _load_part_file_cluster(
+    part_files_dir: str, cluster: List[Dict[str, Any]]
+) -> pd.DataFrame:
+    """
+    Load the part files of a cluster, removing the duplicated timestamps.
+    """
+    dfs = []
+    for entry in cluster:
+        if "data" in entry:
+            # Release the data of the legacy part files once it is used.
+            df = entry.pop("data")
+        else:
+            df = _load_part_file(part_files_dir, entry["file_name"])
+        dfs.append(df)
+    df = pd.concat(dfs)
+    # The files are sorted in the order they were saved and the data saved
+    # first is kept, like when the part files were updated in place.
+    df = df[~df.index.duplicated(keep="first")]
+    df = df.sort_index()
+    return df
+
+
+def union_part_files(
+    part_files_dir: str,
+    dst_file_name: str,
+    *,
+    num_threads: int = 4,
+    return_data: bool = True,
+    manifest: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Merge the part files in `part_files_dir` into a gzipped CSV file.
+
+    The part files with overlapping time ranges are merged and deduplicated
+    together, keeping the data from the first saved part file. Since the
+    clusters of overlapping files are disjoint, they are written one at a
+    time to `dst_file_name` in time order, while the next `num_threads`
+    clusters are read in parallel.
+
+    :param dst_file_name: gzipped CSV file to write (e.g., `.../ES.csv.gz`)
+    :param num_threads: number of threads reading the part files
+    :param return_data: return the merged data, instead of keeping only the
+        clusters being processed in memory
+    :param manifest: the manifest of `part_files_dir`, if already loaded
+    :return: the merged data, if `return_data` is True
+    """
+    hdbg.dassert_lte(1, num_threads)
+    clusters = _get_part_file_clusters(
+        part_files_dir, dst_file_name, manifest=manifest
+    )
+    hdbg.dassert_lte(1, len(clusters), "No part files in '%s'", part_files_dir)
+    _LOG.info(
+        "Merging %s part files from '%s' in %s clusters",
+        sum(len(cluster) for cluster in clusters),
+        part_files_dir,
+        len(clusters),
+    )
+    if hs3.is_s3_path(dst_file_name):
+        s3fs = hs3.get_s3fs("am")
+        dst_file = s3fs.open(dst_file_name, "wb")
+    else:
+        hio.create_enclosing_dir(dst_file_name, incremental=True)
+        dst_file = open(dst_file_name, "wb")
+    dfs = []
+    num_rows = 0
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=num_threads
+    ) as executor, dst_file, gzip.open(dst_file, "wt") as gzip_file:
+        # Read at most `num_threads` clusters ahead of the one being written.
+        clusters_iter = iter(clusters)
+        futures = collections.deque(
+            executor.submit(_load_part_file_cluster, part_files_dir, cluster)
+            for cluster in itertools.islice(clusters_iter, num_threads)
+        )
+        while futures:
+            df = futures.popleft().result()
+            cluster = next(clusters_iter, None)
+            if cluster is not None:
+                futures.append(
+                    executor.submit(
+                        _load_part_file_cluster, part_files_dir, cluster
+                    )
+                )
+            df.to_csv(gzip_file, header=num_rows == 0)
+            num_rows += df.shape[0]
+            if return_data:
+                dfs.append(df)
+    _LOG.info("Saved %s rows in '%s'", num_rows, dst_file_name)
+    if not return_data:
+        return None
+    data = pd.concat(dfs)
+    hpandas.dassert_monotonic_index(data)
+    return data
+
+
+# #############################################################################
+
+
 def get_historical_data_with_IB_loop(
     ib: ib_insync.ib.IB,
     contract: ib_insync.Contract,
@@ -367,13 +659,11 @@ def load_historical_data(file_name: str, verbose: bool = False) -> pd.DataFrame:
     `save_historical_data_with_IB_loop()`.
     """
     _LOG.debug("file_name=%s", file_name)
-    s3fs = hs3.get_s3fs("am")
-    # This call was broken during a refactoring and this fix is not
-    # guaranteed to work.
-    try:
-        df = hpandas.read_csv_to_df(file_name, parse_dates=True, index_col=0)
-    except Exception:  # pylint: disable=broad-except
-        df = hpandas.read_csv_to_df(s3fs, parse_dates=True, index_col=0)
+    kwargs = {}
+    if hs3.is_s3_path(file_name):
+        kwargs["s3fs"] = hs3.get_s3fs("am")
+    stream, kwargs = hs3.get_local_or_s3_stream(file_name, **kwargs)
+    df = hpandas.read_csv_to_df(stream, parse_dates=True, index_col=0, **kwargs)
     # hdbg.dassert_isinstance(df.index[0], pd.Timestamp)
     if verbose:
         _LOG.info(
@@ -385,6 +675,7 @@ def load_historical_data(file_name: str, verbose: bool = False) -> pd.DataFrame:
 
 # #############################################################################
 
+
 # TODO(*): -> _process_workload().
 def process_workload(
     client_id: int,
@@ -264,8 +264,24 @@ def find_date_bounds_by_dateoffset(
     :param offset: the difference between lower and upper bounds
     :return: pair of lower and upper bounds
     """
-    ts_iterator = pd.Timestamp(year=1970, month=1, day=1)
-    while to_ET(ts_iterator) <= to_ET(datetime_):
+    start_ts = pd.Timestamp(year=1970, month=1, day=1)
+    datetime_ = to_ET(datetime_)
+    # Jump close to `datetime_`, instead of moving by `offset` from the start.
+    # Note that `offset * n` applies `offset` `n` times, so we scale its
+    # parameters instead.
+    offset_length = (start_ts + offset) - start_ts
+    num_offsets = int(
+        (pd.Timestamp(datetime_).tz_localize(None) - start_ts) / offset_length
+    )
+    num_offsets = max(num_offsets - 1, 0)
+    while True:
+        ts_iterator = start_ts + pd.DateOffset(
+            **{key: value * num_offsets for key, value in offset.kwds.items()}
+        )
+        if num_offsets == 0 or to_ET(ts_iterator) <= datetime_:
+            break
+        num_offsets -= 1
+    while to_ET(ts_iterator) <= datetime_:
         ts_iterator += offset
     return (ts_iterator - offset, ts_iterator)
 
@@ -463,10 +479,10 @@ def get_tasks(
 
 # TODO(*): Move to helpers.
 def check_file_exists(file_name: str) -> bool:
-    s3fs = hs3.get_s3fs("am")
-    is_exist: bool = (
-        s3fs.exists(file_name)
-        if file_name.startswith("s3://")
-        else os.path.exists(file_name)
-    )
+    is_exist: bool
+    if file_name.startswith("s3://"):
+        s3fs = hs3.get_s3fs("am")
+        is_exist = s3fs.exists(file_name)
+    else:
+        is_exist = os.path.exists(file_name)
     return is_exist
@@ -7,16 +7,15 @@ import im.ib.data.extract.ib_data_extractor as imideidaex
 """
 # TODO(*): -> ib_data_extractor.py
 
+import collections
 import logging
 import os
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import ib_insync
 import pandas as pd
 
 import helpers.hdbg as hdbg
-import helpers.hpandas as hpandas
-import helpers.hs3 as hs3
 import im.common.data.extract.data_extractor as imcdedaex
 import im.common.data.types as imcodatyp
 import im.ib.data.extract.gateway.download_data_ib_loop as imidegddil
@@ -34,8 +33,22 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
     _MAX_IB_CONNECTION_ATTEMPTS = 1000
     _MAX_IB_DATA_LOAD_ATTEMPTS = 3
 
-    def __init__(self, ib_connect_client_id: Optional[int] = None):
-        if ib_connect_client_id is not None:
+    def __init__(
+        self,
+        ib_connect_client_id: Optional[int] = None,
+        *,
+        ib: Optional[ib_insync.ib.IB] = None,
+    ):
+        """
+        Constructor.
+
+        :param ib_connect_client_id: client id to connect to IB with, by default
+            the first free one
+        :param ib: IB connection to use instead of connecting to IB, e.g., a
+            fake IB client for testing
+        """
+        self._ib = ib
+        if ib is not None or ib_connect_client_id is not None:
             self._ib_connect_client_id = ib_connect_client_id
         else:
             self._ib_connect_client_id = imidegaut.get_free_client_id(
@@ -168,9 +181,12 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
         :param part_files_dir: place to keep results of each IB request
         """
         # Connect to IB.
-        ib_connection = imidegaut.ib_connect(
-            self._ib_connect_client_id, is_notebook=False
-        )
+        if self._ib is None:
+            ib_connection = imidegaut.ib_connect(
+                self._ib_connect_client_id, is_notebook=False
+            )
+        else:
+            ib_connection = self._ib
         # Find right intervals for incremental mode.
         left_intervals = self._get_init_intervals(
             start_ts,
@@ -208,7 +224,8 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
             num_attempts_done += 1
             left_intervals = left_intervals_after_try.copy()
         # Disconnect from IB.
-        ib_connection.disconnect()
+        if self._ib is None:
+            ib_connection.disconnect()
 
     @classmethod
     def update_archive(
@@ -220,10 +237,15 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
         exchange: str,
         currency: str,
         frequency: imcodatyp.Frequency,
-    ) -> pd.DataFrame:
+        *,
+        num_threads: int = 4,
+        return_data: bool = True,
+    ) -> Optional[pd.DataFrame]:
         """
         Read data from parts, save it to archive.
 
+        See `imidegddil.union_part_files()` for how the parts are merged.
+
         :param symbol: symbol to get the data for
         :param asset_class: asset class
         :param contract_type: required for asset class of type `futures`
@@ -231,7 +253,9 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
         :param currency: symbol currency
         :param frequency: `D` or `T` for daily or minutely data respectively
         :param part_files_dir: place to keep results of each IB request
-        :return: a dataframe with the data
+        :param num_threads: number of threads reading the parts
+        :param return_data: return the data, instead of only saving it
+        :return: a dataframe with the data, if `return_data` is True
         """
         # Find main archive file location.
         arch_file = imidlifpge.IbFilePathGenerator().generate_file_path(
@@ -243,32 +267,13 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
             currency=currency,
             ext=imcodatyp.Extension.CSV,
         )
-        _, arch_name = os.path.split(arch_file)
-        # Find files with partial data locations.
-        s3fs = hs3.get_s3fs("am")
-        part_file_names = (
-            s3fs.ls(part_files_dir + "/")
-            if part_files_dir.startswith("s3://")
-            else os.listdir(part_files_dir)
-        )
-        part_files = [
-            os.path.join(part_files_dir, file_name)
-            for file_name in part_file_names
-        ]
         _LOG.info("Union files in `%s` to `%s`", part_files_dir, arch_file)
-        # Read data.
-        data: pd.DataFrame = pd.concat(
-            [
-                imidegddil.load_historical_data(part_file)
-                for part_file in part_files
-                if part_file != arch_name
-            ]
+        data = imidegddil.union_part_files(
+            part_files_dir,
+            arch_file,
+            num_threads=num_threads,
+            return_data=return_data,
         )
-        # Sort index.
-        data = data.sort_index(ascending=True)
-        hpandas.dassert_monotonic_index(data)
-        # Save data to archive.
-        data.to_csv(arch_file, compression="gzip")
         _LOG.info("Finished, data in `%s`", arch_file)
         return data
 
@@ -386,12 +391,12 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
         incremental: Optional[bool] = None,
     ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
         """
-        Make a several requests to IB, each response is saved to a separate
-        file.
+        Make a several requests to IB, each response is saved to separate
+        files.
 
         E.g. list of resultes files:
-        - s3://*****/data/ib/futures/daily/ESH1/ESH1.20200101.20210101.csv
-        - s3://*****/data/ib/futures/daily/ESH1/ESH1.20190101.20200101.csv
+        - s3://*****/data/ib/futures/daily/ESH1/ESH1.20200101.20210101.000000.parquet
+        - s3://*****/data/ib/futures/daily/ESH1/ESH1.20190101.20200101.000001.parquet
         - ...
 
         :param ib: IB connection
@@ -433,6 +438,8 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
             currency=currency,
             ext=imcodatyp.Extension.CSV,
         )
+        # Load the manifest once, since it is updated in place by each task.
+        manifest = imidegddil.load_part_files_manifest(part_files_dir)
         failed_tasks_intervals = []
         for (
             contract,
@@ -457,9 +464,15 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
                     part_files_dir=part_files_dir,
                     incremental=incremental,
                     num_retry=self._MAX_IB_DATA_LOAD_ATTEMPTS,
+                    manifest=manifest,
                 )
             )
             # Find intervals with no data.
+            num_rows_by_interval: Dict[str, int] = collections.Counter()
+            for entry in manifest:
+                num_rows_by_interval[entry["interval_file_name"]] += entry[
+                    "num_rows"
+                ]
             for interval in saved_intervals:
                 file_name_for_part = imidegddil.historical_data_to_filename(
                     contract=contract,
@@ -471,8 +484,8 @@ class IbDataExtractor(imcdedaex.AbstractDataExtractor):
                     use_rth=use_rth,
                     dst_dir=part_files_dir,
                 )
-                df_part = imidegddil.load_historical_data(file_name_for_part)
-                if df_part.empty:
+                interval_file_name = os.path.basename(file_name_for_part)
+                if num_rows_by_interval[interval_file_name] == 0:
                     failed_tasks_intervals.append(interval)
         # Return failed intervals.
         return failed_tasks_intervals
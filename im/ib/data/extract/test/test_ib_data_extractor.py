@@ -0,0 +1,234 @@
+import logging
+import os
+from typing import Any, List
+
+import ib_insync
+import pandas as pd
+
+import helpers.hunit_test as hunitest
+import im.common.data.types as imcodatyp
+import im.ib.data.extract.gateway.download_data_ib_loop as imidegddil
+import im.ib.data.extract.gateway.utils as imidegaut
+import im.ib.data.extract.ib_data_extractor as imideidaex
+
+_LOG = logging.getLogger(__name__)
+
+
+class _FakeIb(ib_insync.IB):
+    """
+    Fake IB client returning synthetic 1 minute bars in [start_ts, end_ts).
+
+    Like IB, a request returns the bars in [endDateTime - durationStr,
+    endDateTime], so that the data of consecutive requests overlaps.
+    """
+
+    def __init__(
+        self,
+        start_ts: pd.Timestamp,
+        end_ts: pd.Timestamp,
+        price_offset: float = 0.0,
+    ) -> None:
+        """
+        :param price_offset: offset added to the prices, to tell apart the
+            data returned by different clients
+        """
+        super().__init__()
+        self._start_ts = start_ts
+        self._end_ts = end_ts
+        self._price_offset = price_offset
+        self.num_requests = 0
+
+    def isConnected(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        pass
+
+    def qualifyContracts(self, *contracts: ib_insync.Contract) -> List:
+        return list(contracts)
+
+    def reqHistoricalData(
+        self,
+        contract: ib_insync.Contract,
+        endDateTime: Any,
+        durationStr: str,
+        barSizeSetting: str,
+        whatToShow: str,
+        useRTH: bool,
+        formatDate: int = 1,
+        **kwargs: Any,
+    ) -> List[ib_insync.BarData]:
+        self.num_requests += 1
+        end_ts = pd.Timestamp(endDateTime)
+        start_ts = end_ts - imidegaut.duration_str_to_pd_dateoffset(durationStr)
+        dates = self.get_dates()
+        dates = dates[(start_ts <= dates) & (dates <= end_ts)]
+        bars = [
+            ib_insync.BarData(
+                date=date.tz_convert("UTC").to_pydatetime(),
+                open=self.get_price(date),
+                high=self.get_price(date) + 1.0,
+                low=self.get_price(date) - 1.0,
+                close=self.get_price(date) + 0.5,
+                volume=100.0,
+                average=self.get_price(date),
+                barCount=10,
+            )
+            for date in dates
+        ]
+        return bars
+
+    def get_dates(self) -> pd.DatetimeIndex:
+        dates = pd.date_range(
+            self._start_ts, self._end_ts, freq="T", closed="left"
+        )
+        return dates
+
+    def get_price(self, date: pd.Timestamp) -> float:
+        price = 100.0 + (date.value // (60 * 10**9)) % 1000 / 10.0
+        price += self._price_offset
+        return price
+
+
+# #############################################################################
+
+
+class TestIbDataExtractor1(hunitest.TestCase):
+    """
+    Extract data from a fake IB client into part files and union them.
+    """
+
+    start_ts = pd.Timestamp("2021-02-15 00:00:00", tz="America/New_York")
+    end_ts = pd.Timestamp("2021-02-17 00:00:00", tz="America/New_York")
+
+    def test_extract_data_parts1(self) -> None:
+        """
+        Check that the union of the part files contains each bar once.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        ib = self._extract_data_parts(part_files_dir)
+        # Consecutive requests overlap, so there are duplicated bars in the
+        # part files.
+        manifest = imidegddil.load_part_files_manifest(part_files_dir)
+        num_rows = sum(entry["num_rows"] for entry in manifest)
+        self.assertGreater(num_rows, len(ib.get_dates()))
+        #
+        data = self._union_part_files(part_files_dir)
+        self._check_data(data, ib)
+
+    def test_extract_data_parts2(self) -> None:
+        """
+        Check that downloading again the same data in incremental mode only
+        adds part files.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        self._extract_data_parts(part_files_dir)
+        num_part_files = len(imidegddil.load_part_files_manifest(part_files_dir))
+        ib = self._extract_data_parts(part_files_dir, incremental=True)
+        manifest = imidegddil.load_part_files_manifest(part_files_dir)
+        self.assertEqual(len(manifest), 2 * num_part_files)
+        #
+        data = self._union_part_files(part_files_dir)
+        self._check_data(data, ib)
+
+    def test_extract_data_parts3(self) -> None:
+        """
+        Check that downloading again the same data in non-incremental mode
+        asserts.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        self._extract_data_parts(part_files_dir)
+        with self.assertRaises(AssertionError) as cm:
+            self._extract_data_parts(part_files_dir, incremental=False)
+        self.assertIn("try incremental mode", str(cm.exception))
+
+    def test_extract_data_parts4(self) -> None:
+        """
+        Check that the data downloaded first is kept when the same data is
+        downloaded again in incremental mode.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        ib = self._extract_data_parts(part_files_dir)
+        self._extract_data_parts(
+            part_files_dir, incremental=True, price_offset=1.0
+        )
+        data = self._union_part_files(part_files_dir)
+        self._check_data(data, ib)
+
+    def test_union_part_files1(self) -> None:
+        """
+        Check that the union is the same when reading the parts serially.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        self._extract_data_parts(part_files_dir)
+        self._extract_data_parts(part_files_dir, incremental=True)
+        expected = self._union_part_files(part_files_dir, num_threads=1)
+        actual = self._union_part_files(part_files_dir, num_threads=3)
+        self.assert_equal(actual.to_csv(), expected.to_csv())
+
+    def test_union_part_files2(self) -> None:
+        """
+        Check that legacy CSV part files are merged with the Parquet ones.
+        """
+        part_files_dir = os.path.join(self.get_scratch_space(), "ES")
+        ib = self._extract_data_parts(part_files_dir)
+        # Save the first day as a legacy CSV part file.
+        data = self._union_part_files(part_files_dir)
+        file_name = os.path.join(part_files_dir, "ES.legacy.csv")
+        data.loc[: self.start_ts + pd.Timedelta(days=1)].to_csv(file_name)
+        #
+        data = self._union_part_files(part_files_dir)
+        self._check_data(data, ib)
+
+    def _extract_data_parts(
+        self,
+        part_files_dir: str,
+        incremental: bool = False,
+        price_offset: float = 0.0,
+    ) -> _FakeIb:
+        ib = _FakeIb(self.start_ts, self.end_ts, price_offset=price_offset)
+        extractor = imideidaex.IbDataExtractor(ib=ib)
+        kwargs = {
+            "part_files_dir": part_files_dir,
+            "exchange": "GLOBEX",
+            "symbol": "ES",
+            "asset_class": imcodatyp.AssetClass.Futures,
+            "frequency": imcodatyp.Frequency.Minutely,
+            "currency": "USD",
+            "contract_type": imcodatyp.ContractType.Continuous,
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts,
+            "incremental": incremental,
+        }
+        if incremental:
+            # In incremental mode the intervals to extract are computed from
+            # the archive on S3, so we extract the data parts directly.
+            failed_intervals = extractor._extract_data_parts(ib=ib, **kwargs)
+            self.assertListEqual(failed_intervals, [])
+        else:
+            extractor.extract_data_parts_with_retry(**kwargs)
+        self.assertGreater(ib.num_requests, 0)
+        return ib
+
+    def _union_part_files(
+        self, part_files_dir: str, *, num_threads: int = 2
+    ) -> pd.DataFrame:
+        file_name = os.path.join(self.get_scratch_space(), "ES.csv.gz")
+        data = imidegddil.union_part_files(
+            part_files_dir, file_name, num_threads=num_threads
+        )
+        # Check that the archive contains the returned data.
+        archive = imidegddil.load_historical_data(file_name)
+        self.assert_equal(
+            archive.to_csv(float_format="%.6f"), data.to_csv(float_format="%.6f")
+        )
+        return data
+
+    def _check_data(self, data: pd.DataFrame, ib: _FakeIb) -> None:
+        dates = ib.get_dates()
+        self.assert_equal(str(data.index.tz), "America/New_York")
+        self.assertListEqual(list(data.index), list(dates))
+        self.assertListEqual(
+            list(data["close"]),
+            [ib.get_price(date) + 0.5 for date in dates],
+        )
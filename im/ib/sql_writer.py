@@ -85,6 +85,37 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
         },
     }
 
+    FREQ_COLUMNS = {
+        imcodatyp.Frequency.Daily: [
+            "trade_symbol_id",
+            "date",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+            "average",
+            "barCount",
+        ],
+        imcodatyp.Frequency.Minutely: [
+            "trade_symbol_id",
+            "datetime",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+            "average",
+            "barCount",
+        ],
+        imcodatyp.Frequency.Tick: [
+            "trade_symbol_id",
+            "datetime",
+            "price",
+            "size",
+        ],
+    }
+
     def insert_bulk_daily_data(
         self,
         df: pd.DataFrame,
@@ -94,7 +125,7 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
 
         :param df: a dataframe from s3
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 pextra.execute_values(
                     curs,
@@ -131,7 +162,7 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
         :param average_val: average
         :param bar_count_val: bar count
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO IbDailyData "
@@ -159,7 +190,7 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
 
         :param df: a dataframe from s3
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 pextra.execute_values(
                     curs,
@@ -197,7 +228,7 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
         :param average_val: average
         :param bar_count_val: bar count
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO IbMinuteData "
@@ -232,7 +263,7 @@ class IbSqlWriter(imcosqwri.AbstractSqlWriter):
         :param price_val: price of the transaction
         :param size_val: size of the transaction
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO IbTickData "
@@ -193,6 +193,67 @@ class TestIbSqlWriterBackend1(ictuti.SqlWriterBackendTestCase):
         self._writer.insert_bulk_minute_data(df=df)
         self._check_saved_data(table="IbMinuteData")
 
+    def test_copy_bulk_data1(self) -> None:
+        """
+        Test copying a dataframe to IbMinuteData table.
+        """
+        self._prepare_tables(
+            insert_symbol=True, insert_exchange=True, insert_trade_symbol=True
+        )
+        df = pd.DataFrame(
+            {
+                "trade_symbol_id": [self._trade_symbol_id] * 3,
+                "datetime": [
+                    "2021-02-10T13:50:00Z",
+                    "2021-02-10T13:51:00Z",
+                    "2021-02-10T13:52:00Z",
+                ],
+                "open": [10.0] * 3,
+                "high": [15] * 3,
+                "low": [9] * 3,
+                "close": [12.5] * 3,
+                "volume": [1000] * 3,
+                "average": [12.0] * 3,
+                "barCount": [10] * 3,
+            }
+        )
+        num_rows = self._writer.copy_bulk_data(df, imcodatyp.Frequency.Minutely)
+        self.assertEqual(num_rows, 3)
+        self._check_saved_data(table="IbMinuteData")
+
+    def test_copy_bulk_data_incremental1(self) -> None:
+        """
+        Test copying a dataframe to IbMinuteData table when part of the data is
+        already loaded.
+        """
+        self._prepare_tables(
+            insert_symbol=True, insert_exchange=True, insert_trade_symbol=True
+        )
+        df = pd.DataFrame(
+            {
+                "trade_symbol_id": [self._trade_symbol_id] * 3,
+                "datetime": [
+                    "2021-02-10T13:50:00Z",
+                    "2021-02-10T13:51:00Z",
+                    "2021-02-10T13:52:00Z",
+                ],
+                "open": [10.0] * 3,
+                "high": [15] * 3,
+                "low": [9] * 3,
+                "close": [12.5] * 3,
+                "volume": [1000] * 3,
+                "average": [12.0] * 3,
+                "barCount": [10] * 3,
+            }
+        )
+        self._writer.copy_bulk_data(df.iloc[:2], imcodatyp.Frequency.Minutely)
+        # Only the last row is after the data already loaded.
+        num_rows = self._writer.copy_bulk_data(
+            df, imcodatyp.Frequency.Minutely, incremental=True
+        )
+        self.assertEqual(num_rows, 1)
+        self._check_saved_data(table="IbMinuteData")
+
     def test_insert_bulk_minute_data_with_holes(self) -> None:
         """
         Test adding a dataframe to IbMinuteData table if some data is missing.
@@ -4,23 +4,80 @@ Import as:
 import im.kibot.data.load.kibot_s3_data_loader as ikdlksdlo
 """
 
+import json
 import logging
-from typing import Optional
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
 
 import pandas as pd
 
 import helpers.hcache as hcache
 import helpers.hdbg as hdbg
+import helpers.hgit as hgit
+import helpers.hio as hio
 import helpers.hpandas as hpandas
+import helpers.hparquet as hparque
 import helpers.hs3 as hs3
+import helpers.htimer as htimer
 import im.common.data.load.abstract_data_loader as imcdladalo
 import im.common.data.types as imcodatyp
 import im.kibot.data.load.kibot_file_path_generator as imkdlkfpge
 
 _LOG = logging.getLogger(__name__)
 
+# Name of the dir, relative to the Git root, storing the Parquet cache by
+# default, like the `hcache` disk cache.
+_CACHE_DIR_NAME = "tmp.cache.kibot"
+# File storing the signature of the source file of a cached dataset.
+_CACHE_MANIFEST = "_source.json"
+# Number of rows in a row group of the cached Parquet files, i.e., about a
+# month of minute bars.
+_ROW_GROUP_SIZE = 20000
+# Format of the date and time columns of the raw Kibot data, by frequency.
+_DATETIME_FORMATS = {
+    imcodatyp.Frequency.Daily: "%m/%d/%Y",
+    imcodatyp.Frequency.Hourly: "%m/%d/%Y %H:%M",
+    imcodatyp.Frequency.Minutely: "%m/%d/%Y %H:%M",
+    imcodatyp.Frequency.Tick: "%m/%d/%Y %H:%M:%S",
+}
+
 
 class KibotS3DataLoader(imcdladalo.AbstractS3DataLoader):
+    """
+    Read Kibot data from the CSV files on S3.
+
+    The normalized daily and minute data is cached locally as Parquet, one
+    dataset per source file partitioned by year, e.g.,
+    ```
+    tmp.cache.kibot/alphamatic-data/data/kibot/All_Futures_Continuous_Contracts_daily/XG/
+        _source.json
+        year=1990/
+            data.parquet
+        year=1991/
+            data.parquet
+        ...
+    ```
+    The cache of a file is built the first time the file is read and it is
+    rebuilt when the source file changes. Reading a date range loads only the
+    year partitions and the row groups overlapping the range.
+    """
+
+    def __init__(
+        self, *, use_cache: bool = True, cache_dir: Optional[str] = None
+    ) -> None:
+        """
+        Constructor.
+
+        :param use_cache: whether to cache the data as Parquet
+        :param cache_dir: dir storing the cache. `None` means `tmp.cache.kibot`
+            in the Git root
+        """
+        super().__init__()
+        self._use_cache = use_cache
+        self._cache_dir = cache_dir
+
     def read_data(
         self,
         exchange: str,
@@ -64,17 +121,27 @@ class KibotS3DataLoader(imcdladalo.AbstractS3DataLoader):
         """
         Read data from S3 and cache it.
         """
-        s3fs = hs3.get_s3fs("am")
-        stream, kwargs = hs3.get_local_or_s3_stream(file_path, s3fs=s3fs)
+        data = KibotS3DataLoader._parse_csv(file_path, nrows=nrows)
+        data = KibotS3DataLoader._filter_by_dates(
+            data, frequency=frequency, start_ts=start_ts, end_ts=end_ts
+        )
+        return data
+
+    @staticmethod
+    def _parse_csv(file_path: str, nrows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read raw data from a local or S3 CSV file.
+        """
+        kwargs = {}
+        if hs3.is_s3_path(file_path):
+            kwargs["s3fs"] = hs3.get_s3fs("am")
+        stream, kwargs = hs3.get_local_or_s3_stream(file_path, **kwargs)
         data = hpandas.read_csv_to_df(
             stream,
             header=None,
             nrows=nrows,
             **kwargs,
         )
-        data = KibotS3DataLoader._filter_by_dates(
-            data, frequency=frequency, start_ts=start_ts, end_ts=end_ts
-        )
         return data
 
     @staticmethod
@@ -87,13 +154,18 @@ class KibotS3DataLoader(imcdladalo.AbstractS3DataLoader):
         """
         Filter pandas DataFrame with a date range.
 
-        :param data: dataframe for filtering
+        :param data: raw Kibot dataframe for filtering
         :param frequency: data frequency
         :param start_ts: start time of data to read. `None` means the entire data
         :param end_ts: end time of data to read. `None` means the current timestamp
         :return: filtered data
         """
-        _ = frequency
+        hdbg.dassert_in(
+            frequency,
+            _DATETIME_FORMATS,
+            "Frequency %s is not supported",
+            frequency,
+        )
         # TODO(gp): Improve this.
         if start_ts or end_ts:
             start_ts = start_ts or pd.Timestamp.min
@@ -101,11 +173,34 @@ class KibotS3DataLoader(imcdladalo.AbstractS3DataLoader):
         else:
             # No need to cut the data.
             return data
-        # Filter data.
-        # TODO(*): implement filtering for row Kibot data.
-        raise NotImplementedError
+        if data.shape[1] == 1:
+            # There is no data, see `_normalize_1_min()`.
+            return data
+        # Filter data. According to Kibot the daily data has only the date
+        # column, while the intraday data has the date and the time columns.
+        if frequency == imcodatyp.Frequency.Daily:
+            datetimes = data[0]
+        else:
+            datetimes = data[0] + " " + data[1]
+        datetimes = pd.to_datetime(
+            datetimes, format=_DATETIME_FORMATS[frequency]
+        )
+        start_ts = KibotS3DataLoader._to_kibot_timestamp(start_ts)
+        end_ts = KibotS3DataLoader._to_kibot_timestamp(end_ts)
+        mask = (start_ts <= datetimes) & (datetimes <= end_ts)
+        data = data[mask]
         return data
 
+    @staticmethod
+    def _to_kibot_timestamp(timestamp: pd.Timestamp) -> pd.Timestamp:
+        """
+        Convert a timestamp to the naive ET timestamps used by Kibot.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tz is not None:
+            timestamp = timestamp.tz_convert("America/New_York").tz_localize(None)
+        return timestamp
+
     # TODO(gp): Call the column datetime_ET suffix.
     @staticmethod
     def _normalize_1_min(df: pd.DataFrame) -> pd.DataFrame:
@@ -199,7 +294,172 @@ class KibotS3DataLoader(imcdladalo.AbstractS3DataLoader):
             unadjusted=unadjusted,
             ext=imcodatyp.Extension.CSV,
         )
-        data = self._read_csv(file_path, frequency, start_ts, end_ts, nrows)
+        if (
+            self._use_cache
+            and normalize
+            and frequency
+            in (imcodatyp.Frequency.Daily, imcodatyp.Frequency.Minutely)
+        ):
+            data = self._read_cached_data(file_path, frequency, start_ts, end_ts)
+            if nrows is not None:
+                data = data.head(nrows)
+            return data
+        data = self._read_csv(
+            file_path, frequency, nrows=nrows, start_ts=start_ts, end_ts=end_ts
+        )
         if normalize:
             data = self.normalize(df=data, frequency=frequency)
         return data
+
+    # #########################################################################
+    # Parquet cache.
+    # #########################################################################
+
+    def _read_cached_data(
+        self,
+        file_path: str,
+        frequency: imcodatyp.Frequency,
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
+        """
+        Read normalized data in [start_ts, end_ts] from the Parquet cache,
+        building the cache if it is missing or stale.
+        """
+        cache_path = self._get_cache_path(file_path)
+        signature = self._get_source_signature(file_path)
+        if self._load_cache_manifest(cache_path) != signature:
+            with htimer.TimedScope(logging.DEBUG, "# Parse CSV") as ts:
+                data = self._parse_csv(file_path)
+                data = self.normalize(df=data, frequency=frequency)
+            parse_time = ts.elapsed_time
+            if not isinstance(data.index, pd.DatetimeIndex):
+                # There is no data to cache, see `_normalize_1_min()`.
+                return data
+            with htimer.TimedScope(logging.DEBUG, "# Write cache") as ts:
+                self._write_cache(data, cache_path, signature)
+            _LOG.info(
+                "Built Parquet cache for '%s' (rows=%s, parse=%.3fs, write=%.3fs)",
+                file_path,
+                data.shape[0],
+                parse_time,
+                ts.elapsed_time,
+            )
+        with htimer.TimedScope(logging.DEBUG, "# Read cache") as ts:
+            data = self._read_cache(cache_path, start_ts, end_ts)
+        _LOG.info(
+            "Read '%s' from Parquet cache (rows=%s, time=%.3fs)",
+            file_path,
+            data.shape[0],
+            ts.elapsed_time,
+        )
+        return data
+
+    def _get_cache_path(self, file_path: str) -> str:
+        """
+        Get the dir caching the data of a local or S3 file.
+        """
+        cache_dir = self._cache_dir
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                hgit.get_client_root(super_module=True), _CACHE_DIR_NAME
+            )
+        if hs3.is_s3_path(file_path):
+            rel_path = file_path[len("s3://") :]
+        else:
+            rel_path = os.path.abspath(file_path).lstrip("/")
+        cache_path = os.path.join(cache_dir, rel_path)
+        return cache_path
+
+    @staticmethod
+    def _get_source_signature(file_path: str) -> Dict[str, Any]:
+        """
+        Get the info identifying the version of a local or S3 file.
+        """
+        if hs3.is_s3_path(file_path):
+            s3fs = hs3.get_s3fs("am")
+            info = s3fs.info(file_path)
+            signature = {
+                "size": info["size"],
+                "modified": str(info.get("LastModified")),
+                "etag": info.get("ETag"),
+            }
+        else:
+            stat = os.stat(file_path)
+            signature = {"size": stat.st_size, "modified": stat.st_mtime_ns}
+        signature["file_path"] = file_path
+        return signature
+
+    @staticmethod
+    def _load_cache_manifest(cache_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the signature of the source of a cached dataset, if any.
+        """
+        file_name = os.path.join(cache_path, _CACHE_MANIFEST)
+        if not os.path.exists(file_name):
+            return None
+        with open(file_name) as f:
+            signature: Dict[str, Any] = json.load(f)
+        return signature
+
+    @staticmethod
+    def _write_cache(
+        data: pd.DataFrame, cache_path: str, signature: Dict[str, Any]
+    ) -> None:
+        """
+        Save normalized data as Parquet partitioned by year.
+        """
+        # Write to a new tmp dir next to the cache and then swap it with the
+        # cache, so that an interrupted write doesn't leave a partial cache and
+        # concurrent writes don't use the same tmp dir.
+        cache_dir, cache_name = os.path.split(cache_path)
+        hio.create_dir(cache_dir, incremental=True)
+        tmp_path = tempfile.mkdtemp(dir=cache_dir, prefix=f"{cache_name}.tmp.")
+        try:
+            data, partition_columns = hparque.add_date_partition_columns(
+                data, "by_year"
+            )
+            hparque.to_partitioned_parquet(
+                data, partition_columns, tmp_path, row_group_size=_ROW_GROUP_SIZE
+            )
+            # Write the manifest last, since it marks the cache as valid.
+            with open(os.path.join(tmp_path, _CACHE_MANIFEST), "w") as f:
+                json.dump(signature, f)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        if os.path.exists(cache_path):
+            # Move the old cache aside, since a dir can't be replaced by
+            # renaming over it, and delete it only after the new one is in.
+            old_path = tmp_path + ".old"
+            os.rename(cache_path, old_path)
+            os.rename(tmp_path, cache_path)
+            shutil.rmtree(old_path)
+        else:
+            os.rename(tmp_path, cache_path)
+
+    @staticmethod
+    def _read_cache(
+        cache_path: str,
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
+        """
+        Read data in [start_ts, end_ts] from the Parquet cache.
+
+        The filters on the year prune the partitions and the filters on the
+        datetime prune the row groups using their statistics.
+        """
+        filters = []
+        if start_ts is not None:
+            start_ts = KibotS3DataLoader._to_kibot_timestamp(start_ts)
+            filters.append(("year", ">=", start_ts.year))
+            filters.append(("datetime", ">=", start_ts))
+        if end_ts is not None:
+            end_ts = KibotS3DataLoader._to_kibot_timestamp(end_ts)
+            filters.append(("year", "<=", end_ts.year))
+            filters.append(("datetime", "<=", end_ts))
+        data = hparque.from_parquet(cache_path, filters=filters or None)
+        data = data.drop(columns=["year"])
+        hdbg.dassert(data.index.is_monotonic_increasing)
+        return data
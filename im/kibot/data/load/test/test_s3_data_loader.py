@@ -1,3 +1,5 @@
+import os
+
 import pandas as pd
 import pytest
 
@@ -39,3 +41,132 @@ class TestKibotS3DataLoader(hunitest.TestCase):
         actual_string = hunitest.convert_df_to_string(data)
         # Compare with expected.
         self.check_string(actual_string, fuzzy_match=True)
+
+
+class TestKibotS3DataLoaderCache1(hunitest.TestCase):
+    """
+    Read Kibot data from a local CSV file through the Parquet cache.
+    """
+
+    def test_read_cached_data1(self) -> None:
+        """
+        Check that the cache contains the normalized data by year.
+        """
+        file_path = self._write_csv(imcodatyp.Frequency.Daily, periods=1000)
+        loader = self._get_loader()
+        actual = loader._read_cached_data(
+            file_path, imcodatyp.Frequency.Daily, None, None
+        )
+        expected = self._read_csv(loader, file_path, imcodatyp.Frequency.Daily)
+        self.assert_equal(actual.to_csv(), expected.to_csv())
+        # Check the partitions.
+        cache_path = loader._get_cache_path(file_path)
+        actual = sorted(os.listdir(cache_path))
+        expected = ["_source.json", "year=2020", "year=2021", "year=2022"]
+        self.assertListEqual(actual, expected)
+
+    def test_read_cached_data2(self) -> None:
+        """
+        Check that reading a date range from the cache is the same as filtering
+        the data.
+        """
+        file_path = self._write_csv(imcodatyp.Frequency.Minutely, periods=50000)
+        loader = self._get_loader()
+        start_ts = pd.Timestamp("2020-01-10 10:00:00")
+        end_ts = pd.Timestamp("2020-01-20 12:00:00")
+        # Build the cache.
+        loader._read_cached_data(
+            file_path, imcodatyp.Frequency.Minutely, None, None
+        )
+        actual = loader._read_cached_data(
+            file_path, imcodatyp.Frequency.Minutely, start_ts, end_ts
+        )
+        expected = self._read_csv(loader, file_path, imcodatyp.Frequency.Minutely)
+        expected = expected.loc[start_ts:end_ts]
+        self.assertGreater(expected.shape[0], 0)
+        self.assert_equal(actual.to_csv(), expected.to_csv())
+        # Check that the raw data is filtered in the same way.
+        raw_data = loader._parse_csv(file_path)
+        raw_data = loader._filter_by_dates(
+            raw_data, imcodatyp.Frequency.Minutely, start_ts, end_ts
+        )
+        self.assertEqual(raw_data.shape[0], expected.shape[0])
+
+    def test_read_cached_data3(self) -> None:
+        """
+        Check that the cache is rebuilt when the source file changes.
+        """
+        file_path = self._write_csv(imcodatyp.Frequency.Daily, periods=100)
+        loader = self._get_loader()
+        loader._read_cached_data(file_path, imcodatyp.Frequency.Daily, None, None)
+        # Update the source file.
+        os.remove(file_path)
+        file_path = self._write_csv(imcodatyp.Frequency.Daily, periods=200)
+        actual = loader._read_cached_data(
+            file_path, imcodatyp.Frequency.Daily, None, None
+        )
+        self.assertEqual(actual.shape[0], 200)
+        # Check that the old cache and the tmp dirs are removed.
+        cache_path = loader._get_cache_path(file_path)
+        actual = os.listdir(os.path.dirname(cache_path))
+        self.assertListEqual(actual, [os.path.basename(cache_path)])
+
+    def test_filter_by_dates1(self) -> None:
+        """
+        Check that the raw intraday data is filtered by date for all the
+        frequencies.
+        """
+        loader = self._get_loader()
+        start_ts = pd.Timestamp("2020-01-01 10:00:00")
+        end_ts = pd.Timestamp("2020-01-01 12:00:00")
+        for frequency, expected in [
+            (imcodatyp.Frequency.Hourly, 2),
+            (imcodatyp.Frequency.Minutely, 121),
+            (imcodatyp.Frequency.Tick, 7201),
+        ]:
+            file_path = self._write_csv(frequency, periods=50000)
+            data = loader._parse_csv(file_path)
+            actual = loader._filter_by_dates(data, frequency, start_ts, end_ts)
+            self.assertEqual(actual.shape[0], expected, msg=str(frequency))
+
+    def _get_loader(self) -> ikdlksdlo.KibotS3DataLoader:
+        cache_dir = os.path.join(self.get_scratch_space(), "cache")
+        loader = ikdlksdlo.KibotS3DataLoader(cache_dir=cache_dir)
+        return loader
+
+    def _write_csv(self, frequency: imcodatyp.Frequency, periods: int) -> str:
+        """
+        Write a raw Kibot CSV file with synthetic data.
+        """
+        if frequency == imcodatyp.Frequency.Daily:
+            datetimes = pd.date_range("2020-01-01", periods=periods, freq="D")
+            columns = [datetimes.strftime("%m/%d/%Y")]
+        else:
+            freq, time_format = {
+                imcodatyp.Frequency.Hourly: ("H", "%H:%M"),
+                imcodatyp.Frequency.Minutely: ("T", "%H:%M"),
+                imcodatyp.Frequency.Tick: ("S", "%H:%M:%S"),
+            }[frequency]
+            datetimes = pd.date_range(
+                "2020-01-01 09:30:00", periods=periods, freq=freq
+            )
+            columns = [
+                datetimes.strftime("%m/%d/%Y"),
+                datetimes.strftime(time_format),
+            ]
+        prices = [100.0 + i % 50 / 4 for i in range(periods)]
+        columns += [prices, prices, prices, prices, list(range(periods))]
+        df = pd.DataFrame(dict(enumerate(columns)))
+        file_path = os.path.join(self.get_scratch_space(), "ES.csv.gz")
+        df.to_csv(file_path, header=False, index=False)
+        return file_path
+
+    @staticmethod
+    def _read_csv(
+        loader: ikdlksdlo.KibotS3DataLoader,
+        file_path: str,
+        frequency: imcodatyp.Frequency,
+    ) -> pd.DataFrame:
+        data = loader._parse_csv(file_path)
+        data = loader.normalize(df=data, frequency=frequency)
+        return data
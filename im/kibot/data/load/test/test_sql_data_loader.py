@@ -42,7 +42,7 @@ class TestSqlDataLoader1(hunitest.TestCase):
 
     def tearDown(self) -> None:
         # Close connection.
-        self._loader.conn.close()
+        self._loader.close()
         # Remove created database.
         hsql.remove_database(connection=self._connection, dbname=self._new_db)
         super().tearDown()
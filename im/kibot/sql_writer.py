@@ -82,6 +82,33 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
         },
     }
 
+    FREQ_COLUMNS = {
+        imcodatyp.Frequency.Daily: [
+            "trade_symbol_id",
+            "date",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+        ],
+        imcodatyp.Frequency.Minutely: [
+            "trade_symbol_id",
+            "datetime",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+        ],
+        imcodatyp.Frequency.Tick: [
+            "trade_symbol_id",
+            "datetime",
+            "price",
+            "size",
+        ],
+    }
+
     def insert_bulk_daily_data(
         self,
         df: pd.DataFrame,
@@ -91,7 +118,7 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
 
         :param df: a dataframe from s3
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 pextra.execute_values(
                     curs,
@@ -118,7 +145,7 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
         """
         Insert daily data for a particular TradeSymbol entry.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO KibotDailyData "
@@ -144,7 +171,7 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
 
         :param df: a dataframe from S3
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 pextra.execute_values(
                     curs,
@@ -171,7 +198,7 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
         """
         Insert minute data for a particular TradeSymbol entry.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO KibotMinuteData "
@@ -198,7 +225,7 @@ class KibotSqlWriter(imcosqwri.AbstractSqlWriter):
         """
         Insert tick data for a particular TradeSymbol entry.
         """
-        with self.conn:
+        with self._lock, self.conn:
             with self.conn.cursor() as curs:
                 curs.execute(
                     "INSERT INTO KibotTickData "
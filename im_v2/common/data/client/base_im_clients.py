@@ -6,8 +6,9 @@ import im_v2.common.data.client.base_im_clients as imvcdcbimcl
 
 import abc
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 import helpers.hdatetime as hdateti
@@ -18,6 +19,73 @@ import im_v2.common.universe as ivcu
 
 _LOG = logging.getLogger(__name__)
 
+_ONE_MINUTE_IN_NS = pd.Timedelta(minutes=1).value
+
+
+def _resample_1min_by_full_symbol(
+    df: pd.DataFrame,
+    full_symbol_col_name: str,
+    codes: np.ndarray,
+    full_symbols: pd.Index,
+    timestamps: np.ndarray,
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Resample the data of each symbol on a 1 minute grid in a single pass.
+
+    This is equivalent to applying `hpandas.resample_df(df, "T")` to the data
+    of each symbol and concatenating the results: the grid of each symbol
+    goes from its first to its last timestamp, rows not on the grid are
+    dropped, and missing rows are filled with NaNs.
+
+    :param codes: code of the full symbol of each row, as from
+        `pd.factorize()`
+    :param full_symbols: full symbols corresponding to the codes
+    :param timestamps: index of `df` as int64
+    :return: resampled data sorted by full symbol and timestamp, with the
+        codes and the timestamps of its rows
+    """
+    # Sort by full symbol and timestamp.
+    idxs = np.lexsort((timestamps, codes))
+    codes_sorted = codes[idxs]
+    timestamps_sorted = timestamps[idxs]
+    # Check that the index of each symbol is unique.
+    is_duplicated = (codes_sorted[1:] == codes_sorted[:-1]) & (
+        timestamps_sorted[1:] == timestamps_sorted[:-1]
+    )
+    if is_duplicated.any():
+        hpandas.dassert_unique_index(
+            df.set_index(full_symbol_col_name, append=True),
+            msg="Index must have only unique values",
+        )
+    # Compute the grid of each symbol.
+    is_first = np.r_[True, codes_sorted[1:] != codes_sorted[:-1]]
+    is_last = np.r_[is_first[1:], True]
+    min_timestamps = timestamps_sorted[is_first]
+    max_timestamps = timestamps_sorted[is_last]
+    lengths = (max_timestamps - min_timestamps) // _ONE_MINUTE_IN_NS + 1
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    num_rows = int(lengths.sum())
+    # Map the rows on the grid to their position in the resampled data.
+    group_idxs = np.cumsum(is_first) - 1
+    deltas = timestamps_sorted - min_timestamps[group_idxs]
+    is_on_grid = deltas % _ONE_MINUTE_IN_NS == 0
+    positions = offsets[group_idxs] + deltas // _ONE_MINUTE_IN_NS
+    df = df.iloc[idxs[is_on_grid]]
+    df = df.set_axis(positions[is_on_grid], axis=0)
+    # Compute the full symbol and the timestamp of each row on the grid.
+    grid_codes = np.repeat(codes_sorted[is_first], lengths)
+    grid_timestamps = np.repeat(min_timestamps, lengths) + _ONE_MINUTE_IN_NS * (
+        np.arange(num_rows) - np.repeat(offsets, lengths)
+    )
+    if len(df) < num_rows:
+        # Add the missing rows, filling their full symbol.
+        df = df.reindex(np.arange(num_rows))
+        df[full_symbol_col_name] = np.asarray(full_symbols, dtype=object)[
+            grid_codes
+        ]
+    return df, grid_codes, grid_timestamps
+
+
 # #############################################################################
 # ImClient
 # #############################################################################
@@ -187,39 +255,27 @@ class ImClient(abc.ABC):
         hdateti.dassert_timestamp_lte(df.index.max(), end_ts)
         # Rename index.
         df.index.name = "timestamp"
-        # Normalize data for each symbol.
+        # Normalize the data of all the symbols at once.
         _LOG.debug("full_symbols=%s", df[full_symbol_col_name].unique())
-        dfs = []
-        for full_symbol, df_tmp in df.groupby(full_symbol_col_name):
-            _LOG.debug("apply_im_normalization: full_symbol=%s", full_symbol)
-            df_tmp = self._apply_im_normalizations(
-                df_tmp,
-                full_symbol_col_name,
-                self._resample_1min,
-                start_ts,
-                end_ts,
-            )
-            self._dassert_output_data_is_valid(
-                df_tmp,
-                full_symbol_col_name,
-                self._resample_1min,
-                start_ts,
-                end_ts,
-            )
-            dfs.append(df_tmp)
         # TODO(Nikola): raise error on empty df?
-        df = pd.concat(dfs, axis=0)
+        df = self._apply_im_normalizations(
+            df,
+            full_symbol_col_name,
+            self._resample_1min,
+            start_ts,
+            end_ts,
+        )
+        self._dassert_output_data_is_valid(
+            df,
+            full_symbol_col_name,
+            self._resample_1min,
+            start_ts,
+            end_ts,
+        )
         _LOG.debug("After im_normalization: df=\n%s", hpandas.df_to_str(df))
-        # Sort by index and `full_symbol_col_name`.
-        # There is not a simple way to sort by index and columns in Pandas,
-        # so we convert the index into a column, sort, and convert back.
-        df = df.reset_index()
-        df = df.sort_values(by=["timestamp", full_symbol_col_name])
-        df = df.set_index("timestamp", drop=True)
         # The full_symbol should be a string.
         if not df.empty:
             hdbg.dassert_isinstance(df[full_symbol_col_name].values[0], str)
-        _LOG.debug("After sorting: df=\n%s", hpandas.df_to_str(df))
         return df
 
     # /////////////////////////////////////////////////////////////////////////
@@ -244,6 +300,32 @@ class ImClient(abc.ABC):
         mode = "end"
         return self._get_start_end_ts_for_symbol(full_symbol, mode)
 
+    def get_last_timestamp(
+        self,
+        full_symbols: List[ivcu.FullSymbol],
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> Optional[pd.Timestamp]:
+        """
+        Return the last timestamp of the data in `[start_ts, end_ts]` for
+        `full_symbols`.
+
+        This implementation relies on reading the data and then finding the
+        max. Derived classes can override this method if there is a more
+        efficient way to get this information, e.g., with `SELECT MAX` or the
+        Parquet statistics.
+
+        :return: the last timestamp in UTC or `None` if there is no data
+        """
+        data = self.read_data(full_symbols, start_ts, end_ts)
+        if data.empty:
+            return None
+        # Assume that the timestamp is always stored as index.
+        last_timestamp = data.index.max()
+        hdbg.dassert_isinstance(last_timestamp, pd.Timestamp)
+        hdateti.dassert_has_specified_tz(last_timestamp, ["UTC"])
+        return last_timestamp
+
     def get_full_symbols_from_asset_ids(
         self, asset_ids: List[int]
     ) -> List[ivcu.FullSymbol]:
@@ -274,12 +356,17 @@ class ImClient(abc.ABC):
     ) -> pd.DataFrame:
         """
         Apply normalizations to IM data.
+
+        The data of all the symbols is normalized at once, instead of
+        processing each symbol separately and concatenating the results.
         """
         _LOG.debug(hprint.to_str("full_symbol_col_name start_ts end_ts"))
         hdbg.dassert(not df.empty, "Empty df=\n%s", df)
         # TODO(Dan): CmTask1588 "Consider possible flaws of dropping duplicates
         # from data".
         # 1) Drop duplicates.
+        # Since the full symbol is a column, dropping duplicated rows from all
+        # the data is the same as dropping them from the data of each symbol.
         df = hpandas.drop_duplicates(df)
         # 2) Trim the data keeping only the data with index in [start_ts, end_ts].
         # Trimming of the data is done because:
@@ -293,17 +380,23 @@ class ImClient(abc.ABC):
         df = hpandas.trim_df(
             df, ts_col_name, start_ts, end_ts, left_close, right_close
         )
-        # 3) Resample index to 1 min frequency if specified.
+        # 3) Convert to UTC.
+        df.index = df.index.tz_convert("UTC")
+        # Encode the full symbols so that the order of the codes is the order
+        # of the full symbols.
+        codes, full_symbols = pd.factorize(df[full_symbol_col_name], sort=True)
+        timestamps = df.index.asi8
+        # 4) Resample index to 1 min frequency if specified.
         if resample_1min:
-            df = hpandas.resample_df(df, "T")
-            # Fill NaN values appeared after resampling in full symbol column.
-            # Combination of full symbol and timestamp is a unique identifier,
-            # so full symbol cannot be NaN.
-            df[full_symbol_col_name] = df[full_symbol_col_name].fillna(
-                method="bfill"
+            df, codes, timestamps = _resample_1min_by_full_symbol(
+                df, full_symbol_col_name, codes, full_symbols, timestamps
             )
-        # 4) Convert to UTC.
-        df.index = df.index.tz_convert("UTC")
+        # 5) Sort by index and full symbol.
+        idxs = np.lexsort((codes, timestamps))
+        df = df.iloc[idxs]
+        df.index = pd.DatetimeIndex(
+            timestamps[idxs].view("M8[ns]"), name="timestamp"
+        ).tz_localize("UTC")
         return df
 
     @staticmethod
@@ -316,14 +409,12 @@ class ImClient(abc.ABC):
     ) -> None:
         """
         Verify that the normalized data is valid.
+
+        The checks are vectorized across all the symbols, so that they are
+        cheap enough to run on every call.
         """
         # Check that index is `pd.DatetimeIndex`.
         hpandas.dassert_index_is_datetime(df)
-        if resample_1min:
-            # Check that index is monotonic increasing.
-            hpandas.dassert_strictly_increasing_index(df)
-            # Verify that index frequency is 1 minute.
-            hdbg.dassert_eq(df.index.freq, "T")
         # Check that timezone info is correct.
         expected_tz = ["UTC"]
         # Assume that the first value of an index is representative.
@@ -333,15 +424,33 @@ class ImClient(abc.ABC):
         )
         # Check that full symbol column has no NaNs.
         hdbg.dassert(df[full_symbol_col_name].notna().all())
+        codes, _ = pd.factorize(df[full_symbol_col_name], sort=True)
+        timestamps = df.index.asi8
         # Check that there are no duplicates in data by index and full symbol.
-        n_duplicated_rows = (
-            df.reset_index()
-            .duplicated(subset=["timestamp", full_symbol_col_name])
-            .sum()
-        )
+        # The data is expected to be sorted by index and full symbol, so any
+        # duplicate is adjacent to the original row.
+        is_same_ts = timestamps[1:] == timestamps[:-1]
+        n_duplicated_rows = int((is_same_ts & (codes[1:] == codes[:-1])).sum())
         hdbg.dassert_eq(
             n_duplicated_rows, 0, msg="There are duplicated rows in the data"
         )
+        # Check that the data is sorted by index and full symbol.
+        is_sorted = (timestamps[1:] > timestamps[:-1]) | (
+            is_same_ts & (codes[1:] > codes[:-1])
+        )
+        hdbg.dassert(
+            is_sorted.all(), "The data is not sorted by index and full symbol"
+        )
+        if resample_1min:
+            # Check that the index of each symbol is strictly increasing with
+            # a 1 minute frequency.
+            idxs = np.argsort(codes, kind="stable")
+            is_same_symbol = codes[idxs][1:] == codes[idxs][:-1]
+            diffs = np.diff(timestamps[idxs])[is_same_symbol]
+            hdbg.dassert(
+                (diffs == _ONE_MINUTE_IN_NS).all(),
+                "The index of each symbol should have a 1 minute frequency",
+            )
         # Ensure that all the data is in [start_ts, end_ts].
         if start_ts:
             hdbg.dassert_lte(start_ts, df.index.min())
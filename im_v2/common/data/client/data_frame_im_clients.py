@@ -72,6 +72,27 @@ class DataFrameImClient(imvcdcbimcl.ImClientReadingMultipleSymbols):
         """
         return self._universe
 
+    def get_last_timestamp(
+        self,
+        full_symbols: List[ivcu.FullSymbol],
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> Optional[pd.Timestamp]:
+        """
+        See description in the parent class.
+        """
+        full_symbol_col_name = self._get_full_symbol_col_name(None)
+        data = self._read_data_for_multiple_symbols(
+            full_symbols,
+            start_ts,
+            end_ts,
+            full_symbol_col_name=full_symbol_col_name,
+        )
+        if data.empty:
+            return None
+        last_timestamp = data.index.max().tz_convert("UTC")
+        return last_timestamp
+
     def _read_data_for_multiple_symbols(
         self,
         full_symbols: List[ivcu.FullSymbol],
@@ -77,6 +77,49 @@ class HistoricalPqByTileClient(
         """
         raise NotImplementedError
 
+    def get_last_timestamp(
+        self,
+        full_symbols: List[ivcu.FullSymbol],
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> Optional[pd.Timestamp]:
+        """
+        See description in the parent class.
+
+        The last timestamp is computed from the Parquet statistics, without
+        reading the data.
+        """
+        hdbg.dassert_container_type(full_symbols, list, str)
+        full_symbol_col_name = self._get_full_symbol_col_name(None)
+        root_dir_symbol_filter_dict = self._get_root_dirs_symbol_filters(
+            full_symbols, full_symbol_col_name
+        )
+        last_timestamps = []
+        for root_dir, symbol_filter in root_dir_symbol_filter_dict.items():
+            filters = hparque.get_parquet_filters_from_timestamp_interval(
+                self._partition_mode,
+                start_ts,
+                end_ts,
+                additional_filters=[symbol_filter],
+            )
+            last_timestamp = hparque.get_last_timestamp(
+                root_dir,
+                filters,
+                start_ts,
+                end_ts,
+                aws_profile=self._aws_profile,
+            )
+            if last_timestamp is not None:
+                last_timestamps.append(last_timestamp)
+        if not last_timestamps:
+            return None
+        last_timestamp = max(last_timestamps)
+        if last_timestamp.tz is None:
+            last_timestamp = last_timestamp.tz_localize("UTC")
+        else:
+            last_timestamp = last_timestamp.tz_convert("UTC")
+        return last_timestamp
+
     # TODO(Grisha): factor out the column names in the child classes, see `CCXT`, `Talos`.
     @staticmethod
     def _get_columns_for_query() -> Optional[List[str]]:
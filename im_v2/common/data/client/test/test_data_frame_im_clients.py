@@ -1,10 +1,19 @@
-from typing import List
+import logging
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
+import pytest
 
+import helpers.hpandas as hpandas
+import helpers.htimer as htimer
+import helpers.hunit_test as hunitest
+import im_v2.common.data.client.data_frame_im_clients as imvcdcdfimc
 import im_v2.common.data.client.data_frame_im_clients_example as imvcdcdfimce
 import im_v2.common.data.client.test.im_client_test_case as icdctictc
 
+_LOG = logging.getLogger(__name__)
+
 # #############################################################################
 # TestDataFrameImClient1
 # #############################################################################
@@ -258,3 +267,165 @@ class TestDataFrameImClient1(icdctictc.ImClientTestCase):
             expected_first_elements,
             expected_last_elements,
         )
+
+
+# #############################################################################
+# TestDataFrameImClient2
+# #############################################################################
+
+
+def _get_data(num_symbols: int, num_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate 1 minute bars with gaps, duplicates, and off-grid rows.
+    """
+    rng = np.random.default_rng(seed)
+    dfs = []
+    for i in range(num_symbols):
+        start_ts = pd.Timestamp("2022-01-01 09:00", tz="America/New_York")
+        start_ts += pd.Timedelta(minutes=int(rng.integers(0, 10)))
+        index = pd.date_range(start_ts, periods=num_rows, freq="T")
+        df = pd.DataFrame(
+            {
+                "full_symbol": f"binance::S{i}_USDT",
+                "close": rng.normal(size=num_rows),
+                "volume": rng.integers(0, 100, size=num_rows),
+            },
+            index=index,
+        )
+        # Add gaps, duplicated rows, and rows that are not on the grid.
+        df = df[rng.random(num_rows) > 0.1]
+        df_off_grid = df.iloc[:2].copy()
+        df_off_grid.index += pd.Timedelta(seconds=30)
+        df_off_grid["close"] += 1.0
+        df = pd.concat([df, df.iloc[:3], df_off_grid])
+        df.index = df.index.tz_convert("UTC")
+        dfs.append(df)
+    # Keep one symbol without gaps.
+    dfs.append(
+        pd.DataFrame(
+            {
+                "full_symbol": "binance::BTC_USDT",
+                "close": 1.0,
+                "volume": np.arange(num_rows),
+            },
+            index=pd.date_range(
+                "2022-01-01 14:00", periods=num_rows, freq="T", tz="UTC"
+            ),
+        )
+    )
+    df = pd.concat(dfs).sample(frac=1.0, random_state=seed)
+    df = df.sort_index(kind="stable")
+    df.index.name = "end_ts"
+    return df
+
+
+def _normalize_by_symbol(
+    df: pd.DataFrame,
+    start_ts: Optional[pd.Timestamp],
+    end_ts: Optional[pd.Timestamp],
+) -> pd.DataFrame:
+    """
+    Normalize the data one symbol at a time.
+
+    This is the reference implementation of the normalization in
+    `ImClient.read_data()` with resampling.
+    """
+    df = df.copy()
+    df.index.name = "timestamp"
+    dfs = []
+    for _, df_tmp in df.groupby("full_symbol"):
+        df_tmp = hpandas.drop_duplicates(df_tmp)
+        df_tmp = hpandas.trim_df(df_tmp, None, start_ts, end_ts, True, True)
+        df_tmp = hpandas.resample_df(df_tmp, "T")
+        df_tmp["full_symbol"] = df_tmp["full_symbol"].fillna(method="bfill")
+        df_tmp.index = df_tmp.index.tz_convert("UTC")
+        dfs.append(df_tmp)
+    df = pd.concat(dfs, axis=0)
+    df = df.reset_index()
+    df = df.sort_values(by=["timestamp", "full_symbol"])
+    df = df.set_index("timestamp", drop=True)
+    return df
+
+
+class TestDataFrameImClient2(hunitest.TestCase):
+    def test_read_data1(self) -> None:
+        """
+        Check that the normalization matches the one done symbol by symbol.
+        """
+        df = _get_data(5, 100)
+        self._test_read_data(df, None, None)
+
+    def test_read_data2(self) -> None:
+        """
+        Same as `test_read_data1()` but trimming the data.
+        """
+        df = _get_data(5, 100)
+        start_ts = pd.Timestamp("2022-01-01 14:30", tz="UTC")
+        end_ts = pd.Timestamp("2022-01-01 15:00", tz="UTC")
+        self._test_read_data(df, start_ts, end_ts)
+
+    def test_read_data3(self) -> None:
+        """
+        Check that the data of a symbol without gaps keeps its dtypes.
+        """
+        df = _get_data(0, 10)
+        actual = self._test_read_data(df, None, None)
+        self.assertEqual(actual["volume"].dtype, np.int64)
+
+    def test_read_data4(self) -> None:
+        """
+        Check that conflicting rows for the same timestamp are rejected.
+        """
+        df = _get_data(2, 10)
+        df_conflict = df.iloc[:1].copy()
+        df_conflict["close"] += 1.0
+        df = pd.concat([df, df_conflict]).sort_index(kind="stable")
+        universe = sorted(df["full_symbol"].unique())
+        im_client = imvcdcdfimc.DataFrameImClient(
+            df, universe, resample_1min=True
+        )
+        with self.assertRaises(AssertionError) as cm:
+            im_client.read_data(universe, None, None)
+        self.assertIn("Index must have only unique values", str(cm.exception))
+
+    def _test_read_data(
+        self,
+        df: pd.DataFrame,
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
+        universe = sorted(df["full_symbol"].unique())
+        im_client = imvcdcdfimc.DataFrameImClient(
+            df, universe, resample_1min=True
+        )
+        actual = im_client.read_data(universe, start_ts, end_ts)
+        expected = _normalize_by_symbol(df, start_ts, end_ts)
+        pd.testing.assert_frame_equal(actual, expected, check_freq=False)
+        return actual
+
+
+class TestDataFrameImClientBenchmark(hunitest.TestCase):
+    @pytest.mark.superslow("Benchmark.")
+    def test_read_data1(self) -> None:
+        """
+        Compare the run time of the normalization with the one done symbol by
+        symbol.
+        """
+        df = _get_data(500, 1440)
+        universe = sorted(df["full_symbol"].unique())
+        im_client = imvcdcdfimc.DataFrameImClient(
+            df, universe, resample_1min=True
+        )
+        with htimer.TimedScope(logging.INFO, "By symbol") as ts:
+            expected = _normalize_by_symbol(df, None, None)
+        by_symbol_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "read_data") as ts:
+            actual = im_client.read_data(universe, None, None)
+        read_data_elapsed = ts.elapsed_time
+        _LOG.info(
+            "by_symbol=%.3f s, read_data=%.3f s, speedup=%.2fx",
+            by_symbol_elapsed,
+            read_data_elapsed,
+            by_symbol_elapsed / read_data_elapsed,
+        )
+        pd.testing.assert_frame_equal(actual, expected, check_freq=False)
@@ -278,6 +278,36 @@ class TestHistoricalPqByTileClient1(icdctictc.ImClientTestCase):
             im_client, full_symbol, expected_end_timestamp
         )
 
+    def test_get_last_timestamp1(self) -> None:
+        """
+        Check that the last timestamp from the Parquet statistics is the last
+        timestamp of the data.
+        """
+        # Generate Parquet test data and initialize client.
+        full_symbols = ["binance::BTC_USDT", "kucoin::FIL_USDT"]
+        resample_1min = False
+        im_client = imvcdchpce.get_MockHistoricalByTileClient_example1(
+            self, full_symbols, resample_1min
+        )
+        # Compare the expected values.
+        intervals = [
+            (None, None),
+            (pd.Timestamp("2021-12-30 23:00:00+00:00"), None),
+            (None, pd.Timestamp("2021-12-31 07:03:30+00:00")),
+            (
+                pd.Timestamp("2021-12-31 19:59:00-05:00"),
+                pd.Timestamp("2022-01-01 10:00:00+00:00"),
+            ),
+        ]
+        for start_ts, end_ts in intervals:
+            actual = im_client.get_last_timestamp(full_symbols, start_ts, end_ts)
+            data = im_client.read_data(full_symbols, start_ts, end_ts)
+            self.assertEqual(actual, data.index.max())
+        # Check an interval without data.
+        start_ts = pd.Timestamp("2022-02-01 00:00:00+00:00")
+        actual = im_client.get_last_timestamp(full_symbols, start_ts, None)
+        self.assertIsNone(actual)
+
     # ////////////////////////////////////////////////////////////////////////
 
     def test_get_universe1(self) -> None:
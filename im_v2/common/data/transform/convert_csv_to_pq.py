@@ -14,6 +14,11 @@ dst_dir/
                     data.parquet
 ```
 
+The CSV files are converted in parallel with the Arrow streaming CSV reader
+and the dataset partitioned by date is written one row group at a time and
+a bounded number of dates at a time, so the data is never loaded in memory
+all at once.
+
 Usage sample:
 
 > im_v2/common/data/transform/convert_csv_to_pq.py \
@@ -27,24 +32,41 @@ Usage sample:
 # TODO(gp): -> transform_csv_to_pq
 
 import argparse
+import concurrent.futures
+import contextlib
 import logging
 import os
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
-import pyarrow.dataset as ds
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import s3fs
 
 import helpers.hdbg as hdbg
 import helpers.hio as hio
 import helpers.hpandas as hpandas
-import helpers.hparquet as hparque
 import helpers.hparser as hparser
 import helpers.hs3 as hs3
+import helpers.htimer as htimer
 import im_v2.common.data.transform.transform_utils as imvcdttrut
 
 _LOG = logging.getLogger(__name__)
 
 
+def _get_path_for_filesystem(
+    path: str, filesystem: Optional[s3fs.core.S3FileSystem]
+) -> str:
+    """
+    Return the path to use with `filesystem`, i.e., without `s3://` for S3.
+    """
+    if filesystem is not None and hs3.is_s3_path(path):
+        path = path[len("s3://") :]
+    return path
+
+
 def _get_csv_to_pq_file_names(
     src_dir: str,
     dst_dir: str,
@@ -82,18 +104,20 @@ def _get_csv_to_pq_file_names(
         else:
             _LOG.warning("Found non CSV file '%s'", filename)
         # Build corresponding Parquet file.
+        # Full path is already present in filenames.
+        csv_path = filename
         if s3fs_:
-            # Full path is already present in filenames when iterating in S3.
-            pq_path = (
-                f"{dst_dir.lstrip('s3://')}{csv_filename.split('/')[-1]}.parquet"
-            )
-            csv_path = filename
+            dst_dir_for_s3fs = _get_path_for_filesystem(dst_dir, s3fs_)
+            pq_path = f"{dst_dir_for_s3fs}{csv_filename.split('/')[-1]}.parquet"
+            pq_exists = s3fs_.exists(pq_path)
         else:
-            pq_path = os.path.join(dst_dir, f"{csv_filename}.parquet")
-            csv_path = os.path.join(src_dir, filename)
+            pq_path = os.path.join(
+                dst_dir, f"{os.path.basename(csv_filename)}.parquet"
+            )
+            pq_exists = os.path.exists(pq_path)
         # Skip CSV files that do not need to be converted.
         # TODO(gp): Try to use hjoblib.apply_incremental_mode
-        if incremental:
+        if incremental and pq_exists:
             _LOG.warning(
                 "Skipping conversion of CSV file '%s' since '%s' already exists",
                 csv_path,
@@ -104,6 +128,249 @@ def _get_csv_to_pq_file_names(
     return csv_filenames
 
 
+def _open_input_stream(
+    file_name: str, filesystem: Optional[s3fs.core.S3FileSystem]
+) -> pa.NativeFile:
+    """
+    Open a (possibly gzipped) local or S3 file as an Arrow stream.
+    """
+    compression = "gzip" if file_name.endswith(".gz") else None
+    if filesystem is None:
+        stream = pa.input_stream(file_name, compression=compression)
+    else:
+        stream = pa.input_stream(
+            filesystem.open(file_name, "rb"), compression=compression
+        )
+    return stream
+
+
+def _infer_csv_column_types(
+    csv_path: str, filesystem: Optional[s3fs.core.S3FileSystem]
+) -> Dict[str, pa.DataType]:
+    """
+    Infer the types of the columns from the first block of a CSV file.
+
+    Datetimes are kept as strings, like `pd.read_csv()` does, and the columns
+    without values are left to the inference of each file.
+    """
+    with _open_input_stream(csv_path, filesystem) as stream:
+        schema = pacsv.open_csv(stream).schema
+    column_types = {}
+    for field in schema:
+        if pa.types.is_null(field.type):
+            continue
+        if pa.types.is_temporal(field.type):
+            column_types[field.name] = pa.string()
+        else:
+            column_types[field.name] = field.type
+    return column_types
+
+
+def _stream_csv_file_to_pq(
+    csv_path: str,
+    pq_path: str,
+    column_types: Dict[str, pa.DataType],
+    filesystem: Optional[s3fs.core.S3FileSystem],
+) -> int:
+    """
+    Convert a CSV file into a Parquet file one block at a time.
+
+    :return: number of converted rows
+    """
+    convert_options = pacsv.ConvertOptions(column_types=column_types)
+    num_rows = 0
+    with _open_input_stream(csv_path, filesystem) as stream:
+        reader = pacsv.open_csv(stream, convert_options=convert_options)
+        with pq.ParquetWriter(
+            pq_path, reader.schema, filesystem=filesystem
+        ) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                num_rows += batch.num_rows
+    return num_rows
+
+
+def _read_csv_file_to_pq(
+    csv_path: str,
+    pq_path: str,
+    filesystem: Optional[s3fs.core.S3FileSystem],
+) -> int:
+    """
+    Convert a CSV file into a Parquet file reading it in memory.
+
+    :return: number of converted rows
+    """
+    kwargs = {}
+    if filesystem:
+        kwargs["s3fs"] = filesystem
+    stream, kwargs = hs3.get_local_or_s3_stream(csv_path, **kwargs)
+    df = hpandas.read_csv_to_df(stream, **kwargs)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, pq_path, filesystem=filesystem)
+    return len(df)
+
+
+def _convert_csv_file_to_pq(
+    csv_path: str,
+    pq_path: str,
+    column_types: Dict[str, pa.DataType],
+    filesystem: Optional[s3fs.core.S3FileSystem],
+) -> int:
+    """
+    Convert a CSV file into a Parquet file.
+
+    The file is streamed with `column_types`, which are inferred from the
+    beginning of the data. If the rest of the data doesn't fit them (e.g., a
+    column with ints followed by floats), the file is read in memory with
+    `pd.read_csv()`, which infers the types from all the data.
+
+    :return: number of converted rows
+    """
+    try:
+        num_rows = _stream_csv_file_to_pq(
+            csv_path, pq_path, column_types, filesystem
+        )
+    except pa.ArrowInvalid as e:
+        _LOG.warning(
+            "Can't stream '%s' with the inferred types, reading it in memory: %s",
+            csv_path,
+            str(e),
+        )
+        num_rows = _read_csv_file_to_pq(csv_path, pq_path, filesystem)
+    return num_rows
+
+
+def _get_pq_file_names(
+    dst_dir: str, filesystem: Optional[s3fs.core.S3FileSystem]
+) -> List[str]:
+    """
+    Return the Parquet files converted from CSV files in `dst_dir`, i.e.,
+    excluding the partitioned dataset.
+    """
+    pattern = "*.parquet"
+    only_files = True
+    use_relative_paths = True
+    file_names = hs3.listdir(
+        dst_dir, pattern, only_files, use_relative_paths, aws_profile=filesystem
+    )
+    file_names = sorted(
+        file_name for file_name in file_names if os.sep not in file_name
+    )
+    dst_dir = _get_path_for_filesystem(dst_dir, filesystem)
+    pq_paths = [os.path.join(dst_dir, file_name) for file_name in file_names]
+    return pq_paths
+
+
+@contextlib.contextmanager
+def _open_pq_file(
+    pq_path: str, filesystem: Optional[s3fs.core.S3FileSystem]
+) -> Iterator[pq.ParquetFile]:
+    """
+    Open a local or S3 Parquet file.
+    """
+    # `pq.ParquetFile` doesn't accept a filesystem, so S3 files are opened
+    # through `filesystem`.
+    if filesystem is None:
+        yield pq.ParquetFile(pq_path)
+    else:
+        with filesystem.open(pq_path, "rb") as f:
+            yield pq.ParquetFile(f)
+
+
+def _split_by_date(df: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Split data with a datetime index by date, keeping the order of the rows
+    of each date.
+
+    :return: iterator of dates like `20211204` and the corresponding data
+    """
+    days = df.index.floor("D")
+    # Use a stable sort to keep the order of the rows of each date.
+    idxs = np.argsort(days.values, kind="stable")
+    df = df.iloc[idxs]
+    days = days[idxs]
+    boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(df)]])
+    for start, end in zip(starts, ends):
+        yield days[start].strftime("%Y%m%d"), df.iloc[start:end]
+
+
+def _partition_pq_files_by_date(
+    pq_paths: List[str],
+    dst_dir: str,
+    datetime_col: str,
+    filesystem: Optional[s3fs.core.S3FileSystem],
+    *,
+    max_open_files: int = 64,
+) -> None:
+    """
+    Save the data of `pq_paths` partitioned by date in `dst_dir`.
+
+    The dates of each row group are found reading only `datetime_col`. Then
+    the dates are written in windows of `max_open_files` dates: the row
+    groups with data in a window are read one at a time and their rows are
+    appended to the `date=YYYYMMDD/data.parquet` files of the window, which
+    are closed before moving to the next window. This bounds the memory and
+    the number of open files, while a row group is read once for each window
+    with its data.
+
+    :param max_open_files: max number of files written at the same time
+    """
+    hdbg.dassert_lte(1, max_open_files)
+    dst_dir_for_write = _get_path_for_filesystem(dst_dir, filesystem)
+    # Find the dates of each row group.
+    row_groups: List[Tuple[str, int, Set[str]]] = []
+    for pq_path in pq_paths:
+        with _open_pq_file(pq_path, filesystem) as pq_file:
+            for row_group_idx in range(pq_file.num_row_groups):
+                df = pq_file.read_row_group(
+                    row_group_idx, columns=[datetime_col]
+                ).to_pandas()
+                df = imvcdttrut.reindex_on_datetime(df, datetime_col)
+                dates = set(df.index.floor("D").unique().strftime("%Y%m%d"))
+                row_groups.append((pq_path, row_group_idx, dates))
+    all_dates = sorted(set().union(*[dates for _, _, dates in row_groups]))
+    _LOG.debug(
+        "Found %s dates in %s row groups", len(all_dates), len(row_groups)
+    )
+    schema: Optional[pa.Schema] = None
+    for window_start in range(0, len(all_dates), max_open_files):
+        window_dates = set(
+            all_dates[window_start : window_start + max_open_files]
+        )
+        writers: Dict[str, pq.ParquetWriter] = {}
+        try:
+            for pq_path, row_group_idx, dates in row_groups:
+                if window_dates.isdisjoint(dates):
+                    continue
+                with _open_pq_file(pq_path, filesystem) as pq_file:
+                    df = pq_file.read_row_group(row_group_idx).to_pandas()
+                # Set datetime index.
+                df = imvcdttrut.reindex_on_datetime(df, datetime_col)
+                for date, df_for_date in _split_by_date(df):
+                    if date not in window_dates:
+                        continue
+                    table = pa.Table.from_pandas(df_for_date, schema=schema)
+                    if schema is None:
+                        schema = table.schema
+                    if date not in writers:
+                        dir_name = os.path.join(
+                            dst_dir_for_write, f"date={date}"
+                        )
+                        if filesystem is None:
+                            hio.create_dir(dir_name, incremental=True)
+                        writers[date] = pq.ParquetWriter(
+                            os.path.join(dir_name, "data.parquet"),
+                            schema,
+                            filesystem=filesystem,
+                        )
+                    writers[date].write_table(table)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+
 def _run(args: argparse.Namespace) -> None:
     if args.aws_profile is not None:
         filesystem = hs3.get_s3fs(args.aws_profile)
@@ -115,29 +382,37 @@ def _run(args: argparse.Namespace) -> None:
     files = _get_csv_to_pq_file_names(
         args.src_dir, args.dst_dir, args.incremental, s3fs_=filesystem
     )
-    # Convert CSV files into Parquet files.
-    for csv_full_path, pq_full_path in files:
-        stream, kwargs = hs3.get_local_or_s3_stream(csv_full_path)
-        if filesystem:
-            kwargs["s3fs"] = filesystem
-        df = hpandas.read_csv_to_df(stream, **kwargs)
-        hparque.to_parquet(df, pq_full_path, aws_profile=filesystem)
+    # Convert CSV files into Parquet files in parallel, streaming each file
+    # with the types inferred from the first file.
+    if files:
+        column_types = _infer_csv_column_types(files[0][0], filesystem)
+        _LOG.debug("column_types=%s", column_types)
+        with htimer.TimedScope(logging.INFO, "# convert_csv_to_pq") as ts:
+            with concurrent.futures.ThreadPoolExecutor(
+                args.num_threads
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _convert_csv_file_to_pq,
+                        csv_full_path,
+                        pq_full_path,
+                        column_types,
+                        filesystem,
+                    )
+                    for csv_full_path, pq_full_path in files
+                ]
+                num_rows = sum(future.result() for future in futures)
+        _LOG.info(
+            "Converted %s rows from %s files: %.0f rows/sec",
+            num_rows,
+            len(files),
+            num_rows / max(ts.elapsed_time, 1e-9),
+        )
     # Convert Parquet files into a different partitioning scheme.
     # TODO(gp): IMO this is a different / optional step.
-    dataset = ds.dataset(
-        args.dst_dir, format="parquet", partitioning="hive", filesystem=filesystem
-    )
-    # TODO(gp): Not sure this can be done since all the CSV files might not fit in
-    #  memory.
-    df = dataset.to_table().to_pandas()
-    # Set datetime index.
-    reindexed_df = imvcdttrut.reindex_on_datetime(df, args.datetime_col)
-    # Add date partition columns to the dataframe.
-    df, partition_cols = hparque.add_date_partition_columns(
-        reindexed_df, "by_date"
-    )
-    hparque.to_partitioned_parquet(
-        df, partition_cols, args.dst_dir, aws_profile=args.aws_profile
+    pq_paths = _get_pq_file_names(args.dst_dir, filesystem)
+    _partition_pq_files_by_date(
+        pq_paths, args.dst_dir, args.datetime_col, filesystem
     )
 
 
@@ -178,6 +453,13 @@ def _parse() -> argparse.ArgumentParser:
         action="store_true",
         help="Skip files that have already been converted",
     )
+    parser.add_argument(
+        "--num_threads",
+        action="store",
+        type=int,
+        default=4,
+        help="Number of CSV files converted at the same time",
+    )
     parser.add_argument(
         "--aws_profile",
         action="store",
@@ -2,6 +2,10 @@
 """
 Extract RT data from db to daily PQ files.
 
+The data of the whole timespan is streamed from the DB with a single query
+and written to the daily PQ files incrementally, skipping the dates that are
+already present.
+
 # Usage sample:
 > im_v2/common/data/transform/extract_data_from_db.py \
     --start_date '2021-11-23' \
@@ -12,21 +16,318 @@ Extract RT data from db to daily PQ files.
 
 import argparse
 import logging
-import os.path
+import os
+import resource
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+import helpers.hdatetime as hdateti
 import helpers.hdbg as hdbg
-import helpers.hparquet as hparque
+import helpers.hio as hio
 import helpers.hparser as hparser
 import helpers.hs3 as hs3
 import helpers.hsql as hsql
-import im_v2.ccxt.data.client as icdcl
+import helpers.htimer as htimer
 import im_v2.common.universe as ivcu
 import im_v2.im_lib_tasks as imvimlita
 
 _LOG = logging.getLogger(__name__)
 
+# Columns selected from the DB.
+_DB_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "exchange_id",
+    "currency_pair",
+]
+# Columns of the daily PQ files, like the output of `CcxtCddDbClient`.
+_OHLCV_COLUMNS = ["full_symbol", "open", "high", "low", "close", "volume"]
+
+
+def _get_existing_dates(dst_dir: str, aws_profile: Optional[str]) -> Set[str]:
+    """
+    Return the dates of the partitions in `dst_dir` with a single listing.
+
+    :return: dates like `20211123`
+    """
+    paths = hs3.listdir(
+        dst_dir,
+        "date=*",
+        only_files=False,
+        use_relative_paths=True,
+        aws_profile=aws_profile,
+    )
+    dates = {
+        os.path.basename(path)[len("date=") :]
+        for path in paths
+        if os.path.basename(path).startswith("date=")
+    }
+    return dates
+
+
+def _build_select_query(
+    table_name: str,
+    full_symbols: List[ivcu.FullSymbol],
+    start_ts: pd.Timestamp,
+    end_ts: pd.Timestamp,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build a query for the OHLCV data of `full_symbols` in `[start_ts, end_ts)`
+    ordered by timestamp.
+
+    :return: query and its parameters
+    """
+    parsed_symbols = [ivcu.parse_full_symbol(s) for s in full_symbols]
+    exchange_ids, currency_pairs = zip(*parsed_symbols)
+    # The NUMERIC columns are converted to float by the DB, instead of
+    # returning `Decimal` objects.
+    query = (
+        "SELECT DISTINCT timestamp, open::float8 AS open, high::float8 AS high,"
+        " low::float8 AS low, close::float8 AS close,"
+        " volume::float8 AS volume, exchange_id, currency_pair"
+        f" FROM {table_name}"
+        " WHERE timestamp >= %(start_unix_epoch)s"
+        " AND timestamp < %(end_unix_epoch)s"
+        " AND (exchange_id, currency_pair) IN"
+        " (SELECT * FROM UNNEST(%(exchange_ids)s, %(currency_pairs)s))"
+        " ORDER BY timestamp, exchange_id, currency_pair"
+    )
+    params = {
+        "start_unix_epoch": hdateti.convert_timestamp_to_unix_epoch(start_ts),
+        "end_unix_epoch": hdateti.convert_timestamp_to_unix_epoch(end_ts),
+        "exchange_ids": list(exchange_ids),
+        "currency_pairs": list(currency_pairs),
+    }
+    return query, params
+
+
+def _normalize_rows(rows: List[Tuple]) -> pd.DataFrame:
+    """
+    Convert rows from the DB into OHLCV data indexed by UTC timestamp.
+    """
+    df = pd.DataFrame.from_records(rows, columns=_DB_COLUMNS)
+    df["full_symbol"] = ivcu.build_full_symbol(
+        df["exchange_id"], df["currency_pair"]
+    )
+    df.index = pd.DatetimeIndex(
+        pd.to_datetime(df["timestamp"], unit="ms", utc=True), name="timestamp"
+    )
+    df = df[_OHLCV_COLUMNS]
+    return df
+
+
+class _DatePartitionWriter:
+    """
+    Write data ordered by timestamp into `date=YYYYMMDD/data.parquet` files.
+
+    The file of a date stays open until data for a later date arrives, so
+    that the data of a date can be written in chunks. The data of a date is
+    written to a hidden temporary file, which is moved to its partition only
+    after being closed, so that a failure doesn't leave a partial date that
+    would be skipped as already present.
+    """
+
+    def __init__(
+        self,
+        dst_dir: str,
+        existing_dates: Set[str],
+        aws_profile: Optional[str],
+    ) -> None:
+        """
+        Constructor.
+
+        :param existing_dates: dates whose data is skipped
+        """
+        self._dst_dir = dst_dir
+        self._existing_dates = existing_dates
+        self._filesystem = None
+        if aws_profile is not None:
+            self._filesystem = hs3.get_s3fs(aws_profile)
+        self._schema: Optional[pa.Schema] = None
+        self._date: Optional[str] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self.num_written_rows = 0
+        self.num_skipped_rows = 0
+        self.written_dates: List[str] = []
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Write a chunk of data.
+
+        :param df: data with a UTC timestamp index, ordered by timestamp and
+            following the data of the previous chunks
+        """
+        if df.empty:
+            return
+        # Split the chunk by date.
+        days = df.index.floor("D")
+        boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(df)]])
+        for start, end in zip(starts, ends):
+            date = days[start].strftime("%Y%m%d")
+            if date in self._existing_dates:
+                self.num_skipped_rows += end - start
+                continue
+            if date != self._date:
+                self._open(date)
+            table = pa.Table.from_pandas(df.iloc[start:end], schema=self._schema)
+            if self._schema is None:
+                self._schema = table.schema
+            self._get_writer().write_table(table)
+            self.num_written_rows += end - start
+
+    def close(self) -> None:
+        """
+        Close the file of the current date and move it to its partition.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            dir_name = os.path.join(self._dst_dir, f"date={self._date}")
+            file_name = os.path.join(dir_name, "data.parquet")
+            tmp_file_name = self._get_tmp_file_name()
+            if self._filesystem is None:
+                hio.create_dir(dir_name, incremental=True)
+                os.replace(tmp_file_name, file_name)
+            else:
+                self._filesystem.mv(tmp_file_name, file_name)
+
+    def abort(self) -> None:
+        """
+        Discard the data written for the current date.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            tmp_file_name = self._get_tmp_file_name()
+            _LOG.warning("Removing the partial data in %s", tmp_file_name)
+            if self._filesystem is None:
+                os.remove(tmp_file_name)
+            else:
+                self._filesystem.rm(tmp_file_name)
+            self.written_dates.remove(self._date)
+            self._date = None
+
+    def _open(self, date: str) -> None:
+        hdbg.dassert_not_in(
+            date, self.written_dates, "Data is not ordered by timestamp"
+        )
+        self.close()
+        self._date = date
+        self.written_dates.append(date)
+
+    def _get_tmp_file_name(self) -> str:
+        """
+        Return the file of the current date while it is written.
+
+        The name starts with a dot, so that it is not listed as a partition.
+        """
+        file_name = os.path.join(self._dst_dir, f".tmp.date={self._date}.parquet")
+        return file_name
+
+    def _get_writer(self) -> pq.ParquetWriter:
+        """
+        Return the writer for the current date, creating it on first use.
+        """
+        if self._writer is None:
+            hdbg.dassert_is_not(self._schema, None)
+            if self._filesystem is None:
+                hio.create_dir(self._dst_dir, incremental=True)
+            self._writer = pq.ParquetWriter(
+                self._get_tmp_file_name(),
+                self._schema,
+                filesystem=self._filesystem,
+            )
+        return self._writer
+
+
+def export_data_by_date(
+    connection: hsql.DbConnection,
+    table_name: str,
+    full_symbols: List[ivcu.FullSymbol],
+    start_ts: pd.Timestamp,
+    end_ts: pd.Timestamp,
+    dst_dir: str,
+    *,
+    chunk_size: int = 100000,
+    aws_profile: Optional[str] = None,
+) -> int:
+    """
+    Export OHLCV data in `[start_ts, end_ts)` from the DB to daily PQ files.
+
+    The data is read with a single query through a server-side cursor in
+    chunks of `chunk_size` rows, and written to the `date=YYYYMMDD`
+    partitions as it arrives, so the memory doesn't depend on the timespan.
+    The dates already present in `dst_dir` are skipped. If the export fails,
+    the dates completed before the failure are kept and the partial data of
+    the current date is discarded.
+
+    :param start_ts, end_ts: boundaries of the timespan, aligned to days
+    :return: number of written rows
+    """
+    hdbg.dassert_lt(start_ts, end_ts)
+    existing_dates = _get_existing_dates(dst_dir, aws_profile)
+    dates = pd.date_range(start_ts, end_ts, freq="D", inclusive="left")
+    missing_dates = [
+        date for date in dates if date.strftime("%Y%m%d") not in existing_dates
+    ]
+    if not missing_dates:
+        _LOG.info("Skipping. All the dates are already present in %s", dst_dir)
+        return 0
+    # Read only the timespan covering the missing dates.
+    start_ts = missing_dates[0]
+    end_ts = missing_dates[-1] + pd.Timedelta(days=1)
+    query, params = _build_select_query(
+        table_name, full_symbols, start_ts, end_ts
+    )
+    _LOG.debug("query=%s params=%s", query, params)
+    writer = _DatePartitionWriter(dst_dir, existing_dates, aws_profile)
+    with htimer.TimedScope(logging.DEBUG, "# export_data_by_date") as ts:
+        # A named cursor is a server-side cursor, which needs to be held
+        # across commits in autocommit mode.
+        with connection.cursor(
+            name="export_data_by_date", withhold=True
+        ) as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.write(_normalize_rows(rows))
+            except BaseException:
+                # Don't leave a partial date, since it would be skipped by the
+                # next runs.
+                writer.abort()
+                raise
+            writer.close()
+    # Report the throughput and the peak memory.
+    num_rows = writer.num_written_rows + writer.num_skipped_rows
+    rows_per_sec = num_rows / max(ts.elapsed_time, 1e-9)
+    # `ru_maxrss` is in KB on Linux.
+    peak_memory_in_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    _LOG.info(
+        "Exported %s rows (skipped %s) for %s dates in %.1f s: "
+        "%.0f rows/sec, peak memory=%.1f MB",
+        writer.num_written_rows,
+        writer.num_skipped_rows,
+        len(writer.written_dates),
+        ts.elapsed_time,
+        rows_per_sec,
+        peak_memory_in_mb,
+    )
+    return writer.num_written_rows
+
 
 def _parse() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -88,44 +389,28 @@ def _main(parser: argparse.ArgumentParser) -> None:
     hdbg.dassert_lt(2, len(timespan))
     # Check if location for daily parquet files exists.
     dst_dir = args.dst_dir
-    hdbg.dassert_path_exists(dst_dir)
+    hs3.dassert_path_exists(dst_dir, aws_profile=args.aws_profile)
     # Connect to database.
     db_stage = args.db_stage
     env_file = imvimlita.get_db_env_path(db_stage)
     connection_params = hsql.get_connection_info_from_env_file(env_file)
     connection = hsql.get_connection(*connection_params)
-    # Initiate DB client.
+    # Get universe of symbols.
     # Not sure what vendor is calling below, passing `CCXT` by default.
     vendor = "CCXT"
-    resample_1min = False
-    ccxt_db_client = icdcl.CcxtCddDbClient(vendor, resample_1min, connection)
-    # Get universe of symbols.
+    table_name = vendor.lower() + "_ohlcv"
+    hdbg.dassert_in(table_name, hsql.get_table_names(connection))
     symbols = ivcu.get_vendor_universe(vendor, as_full_symbol=True)
-    for date_index in range(len(timespan) - 1):
-        _LOG.debug("Checking for RT data on %s.", timespan[date_index])
-        # TODO(Nikola): Refactor to use one db call.
-        df = ccxt_db_client.read_data(
-            symbols,
-            start_ts=timespan[date_index],
-            end_ts=timespan[date_index + 1],
-        )
-        try:
-            # Check if directory already exists in specified path.
-            date_directory = f"date={timespan[date_index].strftime('%Y%m%d')}"
-            full_path = os.path.join(dst_dir, date_directory)
-            # Check S3 path.
-            hs3.dassert_path_not_exists(full_path, aws_profile=args.aws_profile)
-            # Add date partition columns to the dataframe.
-            partition_mode = "by_date"
-            hparque.add_date_partition_columns(df, partition_mode)
-            # Partition and write dataset.
-            partition_cols = ["date"]
-            hparque.to_partitioned_parquet(
-                df, partition_cols, dst_dir, aws_profile=args.aws_profile
-            )
-        except AssertionError as ex:
-            _LOG.info("Skipping. PQ file already present: %s.", ex)
-            continue
+    # Export the data of all the dates with one query.
+    export_data_by_date(
+        connection,
+        table_name,
+        symbols,
+        timespan[0],
+        timespan[-1],
+        dst_dir,
+        aws_profile=args.aws_profile,
+    )
 
 
 if __name__ == "__main__":
@@ -1,12 +1,16 @@
 import os
 
+import numpy as np
 import pandas as pd
 import pytest
 
 import helpers.hgit as hgit
 import helpers.hio as hio
+import helpers.hparquet as hparque
 import helpers.hsystem as hsystem
 import helpers.hunit_test as hunitest
+import im_v2.common.data.transform.convert_csv_to_pq as imvcdtcctp
+import im_v2.common.data.transform.transform_utils as imvcdttrut
 
 
 class TestCsvToPq(hunitest.TestCase):
@@ -57,6 +61,124 @@ class TestCsvToPq(hunitest.TestCase):
         df2 = pd.DataFrame(data=d2)
         df2.to_csv(os.path.join(self.csv_dir_path, "test2.csv"), index=False)
 
+    def test_csv_to_pq1(self) -> None:
+        """
+        Check that the streamed conversion is the same as converting the data
+        in memory.
+        """
+        # Generate the files.
+        self.generate_example_csv_files()
+        pq_dir_path = os.path.join(self.get_scratch_space(), "pq_dir")
+        # Run command.
+        exec_path = os.path.join(
+            hgit.get_amp_abs_path(),
+            "im_v2/common/data/transform/convert_csv_to_pq.py",
+        )
+        cmd = [
+            exec_path,
+            f"--src_dir {self.csv_dir_path}",
+            f"--dst_dir {pq_dir_path}",
+            "--datetime_col timestamp",
+            "--num_threads 2",
+        ]
+        cmd = " ".join(cmd)
+        hsystem.system(cmd)
+        # Convert the data in memory.
+        csv_dfs = [
+            pd.read_csv(os.path.join(self.csv_dir_path, file_name))
+            for file_name in ["test1.csv", "test2.csv"]
+        ]
+        expected = pd.concat(csv_dfs, ignore_index=True)
+        expected = imvcdttrut.reindex_on_datetime(expected, "timestamp")
+        # Check.
+        for file_name, csv_df in zip(["test1", "test2"], csv_dfs):
+            actual = hparque.from_parquet(
+                os.path.join(pq_dir_path, f"{file_name}.parquet")
+            )
+            pd.testing.assert_frame_equal(actual, csv_df)
+        for date in ["20211204", "20211205"]:
+            actual = hparque.from_parquet(
+                os.path.join(pq_dir_path, f"date={date}", "data.parquet")
+            )
+            is_date = expected.index.strftime("%Y%m%d") == date
+            pd.testing.assert_frame_equal(actual, expected[is_date])
+
+    def test_partition_pq_files_by_date1(self) -> None:
+        """
+        Check that writing one date at a time gives the same partitions.
+        """
+        self.generate_example_csv_files()
+        pq_dir_path = os.path.join(self.get_scratch_space(), "pq_dir")
+        hio.create_dir(pq_dir_path, False)
+        csv_dfs = []
+        pq_paths = []
+        for file_name in ["test1", "test2"]:
+            csv_df = pd.read_csv(
+                os.path.join(self.csv_dir_path, f"{file_name}.csv")
+            )
+            csv_dfs.append(csv_df)
+            pq_path = os.path.join(pq_dir_path, f"{file_name}.parquet")
+            # Use row groups with rows of different dates.
+            csv_df.to_parquet(pq_path, index=False, row_group_size=2)
+            pq_paths.append(pq_path)
+        imvcdtcctp._partition_pq_files_by_date(
+            pq_paths, pq_dir_path, "timestamp", None, max_open_files=1
+        )
+        # Check.
+        expected = pd.concat(csv_dfs, ignore_index=True)
+        expected = imvcdttrut.reindex_on_datetime(expected, "timestamp")
+        for date in ["20211204", "20211205"]:
+            actual = hparque.from_parquet(
+                os.path.join(pq_dir_path, f"date={date}", "data.parquet")
+            )
+            is_date = expected.index.strftime("%Y%m%d") == date
+            pd.testing.assert_frame_equal(actual, expected[is_date])
+
+    def test_csv_to_pq2(self) -> None:
+        """
+        Check a column with ints followed by floats after the first block of
+        the CSV file, whose types are inferred as `pd.read_csv()` does.
+        """
+        test_dir = self.get_scratch_space()
+        self.csv_dir_path = os.path.join(test_dir, "csv_dir")
+        hio.create_dir(self.csv_dir_path, False)
+        num_rows = 200000
+        df = pd.DataFrame(
+            {
+                "timestamp": 1638646800000 + 10 * np.arange(num_rows),
+                "volume": np.arange(num_rows, dtype=object),
+            }
+        )
+        df.loc[num_rows - 1, "volume"] = 1.5
+        csv_path = os.path.join(self.csv_dir_path, "test1.csv")
+        df.to_csv(csv_path, index=False)
+        pq_dir_path = os.path.join(test_dir, "pq_dir")
+        # Run command.
+        exec_path = os.path.join(
+            hgit.get_amp_abs_path(),
+            "im_v2/common/data/transform/convert_csv_to_pq.py",
+        )
+        cmd = [
+            exec_path,
+            f"--src_dir {self.csv_dir_path}",
+            f"--dst_dir {pq_dir_path}",
+            "--datetime_col timestamp",
+        ]
+        cmd = " ".join(cmd)
+        hsystem.system(cmd)
+        # Check.
+        expected = pd.read_csv(csv_path)
+        self.assertEqual(expected["volume"].dtype, np.float64)
+        actual = hparque.from_parquet(
+            os.path.join(pq_dir_path, "test1.parquet")
+        )
+        pd.testing.assert_frame_equal(actual, expected)
+        actual = hparque.from_parquet(
+            os.path.join(pq_dir_path, "date=20211204", "data.parquet")
+        )
+        expected = imvcdttrut.reindex_on_datetime(expected, "timestamp")
+        pd.testing.assert_frame_equal(actual, expected)
+
     @pytest.mark.skip(
         reason="CmTask1305: after removing circular dependencies in "
         "`hio.from_file`, this test fails reading a parquet file"
@@ -1,16 +1,43 @@
 import os
+import unittest.mock as umock
+from typing import List, Tuple
 
+import pandas as pd
 import pytest
 
 import helpers.hgit as hgit
 import helpers.hio as hio
+import helpers.hpandas as hpandas
+import helpers.hparquet as hparque
 import helpers.hsql as hsql
 import helpers.hsystem as hsystem
 import helpers.hunit_test as hunitest
 import im_v2.ccxt.db.utils as imvccdbut
+import im_v2.common.data.transform.extract_data_from_db as imvcdtedfd
 import im_v2.common.db.db_utils as imvcddbut
 
 
+def _get_rows(timestamps: pd.DatetimeIndex) -> List[Tuple]:
+    """
+    Build rows like the ones read from the DB for 2 symbols.
+    """
+    rows = [
+        (
+            ts.value // 10**6,
+            1.0,
+            2.0,
+            0.5,
+            1.5,
+            10.0,
+            exchange_id,
+            "BTC_USDT",
+        )
+        for ts in timestamps
+        for exchange_id in ["binance", "kucoin"]
+    ]
+    return rows
+
+
 class TestExtractDataFromDb1(imvcddbut.TestImDbHelper):
     def setUp(self) -> None:
         super().setUp()
@@ -35,6 +62,37 @@ class TestExtractDataFromDb1(imvcddbut.TestImDbHelper):
         """
         hsql.execute_query(self.connection, ccxt_ohlcv_drop_query)
 
+    def test_export_data_by_date1(self) -> None:
+        """
+        Check that the data is exported to daily PQ files, skipping the dates
+        that are already present.
+        """
+        dst_dir = os.path.join(self.get_scratch_space(), "by_date")
+        hio.create_dir(os.path.join(dst_dir, "date=20211124"), False)
+        full_symbols = ["gateio::XRP_USDT", "kucoin::SOL_USDT"]
+        num_rows = imvcdtedfd.export_data_by_date(
+            self.connection,
+            "ccxt_ohlcv",
+            full_symbols,
+            pd.Timestamp("2021-11-23", tz="UTC"),
+            pd.Timestamp("2021-11-25", tz="UTC"),
+            dst_dir,
+            chunk_size=1,
+        )
+        # Check the output.
+        self.assertEqual(num_rows, 1)
+        df = hparque.from_parquet(
+            os.path.join(dst_dir, "date=20211123", "data.parquet")
+        )
+        actual = hpandas.df_to_str(df)
+        expected = r"""
+                                full_symbol     open     high      low    close       volume
+        timestamp
+        2021-11-23 17:59:00+00:00  gateio::XRP_USDT  1.04549  1.04549  1.04527  1.04527  5898.04278
+        """
+        self.assert_equal(actual, expected, fuzzy_match=True)
+        self.assertEqual(os.listdir(os.path.join(dst_dir, "date=20211124")), [])
+
     # TODO(Nikola): Test both local and S3 (with moto).
     @pytest.mark.slow
     @pytest.mark.skip(
@@ -72,3 +130,76 @@ class TestExtractDataFromDb1(imvcddbut.TestImDbHelper):
         actual.append(daily_signature_after)
         actual = "\n".join(actual)
         self.check_string(actual, purify_text=True)
+
+
+class TestDatePartitionWriter1(hunitest.TestCase):
+    def test_write1(self) -> None:
+        """
+        Check that chunks spanning multiple dates are split in daily files.
+        """
+        timestamps = pd.date_range(
+            "2021-11-23 23:58", "2021-11-25 00:01", freq="T", tz="UTC"
+        )
+        rows = _get_rows(timestamps)
+        dst_dir = self.get_scratch_space()
+        writer = imvcdtedfd._DatePartitionWriter(dst_dir, {"20211124"}, None)
+        chunk_size = 7
+        for idx in range(0, len(rows), chunk_size):
+            writer.write(imvcdtedfd._normalize_rows(rows[idx : idx + chunk_size]))
+        writer.close()
+        # Check the output.
+        self.assertEqual(writer.written_dates, ["20211123", "20211125"])
+        self.assertEqual(writer.num_written_rows, 8)
+        self.assertEqual(writer.num_skipped_rows, 2 * 24 * 60)
+        df = hparque.from_parquet(
+            os.path.join(dst_dir, "date=20211125", "data.parquet")
+        )
+        actual = hpandas.df_to_str(df)
+        expected = r"""
+                                full_symbol  open  high  low  close  volume
+        timestamp
+        2021-11-25 00:00:00+00:00  binance::BTC_USDT   1.0   2.0  0.5    1.5    10.0
+        2021-11-25 00:00:00+00:00   kucoin::BTC_USDT   1.0   2.0  0.5    1.5    10.0
+        2021-11-25 00:01:00+00:00  binance::BTC_USDT   1.0   2.0  0.5    1.5    10.0
+        2021-11-25 00:01:00+00:00   kucoin::BTC_USDT   1.0   2.0  0.5    1.5    10.0
+        """
+        self.assert_equal(actual, expected, fuzzy_match=True)
+
+
+class TestExportDataByDate1(hunitest.TestCase):
+    def test_export_data_by_date1(self) -> None:
+        """
+        Check that a failure while reading a date discards its partial data,
+        so that the date is exported again by the next run.
+        """
+        rows_20211123 = _get_rows(
+            pd.date_range("2021-11-23 23:58", periods=2, freq="T", tz="UTC")
+        )
+        rows_20211124 = _get_rows(
+            pd.date_range("2021-11-24 00:00", periods=2, freq="T", tz="UTC")
+        )
+        connection = umock.MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchmany.side_effect = [
+            rows_20211123,
+            rows_20211124,
+            RuntimeError("Connection lost"),
+        ]
+        dst_dir = self.get_scratch_space()
+        with self.assertRaises(RuntimeError):
+            imvcdtedfd.export_data_by_date(
+                connection,
+                "ccxt_ohlcv",
+                ["binance::BTC_USDT", "kucoin::BTC_USDT"],
+                pd.Timestamp("2021-11-23", tz="UTC"),
+                pd.Timestamp("2021-11-25", tz="UTC"),
+                dst_dir,
+            )
+        # Check that only the completed date is present.
+        self.assertEqual(os.listdir(dst_dir), ["date=20211123"])
+        existing_dates = imvcdtedfd._get_existing_dates(dst_dir, None)
+        self.assertEqual(existing_dates, {"20211123"})
+        df = hparque.from_parquet(
+            os.path.join(dst_dir, "date=20211123", "data.parquet")
+        )
+        self.assertEqual(len(df), len(rows_20211123))
@@ -30,10 +30,11 @@ def convert_timestamp_column(
     :return: series containing datetime as `pd.Timestamp`
     """
     if pd.api.types.is_integer_dtype(datetime_col_name):
-        # Convert unix epoch into timestamp.
-        kwargs = {"unit": unit}
-        converted_datetime_col = datetime_col_name.apply(
-            hdateti.convert_unix_epoch_to_timestamp, **kwargs
+        # Convert unix epoch into UTC timestamp, like
+        # `hdateti.convert_unix_epoch_to_timestamp()` but for all the values
+        # at once.
+        converted_datetime_col = pd.to_datetime(
+            datetime_col_name, unit=unit, utc=True
         )
     elif pd.api.types.is_string_dtype(datetime_col_name):
         # Convert string into timestamp.
@@ -1,6 +1,15 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 import im_v2.common.universe.universe_utils as imvcuunut
 
+_LOG = logging.getLogger(__name__)
+
 
 class TestStringToNumericalId(hunitest.TestCase):
     def test1(self) -> None:
@@ -22,3 +31,57 @@ class TestBuildNumericalToStringIdMapping(hunitest.TestCase):
         self.assertEqual(len(mapping), 2)
         self.assert_equal(mapping[2002879833], "gateio::XRP_USDT")
         self.assert_equal(mapping[2568064341], "kucoin::SOL_USDT")
+
+
+class TestStringIdsToNumericalIds(hunitest.TestCase):
+    def test1(self) -> None:
+        """
+        Test that string ids are converted like one at a time.
+        """
+        string_ids = pd.Series(
+            ["binance::BTC_USDT", "gateio::XRP_USDT", "binance::BTC_USDT"],
+            index=[3, 1, 2],
+        )
+        numerical_ids = imvcuunut.string_ids_to_numerical_ids(string_ids)
+        self.assertEqual(numerical_ids.dtype, np.int64)
+        self.assertEqual(
+            numerical_ids.tolist(), [1467591036, 2002879833, 1467591036]
+        )
+
+    def test2(self) -> None:
+        """
+        Test that categorical string ids are supported.
+        """
+        string_ids = pd.Series(
+            ["kucoin::SOL_USDT", "gateio::XRP_USDT", "kucoin::SOL_USDT"],
+            dtype="category",
+        )
+        numerical_ids = imvcuunut.string_ids_to_numerical_ids(string_ids)
+        self.assertEqual(
+            numerical_ids.tolist(), [2568064341, 2002879833, 2568064341]
+        )
+
+    @pytest.mark.superslow("Benchmark.")
+    def test_benchmark1(self) -> None:
+        """
+        Compare the conversion rate of `apply()` and the vectorized conversion.
+        """
+        num_rows = 1000000
+        universe = [f"binance::S{i}_USDT" for i in range(500)]
+        string_ids = pd.Series(
+            np.random.default_rng(0).choice(universe, num_rows)
+        )
+        # Use the function without the memoization, like before.
+        string_to_numerical_id = imvcuunut.string_to_numerical_id.__wrapped__
+        with htimer.TimedScope(logging.INFO, "apply") as ts:
+            expected = string_ids.apply(string_to_numerical_id)
+        apply_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "vectorized") as ts:
+            actual = imvcuunut.string_ids_to_numerical_ids(string_ids)
+        vectorized_elapsed = ts.elapsed_time
+        _LOG.info(
+            "apply=%.0f rows/s, vectorized=%.0f rows/s",
+            num_rows / apply_elapsed,
+            num_rows / vectorized_elapsed,
+        )
+        self.assertEqual(actual.tolist(), expected.tolist())
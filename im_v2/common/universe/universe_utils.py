@@ -4,15 +4,22 @@ Import as:
 import im_v2.common.universe.universe_utils as imvcuunut
 """
 
+import functools
 import hashlib
 from typing import Dict, List
 
+import numpy as np
+import pandas as pd
+
 import helpers.hdbg as hdbg
 
 # TODO(gp): This file is more generic than `asset_ids` vs `full_symbols` and could
 #  go in helpers.
 
 
+# The universe contains a few hundred ids, which are converted over and over,
+# so we memoize the conversion.
+@functools.lru_cache(maxsize=None)
 def string_to_numerical_id(string_id: str) -> int:
     """
     Convert string id into a numerical one.
@@ -32,6 +39,28 @@ def string_to_numerical_id(string_id: str) -> int:
     return num_id
 
 
+def string_ids_to_numerical_ids(string_ids: pd.Series) -> np.ndarray:
+    """
+    Convert string ids into numerical ones.
+
+    The string ids are encoded as categorical codes so that each distinct id
+    is converted once and the numerical ids are looked up by code.
+
+    :param string_ids: string ids to convert, e.g., the full symbol column of
+        a dataframe
+    :return: numerical ids in the same order as `string_ids`
+    """
+    hdbg.dassert_isinstance(string_ids, pd.Series)
+    codes, uniques = pd.factorize(string_ids)
+    hdbg.dassert_lte(0, codes.min(initial=0), "String ids cannot be NaN")
+    lookup = np.array(
+        [string_to_numerical_id(string_id) for string_id in uniques],
+        dtype=np.int64,
+    )
+    numerical_ids = lookup.take(codes)
+    return numerical_ids
+
+
 def build_numerical_to_string_id_mapping(universe: List[str]) -> Dict[int, str]:
     """
     Build a mapping from numerical ids to string ones.
@@ -185,6 +185,18 @@ class RealTimeSqlTalosClient(icdc.ImClient):
     Retrieve real-time Talos data from DB using SQL queries.
     """
 
+    # Columns needed to build the output of the client.
+    _COLUMNS = [
+        "timestamp",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "exchange_id",
+        "currency_pair",
+    ]
+
     def __init__(
         self,
         resample_1min: bool,
@@ -243,6 +255,42 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         full_symbols = full_symbols.to_list()
         return full_symbols
 
+    def get_last_timestamp(
+        self,
+        full_symbols: List[ivcu.FullSymbol],
+        start_ts: Optional[pd.Timestamp],
+        end_ts: Optional[pd.Timestamp],
+    ) -> Optional[pd.Timestamp]:
+        """
+        See description in the parent class.
+
+        The last timestamp is computed by the DB with `SELECT MAX(timestamp)`.
+        """
+        parsed_symbols = [ivcu.parse_full_symbol(s) for s in full_symbols]
+        start_unix_epoch = (
+            hdateti.convert_timestamp_to_unix_epoch(start_ts)
+            if start_ts
+            else None
+        )
+        end_unix_epoch = (
+            hdateti.convert_timestamp_to_unix_epoch(end_ts) if end_ts else None
+        )
+        select_query, params = self._build_select_query(
+            parsed_symbols,
+            start_unix_epoch,
+            end_unix_epoch,
+            columns=["MAX(timestamp)"],
+        )
+        timestamp = hsql.execute_query_to_df(
+            self._db_connection, select_query, params=params
+        ).iloc[0, 0]
+        if pd.isna(timestamp):
+            # There is no data.
+            return None
+        timestamp = hdateti.convert_unix_epoch_to_timestamp(int(timestamp))
+        hdateti.dassert_has_specified_tz(timestamp, ["UTC"])
+        return timestamp
+
     def _apply_talos_normalization(
         self,
         data: pd.DataFrame,
@@ -269,9 +317,7 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         ```
         """
         # Convert timestamp column with Unix epoch to timestamp format.
-        data["timestamp"] = data["timestamp"].apply(
-            hdateti.convert_unix_epoch_to_timestamp
-        )
+        data["timestamp"] = pd.to_datetime(data["timestamp"], unit="ms", utc=True)
         full_symbol_col_name = self._get_full_symbol_col_name(
             full_symbol_col_name
         )
@@ -289,16 +335,14 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         elif self._mode == "market_data":
             # TODO (Danya): Move this transformation to MarketData.
             # Add `asset_id` column using mapping on `full_symbol` column.
-            data["asset_id"] = data[full_symbol_col_name].apply(
-                ivcu.string_to_numerical_id
+            data["asset_id"] = ivcu.string_ids_to_numerical_ids(
+                data[full_symbol_col_name]
             )
             # Convert to int64 to keep NaNs alongside with int values.
             data["asset_id"] = data["asset_id"].astype(pd.Int64Dtype())
             # Generate `start_timestamp` from `end_timestamp` by substracting delta.
             delta = pd.Timedelta("1M")
-            data["start_timestamp"] = data["timestamp"].apply(
-                lambda pd_timestamp: (pd_timestamp - delta)
-            )
+            data["start_timestamp"] = data["timestamp"] - delta
             # Columns that should left in the table.
             market_data_ohlcv_columns = [
                 "start_timestamp",
@@ -351,11 +395,14 @@ class RealTimeSqlTalosClient(icdc.ImClient):
             end_unix_epoch = hdateti.convert_timestamp_to_unix_epoch(end_ts)
         else:
             end_unix_epoch = end_ts
-        # Read data from DB.
-        select_query = self._build_select_query(
+        # Read from DB only the columns needed by the normalization.
+        kwargs.setdefault("columns", self._COLUMNS)
+        select_query, params = self._build_select_query(
             parsed_symbols, start_unix_epoch, end_unix_epoch, **kwargs
         )
-        data = hsql.execute_query_to_df(self._db_connection, select_query)
+        data = hsql.execute_query_to_df(
+            self._db_connection, select_query, params=params
+        )
         # Add a full symbol column.
         full_symbol_col_name = self._get_full_symbol_col_name(
             full_symbol_col_name
@@ -381,19 +428,31 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         left_close: bool = True,
         right_close: bool = True,
         limit: Optional[int] = None,
-    ) -> str:
+    ) -> Tuple[str, Dict[str, Any]]:
         """
         Build a SELECT query for Talos DB.
 
         Time is provided as unix epochs in ms, the time range
         is considered closed on both sides, i.e. [1647470940000, 1647471180000]
 
+        The values are passed as query parameters, so that the text of the
+        query does not depend on the values and the number of symbols.
+
         Example of a full query:
         ```
-        "SELECT * FROM talos_ohlcv WHERE timestamp >= 1647470940000
-         AND timestamp <= 1647471180000
-         AND ((exchange_id='binance' AND currency_pair='AVAX_USDT')
-          OR (exchange_id='ftx' AND currency_pair='BTC_USDT'))
+        "SELECT * FROM talos_ohlcv WHERE timestamp >= %(start_unix_epoch)s
+         AND timestamp <= %(end_unix_epoch)s
+         AND (exchange_id, currency_pair) IN
+          (SELECT * FROM UNNEST(%(exchange_ids)s, %(currency_pairs)s))"
+        ```
+        with params
+        ```
+        {
+            "start_unix_epoch": 1647470940000,
+            "end_unix_epoch": 1647471180000,
+            "exchange_ids": ["binance", "ftx"],
+            "currency_pairs": ["AVAX_USDT", "BTC_USDT"],
+        }
         ```
 
         :param parsed_symbols: List of tuples, e.g. [(`exchange_id`, `currency_pair`),..]
@@ -405,7 +464,7 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         :param left_close: if operator for `start_unix_epoch` is either > or >=
         :param right_close: if operator for `end_unix_epoch` is either < or <=
         :param limit: number of rows to return
-        :return: SELECT query for Talos data
+        :return: SELECT query for Talos data and its parameters
         """
         hdbg.dassert_container_type(
             obj=parsed_symbols,
@@ -420,44 +479,49 @@ class RealTimeSqlTalosClient(icdc.ImClient):
         # Build a WHERE query.
         # TODO(Danya): Generalize to hsql with dictionary input.
         where_clause = []
+        params: Dict[str, Any] = {}
         if start_unix_epoch:
             hdbg.dassert_isinstance(
                 start_unix_epoch,
                 int,
             )
             operator = ">=" if left_close else ">"
-            where_clause.append(f"{ts_col_name} {operator} {start_unix_epoch}")
+            where_clause.append(f"{ts_col_name} {operator} %(start_unix_epoch)s")
+            params["start_unix_epoch"] = start_unix_epoch
         if end_unix_epoch:
             hdbg.dassert_isinstance(
                 end_unix_epoch,
                 int,
             )
             operator = "<=" if right_close else "<"
-            where_clause.append(f"{ts_col_name} {operator} {end_unix_epoch}")
+            where_clause.append(f"{ts_col_name} {operator} %(end_unix_epoch)s")
+            params["end_unix_epoch"] = end_unix_epoch
         if start_unix_epoch and end_unix_epoch:
             hdbg.dassert_lte(
                 start_unix_epoch,
                 end_unix_epoch,
                 msg="Start unix epoch should be smaller than end.",
             )
-        # Create conditions for getting values by exchange_id and currency_pair
-        # In the end there should be something like:
-        # (exchange_id='binance' AND currency_pair='ADA_USDT') OR (exchange_id='ftx' AND currency_pair='BTC_USDT')
-        exchange_currency_conditions = [
-            f"(exchange_id='{exchange_id}' AND currency_pair='{currency_pair}')"
+        # Select the pairs of `exchange_id` and `currency_pair` passed as two
+        # arrays, which are converted into Postgres arrays.
+        parsed_symbols = [
+            (exchange_id, currency_pair)
             for exchange_id, currency_pair in parsed_symbols
             if exchange_id and currency_pair
         ]
-        if exchange_currency_conditions:
-            # Add OR conditions between each pair of `exchange_id` and `currency_pair`
+        if parsed_symbols:
             where_clause.append(
-                "(" + " OR ".join(exchange_currency_conditions) + ")"
+                "(exchange_id, currency_pair) IN (SELECT * FROM "
+                "UNNEST(%(exchange_ids)s, %(currency_pairs)s))"
             )
+            exchange_ids, currency_pairs = zip(*parsed_symbols)
+            params["exchange_ids"] = list(exchange_ids)
+            params["currency_pairs"] = list(currency_pairs)
         # Build whole query.
         query = select_query + " AND ".join(where_clause)
         if limit:
             query += f" LIMIT {limit}"
-        return query
+        return query, params
 
     def _read_data_for_multiple_symbols(
         self,
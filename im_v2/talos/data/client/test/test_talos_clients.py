@@ -1,16 +1,21 @@
+import logging
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 import pytest
 
 import helpers.hsql as hsql
 import helpers.hsystem as hsystem
+import helpers.htimer as htimer
 import im_v2.common.data.client.test.im_client_test_case as icdctictc
 import im_v2.common.db.db_utils as imvcddbut
 import im_v2.talos.data.client.talos_clients as imvtdctacl
 import im_v2.talos.data.client.talos_clients_example as imvtdctcex
 import im_v2.talos.db.utils as imvtadbut
 
+_LOG = logging.getLogger(__name__)
+
 
 def get_expected_column_names() -> List[str]:
     """
@@ -747,8 +752,16 @@ class TestRealTimeSqlTalosClient1(
             parsed_symbols, start_unix_epoch, end_unix_epoch
         )
         expected_outcome = (
-            "SELECT * FROM talos_ohlcv WHERE timestamp >= 1647470940000 AND timestamp <= "
-            "1647471180000 AND ((exchange_id='binance' AND currency_pair='BTC_USDT'))"
+            "SELECT * FROM talos_ohlcv WHERE timestamp >= %(start_unix_epoch)s "
+            "AND timestamp <= %(end_unix_epoch)s AND "
+            "(exchange_id, currency_pair) IN (SELECT * FROM "
+            "UNNEST(%(exchange_ids)s, %(currency_pairs)s))",
+            {
+                "start_unix_epoch": 1647470940000,
+                "end_unix_epoch": 1647471180000,
+                "exchange_ids": ["binance"],
+                "currency_pairs": ["BTC_USDT"],
+            },
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -772,8 +785,10 @@ class TestRealTimeSqlTalosClient1(
             parsed_symbols, start_unix_epoch, end_unix_epoch
         )
         expected_outcome = (
-            "SELECT * FROM talos_ohlcv "
-            "WHERE ((exchange_id='binance' AND currency_pair='BTC_USDT'))"
+            "SELECT * FROM talos_ohlcv WHERE "
+            "(exchange_id, currency_pair) IN (SELECT * FROM "
+            "UNNEST(%(exchange_ids)s, %(currency_pairs)s))",
+            {"exchange_ids": ["binance"], "currency_pairs": ["BTC_USDT"]},
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -797,8 +812,12 @@ class TestRealTimeSqlTalosClient1(
             parsed_symbols, start_unix_epoch, end_unix_epoch
         )
         expected_outcome = (
-            "SELECT * FROM talos_ohlcv "
-            "WHERE timestamp >= 1647470940000 AND timestamp <= 1647471180000"
+            "SELECT * FROM talos_ohlcv WHERE timestamp >= %(start_unix_epoch)s "
+            "AND timestamp <= %(end_unix_epoch)s",
+            {
+                "start_unix_epoch": 1647470940000,
+                "end_unix_epoch": 1647471180000,
+            },
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -826,8 +845,16 @@ class TestRealTimeSqlTalosClient1(
             right_close=False,
         )
         expected_outcome = (
-            "SELECT * FROM talos_ohlcv WHERE timestamp > 1647470940000 AND timestamp < "
-            "1647471180000 AND ((exchange_id='binance' AND currency_pair='BTC_USDT'))"
+            "SELECT * FROM talos_ohlcv WHERE timestamp > %(start_unix_epoch)s "
+            "AND timestamp < %(end_unix_epoch)s AND "
+            "(exchange_id, currency_pair) IN (SELECT * FROM "
+            "UNNEST(%(exchange_ids)s, %(currency_pairs)s))",
+            {
+                "start_unix_epoch": 1647470940000,
+                "end_unix_epoch": 1647471180000,
+                "exchange_ids": ["binance"],
+                "currency_pairs": ["BTC_USDT"],
+            },
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -854,8 +881,16 @@ class TestRealTimeSqlTalosClient1(
             ts_col_name="test_timestamp",
         )
         expected_outcome = (
-            "SELECT * FROM talos_ohlcv WHERE test_timestamp >= 1647470940000 AND test_timestamp <= "
-            "1647471180000 AND ((exchange_id='binance' AND currency_pair='BTC_USDT'))"
+            "SELECT * FROM talos_ohlcv WHERE test_timestamp >= %(start_unix_epoch)s "
+            "AND test_timestamp <= %(end_unix_epoch)s AND "
+            "(exchange_id, currency_pair) IN (SELECT * FROM "
+            "UNNEST(%(exchange_ids)s, %(currency_pairs)s))",
+            {
+                "start_unix_epoch": 1647470940000,
+                "end_unix_epoch": 1647471180000,
+                "exchange_ids": ["binance"],
+                "currency_pairs": ["BTC_USDT"],
+            },
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -884,8 +919,16 @@ class TestRealTimeSqlTalosClient1(
         )
         expected_outcome = (
             "SELECT close,volume,timestamp "
-            "FROM talos_ohlcv WHERE timestamp >= 1647470940000 AND timestamp <= "
-            "1647471180000 AND ((exchange_id='binance' AND currency_pair='BTC_USDT'))"
+            "FROM talos_ohlcv WHERE timestamp >= %(start_unix_epoch)s "
+            "AND timestamp <= %(end_unix_epoch)s AND "
+            "(exchange_id, currency_pair) IN (SELECT * FROM "
+            "UNNEST(%(exchange_ids)s, %(currency_pairs)s))",
+            {
+                "start_unix_epoch": 1647470940000,
+                "end_unix_epoch": 1647471180000,
+                "exchange_ids": ["binance"],
+                "currency_pairs": ["BTC_USDT"],
+            },
         )
         # Message in case if test case got failed.
         message = "Actual and expected SQL queries are not equal!"
@@ -1203,6 +1246,30 @@ class TestRealTimeSqlTalosClient1(
         self._test_get_end_ts_for_symbol1(im_client, full_symbol, expected_end_ts)
         hsql.remove_table(self.connection, "talos_ohlcv")
 
+    def test_get_last_timestamp1(self) -> None:
+        """
+        Verify that the last timestamp is computed with `SELECT MAX`.
+        """
+        # Load data.
+        self._create_test_table()
+        test_data = self._get_test_data()
+        hsql.copy_rows_with_copy_from(self.connection, test_data, "talos_ohlcv")
+        im_client = self.setup_talos_sql_client()
+        full_symbols = ["binance::BTC_USDT", "binance::ETH_USDT"]
+        # Check the last timestamp in an interval.
+        start_ts = pd.Timestamp("2022-03-24 16:21:00", tz="UTC")
+        end_ts = pd.Timestamp("2022-03-24 16:22:30", tz="UTC")
+        actual = im_client.get_last_timestamp(full_symbols, start_ts, end_ts)
+        self.assertEqual(actual, pd.Timestamp("2022-03-24 16:22:00", tz="UTC"))
+        # Check the last timestamp without `end_ts`.
+        actual = im_client.get_last_timestamp(full_symbols, start_ts, None)
+        self.assertEqual(actual, pd.Timestamp("2022-03-24 16:23:00", tz="UTC"))
+        # Check an interval without data.
+        start_ts = pd.Timestamp("2022-03-25 00:00:00", tz="UTC")
+        actual = im_client.get_last_timestamp(full_symbols, start_ts, None)
+        self.assertIsNone(actual)
+        hsql.remove_table(self.connection, "talos_ohlcv")
+
     # ///////////////////////////////////////////////////////////////////////
 
     def test_build_numerical_to_string_id_mapping(self) -> None:
@@ -1339,6 +1406,50 @@ class TestRealTimeSqlTalosClient1(
         )
         hsql.remove_table(self.connection, "talos_ohlcv")
 
+    @pytest.mark.superslow("Benchmark.")
+    def test_read_data_benchmark1(self) -> None:
+        """
+        Measure the latency of a real-time poll of the last 10 minutes of data
+        for 100 symbols.
+        """
+        self._create_test_table()
+        num_symbols = 100
+        num_minutes = 24 * 60
+        end_ts = pd.Timestamp("2022-03-24 16:00", tz="UTC")
+        timestamps = pd.date_range(end=end_ts, periods=num_minutes, freq="T")
+        test_data = pd.DataFrame(
+            {
+                "id": np.arange(num_symbols * num_minutes),
+                "timestamp": np.tile(timestamps.asi8 // 10**6, num_symbols),
+                "open": 1.0,
+                "high": 1.0,
+                "low": 1.0,
+                "close": 1.0,
+                "volume": 1.0,
+                "ticks": 1,
+                "currency_pair": np.repeat(
+                    [f"S{i}_USDT" for i in range(num_symbols)], num_minutes
+                ),
+                "exchange_id": "binance",
+                "end_download_timestamp": end_ts.tz_localize(None),
+                "knowledge_timestamp": end_ts.tz_localize(None),
+            }
+        )
+        hsql.copy_rows_with_copy_from(self.connection, test_data, "talos_ohlcv")
+        table_name = "talos_ohlcv"
+        im_client = imvtdctacl.RealTimeSqlTalosClient(
+            True, self.connection, table_name, mode="market_data"
+        )
+        full_symbols = im_client.get_universe()
+        start_ts = end_ts - pd.Timedelta(minutes=9)
+        num_polls = 20
+        with htimer.TimedScope(logging.INFO, "Polls") as ts:
+            for _ in range(num_polls):
+                data = im_client.read_data(full_symbols, start_ts, end_ts)
+        _LOG.info("latency=%.1f ms/poll", 1000 * ts.elapsed_time / num_polls)
+        self.assertEqual(len(data), num_symbols * 10)
+        hsql.remove_table(self.connection, "talos_ohlcv")
+
     # ///////////////////////////////////////////////////////////////////////
 
     @staticmethod
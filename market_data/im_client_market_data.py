@@ -94,16 +94,8 @@ class ImClientMarketData(mdabmada.MarketData):
             if end_ts is not None:
                 # Subtract one millisecond not to include the right boundary.
                 end_ts -= pd.Timedelta(1, "ms")
-        if asset_ids is None:
-            # If asset ids are not provided, get universe as full symbols.
-            full_symbols = self._im_client.get_universe()
-        else:
-            # Convert asset ids to full symbols to read `im` data.
-            full_symbols = self._im_client.get_full_symbols_from_asset_ids(
-                asset_ids
-            )
+        full_symbols = self._get_full_symbols(asset_ids)
         # Load the data using `im_client`.
-        ivcu.dassert_valid_full_symbols(full_symbols)
         market_data = self._im_client.read_data(
             full_symbols,
             start_ts,
@@ -118,8 +110,8 @@ class ImClientMarketData(mdabmada.MarketData):
         _LOG.debug("full_symbol_col_name=%s", full_symbol_col_name)
         _LOG.debug("market_data.columns=%s", sorted(list(market_data.columns)))
         hdbg.dassert_in(full_symbol_col_name, market_data.columns)
-        transformed_asset_ids = self._im_client.get_asset_ids_from_full_symbols(
-            market_data[full_symbol_col_name].tolist()
+        transformed_asset_ids = ivcu.string_ids_to_numerical_ids(
+            market_data[full_symbol_col_name]
         )
         if self._asset_id_col in market_data.columns:
             _LOG.debug(
@@ -179,19 +171,32 @@ class ImClientMarketData(mdabmada.MarketData):
         ] - pd.Timedelta(minutes=1)
         return df
 
+    def _get_full_symbols(
+        self, asset_ids: Optional[List[int]]
+    ) -> List[ivcu.FullSymbol]:
+        """
+        Convert `asset_ids` into the full symbols to read `im` data.
+        """
+        if asset_ids is None:
+            # If asset ids are not provided, get universe as full symbols.
+            full_symbols = self._im_client.get_universe()
+        else:
+            # Convert asset ids to full symbols to read `im` data.
+            full_symbols = self._im_client.get_full_symbols_from_asset_ids(
+                asset_ids
+            )
+        ivcu.dassert_valid_full_symbols(full_symbols)
+        return full_symbols
+
     def _get_last_end_time(self) -> Optional[pd.Timestamp]:
         # We need to find the last timestamp before the current time. We use
         # `7D` but could also use all the data since we don't call the DB.
-        # TODO(gp): SELECT MAX(start_time) instead of getting all the data
-        #  and then find the max and use `start_time`
         timedelta = pd.Timedelta("7D")
-        df = self.get_data_for_last_period(timedelta)
-        _LOG.debug(
-            hpandas.df_to_str(df, print_shape_info=True, tag="after get_data")
-        )
-        if df.empty:
-            ret = None
-        else:
-            ret = df.index.max()
+        # Ask the `ImClient` for the last timestamp, so that the clients that
+        # support it can avoid reading the data, e.g., with `SELECT MAX`.
+        wall_clock_time = self.get_wall_clock_time()
+        start_ts = self._process_period(timedelta, wall_clock_time)
+        full_symbols = self._get_full_symbols(self._asset_ids)
+        ret = self._im_client.get_last_timestamp(full_symbols, start_ts, None)
         _LOG.debug("-> ret=%s", ret)
         return ret
@@ -1,11 +1,22 @@
-from typing import List
+import functools
+import logging
+import unittest.mock as umock
+from typing import List, Optional
 
 import pandas as pd
 import pytest
 
+import helpers.htimer as htimer
+import helpers.hunit_test as hunitest
+import im_v2.common.data.client.base_im_clients as imvcdcbimcl
+import im_v2.common.data.client.historical_pq_clients_example as imvcdchpce
+import im_v2.common.universe as ivcu
 import market_data as mdata
+import market_data.im_client_market_data as mdimcmada
 import market_data.test.market_data_test_case as mdtmdtca
 
+_LOG = logging.getLogger(__name__)
+
 # #############################################################################
 # TestImClientMarketData1
 # #############################################################################
@@ -964,3 +975,110 @@ class TestImClientMarketData2(mdtmdtca.MarketData_get_data_TestCase):
         wall_clock_time = pd.Timestamp("2000-01-01T09:42:00-05:00")
         # Run.
         self._test_should_be_online1(market_data, wall_clock_time)
+
+
+# #############################################################################
+# TestImClientMarketData3
+# #############################################################################
+
+
+class TestImClientMarketData3(hunitest.TestCase):
+    """
+    Test `get_last_end_time()` with and without overriding
+    `ImClient.get_last_timestamp()`.
+    """
+
+    def test_get_last_end_time1(self) -> None:
+        """
+        Check that the last end time from the Parquet statistics is the same
+        as the one from the data.
+        """
+        im_client = imvcdchpce.get_MockHistoricalByTileClient_example1(
+            self, ["binance::BTC_USDT", "kucoin::FIL_USDT"], False
+        )
+        wall_clock_time = pd.Timestamp("2022-01-01 10:00:00-05:00")
+        market_data = self._get_market_data(im_client, wall_clock_time)
+        expected = self._get_last_end_time_from_data(market_data)
+        actual = market_data.get_last_end_time()
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual, pd.Timestamp("2022-01-01 18:59:00-05:00"))
+
+    def test_get_last_end_time2(self) -> None:
+        """
+        Check that there is no last end time without data.
+        """
+        im_client = imvcdchpce.get_MockHistoricalByTileClient_example1(
+            self, ["binance::BTC_USDT", "kucoin::FIL_USDT"], False
+        )
+        wall_clock_time = pd.Timestamp("2022-03-01 10:00:00-05:00")
+        market_data = self._get_market_data(im_client, wall_clock_time)
+        actual = market_data.get_last_end_time()
+        self.assertIsNone(actual)
+
+    @pytest.mark.superslow("Benchmark.")
+    def test_get_last_end_time_benchmark1(self) -> None:
+        """
+        Compare the polling latency of `get_last_end_time()` reading the data
+        and using the Parquet statistics.
+        """
+        full_symbols = ["binance::BTC_USDT", "kucoin::FIL_USDT"]
+        im_client = imvcdchpce.get_MockHistoricalByTileClient_example3(
+            self, full_symbols, "2021-10-01", "2022-01-02", False
+        )
+        wall_clock_time = pd.Timestamp("2022-01-01 10:00:00-05:00")
+        market_data = self._get_market_data(im_client, wall_clock_time)
+        num_polls = 20
+        with htimer.TimedScope(logging.INFO, "Read data") as ts:
+            for _ in range(num_polls):
+                expected = self._get_last_end_time_from_data(market_data)
+        data_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Parquet statistics") as ts:
+            for _ in range(num_polls):
+                actual = market_data.get_last_end_time()
+        stats_elapsed = ts.elapsed_time
+        _LOG.info(
+            "latency per poll: data=%.1f ms, statistics=%.1f ms, speedup=%.2fx",
+            1e3 * data_elapsed / num_polls,
+            1e3 * stats_elapsed / num_polls,
+            data_elapsed / stats_elapsed,
+        )
+        self.assertEqual(actual, expected)
+
+    @staticmethod
+    def _get_market_data(
+        im_client: imvcdchpce.MockHistoricalByTileClient,
+        wall_clock_time: pd.Timestamp,
+    ) -> mdimcmada.ImClientMarketData:
+        asset_ids = [
+            ivcu.string_to_numerical_id(full_symbol)
+            for full_symbol in im_client.get_universe()
+        ]
+        columns: List[str] = []
+        market_data = mdimcmada.ImClientMarketData(
+            "asset_id",
+            asset_ids,
+            "start_ts",
+            "end_ts",
+            columns,
+            lambda: wall_clock_time,
+            im_client=im_client,
+        )
+        return market_data
+
+    @staticmethod
+    def _get_last_end_time_from_data(
+        market_data: mdimcmada.ImClientMarketData,
+    ) -> Optional[pd.Timestamp]:
+        """
+        Compute the last end time reading the data, with the default
+        `ImClient.get_last_timestamp()`.
+        """
+        im_client = market_data._im_client
+        get_last_timestamp = functools.partial(
+            imvcdcbimcl.ImClient.get_last_timestamp, im_client
+        )
+        with umock.patch.object(
+            im_client, "get_last_timestamp", get_last_timestamp
+        ):
+            ret = market_data.get_last_end_time()
+        return ret
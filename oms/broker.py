@@ -221,6 +221,17 @@ class AbstractBroker(abc.ABC):
         """
         ...
 
+    def get_open_orders(self) -> List[omorder.Order]:
+        """
+        Get the submitted orders that have not been filled yet.
+        """
+        open_orders = [
+            order
+            for orders in self._deadline_timestamp_to_orders.values()
+            for order in orders
+        ]
+        return open_orders
+
     @staticmethod
     def _get_next_submitted_order_id() -> int:
         submitted_order_id = AbstractBroker._submitted_order_id
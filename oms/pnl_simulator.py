@@ -3,7 +3,6 @@ Import as:
 
 import oms.pnl_simulator as opnlsimu
 """
-import collections
 import copy
 import logging
 from typing import Any, Dict, List, Optional, Tuple, cast
@@ -13,15 +12,16 @@ import pandas as pd
 from tqdm.autonotebook import tqdm
 
 import helpers.hdbg as hdbg
-import helpers.hprint as hprint
-import helpers.htqdm as htqdm
 
 _LOG = logging.getLogger(__name__)
 
 # _LOG.debug = _LOG.info
 
+# Map the name of an accounting quantity (e.g., `wealth`) to its values, with
+# shape (num_bars, num_instruments) or (num_bars,) for a single instrument.
+Accounting = Dict[str, np.ndarray]
+
 # TODO(gp): Generalize for different intervals, besides 5 mins trading.
-# TODO(gp): Extend for computing PnL on multiple stocks.
 # TODO(gp): Consider ts -> datetime_, {start,end}_ts -> {start,end}_datetime for
 #  uniformity with the rest of the code.
 # TODO(gp): Find a better name for `future_snoop_allocation` that represents the
@@ -38,6 +38,25 @@ def _ts_to_str(ts: pd.Timestamp) -> str:
     return val
 
 
+def _get_idxs(index: pd.Index, ts: pd.Index) -> np.ndarray:
+    """
+    Return the positions of the timestamps `ts` in `index`.
+    """
+    idxs = index.get_indexer(ts)
+    hdbg.dassert(
+        (idxs >= 0).all(), "Missing timestamps=%s", ts[idxs < 0].tolist()
+    )
+    return idxs
+
+
+def _get_prices_at(prices: pd.Series, ts: pd.Index) -> np.ndarray:
+    """
+    Return the values of `prices` at the timestamps `ts`.
+    """
+    idxs = _get_idxs(prices.index, ts)
+    return prices.values[idxs]
+
+
 def get_random_market_data(num_samples: int, seed: int = 42) -> pd.DataFrame:
     """
     Generate random 1-minute market data in terms of `price`, `ask`, `bid`.
@@ -145,97 +164,83 @@ def compute_pnl_level1(
 
     This is equivalent to the `compute_lag_pnl()` but using a little more detail.
     """
-    columns = [
-        "num_shares",
-        "diff",
-        "wealth",
-    ]
-    accounting = _create_accounting_stats(columns)
-
-    def _update(key: str, value: float) -> None:
-        prev_value = accounting[key][-1] if accounting[key] else None
-        _LOG.debug("%s=%s -> %s", key, prev_value, value)
-        accounting[key].append(value)
-
-    # Initial balance.
-    wealth = initial_wealth
     # Skip the last two rows since we need two rows to enter / exit the position.
-    tqdm_out = htqdm.TqdmToLogger(_LOG, level=logging.INFO)
-    num_rows = df_5mins.shape[0] - 2
-    for ts, row in tqdm(df_5mins[:-2].iterrows(), total=num_rows, file=tqdm_out):
-        _LOG.debug(hprint.frame("# ts=%s" % _ts_to_str(ts), char1="<"))
-        pred = row["preds"]
-        _LOG.debug("wealth=%s", wealth)
-        #
-        ts_5 = ts + pd.DateOffset(minutes=5)
-        hdbg.dassert_in(ts_5, df.index)
-        price_5 = df.loc[ts_5]["price"]
-        #
-        ts_10 = ts + pd.DateOffset(minutes=10)
-        hdbg.dassert_in(ts_10, df.index)
-        price_10 = df.loc[ts_10]["price"]
-        _LOG.debug("pred=%s price_5=%s price_10=%s", pred, price_5, price_10)
-        #
-        num_shares = wealth / price_5
-        # The magnitude of the prediction is interpreted as amount of leverage.
-        num_shares *= abs(pred)
-        _update("num_shares", num_shares)
-        if pred > 0:
-            # Go long.
-            buy_pnl = num_shares * price_5
-            _LOG.debug(
-                "Buy: @ ts_5=%s for price_5=$%s -> buy_pnl=$%s",
-                _ts_to_str(ts_5),
-                price_5,
-                buy_pnl,
-            )
-            sell_pnl = num_shares * price_10
-            _LOG.debug(
-                "Sell: @ ts_10=%s for price_10=$%s -> sell_pnl=$%s",
-                _ts_to_str(ts_10),
-                price_10,
-                sell_pnl,
-            )
-            diff = -buy_pnl + sell_pnl
-        elif pred < 0:
-            # Short sell.
-            sell_pnl = num_shares * price_5
-            _LOG.debug(
-                "Short sell: @ ts_5=%s for price_5=$%s -> sell_pnl=$%s",
-                _ts_to_str(ts_5),
-                price_5,
-                sell_pnl,
-            )
-            buy_pnl = num_shares * price_10
-            _LOG.debug(
-                "Cover: @ ts_10=%s for price_10=$%s -> buy_pnl=$%s",
-                _ts_to_str(ts_10),
-                price_10,
-                buy_pnl,
-            )
-            diff = sell_pnl - buy_pnl
-        elif pred == 0:
-            # Stay flat.
-            diff = 0.0
-        else:
-            raise ValueError
-        _update("diff", diff)
-        wealth += diff
-        _update("wealth", wealth)
+    ts = df_5mins.index[:-2]
+    preds = df_5mins["preds"].values[:-2]
+    # Look up the prices to enter / exit each position.
+    prices = df["price"]
+    price_5 = _get_prices_at(prices, ts + pd.Timedelta(minutes=5))
+    price_10 = _get_prices_at(prices, ts + pd.Timedelta(minutes=10))
+    # Run the simulation on a single instrument.
+    accounting = simulate_level1(
+        initial_wealth,
+        preds[:, np.newaxis],
+        price_5[:, np.newaxis],
+        price_10[:, np.newaxis],
+    )
+    accounting = {key: value[:, 0] for key, value in accounting.items()}
     # Update the df with intermediate results.
     df_5mins = _append_accounting_df(df_5mins, accounting, prefix)
     # Little index gymnastic to introduce the initial value, given that the
     # semantic of the interval is at the end of the interval.
     col_name = _get_col_name("wealth", prefix)
     wealth_srs = pd.Series([initial_wealth] + df_5mins[col_name].values.tolist())
-    # _LOG.debug("wealth_srs=%s", wealth_srs)
     col_name = _get_col_name("pnl", prefix)
     df_5mins[col_name] = wealth_srs.pct_change().values[1:]
     # Compute total return.
+    wealth = accounting["wealth"][-1] if len(preds) > 0 else initial_wealth
     total_ret = (wealth - initial_wealth) / initial_wealth
     return wealth, total_ret, df_5mins
 
 
+def simulate_level1(
+    initial_wealth: float,
+    preds: np.ndarray,
+    price_5: np.ndarray,
+    price_10: np.ndarray,
+) -> Accounting:
+    """
+    Run the level1 simulation on the arrays of one or more instruments.
+
+    Each instrument starts with `initial_wealth` and is simulated independently.
+    The wealth recursion is carried over time one bar at a time, so that the
+    floating point results are the same as the ones of a per-bar simulation,
+    while each step is vectorized across instruments.
+
+    :param preds: predictions with shape (num_bars, num_instruments)
+    :param price_5: prices to enter the positions, with the same shape as `preds`
+    :param price_10: prices to exit the positions, with the same shape as `preds`
+    :return: accounting with arrays `num_shares`, `diff`, `wealth` with the same
+        shape as `preds`
+    """
+    hdbg.dassert_eq(preds.ndim, 2)
+    hdbg.dassert_eq(preds.shape, price_5.shape)
+    hdbg.dassert_eq(preds.shape, price_10.shape)
+    hdbg.dassert(np.isfinite(preds).all(), "preds=%s", preds)
+    # The magnitude of the prediction is interpreted as amount of leverage,
+    # while the sign decides whether we go long, short sell, or stay flat.
+    abs_preds = np.abs(preds)
+    sign_preds = np.sign(preds)
+    accounting = {
+        "num_shares": np.empty(preds.shape),
+        "diff": np.empty(preds.shape),
+        "wealth": np.empty(preds.shape),
+    }
+    wealth = np.full(preds.shape[1], float(initial_wealth))
+    for i in range(preds.shape[0]):
+        num_shares = wealth / price_5[i]
+        num_shares *= abs_preds[i]
+        # Long positions earn `sell_pnl - buy_pnl`, short positions the opposite.
+        diff = sign_preds[i] * (
+            num_shares * price_10[i] - num_shares * price_5[i]
+        )
+        wealth = wealth + diff
+        accounting["num_shares"][i] = num_shares
+        accounting["diff"][i] = diff
+        accounting["wealth"][i] = wealth
+    return accounting
+
+
 def compute_lag_pnl(df_5mins: pd.DataFrame, prefix: str = "lag") -> pd.DataFrame:
     """
     Compute PnL using vectorized equation as in post-processing of
@@ -273,12 +278,16 @@ class MarketInterface:
         self._df = df
         if self._use_cache:
             _LOG.info("Caching")
-            self._cached = {}
             hdbg.dassert_is_not(columns, None)
             columns = cast(List[str], columns)
-            for column in tqdm(columns):
-                hdbg.dassert_in(column, df.columns)
-                self._cached[column] = df[column].to_dict()
+            hdbg.dassert_is_subset(columns, df.columns)
+            # Store the values of all the columns in a single array, indexed
+            # by timestamp and column.
+            self._cached_values = df[columns].to_numpy()
+            self._cached_ts_to_idx = dict(zip(df.index, range(len(df.index))))
+            self._cached_column_to_idx = {
+                column: idx for idx, column in enumerate(columns)
+            }
             _LOG.info("Caching done")
 
     def get_instantaneous_price(
@@ -288,7 +297,9 @@ class MarketInterface:
     ) -> float:
         price: float
         if self._use_cache:
-            price = self._cached[column][ts]
+            price = self._cached_values[
+                self._cached_ts_to_idx[ts], self._cached_column_to_idx[column]
+            ]
         else:
             hdbg.dassert_in(ts, self._df.index)
             price = self._df.loc[ts][column]
@@ -320,6 +331,51 @@ class MarketInterface:
         price: float = prices.mean()
         return price
 
+    def get_instantaneous_prices(self, ts: pd.Index, column: str) -> np.ndarray:
+        """
+        Vectorized version of `get_instantaneous_price()` for all the
+        timestamps `ts`.
+        """
+        idxs = _get_idxs(self._df.index, ts)
+        prices = self._get_values(column)[idxs]
+        hdbg.dassert(np.isfinite(prices).all(), "prices=%s at ts=%s", prices, ts)
+        return prices
+
+    def get_twap_prices(
+        self, ts_start: pd.Index, ts_end: pd.Index, column: str
+    ) -> np.ndarray:
+        """
+        Vectorized version of `get_twap_price()` for all the intervals
+        (ts_start[i], ts_end[i]].
+        """
+        hdbg.dassert_eq(len(ts_start), len(ts_end))
+        start_idxs = _get_idxs(self._df.index, ts_start)
+        end_idxs = _get_idxs(self._df.index, ts_end)
+        hdbg.dassert((start_idxs < end_idxs).all())
+        values = self._get_values(column)
+        # Fill the NaNs with 0 and count the non-NaN values, like
+        # `pd.Series.mean()` does.
+        mask = np.isnan(values)
+        values = np.where(mask, 0.0, values)
+        prices = np.empty(len(start_idxs))
+        # Sum the intervals with the same number of values at once. Each
+        # interval is a contiguous row, so that the values are summed in the
+        # same order as in `pd.Series.mean()`.
+        lengths = end_idxs - start_idxs
+        for length in np.unique(lengths):
+            is_length = lengths == length
+            idxs = start_idxs[is_length, np.newaxis] + 1 + np.arange(length)
+            sums = values[idxs].sum(axis=1)
+            counts = length - mask[idxs].sum(axis=1)
+            with np.errstate(invalid="ignore"):
+                prices[is_length] = sums / counts
+        return prices
+
+    def _get_values(self, column: str) -> np.ndarray:
+        hdbg.dassert_in(column, self._df.columns)
+        values: np.ndarray = self._df[column].values
+        return values
+
 
 # #############################################################################
 # Order
@@ -418,6 +474,44 @@ class Order:
         )
         return price
 
+    @staticmethod
+    def get_prices(
+        mi: MarketInterface,
+        type_: str,
+        ts_start: pd.Index,
+        ts_end: pd.Index,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of `get_price()` for all the intervals
+        (ts_start[i], ts_end[i]].
+
+        :return: prices achieved by buy and sell orders, respectively
+        """
+        # Parse the type.
+        config = type_.split("@")
+        hdbg.dassert_eq(len(config), 2, "Invalid type_='%s'", type_)
+        price_type, timing = config
+        # Get the prices depending on the price_type.
+        if price_type in ("price", "midpoint"):
+            column = price_type
+            buy_prices = Order._get_prices(mi, ts_start, ts_end, column, timing)
+            sell_prices = buy_prices
+        elif price_type == "full_spread":
+            # Cross the spread depending on buy / sell.
+            buy_prices = Order._get_prices(mi, ts_start, ts_end, "ask", timing)
+            sell_prices = Order._get_prices(mi, ts_start, ts_end, "bid", timing)
+        elif price_type.startswith("partial_spread"):
+            perc = float(price_type.split("_")[2])
+            hdbg.dassert_lte(0, perc)
+            hdbg.dassert_lte(perc, 1.0)
+            bid_prices = Order._get_prices(mi, ts_start, ts_end, "bid", timing)
+            ask_prices = Order._get_prices(mi, ts_start, ts_end, "ask", timing)
+            buy_prices = perc * ask_prices + (1.0 - perc) * bid_prices
+            sell_prices = (1.0 - perc) * ask_prices + perc * bid_prices
+        else:
+            raise ValueError("Invalid type='%s'", type_)
+        return buy_prices, sell_prices
+
     def get_execution_price(self) -> float:
         """
         Get price that this order executes at.
@@ -475,6 +569,27 @@ class Order:
             raise ValueError("Invalid timing='%s'", timing)
         return price
 
+    @staticmethod
+    def _get_prices(
+        mi: MarketInterface,
+        ts_start: pd.Index,
+        ts_end: pd.Index,
+        column: str,
+        timing: str,
+    ) -> np.ndarray:
+        """
+        Vectorized version of `_get_price()`.
+        """
+        if timing == "start":
+            prices = mi.get_instantaneous_prices(ts_start, column)
+        elif timing == "end":
+            prices = mi.get_instantaneous_prices(ts_end, column)
+        elif timing == "twap":
+            prices = mi.get_twap_prices(ts_start, ts_end, column)
+        else:
+            raise ValueError("Invalid timing='%s'", timing)
+        return prices
+
 
 def get_orders_to_execute(orders: List[Order], ts: pd.Timestamp) -> List[Order]:
     """
@@ -498,15 +613,6 @@ def orders_to_string(orders: List[Order]) -> str:
 # Accounting functions.
 # #############################################################################
 
-Accounting = Dict[str, List[float]]
-
-
-def _create_accounting_stats(columns: List[str]) -> Accounting:
-    accounting = collections.OrderedDict()
-    for column in columns:
-        accounting[column] = []
-    return accounting
-
 
 def _get_col_name(col_name: str, prefix: str) -> str:
     if prefix != "":
@@ -525,13 +631,13 @@ def _append_accounting_df(
     dfs = []
     for key, value in accounting.items():
         _LOG.debug("key=%s", key)
-        num_vals = len(accounting[key])
-        buffer = [np.nan] * (df_5mins.shape[0] - num_vals)
+        hdbg.dassert_eq(value.ndim, 1)
+        hdbg.dassert_lte(value.shape[0], df_5mins.shape[0])
+        # Pad the missing values at the end with NaNs.
+        values = np.full(df_5mins.shape[0], np.nan)
+        values[: value.shape[0]] = value
         col_name = _get_col_name(key, prefix)
-        df = pd.DataFrame(
-            value + buffer, index=df_5mins.index, columns=[col_name]
-        )
-        hdbg.dassert_eq(df.shape[0], df_5mins.shape[0])
+        df = pd.DataFrame(values, index=df_5mins.index, columns=[col_name])
         dfs.append(df)
     df_5mins = pd.concat([df_5mins] + dfs, axis=1)
     return df_5mins
@@ -566,33 +672,6 @@ def get_total_wealth(
 # #############################################################################
 
 
-def _get_orders_to_execute(ts: pd.Timestamp, orders: List[Order]) -> List[Order]:
-    if True:
-        if orders[0].ts_start == ts:
-            return [orders.pop()]
-        # hdbg.dassert_eq(len(orders), 1, "%s", orders_to_string(orders))
-        assert 0
-    orders_to_execute = get_orders_to_execute(orders, ts)
-    _LOG.debug("orders_to_execute=%s", orders_to_string(orders_to_execute))
-    # Merge the orders.
-    merged_orders = []
-    while orders_to_execute:
-        order = orders_to_execute.pop()
-        orders_to_execute_tmp = orders_to_execute[:]
-        for next_order in orders_to_execute_tmp:
-            if order.is_mergeable(next_order):
-                order = order.merge(next_order)
-                orders_to_execute_tmp.remove(next_order)
-        merged_orders.append(order)
-        orders_to_execute = orders_to_execute_tmp
-    _LOG.debug(
-        "After merging:\n  merged_orders=%s\n  orders_to_execute=%s",
-        orders_to_string(merged_orders),
-        orders_to_string(orders_to_execute),
-    )
-    return merged_orders
-
-
 def compute_pnl_level2(
     mi: MarketInterface,
     df_5mins: pd.DataFrame,
@@ -600,27 +679,41 @@ def compute_pnl_level2(
     config: Dict[str, Any],
     prefix: str = "sim2",
 ) -> pd.DataFrame:
-    print(df_5mins)
+    """
+    In this implementation we use the prediction to place orders, that are
+    realized over the span of two intervals of time (i.e., two lags).
+
+    - The PnL is realized two intervals of time after the corresponding prediction
+    - The columns reported in the df are for the beginning of the interval of time
+    - The columns ending with `+1` represent what happens in the next interval
+      of time
+    """
     hdbg.dassert(df_5mins.index.is_monotonic)
-    # Create the accounting data structure.
-    columns = [
-        "target_n_shares",
-        "cash",
-        "holdings",
-        "wealth",
-        "diff_n_shares",
-        #
-        "filled_n_shares",
-        "cash+1",
-        "holdings+1",
-        # "wealth.after",
-    ]
-    accounting = _create_accounting_stats(columns)
-    preds = list(zip(df_5mins.index, df_5mins["preds"].values))
-    # Run the simulation.
-    accounting = _compute_pnl_level2(
-        mi, preds, initial_wealth, config, accounting
+    price_column = config["price_column"]
+    order_type = config["order_type"]
+    future_snoop_allocation = config.get("future_snoop_allocation", False)
+    # Each order is placed at the beginning of a 5 minute interval and executed
+    # by its end, i.e., in (ts, ts + 5 mins].
+    ts = df_5mins.index
+    ts_start = ts[:-1]
+    ts_end = ts_start + pd.Timedelta(minutes=5)
+    # Get all the prices needed by the simulation.
+    prices = mi.get_instantaneous_prices(ts, price_column)
+    buy_prices, sell_prices = Order.get_prices(mi, order_type, ts_start, ts_end)
+    end_prices = None
+    if future_snoop_allocation:
+        end_prices = mi.get_instantaneous_prices(ts_end, price_column)
+        end_prices = end_prices[:, np.newaxis]
+    # Run the simulation on a single instrument.
+    accounting = simulate_level2(
+        initial_wealth,
+        df_5mins["preds"].values[:, np.newaxis],
+        prices[:, np.newaxis],
+        buy_prices[:, np.newaxis],
+        sell_prices[:, np.newaxis],
+        end_prices=end_prices,
     )
+    accounting = {key: value[:, 0] for key, value in accounting.items()}
     # Update the df with intermediate results.
     df_5mins = _append_accounting_df(df_5mins, accounting, prefix)
     pnl = _get_col_name("pnl", prefix)
@@ -629,127 +722,108 @@ def compute_pnl_level2(
     return df_5mins
 
 
-def _compute_pnl_level2(
-    mi: MarketInterface,
-    preds: List[Tuple[pd.Timestamp, float]],
+def simulate_level2(
     initial_wealth: float,
-    config: Dict[str, Any],
-    accounting: Accounting,
+    preds: np.ndarray,
+    prices: np.ndarray,
+    buy_prices: np.ndarray,
+    sell_prices: np.ndarray,
+    *,
+    end_prices: Optional[np.ndarray] = None,
 ) -> Accounting:
     """
-    In this implementation we use the prediction to place orders, that are
-    realized over the span of two intervals of time (i.e., two lags).
-
-    - The PnL is realized two intervals of time after the corresponding prediction
-    - The columns reported in the df are for the beginning of the interval of time
-    - The columns ending with `+1` represent what happens in the next interval
-      of time
+    Run the level2 simulation on the arrays of one or more instruments.
+
+    At each bar but the last one:
+    - the portfolio is marked to market
+    - the prediction is converted into a target number of shares
+    - an order for the difference with the current holdings is placed and
+      executed by the next bar at `buy_prices` or `sell_prices`, depending on
+      the direction of the trade
+    At the last bar the portfolio is only marked to market.
+
+    Each instrument starts with `initial_wealth` and is simulated independently.
+    Since there is exactly one order per bar, the orders are matched with the
+    bars by position. The accounting is carried over time one bar at a time, so
+    that the floating point results are the same as the ones of a per-bar
+    simulation, while each step is vectorized across instruments.
+
+    :param preds: predictions with shape (num_bars, num_instruments)
+    :param prices: prices to mark the portfolio to market, with the same shape
+        as `preds`
+    :param buy_prices, sell_prices: execution prices of the orders placed at
+        each bar but the last one, with shape (num_bars - 1, num_instruments)
+    :param end_prices: prices at the end of the execution interval of each
+        order, with the same shape as `buy_prices`. If not `None`, use future
+        information to invest the entire wealth at the execution price (i.e.,
+        "future snoop allocation")
+    :return: accounting with arrays `wealth` with the same shape as `preds` and
+        `target_n_shares`, `cash`, `holdings`, `diff_n_shares`,
+        `filled_n_shares`, `cash+1`, `holdings+1` with the same shape as
+        `buy_prices`
     """
-
-    def _update(key: str, value: float) -> None:
-        prev_value = accounting[key][-1] if accounting[key] else None
-        _LOG.debug("%s=%s -> %s", key, prev_value, value)
-        accounting[key].append(value)
-
-    orders: List[Order] = []
+    hdbg.dassert_eq(preds.ndim, 2)
+    hdbg.dassert_lte(1, preds.shape[0])
+    hdbg.dassert_eq(preds.shape, prices.shape)
+    num_bars, num_instruments = preds.shape
+    orders_shape = (num_bars - 1, num_instruments)
+    hdbg.dassert_eq(buy_prices.shape, orders_shape)
+    hdbg.dassert_eq(sell_prices.shape, orders_shape)
+    hdbg.dassert(np.isfinite(preds).all(), "preds=%s", preds)
+    future_snoop_allocation = end_prices is not None
+    if future_snoop_allocation:
+        hdbg.dassert_eq(end_prices.shape, orders_shape)
+        # - In the vectorized PnL case we assume we work in terms of dollar and
+        #   not shares: we assume we can buy the entire amount of wealth in terms
+        #   of shares (i.e., we assume that we know the future execution price)
+        # - In the real set-up, we need to place order for a certain number of
+        #   shares before we know what price we will get. Thus we use the price
+        #   at the decision time to estimate the number of shares, which means
+        #   that we can't always invest exactly the whole available wealth.
+        # The direction of the trade is enough to determine the price.
+        alloc_prices = np.where(preds[:-1] >= 0, buy_prices, sell_prices)
+        hdbg.dassert(np.isfinite(alloc_prices).all())
+    accounting = {
+        "target_n_shares": np.empty(orders_shape),
+        "cash": np.empty(orders_shape),
+        "holdings": np.empty(orders_shape),
+        "wealth": np.empty(preds.shape),
+        "diff_n_shares": np.empty(orders_shape),
+        "filled_n_shares": np.empty(orders_shape),
+        "cash+1": np.empty(orders_shape),
+        "holdings+1": np.empty(orders_shape),
+    }
     # Initial balance.
-    holdings = 0.0
-    cash = initial_wealth
-    # Cache some variables used many times.
-    last_index, _ = preds[-1]
-    price_column = config["price_column"]
-    offset_5min = pd.DateOffset(minutes=5)
-    order_type = config["order_type"]
-    #
-    tqdm_out = htqdm.TqdmToLogger(_LOG, level=logging.INFO)
-    num_rows = len(preds)
-    for ts, pred in tqdm(preds, total=num_rows, file=tqdm_out):
-        # _LOG.debug(hprint.frame("# ts=%s" % _ts_to_str(ts)))
-        # 1) Place orders based on the predictions, if needed.
-        _LOG.debug("pred=%s", pred)
-        hdbg.dassert(np.isfinite(pred), "pred=%s", pred)
+    holdings = np.zeros(num_instruments)
+    cash = np.full(num_instruments, float(initial_wealth))
+    for i in range(num_bars - 1):
         # Mark the portfolio to market.
-        _LOG.debug("# Mark portfolio to market")
-        wealth = get_total_wealth(mi, ts, cash, holdings, price_column)
-        hdbg.dassert(np.isfinite(wealth), "wealth=%s", wealth)
-        _update("wealth", wealth)
-        if ts == last_index:
-            # For the last timestamp we only need to mark to market, but not post
-            # any more orders.
-            continue
-        # Use current price to convert forecasts in position intents.
-        _LOG.debug("# Decide how much to trade")
-        # Enter position between [0, 5].
-        ts_start = ts
-        ts_end = ts + offset_5min
-        if config.get("future_snoop_allocation", False):
-            # - In the vectorized PnL case we assume we work in terms of dollar and
-            #   not shares: we assume we can buy the entire amount of wealth in terms
-            #   of shares (i.e., we assume that we know the future execution price)
-            # - In the real set-up, we need to place order for a certain number of
-            #   shares before we know what price we will get. Thus we use the price
-            #   at the decision time to estimate the number of shares, which means
-            #   that we can't always invest exactly the whole available wealth.
-            # The direction of the trade is enough to determine the price.
-            num_shares_proxy = pred
-            price_0 = Order.get_price(
-                mi, order_type, ts_start, ts_end, num_shares_proxy
-            )
-            hdbg.dassert(np.isfinite(price_0), "price_0=%s", pred)
-            wealth_to_allocate = get_total_wealth(
-                mi, ts_end, cash, holdings, price_column
-            )
+        wealth = cash + holdings * prices[i]
+        accounting["wealth"][i] = wealth
+        # Use the allocation price to convert forecasts in position intents.
+        if future_snoop_allocation:
+            wealth_to_allocate = cash + holdings * end_prices[i]
+            price_0 = alloc_prices[i]
         else:
-            price_0 = mi.get_instantaneous_price(ts, price_column)
             wealth_to_allocate = wealth
-        _LOG.debug("price_0=%s", price_0)
+            price_0 = prices[i]
         target_num_shares = wealth_to_allocate / price_0
-        target_num_shares *= pred
-        _update("target_n_shares", target_num_shares)
-        _update("cash", cash)
-        _update("holdings", holdings)
-        _LOG.debug("# Place orders")
-        diff = target_num_shares - holdings
-        _update("diff_n_shares", diff)
-        # Create order.
-        order = Order(mi, order_type, ts_start, ts_end, diff)
-        _LOG.debug("order=%s", order)
-        orders.append(order)
-        # 2) Execute the orders.
-        # INV: When we get here all the orders for the current timestamp `ts` have
-        # been placed since we acted on the predictions for `ts` and we can't place
-        # orders in the past.
-        # Find all the orders with the current timestamp.
-        _LOG.debug("# Get orders to execute")
-        merged_orders = _get_orders_to_execute(ts, orders)
-        # Execute the merged orders.
-        _LOG.debug("# Execute orders")
-        # TODO(gp): We rely on the assumption that order span only one time step.
-        #  so we can evaluate an order starting now and ending in the next time step.
-        #  A more accurate simulation requires to attach "callbacks" representing
-        #  actions to timestamp.
-        # TODO(gp): For now there should be at most one order.
-        hdbg.dassert_lte(len(merged_orders), 1)
-        order = merged_orders[0]
-        _LOG.debug("order=%s", order)
-        num_shares = order.num_shares
-        _update("filled_n_shares", num_shares)
-        holdings += num_shares
-        _update("holdings+1", holdings)
-        executed_price = order.get_execution_price()
-        cash -= executed_price * num_shares
-        _update("cash+1", cash)
-    if use_profiler:
-        profiler.print_stats()
+        target_num_shares *= preds[i]
+        accounting["target_n_shares"][i] = target_num_shares
+        accounting["cash"][i] = cash
+        accounting["holdings"][i] = holdings
+        # Place and execute the order.
+        num_shares = target_num_shares - holdings
+        accounting["diff_n_shares"][i] = num_shares
+        accounting["filled_n_shares"][i] = num_shares
+        holdings = holdings + num_shares
+        accounting["holdings+1"][i] = holdings
+        executed_prices = np.where(num_shares >= 0, buy_prices[i], sell_prices[i])
+        cash = cash - executed_prices * num_shares
+        accounting["cash+1"][i] = cash
+    # For the last timestamp we only need to mark to market, but not post any
+    # more orders.
+    wealth = cash + holdings * prices[-1]
+    accounting["wealth"][-1] = wealth
+    hdbg.dassert(np.isfinite(accounting["wealth"]).all(), "wealth=%s", wealth)
     return accounting
-
-
-use_profiler = False
-# use_profiler = True
-
-
-if use_profiler:
-    import line_profiler
-
-    profiler = line_profiler.LineProfiler()
-    _compute_pnl_level2 = profiler(_compute_pnl_level2)
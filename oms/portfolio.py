@@ -21,6 +21,7 @@ import helpers.hpandas as hpandas
 import helpers.hprint as hprint
 import helpers.hsql as hsql
 import oms.broker as ombroker
+import oms.order as omorder
 
 _LOG = logging.getLogger(__name__)
 
@@ -275,6 +276,25 @@ class AbstractPortfolio(abc.ABC):
         )
         return portfolio
 
+    @staticmethod
+    def get_holdings_from_state(state: Dict[str, Any]) -> pd.Series:
+        """
+        Return the holdings stored in a state from `get_state()`.
+
+        The holdings can be used as `initial_holdings` of a new portfolio.
+        """
+        hdbg.dassert_in("holdings", state)
+        # Keys are strings after a JSON round trip.
+        holdings_dict = {
+            int(asset_id): num_shares
+            for asset_id, num_shares in state["holdings"].items()
+        }
+        # The cash is expected to be the last entry.
+        cash = holdings_dict.pop(AbstractPortfolio.CASH_ID)
+        holdings_dict[AbstractPortfolio.CASH_ID] = cash
+        holdings = pd.Series(holdings_dict, dtype="float64")
+        return holdings
+
     @property
     def universe(self) -> List[int]:
         # TODO(Paul): Consider making this time-dependent.
@@ -504,6 +524,40 @@ class AbstractPortfolio(abc.ABC):
         AbstractPortfolio._write_df(stats_df, log_dir, "statistics", file_name)
         return file_name
 
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Return the latest holdings of the portfolio as a serializable dict.
+
+        The state is well-defined only once all the submitted orders are filled,
+        and it allows to restart the simulation with a new portfolio (e.g., on
+        the next tile of data) using `get_holdings_from_state()`.
+
+        :return: dict like
+            ```
+            {
+                "timestamp": "2000-01-01 16:00:01-05:00",
+                "holdings": {101: 33.32, 202: 66.65, -1: 900039.56},
+            }
+            ```
+        """
+        hdbg.dassert(self._asset_holdings, "The portfolio was never marked")
+        open_orders = self.broker.get_open_orders()
+        hdbg.dassert(
+            not open_orders,
+            "There are open orders:\n%s",
+            omorder.orders_to_string(open_orders),
+        )
+        timestamp, asset_holdings = self._asset_holdings.peek()
+        cash_timestamp, cash = self._cash.peek()
+        hdbg.dassert_eq(timestamp, cash_timestamp)
+        holdings = {
+            int(asset_id): float(num_shares)
+            for asset_id, num_shares in asset_holdings.items()
+        }
+        holdings[AbstractPortfolio.CASH_ID] = float(cash)
+        state = {"timestamp": str(timestamp), "holdings": holdings}
+        return state
+
     def price_assets(self, asset_ids: List[int]) -> pd.Series:
         """
         Wrap `portfolio.market_data` and packages output.
@@ -834,7 +888,6 @@ class AbstractPortfolio(abc.ABC):
 
 
 class DataFramePortfolio(AbstractPortfolio):
-
     # A `fills_df` represents orders that have been executed (e.g., how many shares,
     # at how much).
     # Columns required in a `fills_df`.
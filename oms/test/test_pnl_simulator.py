@@ -1,11 +1,12 @@
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import pytest
 
 import helpers.hprint as hprint
+import helpers.htimer as htimer
 import helpers.hunit_test as hunitest
 import oms.pnl_simulator as opnlsimu
 
@@ -473,3 +474,313 @@ class TestPnlSimulator2(hunitest.TestCase):
 
 # TODO(gp): Add unit tests for computing PnL with level2 sim using midpoint price,
 #  and different spread amount.
+
+
+# #############################################################################
+
+
+def _compute_pnl_level1_loop(
+    initial_wealth: float, df: pd.DataFrame, df_5mins: pd.DataFrame
+) -> Dict[str, List[float]]:
+    """
+    Reference per-bar implementation of `compute_pnl_level1()`.
+    """
+    accounting: Dict[str, List[float]] = {
+        "num_shares": [],
+        "diff": [],
+        "wealth": [],
+    }
+    wealth = initial_wealth
+    for ts, row in df_5mins[:-2].iterrows():
+        pred = row["preds"]
+        price_5 = df.loc[ts + pd.DateOffset(minutes=5)]["price"]
+        price_10 = df.loc[ts + pd.DateOffset(minutes=10)]["price"]
+        num_shares = wealth / price_5
+        num_shares *= abs(pred)
+        if pred > 0:
+            diff = -num_shares * price_5 + num_shares * price_10
+        elif pred < 0:
+            diff = num_shares * price_5 - num_shares * price_10
+        else:
+            diff = 0.0
+        wealth += diff
+        accounting["num_shares"].append(num_shares)
+        accounting["diff"].append(diff)
+        accounting["wealth"].append(wealth)
+    return accounting
+
+
+def _compute_pnl_level2_loop(
+    mi: opnlsimu.MarketInterface,
+    df_5mins: pd.DataFrame,
+    initial_wealth: float,
+    config: Dict[str, Any],
+) -> Dict[str, List[float]]:
+    """
+    Reference per-bar implementation of `compute_pnl_level2()` with `Order`s.
+    """
+    keys = [
+        "target_n_shares",
+        "cash",
+        "holdings",
+        "wealth",
+        "diff_n_shares",
+        "filled_n_shares",
+        "cash+1",
+        "holdings+1",
+    ]
+    accounting: Dict[str, List[float]] = {key: [] for key in keys}
+    holdings = 0.0
+    cash = initial_wealth
+    price_column = config["price_column"]
+    order_type = config["order_type"]
+    for i, (ts, pred) in enumerate(df_5mins["preds"].items()):
+        wealth = opnlsimu.get_total_wealth(mi, ts, cash, holdings, price_column)
+        accounting["wealth"].append(wealth)
+        if i == df_5mins.shape[0] - 1:
+            break
+        ts_end = ts + pd.DateOffset(minutes=5)
+        if config["future_snoop_allocation"]:
+            price_0 = opnlsimu.Order.get_price(mi, order_type, ts, ts_end, pred)
+            wealth_to_allocate = opnlsimu.get_total_wealth(
+                mi, ts_end, cash, holdings, price_column
+            )
+        else:
+            price_0 = mi.get_instantaneous_price(ts, price_column)
+            wealth_to_allocate = wealth
+        target_num_shares = wealth_to_allocate / price_0
+        target_num_shares *= pred
+        accounting["target_n_shares"].append(target_num_shares)
+        accounting["cash"].append(cash)
+        accounting["holdings"].append(holdings)
+        order = opnlsimu.Order(
+            mi, order_type, ts, ts_end, target_num_shares - holdings
+        )
+        accounting["diff_n_shares"].append(order.num_shares)
+        accounting["filled_n_shares"].append(order.num_shares)
+        holdings += order.num_shares
+        accounting["holdings+1"].append(holdings)
+        cash -= order.get_execution_price() * order.num_shares
+        accounting["cash+1"].append(cash)
+    return accounting
+
+
+def _get_multi_instrument_data(
+    num_samples: int, num_instruments: int
+) -> Tuple[pd.DataFrame, List[pd.DataFrame]]:
+    """
+    Return 1-minute market data and 5-minute predictions for many instruments.
+
+    :return: 1-minute market data with `(column, instrument)` columns and one
+        `df_5mins` per instrument
+    """
+    dfs = {}
+    dfs_5mins = []
+    for i in range(num_instruments):
+        df, df_5mins = opnlsimu.get_example_market_data2(num_samples, seed=i)
+        dfs[i] = df
+        dfs_5mins.append(df_5mins)
+    df = pd.concat(dfs, axis=1).swaplevel(axis=1)
+    return df, dfs_5mins
+
+
+def _simulate_level2_multi_instrument(
+    df: pd.DataFrame,
+    dfs_5mins: List[pd.DataFrame],
+    initial_wealth: float,
+    order_type: str,
+) -> opnlsimu.Accounting:
+    """
+    Run the level2 simulation on all the instruments at once.
+    """
+    ts = dfs_5mins[0].index
+    ts_start = ts[:-1]
+    ts_end = ts_start + pd.Timedelta(minutes=5)
+    preds = np.column_stack([df_5mins["preds"] for df_5mins in dfs_5mins])
+    # Get the prices of each instrument.
+    prices = []
+    buy_prices = []
+    sell_prices = []
+    for instrument in range(len(dfs_5mins)):
+        mi = opnlsimu.MarketInterface(
+            df.xs(instrument, axis=1, level=1), use_cache=False
+        )
+        prices.append(mi.get_instantaneous_prices(ts, "price"))
+        buy_prices_tmp, sell_prices_tmp = opnlsimu.Order.get_prices(
+            mi, order_type, ts_start, ts_end
+        )
+        buy_prices.append(buy_prices_tmp)
+        sell_prices.append(sell_prices_tmp)
+    accounting = opnlsimu.simulate_level2(
+        initial_wealth,
+        preds,
+        np.column_stack(prices),
+        np.column_stack(buy_prices),
+        np.column_stack(sell_prices),
+    )
+    return accounting
+
+
+class TestPnlSimulator3(hunitest.TestCase):
+    """
+    Check the array-based simulations against the per-bar implementations.
+    """
+
+    def test_level1(self) -> None:
+        num_samples = 5 * 30 + 1
+        seed = 46
+        df, df_5mins = opnlsimu.get_example_market_data2(num_samples, seed)
+        initial_wealth = 1000.0
+        _, _, actual = opnlsimu.compute_pnl_level1(
+            initial_wealth, df, df_5mins, prefix=""
+        )
+        expected = _compute_pnl_level1_loop(initial_wealth, df, df_5mins)
+        for key, values in expected.items():
+            np.testing.assert_array_equal(
+                actual[key].values[: len(values)], values
+            )
+
+    def test_level2_price1(self) -> None:
+        self._test_level2("price@end", future_snoop_allocation=False)
+
+    def test_level2_price2(self) -> None:
+        self._test_level2("price@twap", future_snoop_allocation=True)
+
+    def test_level2_midpoint1(self) -> None:
+        self._test_level2("midpoint@start", future_snoop_allocation=False)
+
+    def test_level2_full_spread1(self) -> None:
+        self._test_level2("full_spread@twap", future_snoop_allocation=False)
+
+    def test_level2_full_spread2(self) -> None:
+        self._test_level2("full_spread@end", future_snoop_allocation=True)
+
+    def test_level2_partial_spread1(self) -> None:
+        self._test_level2("partial_spread_0.3@twap", future_snoop_allocation=True)
+
+    def test_get_twap_prices1(self) -> None:
+        """
+        Check the vectorized TWAP against the scalar one, also with NaNs.
+        """
+        df = opnlsimu.get_random_market_data(31)
+        df.iloc[[3, 7, 8, 9, 10, 11]] = np.nan
+        mi = opnlsimu.MarketInterface(df, use_cache=False)
+        ts_start = df.index[[0, 1, 5, 20]]
+        ts_end = df.index[[5, 30, 12, 30]]
+        actual = mi.get_twap_prices(ts_start, ts_end, "ask")
+        expected = [
+            mi.get_twap_price(start, end, "ask")
+            for start, end in zip(ts_start, ts_end)
+        ]
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_multi_instrument1(self) -> None:
+        """
+        Check that simulating many instruments at once is the same as
+        simulating each instrument separately.
+        """
+        num_instruments = 4
+        df, dfs_5mins = _get_multi_instrument_data(5 * 20 + 1, num_instruments)
+        initial_wealth = 1000.0
+        order_type = "full_spread@twap"
+        actual = _simulate_level2_multi_instrument(
+            df, dfs_5mins, initial_wealth, order_type
+        )
+        config = {
+            "price_column": "price",
+            "future_snoop_allocation": False,
+            "order_type": order_type,
+        }
+        for instrument in range(num_instruments):
+            mi = opnlsimu.MarketInterface(
+                df.xs(instrument, axis=1, level=1), use_cache=False
+            )
+            expected = opnlsimu.compute_pnl_level2(
+                mi, dfs_5mins[instrument], initial_wealth, config, prefix=""
+            )
+            for key, values in actual.items():
+                np.testing.assert_array_equal(
+                    values[:, instrument],
+                    expected[key].values[: values.shape[0]],
+                )
+
+    def _test_level2(
+        self, order_type: str, future_snoop_allocation: bool
+    ) -> None:
+        num_samples = 5 * 30 + 1
+        seed = 47
+        df, df_5mins = opnlsimu.get_example_market_data2(num_samples, seed)
+        df["midpoint"] = (df["ask"] + df["bid"]) / 2
+        mi = opnlsimu.MarketInterface(df, use_cache=False)
+        initial_wealth = 1000.0
+        config = {
+            "price_column": "price",
+            "future_snoop_allocation": future_snoop_allocation,
+            "order_type": order_type,
+        }
+        actual = opnlsimu.compute_pnl_level2(
+            mi, df_5mins, initial_wealth, config, prefix=""
+        )
+        expected = _compute_pnl_level2_loop(mi, df_5mins, initial_wealth, config)
+        for key, values in expected.items():
+            np.testing.assert_array_equal(
+                actual[key].values[: len(values)], values, err_msg=key
+            )
+
+
+class TestPnlSimulatorBenchmark(hunitest.TestCase):
+    """
+    Measure the throughput of the simulations in bars per second.
+    """
+
+    @pytest.mark.superslow("Benchmark.")
+    def test_one_instrument1(self) -> None:
+        num_samples = 5 * 2000 + 1
+        df, df_5mins = opnlsimu.get_example_market_data2(num_samples, seed=43)
+        num_bars = df_5mins.shape[0]
+        mi = opnlsimu.MarketInterface(df, use_cache=False)
+        initial_wealth = 1e6
+        config = {
+            "price_column": "price",
+            "future_snoop_allocation": False,
+            "order_type": "full_spread@twap",
+        }
+        with htimer.TimedScope(logging.INFO, "Per-bar level1") as ts:
+            _compute_pnl_level1_loop(initial_wealth, df, df_5mins)
+        level1_loop_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Vectorized level1") as ts:
+            opnlsimu.compute_pnl_level1(initial_wealth, df, df_5mins)
+        level1_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Per-bar level2") as ts:
+            _compute_pnl_level2_loop(mi, df_5mins, initial_wealth, config)
+        level2_loop_elapsed = ts.elapsed_time
+        with htimer.TimedScope(logging.INFO, "Array-based level2") as ts:
+            opnlsimu.compute_pnl_level2(mi, df_5mins, initial_wealth, config)
+        level2_elapsed = ts.elapsed_time
+        _LOG.info(
+            "level1: per-bar=%.0f bars/s, vectorized=%.0f bars/s, speedup=%.2fx",
+            num_bars / level1_loop_elapsed,
+            num_bars / level1_elapsed,
+            level1_loop_elapsed / level1_elapsed,
+        )
+        _LOG.info(
+            "level2: per-bar=%.0f bars/s, array-based=%.0f bars/s, speedup=%.2fx",
+            num_bars / level2_loop_elapsed,
+            num_bars / level2_elapsed,
+            level2_loop_elapsed / level2_elapsed,
+        )
+
+    @pytest.mark.superslow("Benchmark.")
+    def test_many_instruments1(self) -> None:
+        num_instruments = 100
+        df, dfs_5mins = _get_multi_instrument_data(5 * 2000 + 1, num_instruments)
+        num_bars = dfs_5mins[0].shape[0] * num_instruments
+        with htimer.TimedScope(logging.INFO, "Array-based level2") as ts:
+            _simulate_level2_multi_instrument(
+                df, dfs_5mins, 1e6, "full_spread@twap"
+            )
+        _LOG.info(
+            "level2: %s instruments, %.0f bars/s",
+            num_instruments,
+            num_bars / ts.elapsed_time,
+        )
@@ -0,0 +1,235 @@
+import datetime
+import logging
+import os
+import unittest.mock as umock
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import core.config as cconfig
+import helpers.hasyncio as hasynci
+import helpers.hparquet as hparque
+import helpers.hunit_test as hunitest
+import oms.tiled_process_forecasts as otiprfor
+
+_LOG = logging.getLogger(__name__)
+
+
+def _get_data(
+    dates: List[str], asset_ids: List[int], seed: int = 0
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Build market data and backtest data with 5-minute bars in [9:30, 10:30].
+
+    :return: market data and backtest data indexed by the end of the bars
+    """
+    np.random.seed(seed)
+    index = []
+    for date in dates:
+        index.extend(
+            pd.date_range(
+                f"{date} 09:30", f"{date} 10:30", freq="5T", tz="America/New_York"
+            )
+        )
+    index = pd.DatetimeIndex(index, name="end_time")
+    market_data_dfs = []
+    backtest_dfs = []
+    for asset_id in asset_ids:
+        close = 100.0 + np.random.randn(len(index)).cumsum()
+        market_data_df = pd.DataFrame(
+            {
+                "asset_id": asset_id,
+                "close": close,
+                "start_time": index - pd.Timedelta(minutes=5),
+            },
+            index=index,
+        )
+        market_data_dfs.append(market_data_df)
+        backtest_df = pd.DataFrame(
+            {
+                "asset_id": asset_id,
+                "prediction": np.random.randn(len(index)),
+                "volatility": np.abs(np.random.randn(len(index))) + 1.0,
+                "spread": 0.0,
+            },
+            index=index,
+        )
+        backtest_dfs.append(backtest_df)
+    market_data_df = pd.concat(market_data_dfs).sort_index()
+    backtest_df = pd.concat(backtest_dfs).sort_index()
+    return market_data_df, backtest_df
+
+
+def _to_tiles(df: pd.DataFrame, dst_dir: str) -> None:
+    """
+    Save `df` partitioned by asset and year / month, like backtest tiles.
+    """
+    df, partition_columns = hparque.add_date_partition_columns(
+        df.copy(), "by_year_month"
+    )
+    hparque.to_partitioned_parquet(df, ["asset_id"] + partition_columns, dst_dir)
+
+
+def _get_process_forecasts_config() -> cconfig.Config:
+    dict_ = {
+        "order_config": {
+            "order_type": "price@twap",
+            "order_duration": 5,
+        },
+        "optimizer_config": {
+            "backend": "compute_target_positions_in_cash",
+            "target_gmv": 1e5,
+            "dollar_neutrality": "no_constraint",
+        },
+        "execution_mode": "batch",
+        "ath_start_time": datetime.time(9, 30),
+        "trading_start_time": datetime.time(9, 35),
+        "ath_end_time": datetime.time(16, 00),
+        "trading_end_time": datetime.time(10, 25),
+        "remove_weekends": True,
+    }
+    config = cconfig.get_config_from_nested_dict(dict_)
+    return config
+
+
+class TestRunTiledProcessForecasts1(hunitest.TestCase):
+    def test_serial1(self) -> None:
+        """
+        Check that chaining tiles is the same as processing all the data.
+        """
+        market_data_df, backtest_df = self._get_data()
+        expected = self._process_all_data(market_data_df, backtest_df)
+        states = self._run_tiled_process_forecasts(market_data_df, backtest_df)
+        self.assertEqual(len(states), 2)
+        self.assertEqual(states[-1], expected)
+
+    def test_parallel1(self) -> None:
+        """
+        Check that processing tiles concurrently is the same as processing
+        them serially, when a tile needs to be processed again.
+        """
+        market_data_df, backtest_df = self._get_data()
+        expected = self._run_tiled_process_forecasts(market_data_df, backtest_df)
+        # Count the tiles processed again in the parent process.
+        with umock.patch.object(
+            otiprfor, "_process_tile", wraps=otiprfor._process_tile
+        ) as process_tile_mock:
+            actual = self._run_tiled_process_forecasts(
+                market_data_df, backtest_df, num_workers=2
+            )
+        self.assertEqual(process_tile_mock.call_count, 1)
+        self.assertEqual(actual, expected)
+
+    def test_parallel2(self) -> None:
+        """
+        Same as `test_parallel1()`, but the holdings are flat at the end of
+        each tile, so that the states of all the tiles are kept.
+        """
+        market_data_df, backtest_df = self._get_data()
+        # Close all the positions at the end of each day.
+        is_last_bar = backtest_df.index.time == datetime.time(10, 25)
+        backtest_df.loc[is_last_bar, "prediction"] = 0.0
+        expected = self._run_tiled_process_forecasts(market_data_df, backtest_df)
+        # Count the tiles processed again in the parent process.
+        with umock.patch.object(
+            otiprfor, "_process_tile", wraps=otiprfor._process_tile
+        ) as process_tile_mock:
+            actual = self._run_tiled_process_forecasts(
+                market_data_df, backtest_df, num_workers=2
+            )
+        process_tile_mock.assert_not_called()
+        self.assertEqual(len(actual), len(expected))
+        for actual_state, expected_state in zip(actual, expected):
+            self.assertEqual(
+                actual_state["timestamp"], expected_state["timestamp"]
+            )
+            actual_holdings = pd.Series(actual_state["holdings"])
+            expected_holdings = pd.Series(expected_state["holdings"])
+            pd.testing.assert_series_equal(
+                actual_holdings, expected_holdings, rtol=1e-9
+            )
+
+    @staticmethod
+    def _get_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return _get_data(["2000-12-29", "2001-01-02"], [101, 202])
+
+    def _run_tiled_process_forecasts(
+        self,
+        market_data_df: pd.DataFrame,
+        backtest_df: pd.DataFrame,
+        *,
+        num_workers: int = 1,
+    ) -> List[otiprfor.TileState]:
+        scratch_dir = self.get_scratch_space()
+        market_data_dir = os.path.join(scratch_dir, "market_data")
+        backtest_dir = os.path.join(scratch_dir, "backtest")
+        _to_tiles(market_data_df, market_data_dir)
+        _to_tiles(backtest_df, backtest_dir)
+        market_data_tile_config = cconfig.get_config_from_nested_dict(
+            {
+                "file_name": market_data_dir,
+                "price_col": "close",
+                "knowledge_datetime_col": "end_time",
+                "start_time_col": "start_time",
+                "end_time_col": "end_time",
+            }
+        )
+        backtest_tile_config = cconfig.get_config_from_nested_dict(
+            {
+                "file_name": backtest_dir,
+                "asset_id_col": "asset_id",
+                "start_date": datetime.date(2000, 12, 1),
+                "end_date": datetime.date(2001, 1, 31),
+                "prediction_col": "prediction",
+                "volatility_col": "volatility",
+                "spread_col": "spread",
+            }
+        )
+        with hasynci.solipsism_context() as event_loop:
+            coroutine = otiprfor.run_tiled_process_forecasts(
+                event_loop,
+                market_data_tile_config,
+                backtest_tile_config,
+                _get_process_forecasts_config(),
+                num_workers=num_workers,
+            )
+            states = hasynci.run(coroutine, event_loop=event_loop)
+        return states
+
+    @staticmethod
+    def _process_all_data(
+        market_data_df: pd.DataFrame,
+        backtest_df: pd.DataFrame,
+        state: Optional[otiprfor.TileState] = None,
+    ) -> otiprfor.TileState:
+        """
+        Process all the data as a single tile.
+        """
+        market_data_tile_config = cconfig.get_config_from_nested_dict(
+            {
+                "knowledge_datetime_col": "end_time",
+                "start_time_col": "start_time",
+                "end_time_col": "end_time",
+            }
+        )
+        backtest_tile_config = cconfig.get_config_from_nested_dict(
+            {
+                "asset_id_col": "asset_id",
+                "prediction_col": "prediction",
+                "volatility_col": "volatility",
+                "spread_col": "spread",
+            }
+        )
+        with hasynci.solipsism_context() as event_loop:
+            coroutine = otiprfor._process_tile(
+                event_loop,
+                market_data_df.copy(),
+                backtest_df.copy(),
+                market_data_tile_config=market_data_tile_config,
+                backtest_tile_config=backtest_tile_config,
+                process_forecasts_config=_get_process_forecasts_config(),
+                state=state,
+            )
+            state = hasynci.run(coroutine, event_loop=event_loop)
+        return state
@@ -4,13 +4,18 @@ Import as:
 import oms.tiled_process_forecasts as otiprfor
 """
 import asyncio
+import concurrent.futures
 import datetime
+import functools
 import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from tqdm.autonotebook import tqdm
 
 import core.config as cconfig
+import helpers.hasyncio as hasynci
+import helpers.hdbg as hdbg
 import helpers.hpandas as hpandas
 import helpers.hparquet as hparque
 import market_data as mdata
@@ -20,15 +25,24 @@ import oms.process_forecasts_ as oprofore
 
 _LOG = logging.getLogger(__name__)
 
+# The state of the simulation at the end of a tile, as returned by
+# `AbstractPortfolio.get_state()`.
+TileState = Dict[str, Any]
+
 
 # TODO(Paul): Move this or make it an example.
-def get_portfolio(market_data: mdata.MarketData) -> omportfo.AbstractPortfolio:
+def get_portfolio(
+    market_data: mdata.MarketData,
+    *,
+    initial_holdings: Optional[pd.Series] = None,
+) -> omportfo.AbstractPortfolio:
     strategy_id = "strategy"
     account = "account"
     timestamp_col = "end_time"
     mark_to_market_col = "close"
     pricing_method = "twap.5T"
-    initial_holdings = pd.Series([0], [-1])
+    if initial_holdings is None:
+        initial_holdings = pd.Series([0], [-1])
     column_remap = {
         "bid": "bid",
         "ask": "ask",
@@ -81,91 +95,296 @@ async def run_tiled_process_forecasts(
     market_data_tile_config: cconfig.Config,
     backtest_tile_config: cconfig.Config,
     process_forecasts_config: cconfig.Config,
-) -> None:
-    # Process `backtest_tile_config`.
-    backtest_file_name = backtest_tile_config["file_name"]
-    asset_id_col = backtest_tile_config["asset_id_col"]
+    *,
+    initial_state: Optional[TileState] = None,
+    num_workers: int = 1,
+) -> List[TileState]:
+    """
+    Run `process_forecasts()` on yearly tiles of backtest and market data.
+
+    At the end of each tile the open orders are filled and the state of the
+    portfolio is used to initialize the portfolio of the next tile, so that the
+    holdings and cash are the same as processing all the data at once.
+
+    With `num_workers > 1` the tiles are processed concurrently, each starting
+    from `initial_state`, and then reconciled in order:
+    - if a tile started from the same (non-cash) holdings as the end of the
+      previous tile, its state is kept and its cash is shifted by the difference
+      in the initial cash, since the orders don't depend on the cash (up to
+      rounding errors in the cash)
+    - otherwise the tile is processed again from the end of the previous tile
+
+    :param initial_state: state to initialize the portfolio of the first tile;
+        `None` for no holdings and no cash
+    :param num_workers: number of processes to run tiles concurrently
+    :return: the state at the end of each tile
+    """
     start_date = backtest_tile_config["start_date"]
     end_date = backtest_tile_config["end_date"]
-    prediction_col = backtest_tile_config["prediction_col"]
-    volatility_col = backtest_tile_config["volatility_col"]
-    spread_col = backtest_tile_config["spread_col"]
+    process_tile = functools.partial(
+        _process_tile,
+        market_data_tile_config=market_data_tile_config,
+        backtest_tile_config=backtest_tile_config,
+        process_forecasts_config=process_forecasts_config,
+    )
+    states = []
+    state = initial_state
+    if num_workers == 1:
+        # Process forecasts by tile.
+        tiles = _yield_tiles(
+            market_data_tile_config, backtest_tile_config, start_date, end_date
+        )
+        num_years = end_date.year - start_date.year + 1
+        for market_data_tile, backtest_tile in tqdm(tiles, total=num_years):
+            state = await process_tile(
+                event_loop, market_data_tile, backtest_tile, state=state
+            )
+            states.append(state)
+        return states
+    hdbg.dassert_lt(1, num_workers)
+    # The logs of the tiles that are kept would have a different cash.
+    hdbg.dassert_is(
+        process_forecasts_config.get("log_dir", None),
+        None,
+        "Logging is not supported with multiple workers",
+    )
+    # Process all the tiles concurrently from `initial_state`.
+    date_ranges = _get_yearly_date_ranges(start_date, end_date)
+    func = functools.partial(
+        _process_tile_in_worker,
+        market_data_tile_config,
+        backtest_tile_config,
+        process_forecasts_config,
+        initial_state,
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers
+    ) as executor:
+        speculative_states = list(executor.map(func, date_ranges))
+    # Reconcile the states at the tile boundaries.
+    initial_holdings = _get_initial_holdings(initial_state)
+    for (tile_start_date, tile_end_date), speculative_state in zip(
+        date_ranges, speculative_states
+    ):
+        holdings = _get_initial_holdings(state)
+        if _get_asset_holdings(holdings).equals(
+            _get_asset_holdings(initial_holdings)
+        ):
+            cash_diff = (
+                holdings[omportfo.AbstractPortfolio.CASH_ID]
+                - initial_holdings[omportfo.AbstractPortfolio.CASH_ID]
+            )
+            state = _shift_cash(speculative_state, cash_diff)
+        else:
+            _LOG.info(
+                "Processing again the tile for [%s, %s]",
+                tile_start_date,
+                tile_end_date,
+            )
+            tiles = _yield_tiles(
+                market_data_tile_config,
+                backtest_tile_config,
+                tile_start_date,
+                tile_end_date,
+            )
+            market_data_tile, backtest_tile = next(tiles)
+            state = await process_tile(
+                event_loop, market_data_tile, backtest_tile, state=state
+            )
+        states.append(state)
+    return states
+
+
+def _yield_tiles(
+    market_data_tile_config: cconfig.Config,
+    backtest_tile_config: cconfig.Config,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Yield market data and backtest tiles for each year in [start_date, end_date].
+    """
     # Yield backtest tiles.
-    backtest_cols = [asset_id_col, volatility_col, prediction_col, spread_col]
+    asset_id_col = backtest_tile_config["asset_id_col"]
+    backtest_cols = [
+        asset_id_col,
+        backtest_tile_config["volatility_col"],
+        backtest_tile_config["prediction_col"],
+        backtest_tile_config["spread_col"],
+    ]
     backtest_tiles = hparque.yield_parquet_tiles_by_year(
-        backtest_file_name,
+        backtest_tile_config["file_name"],
         start_date,
         end_date,
         backtest_cols,
     )
-    # Process `market_data_tile_config`.
-    market_data_file_name = market_data_tile_config["file_name"]
-    price_col = market_data_tile_config["price_col"]
-    knowledge_datetime_col = market_data_tile_config["knowledge_datetime_col"]
-    start_time_col = market_data_tile_config["start_time_col"]
-    end_time_col = market_data_tile_config["end_time_col"]
     # Yield market data tiles.
     market_data_cols = [
         asset_id_col,
-        price_col,
-        knowledge_datetime_col,
-        start_time_col,
-        end_time_col,
+        market_data_tile_config["price_col"],
+        market_data_tile_config["knowledge_datetime_col"],
+        market_data_tile_config["start_time_col"],
+        market_data_tile_config["end_time_col"],
     ]
     market_data_cols = list(set(market_data_cols))
     market_data_tiles = hparque.yield_parquet_tiles_by_year(
-        market_data_file_name,
+        market_data_tile_config["file_name"],
         start_date,
         end_date,
         market_data_cols,
     )
-    # Process forecasts by tile.
-    num_years = end_date.year - start_date.year + 1
-    for backtest_tile in tqdm(backtest_tiles, total=num_years):
-        # Parquet reads asset_ids as categoricals; convert to ints.
-        backtest_tile = hpandas.convert_col_to_int(backtest_tile, asset_id_col)
-        # Convert any dataframe columns to ints if possible.
-        backtest_tile = backtest_tile.rename(columns=hparque.maybe_cast_to_int)
-        # Build a `MarketData` object from `market_data_tile`.
-        market_data_tile = next(market_data_tiles)
-        market_data_tile = hpandas.convert_col_to_int(
-            market_data_tile, asset_id_col
-        )
-        market_data_tile.index.name = end_time_col
-        market_data_tile = market_data_tile.reset_index()
-        market_data, _ = mdata.get_ReplayedTimeMarketData_from_df(
+    yield from zip(market_data_tiles, backtest_tiles)
+
+
+def _get_yearly_date_ranges(
+    start_date: datetime.date, end_date: datetime.date
+) -> List[Tuple[datetime.date, datetime.date]]:
+    """
+    Split [start_date, end_date] into the intervals loaded as a single tile.
+    """
+    hdbg.dassert_lte(start_date, end_date)
+    date_ranges = []
+    for year in range(start_date.year, end_date.year + 1):
+        tile_start_date = max(start_date, datetime.date(year, 1, 1))
+        tile_end_date = min(end_date, datetime.date(year, 12, 31))
+        date_ranges.append((tile_start_date, tile_end_date))
+    return date_ranges
+
+
+def _get_initial_holdings(state: Optional[TileState]) -> pd.Series:
+    if state is None:
+        # Start with no holdings and no cash.
+        state = {"holdings": {omportfo.AbstractPortfolio.CASH_ID: 0.0}}
+    holdings = omportfo.AbstractPortfolio.get_holdings_from_state(state)
+    return holdings
+
+
+def _get_asset_holdings(holdings: pd.Series) -> pd.Series:
+    """
+    Return the non-zero holdings excluding cash, sorted by asset id.
+
+    Flat positions are dropped, so that a portfolio that closed its positions
+    has the same asset holdings as one that never had them.
+    """
+    asset_holdings = holdings.drop(omportfo.AbstractPortfolio.CASH_ID)
+    asset_holdings = asset_holdings[asset_holdings != 0].sort_index()
+    return asset_holdings
+
+
+def _shift_cash(state: TileState, cash_diff: float) -> TileState:
+    holdings = omportfo.AbstractPortfolio.get_holdings_from_state(state)
+    holdings[omportfo.AbstractPortfolio.CASH_ID] += cash_diff
+    state = {**state, "holdings": holdings.to_dict()}
+    return state
+
+
+async def _process_tile(
+    event_loop: asyncio.AbstractEventLoop,
+    market_data_tile: pd.DataFrame,
+    backtest_tile: pd.DataFrame,
+    *,
+    market_data_tile_config: cconfig.Config,
+    backtest_tile_config: cconfig.Config,
+    process_forecasts_config: cconfig.Config,
+    state: Optional[TileState],
+) -> TileState:
+    """
+    Run `process_forecasts()` on a tile starting from `state`.
+
+    :return: the state at the end of the tile, once the open orders are filled
+    """
+    # Process `backtest_tile_config`.
+    asset_id_col = backtest_tile_config["asset_id_col"]
+    prediction_col = backtest_tile_config["prediction_col"]
+    volatility_col = backtest_tile_config["volatility_col"]
+    spread_col = backtest_tile_config["spread_col"]
+    # Process `market_data_tile_config`.
+    knowledge_datetime_col = market_data_tile_config["knowledge_datetime_col"]
+    start_time_col = market_data_tile_config["start_time_col"]
+    end_time_col = market_data_tile_config["end_time_col"]
+    # Parquet reads asset_ids as categoricals; convert to ints.
+    backtest_tile = hpandas.convert_col_to_int(backtest_tile, asset_id_col)
+    # Convert any dataframe columns to ints if possible.
+    backtest_tile = backtest_tile.rename(columns=hparque.maybe_cast_to_int)
+    # Build a `MarketData` object from `market_data_tile`.
+    market_data_tile = hpandas.convert_col_to_int(market_data_tile, asset_id_col)
+    market_data_tile.index.name = end_time_col
+    market_data_tile = market_data_tile.reset_index()
+    market_data, _ = mdata.get_ReplayedTimeMarketData_from_df(
+        event_loop,
+        5,
+        market_data_tile,
+        knowledge_datetime_col_name=knowledge_datetime_col,
+        asset_id_col_name=asset_id_col,
+        start_time_col_name=start_time_col,
+        end_time_col_name=end_time_col,
+    )
+    # Initialize `portfolio` from the state at the end of the previous tile.
+    initial_holdings = _get_initial_holdings(state)
+    portfolio = get_portfolio(market_data, initial_holdings=initial_holdings)
+    # Extract the prediction, volatility, and spread data as dataframes with
+    # columns equal to asset ids, pivoting all of them at once.
+    backtest_df = backtest_tile.pivot(
+        columns=asset_id_col,
+        values=[prediction_col, volatility_col, spread_col],
+    )
+    prediction_df = backtest_df[prediction_col]
+    volatility_df = backtest_df[volatility_col]
+    spread_df = backtest_df[spread_col]
+    restrictions_df = None
+    await oprofore.process_forecasts(
+        prediction_df,
+        volatility_df,
+        portfolio,
+        process_forecasts_config,
+        spread_df,
+        restrictions_df,
+    )
+    await _fill_open_orders(portfolio)
+    state = portfolio.get_state()
+    return state
+
+
+async def _fill_open_orders(portfolio: omportfo.AbstractPortfolio) -> None:
+    """
+    Wait for the open orders to be filled and mark the portfolio to market.
+    """
+    open_orders = portfolio.broker.get_open_orders()
+    if not open_orders:
+        return
+    end_timestamp = max(order.end_timestamp for order in open_orders)
+    get_wall_clock_time = portfolio.market_data.get_wall_clock_time
+    await hasynci.async_wait_until(end_timestamp, get_wall_clock_time)
+    # Wait 1 second to give all open orders sufficient time to close, as in
+    # `process_forecasts()`.
+    await asyncio.sleep(1)
+    portfolio.mark_to_market()
+
+
+def _process_tile_in_worker(
+    market_data_tile_config: cconfig.Config,
+    backtest_tile_config: cconfig.Config,
+    process_forecasts_config: cconfig.Config,
+    state: Optional[TileState],
+    date_range: Tuple[datetime.date, datetime.date],
+) -> TileState:
+    """
+    Load and process the tile for `date_range` with its own event loop.
+    """
+    start_date, end_date = date_range
+    tiles = _yield_tiles(
+        market_data_tile_config, backtest_tile_config, start_date, end_date
+    )
+    market_data_tile, backtest_tile = next(tiles)
+    with hasynci.solipsism_context() as event_loop:
+        coroutine = _process_tile(
             event_loop,
-            5,
             market_data_tile,
-            knowledge_datetime_col_name=knowledge_datetime_col,
-            asset_id_col_name=asset_id_col,
-            start_time_col_name=start_time_col,
-            end_time_col_name=end_time_col,
-        )
-        # TODO(Paul): Initialize `portfolio` from state from previous loop.
-        portfolio = get_portfolio(market_data)
-        # Extract the prediction and volatility data as dataframes with columns
-        # equal to asset ids.
-        prediction_df = backtest_tile[[prediction_col, asset_id_col]].pivot(
-            columns=asset_id_col,
-            values=prediction_col,
+            backtest_tile,
+            market_data_tile_config=market_data_tile_config,
+            backtest_tile_config=backtest_tile_config,
+            process_forecasts_config=process_forecasts_config,
+            state=state,
         )
-        volatility_df = backtest_tile[[volatility_col, asset_id_col]].pivot(
-            columns=asset_id_col,
-            values=volatility_col,
-        )
-        spread_df = backtest_tile[[spread_col, asset_id_col]].pivot(
-            columns=asset_id_col,
-            values=spread_col,
-        )
-        restrictions_df = None
-        await oprofore.process_forecasts(
-            prediction_df,
-            volatility_df,
-            portfolio,
-            process_forecasts_config,
-            spread_df,
-            restrictions_df,
-        )
-        # TODO(Paul): Save `portfolio` state.
-    return portfolio
+        state = hasynci.run(coroutine, event_loop=event_loop)
+    return state